@@ -0,0 +1,188 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, set_next_cursor
+from app.db.database import get_async_db
+from app.db.grocery import create_generated_grocery_list
+from app.db.versions import GROCERY_LIST, INGREDIENT, bump_collection_version_async, get_collection_versions_async
+from app.models.models import GroceryList as GroceryListModel, Ingredient as IngredientModel, grocery_list_item
+from app.schemas.schemas import (
+    GeneratedGroceryList, GroceryList, GroceryListCreate, GroceryListGenerate, GroceryItemUpdate
+)
+
+router = APIRouter()
+
+# Longest range one generated grocery list may cover
+MAX_GENERATE_DAYS = 31
+
+async def load_grocery_list(db: AsyncSession, grocery_list_id: int, fields: Fields = None) -> GroceryListModel:
+    query = select(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+    query = query.where(GroceryListModel.id == grocery_list_id)
+    grocery_list = await db.scalar(query.execution_options(populate_existing=True))
+    if grocery_list is None:
+        raise HTTPException(status_code=404, detail="Grocery list not found")
+    return grocery_list
+
+async def add_grocery_items(db: AsyncSession, grocery_list_id: int, grocery_list: GroceryListCreate) -> None:
+    # Check all referenced ingredients in one query instead of one per item
+    ingredient_ids = {item_data.ingredient_id for item_data in grocery_list.items}
+    found = set((await db.scalars(
+        select(IngredientModel.id).where(IngredientModel.id.in_(ingredient_ids))
+    )).all())
+    for item_data in grocery_list.items:
+        if int(item_data.ingredient_id) not in found:
+            raise HTTPException(status_code=404, detail=f"Ingredient with id {item_data.ingredient_id} not found")
+    
+    if grocery_list.items:
+        await db.execute(grocery_list_item.insert(), [
+            {
+                "grocery_list_id": grocery_list_id,
+                "ingredient_id": int(item_data.ingredient_id),
+                "quantity": item_data.quantity,
+                "unit": item_data.unit,
+                "checked": 1 if item_data.checked else 0
+            }
+            for item_data in grocery_list.items
+        ])
+
+@router.post("/grocery-lists/", response_model=GroceryList, status_code=status.HTTP_201_CREATED)
+async def create_grocery_list(grocery_list: GroceryListCreate, db: AsyncSession = Depends(get_async_db)):
+    # Create grocery list and its items in a single transaction
+    db_grocery_list = GroceryListModel(
+        name=grocery_list.name,
+        meal_plan_id=grocery_list.meal_plan_id
+    )
+    db.add(db_grocery_list)
+    await db.flush()
+    await add_grocery_items(db, db_grocery_list.id, grocery_list)
+    await bump_collection_version_async(db, GROCERY_LIST)
+    await db.commit()
+    
+    return await load_grocery_list(db, db_grocery_list.id)
+
+@router.post("/grocery-lists/generate", response_model=GeneratedGroceryList, status_code=status.HTTP_201_CREATED)
+async def generate_grocery_list(request: GroceryListGenerate, db: AsyncSession = Depends(get_async_db)):
+    if request.end_date < request.start_date or (request.end_date - request.start_date).days >= MAX_GENERATE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_GENERATE_DAYS} days")
+    
+    # The expansion is a few queries and array operations; run it on the sync session API
+    name = request.name or f"Groceries {request.start_date} to {request.end_date}"
+    grocery_list = await db.run_sync(
+        create_generated_grocery_list, name, request.start_date, request.end_date, request.servings
+    )
+    await db.commit()
+    return grocery_list
+
+@router.get("/grocery-lists/", response_model=List[GroceryList])
+async def read_grocery_lists(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Fields = Depends(field_selection(GroceryList)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Items carry their ingredient's name, so ingredient writes change lists too
+    versions = await get_collection_versions_async(db, [GROCERY_LIST, INGREDIENT])
+    etag = request_etag(request, GROCERY_LIST, versions[GROCERY_LIST], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    # Legacy offset paging, kept for existing clients
+    if skip is not None:
+        query = select(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+        result = await db.scalars(query.offset(skip).limit(limit))
+        return sparse_response(GroceryList, fields, result.all(), response)
+    
+    # Keyset paging on the primary key
+    query = select(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+    query = query.order_by(GroceryListModel.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.where(GroceryListModel.id > last_id)
+    
+    # Fetch one extra row to find out whether there is a next page
+    grocery_lists = (await db.scalars(query.limit(limit + 1))).all()
+    if len(grocery_lists) > limit:
+        grocery_lists = grocery_lists[:limit]
+        set_next_cursor(response, encode_cursor([grocery_lists[-1].id]))
+    return sparse_response(GroceryList, fields, grocery_lists, response)
+
+@router.get("/grocery-lists/{grocery_list_id}", response_model=GroceryList)
+async def read_grocery_list(
+    grocery_list_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(GroceryList)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Items carry their ingredient's name, so ingredient writes change lists too
+    versions = await get_collection_versions_async(db, [GROCERY_LIST, INGREDIENT])
+    etag = request_etag(request, GROCERY_LIST, versions[GROCERY_LIST], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    grocery_list = await load_grocery_list(db, grocery_list_id, fields)
+    return sparse_response(GroceryList, fields, grocery_list, response)
+
+@router.put("/grocery-lists/{grocery_list_id}", response_model=GroceryList)
+async def update_grocery_list(
+    grocery_list_id: int,
+    grocery_list: GroceryListCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_grocery_list = await load_grocery_list(db, grocery_list_id)
+    
+    # Update grocery list attributes
+    db_grocery_list.name = grocery_list.name
+    db_grocery_list.meal_plan_id = grocery_list.meal_plan_id
+    
+    # Replace items
+    await db.execute(grocery_list_item.delete().where(grocery_list_item.c.grocery_list_id == grocery_list_id))
+    await add_grocery_items(db, grocery_list_id, grocery_list)
+    await bump_collection_version_async(db, GROCERY_LIST)
+    await db.commit()
+    
+    return await load_grocery_list(db, grocery_list_id)
+
+@router.patch("/grocery-lists/{grocery_list_id}/items/{ingredient_id}", response_model=GroceryList)
+async def update_grocery_item(
+    grocery_list_id: int,
+    ingredient_id: int,
+    item: GroceryItemUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Check if grocery list exists
+    await load_grocery_list(db, grocery_list_id)
+    
+    # Update only the fields sent, e.g. just checked
+    values = item.dict(exclude_unset=True)
+    if "checked" in values:
+        values["checked"] = 1 if values["checked"] else 0
+    where = (grocery_list_item.c.grocery_list_id == grocery_list_id, grocery_list_item.c.ingredient_id == ingredient_id)
+    if values:
+        found = (await db.execute(grocery_list_item.update().where(*where).values(**values))).rowcount
+    else:
+        found = (await db.execute(select(grocery_list_item.c.ingredient_id).where(*where))).first() is not None
+    
+    if not found:
+        raise HTTPException(status_code=404, detail="Item not found in grocery list")
+    
+    await bump_collection_version_async(db, GROCERY_LIST)
+    await db.commit()
+    return await load_grocery_list(db, grocery_list_id)
+
+@router.delete("/grocery-lists/{grocery_list_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_grocery_list(grocery_list_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_grocery_list = await load_grocery_list(db, grocery_list_id)
+    
+    await db.delete(db_grocery_list)
+    await bump_collection_version_async(db, GROCERY_LIST)
+    await db.commit()
+    return None
@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, set_next_cursor
+from app.db.autocomplete import get_prefix_index_async
+from app.db.database import get_async_db
+from app.db.nutrition import facts_dict
+from app.db.versions import GROCERY_LIST, INGREDIENT, bump_collection_version_async, get_collection_version_async
+from app.models.models import Ingredient as IngredientModel, IngredientNutrition as IngredientNutritionModel
+from app.schemas.schemas import Ingredient, IngredientCreate, IngredientNutrition, IngredientSuggestion, NutritionFacts
+
+router = APIRouter()
+
+# Most suggestions one autocomplete request may return
+MAX_SUGGESTIONS = 25
+
+async def get_ingredient_or_404(db: AsyncSession, ingredient_id: int, fields: Fields = None) -> IngredientModel:
+    db_ingredient = await db.get(IngredientModel, ingredient_id, options=load_columns(IngredientModel, fields))
+    if db_ingredient is None:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    return db_ingredient
+
+@router.post("/ingredients/", response_model=Ingredient, status_code=status.HTTP_201_CREATED)
+async def create_ingredient(ingredient: IngredientCreate, db: AsyncSession = Depends(get_async_db)):
+    # Check if ingredient already exists
+    existing = await db.scalar(select(IngredientModel).where(IngredientModel.name == ingredient.name))
+    if existing:
+        raise HTTPException(status_code=400, detail="Ingredient already exists")
+    
+    # Create new ingredient
+    db_ingredient = IngredientModel(**ingredient.dict())
+    db.add(db_ingredient)
+    await bump_collection_version_async(db, INGREDIENT)
+    await db.commit()
+    return db_ingredient
+
+@router.get("/ingredients/", response_model=List[Ingredient])
+async def read_ingredients(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Fields = Depends(field_selection(Ingredient)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_collection_version_async(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    # Legacy offset paging, kept for existing clients
+    if skip is not None:
+        query = select(IngredientModel).options(*load_columns(IngredientModel, fields))
+        result = await db.scalars(query.offset(skip).limit(limit))
+        return sparse_response(Ingredient, fields, result.all(), response)
+    
+    # Keyset paging on (name, id), served by the index on Ingredient.name
+    query = select(IngredientModel).options(*load_columns(IngredientModel, fields, "name"))
+    query = query.order_by(IngredientModel.name, IngredientModel.id)
+    if cursor:
+        last_name, last_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            IngredientModel.name > last_name,
+            and_(IngredientModel.name == last_name, IngredientModel.id > last_id)
+        ))
+    
+    # Fetch one extra row to find out whether there is a next page
+    ingredients = (await db.scalars(query.limit(limit + 1))).all()
+    if len(ingredients) > limit:
+        ingredients = ingredients[:limit]
+        last = ingredients[-1]
+        set_next_cursor(response, encode_cursor([last.name, last.id]))
+    return sparse_response(Ingredient, fields, ingredients, response)
+
+@router.get("/ingredients/autocomplete", response_model=List[IngredientSuggestion])
+async def autocomplete_ingredients(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Suggestions are ranked by usage in recipes and grocery lists, so both versions feed the ETag
+    index = await get_prefix_index_async(db)
+    etag = request_etag(request, INGREDIENT, index.versions[INGREDIENT], index.versions[GROCERY_LIST])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return index.complete(q, limit)
+
+@router.get("/ingredients/{ingredient_id}", response_model=Ingredient)
+async def read_ingredient(
+    ingredient_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(Ingredient)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_collection_version_async(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    ingredient = await get_ingredient_or_404(db, ingredient_id, fields)
+    return sparse_response(Ingredient, fields, ingredient, response)
+
+@router.put("/ingredients/{ingredient_id}", response_model=Ingredient)
+async def update_ingredient(ingredient_id: int, ingredient: IngredientCreate, db: AsyncSession = Depends(get_async_db)):
+    db_ingredient = await get_ingredient_or_404(db, ingredient_id)
+    
+    # Check if name is being changed and if it would conflict
+    if ingredient.name != db_ingredient.name:
+        existing = await db.scalar(select(IngredientModel).where(IngredientModel.name == ingredient.name))
+        if existing:
+            raise HTTPException(status_code=400, detail="Ingredient with this name already exists")
+    
+    # Update ingredient
+    for key, value in ingredient.dict().items():
+        setattr(db_ingredient, key, value)
+    
+    await bump_collection_version_async(db, INGREDIENT)
+    await db.commit()
+    return db_ingredient
+
+@router.delete("/ingredients/{ingredient_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_ingredient(ingredient_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_ingredient = await get_ingredient_or_404(db, ingredient_id)
+    
+    await db.delete(db_ingredient)
+    await bump_collection_version_async(db, INGREDIENT)
+    await db.commit()
+    return None
+
+@router.get("/ingredients/{ingredient_id}/nutrition", response_model=IngredientNutrition)
+async def read_ingredient_nutrition(
+    ingredient_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_collection_version_async(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    facts = await db.get(IngredientNutritionModel, ingredient_id)
+    if facts is None or await db.get(IngredientModel, ingredient_id) is None:
+        raise HTTPException(status_code=404, detail="Nutrition facts not found")
+    return facts_dict(facts)
+
+@router.put("/ingredients/{ingredient_id}/nutrition", response_model=IngredientNutrition)
+async def update_ingredient_nutrition(
+    ingredient_id: int,
+    nutrition: NutritionFacts,
+    db: AsyncSession = Depends(get_async_db)
+):
+    await get_ingredient_or_404(db, ingredient_id)
+    
+    # Nutrition facts are part of the ingredient, so they share its collection version
+    facts = await db.get(IngredientNutritionModel, ingredient_id)
+    if facts is None:
+        facts = IngredientNutritionModel(ingredient_id=ingredient_id)
+        db.add(facts)
+    for key, value in nutrition.dict().items():
+        setattr(facts, key, value)
+    
+    await bump_collection_version_async(db, INGREDIENT)
+    await db.commit()
+    return facts_dict(facts)
@@ -0,0 +1,257 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List
+from datetime import date, timedelta
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.responses import trusted_response
+from app.db.database import get_async_db
+from app.db.dynamodb import get_collection_version as get_recipe_version
+from app.db.executor import run_blocking
+from app.db.nutrition import meal_plan_nutrition
+from app.db.planner import generate_meal_plans
+from app.db.scaling import scale_meal_plans
+from app.db.versions import (
+    GROCERY_LIST, INGREDIENT, MEAL_PLAN, bump_collection_version_async, get_collection_version_async,
+    get_collection_versions_async
+)
+from app.models.models import GroceryList as GroceryListModel, MealPlan as MealPlanModel, Recipe as RecipeModel, meal_plan_recipe
+from app.schemas.schemas import (
+    GeneratedMealPlans, MealPlan, MealPlanCreate, MealPlanGenerate, MealPlanNutrition, ScaledMealPlans
+)
+
+router = APIRouter()
+
+# Longest range one nutrition rollup may cover
+MAX_NUTRITION_DAYS = 92
+
+# Longest range one generated plan may cover
+MAX_PLAN_DAYS = 31
+
+# Most servings a meal may be scaled to
+MAX_SERVINGS = 100
+
+# Relationships are loaded up front: lazy loads are not allowed on an AsyncSession
+MEAL_PLAN_QUERY = select(MealPlanModel).options(selectinload(MealPlanModel.recipes))
+
+def meal_plan_query(fields: Fields = None):
+    """MEAL_PLAN_QUERY narrowed to a field selection, loading recipes only if they were asked for"""
+    if fields is None:
+        return MEAL_PLAN_QUERY
+    query = select(MealPlanModel).options(*load_columns(MealPlanModel, fields))
+    if "recipes" in fields:
+        query = query.options(selectinload(MealPlanModel.recipes))
+    return query
+
+async def load_meal_plan(db: AsyncSession, meal_plan_id: int, fields: Fields = None) -> MealPlanModel:
+    query = meal_plan_query(fields).where(MealPlanModel.id == meal_plan_id).execution_options(populate_existing=True)
+    meal_plan = await db.scalar(query)
+    if meal_plan is None:
+        raise HTTPException(status_code=404, detail="Meal plan not found")
+    return meal_plan
+
+async def add_meal_plan_recipes(db: AsyncSession, meal_plan_id: int, meal_plan: MealPlanCreate) -> None:
+    # Check all referenced recipes in one query instead of one per recipe
+    recipe_ids = {recipe_data.recipe_id for recipe_data in meal_plan.recipes}
+    found = set((await db.scalars(select(RecipeModel.id).where(RecipeModel.id.in_(recipe_ids)))).all())
+    for recipe_data in meal_plan.recipes:
+        if int(recipe_data.recipe_id) not in found:
+            raise HTTPException(status_code=404, detail=f"Recipe with id {recipe_data.recipe_id} not found")
+    
+    if meal_plan.recipes:
+        await db.execute(meal_plan_recipe.insert(), [
+            {"meal_plan_id": meal_plan_id, "recipe_id": int(recipe_data.recipe_id), "meal_type": recipe_data.meal_type}
+            for recipe_data in meal_plan.recipes
+        ])
+
+@router.post("/meal-plans/", response_model=MealPlan, status_code=status.HTTP_201_CREATED)
+async def create_meal_plan(meal_plan: MealPlanCreate, db: AsyncSession = Depends(get_async_db)):
+    plan_date = date.fromisoformat(meal_plan.date)
+    
+    # Check if meal plan for this date already exists
+    existing_plan = await db.scalar(select(MealPlanModel.id).where(MealPlanModel.date == plan_date))
+    if existing_plan:
+        raise HTTPException(status_code=400, detail=f"Meal plan for date {meal_plan.date} already exists")
+    
+    # Create meal plan and its recipes in a single transaction
+    db_meal_plan = MealPlanModel(date=plan_date)
+    db.add(db_meal_plan)
+    await db.flush()
+    await add_meal_plan_recipes(db, db_meal_plan.id, meal_plan)
+    await bump_collection_version_async(db, MEAL_PLAN)
+    await db.commit()
+    
+    return await load_meal_plan(db, db_meal_plan.id)
+
+@router.get("/meal-plans/", response_model=List[MealPlan])
+async def read_meal_plans(
+    request: Request,
+    response: Response,
+    start_date: date = None,
+    end_date: date = None,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_collection_version_async(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version))
+    if not_modified:
+        return not_modified
+    
+    query = meal_plan_query(fields)
+    
+    # Filter by date range if provided
+    if start_date:
+        query = query.where(MealPlanModel.date >= start_date)
+    if end_date:
+        query = query.where(MealPlanModel.date <= end_date)
+    
+    # Order by date
+    result = await db.scalars(query.order_by(MealPlanModel.date))
+    return sparse_response(MealPlan, fields, result.all(), response)
+
+@router.get("/meal-plans/week/", response_model=List[MealPlan])
+async def read_weekly_meal_plan(
+    request: Request,
+    response: Response,
+    start_date: date = None,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # If no start date provided, use today
+    if not start_date:
+        start_date = date.today()
+    
+    # The defaulted start date is part of the representation
+    version = await get_collection_version_async(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version, start_date))
+    if not_modified:
+        return not_modified
+    
+    # Calculate end date (7 days from start)
+    end_date = start_date + timedelta(days=6)
+    
+    # Get meal plans for the week
+    result = await db.scalars(meal_plan_query(fields).where(
+        MealPlanModel.date >= start_date,
+        MealPlanModel.date <= end_date
+    ).order_by(MealPlanModel.date))
+    return sparse_response(MealPlan, fields, result.all(), response)
+
+@router.get("/meal-plans/nutrition", response_model=MealPlanNutrition)
+async def read_meal_plan_nutrition(
+    request: Request,
+    response: Response,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if end_date < start_date or (end_date - start_date).days >= MAX_NUTRITION_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_NUTRITION_DAYS} days")
+    
+    # Totals depend on the meals planned and on the ingredients' nutrition facts
+    versions = await get_collection_versions_async(db, [MEAL_PLAN, INGREDIENT])
+    etag = request_etag(request, MEAL_PLAN, versions[MEAL_PLAN], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    # A few queries and array operations; run them on the sync session API
+    nutrition = await db.run_sync(meal_plan_nutrition, start_date, end_date, versions[INGREDIENT])
+    return trusted_response(MealPlanNutrition, nutrition, response)
+
+@router.get("/meal-plans/scaled", response_model=ScaledMealPlans)
+async def read_scaled_meal_plans(
+    request: Request,
+    response: Response,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    servings: int = Query(..., ge=1, le=MAX_SERVINGS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if end_date < start_date or (end_date - start_date).days >= MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_PLAN_DAYS} days")
+    
+    # Ingredient names come from the INGREDIENT collection
+    versions = await get_collection_versions_async(db, [MEAL_PLAN, INGREDIENT])
+    etag = request_etag(request, MEAL_PLAN, versions[MEAL_PLAN], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    # A few queries and one vectorised pass; run them on the sync session API
+    scaled = await db.run_sync(scale_meal_plans, start_date, end_date, servings)
+    return trusted_response(ScaledMealPlans, scaled, response)
+
+@router.post("/meal-plans/generate", response_model=GeneratedMealPlans)
+async def generate_meal_plans_endpoint(request: MealPlanGenerate, response: Response):
+    """Plan every meal of a date range under the given constraints; nothing is saved, POST the plans to keep them"""
+    if request.end_date < request.start_date or (request.end_date - request.start_date).days >= MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_PLAN_DAYS} days")
+    
+    version = await run_blocking(get_recipe_version, "RECIPE")
+    try:
+        # CPU-bound for up to time_budget_ms; keep it off the event loop
+        plans = await run_blocking(
+            generate_meal_plans,
+            request.start_date, request.end_date, [slot.dict() for slot in request.slots], request.max_total_time,
+            request.difficulty, request.tags, request.exclude_tags, request.no_repeat_days,
+            request.time_budget_ms, request.restarts, request.seed, version
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return trusted_response(GeneratedMealPlans, plans, response)
+
+@router.get("/meal-plans/{meal_plan_id}", response_model=MealPlan)
+async def read_meal_plan(
+    meal_plan_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    version = await get_collection_version_async(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version))
+    if not_modified:
+        return not_modified
+    
+    meal_plan = await load_meal_plan(db, meal_plan_id, fields)
+    return sparse_response(MealPlan, fields, meal_plan, response)
+
+@router.put("/meal-plans/{meal_plan_id}", response_model=MealPlan)
+async def update_meal_plan(meal_plan_id: int, meal_plan: MealPlanCreate, db: AsyncSession = Depends(get_async_db)):
+    db_meal_plan = await load_meal_plan(db, meal_plan_id)
+    plan_date = date.fromisoformat(meal_plan.date)
+    
+    # Update date if changed
+    if plan_date != db_meal_plan.date:
+        # Check if new date conflicts with existing meal plan
+        existing_plan = await db.scalar(select(MealPlanModel.id).where(
+            MealPlanModel.date == plan_date,
+            MealPlanModel.id != meal_plan_id
+        ))
+        if existing_plan:
+            raise HTTPException(status_code=400, detail=f"Meal plan for date {meal_plan.date} already exists")
+        
+        db_meal_plan.date = plan_date
+    
+    # Replace recipes
+    await db.execute(meal_plan_recipe.delete().where(meal_plan_recipe.c.meal_plan_id == meal_plan_id))
+    await add_meal_plan_recipes(db, meal_plan_id, meal_plan)
+    await bump_collection_version_async(db, MEAL_PLAN)
+    await db.commit()
+    
+    return await load_meal_plan(db, meal_plan_id)
+
+@router.delete("/meal-plans/{meal_plan_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_meal_plan(meal_plan_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_meal_plan = await load_meal_plan(db, meal_plan_id)
+    
+    # A grocery list made for the plan loses its link (SET NULL)
+    if await db.scalar(select(GroceryListModel.id).where(GroceryListModel.meal_plan_id == meal_plan_id).limit(1)):
+        await bump_collection_version_async(db, GROCERY_LIST)
+    await db.delete(db_meal_plan)
+    await bump_collection_version_async(db, MEAL_PLAN)
+    await db.commit()
+    return None
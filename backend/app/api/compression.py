@@ -0,0 +1,192 @@
+"""
+Response compression middleware.
+
+Negotiates brotli or gzip from the request's Accept-Encoding and compresses
+responses above a minimum size. JSON from the recipe and meal plan endpoints
+is large and repetitive and typically shrinks 5-10x, which matters most for
+Lambda, where response size drives transfer time (and the 6 MB payload cap).
+
+Under Mangum, compressed bodies are returned base64-encoded with
+isBase64Encoded set, which API Gateway HTTP APIs and Lambda function URLs
+decode back to the raw bytes before sending them to the client.
+
+Brotli is used when the ``brotli`` package is installed; gzip always works.
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is an optional speed-up
+    brotli = None
+
+# Content types worth compressing; images and other binary payloads are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/x-ndjson")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}."""
+    codings: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Pick the best supported encoding the client accepts, preferring brotli."""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class Compressor:
+    """Incremental compressor with the same interface for gzip and brotli."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality, mode=brotli.MODE_TEXT)
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far without ending the stream."""
+        if self.encoding == "br":
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """End the stream."""
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware applying negotiated brotli/gzip compression.
+
+    Args:
+        app: The ASGI app to wrap
+        minimum_size: Responses smaller than this many bytes are sent as-is
+        gzip_level: zlib compression level, 1 (fastest) to 9 (smallest)
+        brotli_quality: brotli quality, 0 (fastest) to 11 (smallest)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """Per-request state: holds back the response start until the body shows whether to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Message = {}
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    def should_compress(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return any(content_type.startswith(compressible) for compressible in COMPRESSIBLE_TYPES)
+
+    def start_compressed(self) -> None:
+        """Rewrite the held-back response headers for a compressed body."""
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The bytes differ from the identity representation, so the validator becomes weak
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        self.compressor = Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self.should_compress(Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                # Whole body in one message: compress in one shot if it is big enough
+                headers = MutableHeaders(raw=self.start_message["headers"])
+                if len(body) >= self.middleware.minimum_size:
+                    self.start_compressed()
+                    body = self.compressor.compress(body) + self.compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                else:
+                    headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start_message)
+                await self.downstream({"type": "http.response.body", "body": body})
+                return
+
+            # Streaming body: length is unknown, so compress chunk by chunk
+            self.start_compressed()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.downstream(self.start_message)
+
+        if more_body:
+            # Flush each chunk so streamed rows reach the client promptly
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
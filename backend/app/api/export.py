@@ -0,0 +1,155 @@
+"""
+Streaming NDJSON export of the whole dataset.
+
+The export is a chain of generators, so memory use stays flat however large
+the dataset is:
+
+    storage pages -> records -> NDJSON lines -> 64 KB chunks -> (gzip) -> output
+
+- SQL tables are read with keyset pages on the primary key and the session is
+  cleared after every page; each page's association rows are fetched with one
+  IN query
+- recipes are read from DynamoDB a page at a time, following LastEvaluatedKey
+
+Every line is ``{"type": <resource>, "data": {...}}``. Ingredients come
+before the recipes, meal plans and grocery lists that reference them, so a
+file can be loaded back in order.
+
+The API streams it from ``GET /api/export`` and scripts/export_data.py writes
+it to a file.
+"""
+
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.responses import orjson_default
+from app.db.dynamodb import iter_partition
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    grocery_list_item,
+    meal_plan_recipe,
+)
+
+# Export order: referenced resources first
+RESOURCES = ("ingredients", "recipes", "meal-plans", "grocery-lists")
+
+# DynamoDB key attributes, which are storage details rather than data
+STORAGE_KEYS = ("PK", "SK", "GSI1PK", "GSI1SK")
+
+PAGE_SIZE = 500
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_pages(db: Session, model: Any, page_size: int = PAGE_SIZE) -> Iterator[List[Any]]:
+    """Yield all rows of a table in primary key order, one page at a time."""
+    last_id = None
+    while True:
+        query = select(model).order_by(model.id).limit(page_size)
+        if last_id is not None:
+            query = query.where(model.id > last_id)
+        rows = db.scalars(query).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+        # Drop the page from the identity map so memory does not grow with the table
+        db.expunge_all()
+
+
+def export_ingredients(db: Session, page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    for page in iter_pages(db, IngredientModel, page_size):
+        for ingredient in page:
+            yield {"id": str(ingredient.id), "name": ingredient.name, "category": ingredient.category}
+
+
+def export_recipes(page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    for item in iter_partition('RECIPE', page_size):
+        yield {key: value for key, value in item.items() if key not in STORAGE_KEYS}
+
+
+def export_meal_plans(db: Session, page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    for page in iter_pages(db, MealPlanModel, page_size):
+        meals: Dict[int, List[Dict[str, Any]]] = {plan.id: [] for plan in page}
+        rows = db.execute(select(meal_plan_recipe).where(meal_plan_recipe.c.meal_plan_id.in_(list(meals))))
+        for row in rows:
+            meals[row.meal_plan_id].append({"recipe_id": str(row.recipe_id), "meal_type": row.meal_type})
+        for plan in page:
+            yield {"id": str(plan.id), "date": plan.date, "recipes": meals[plan.id]}
+
+
+def export_grocery_lists(db: Session, page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    for page in iter_pages(db, GroceryListModel, page_size):
+        items: Dict[int, List[Dict[str, Any]]] = {grocery_list.id: [] for grocery_list in page}
+        rows = db.execute(select(grocery_list_item).where(grocery_list_item.c.grocery_list_id.in_(list(items))))
+        for row in rows:
+            items[row.grocery_list_id].append({
+                "ingredient_id": str(row.ingredient_id),
+                "quantity": row.quantity,
+                "unit": row.unit,
+                "checked": bool(row.checked),
+            })
+        for grocery_list in page:
+            yield {
+                "id": str(grocery_list.id),
+                "name": grocery_list.name,
+                "meal_plan_id": str(grocery_list.meal_plan_id) if grocery_list.meal_plan_id else None,
+                "items": items[grocery_list.id],
+            }
+
+
+def export_records(db: Session, resources: Sequence[str] = RESOURCES,
+                   page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield {"type", "data"} records for the given resources, in export order."""
+    exporters = {
+        "ingredients": lambda: export_ingredients(db, page_size),
+        "recipes": lambda: export_recipes(page_size),
+        "meal-plans": lambda: export_meal_plans(db, page_size),
+        "grocery-lists": lambda: export_grocery_lists(db, page_size),
+    }
+    for resource in RESOURCES:
+        if resource in resources:
+            for data in exporters[resource]():
+                yield {"type": resource, "data": data}
+
+
+def ndjson_lines(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Serialise records as newline-delimited JSON."""
+    for record in records:
+        yield orjson.dumps(record, default=orjson_default, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def buffered(chunks: Iterable[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Join small chunks into chunks of about size bytes."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzipped(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member, incrementally."""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(db: Session, resources: Sequence[str] = RESOURCES, gzip: bool = False,
+                  page_size: int = PAGE_SIZE) -> Iterator[bytes]:
+    """The full pipeline: NDJSON bytes of the export, optionally gzipped."""
+    stream = buffered(ndjson_lines(export_records(db, resources, page_size)))
+    return gzipped(stream) if gzip else stream
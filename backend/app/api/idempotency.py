@@ -0,0 +1,208 @@
+"""
+Idempotency keys for POST requests.
+
+Lambda, API Gateway and HTTP clients all retry requests whose response they
+did not see, and every create endpoint makes a new id each time it runs, so a
+retried create makes a duplicate. A POST sent with an ``Idempotency-Key``
+header runs at most once per key: the first request claims the key with a
+conditional write to the DynamoDB table, runs, and stores its response on the
+claim; a retry with the same key and request gets that response back, marked
+``Idempotent-Replayed: true``, without running again.
+
+The record holds a hash of the method, path, query and body, the status code,
+headers and the zlib-compressed body, and expires after IDEMPOTENCY_TTL_SECONDS
+(default 24 hours) through the table's TTL on ``expires_at``. Reusing a key for
+a different request is rejected with 422, and a retry arriving while the first
+request still runs gets 409. Responses with a 5xx status, or requests that
+raise, release the key so they can be retried; responses too large to store do
+too. A request that never finishes (a timed-out Lambda, a killed process) holds
+its key only for IDEMPOTENCY_LOCK_SECONDS (default 60), which should exceed the
+longest request; after that a retry claims the key and runs.
+
+Keys are scoped to the request's user (``X-User-Id``, see app.api.users): two
+users sending the same key have separate records, so neither can replay the
+other's response or hold the other's key.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import zlib
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.dynamodb import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    get_idempotency_record,
+    release_idempotency_key,
+)
+from app.api.users import USER_ID_HEADER, header_user
+from app.db.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Keys are client-made, typically UUIDs
+MAX_KEY_LENGTH = 255
+
+# Compressed bodies above this are not stored; DynamoDB items are capped at 400 KB
+MAX_STORED_BODY = 300_000
+
+
+def request_hash(scope: Scope, body: bytes) -> str:
+    """A compact digest of what a request asks for: method, path, query and body."""
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()[:32]
+
+
+async def send_json(send: Send, status_code: int, content: dict, headers: Optional[dict] = None) -> None:
+    body = json.dumps(content).encode()
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware running each POST with an Idempotency-Key at most once per key.
+
+    Args:
+        app: The ASGI app to wrap
+        ttl_seconds: How long a key and its stored response are kept
+        lock_seconds: How long a request holds its key before it has a response to store
+    """
+
+    def __init__(self, app: ASGIApp, ttl_seconds: int = 86400, lock_seconds: int = 60):
+        self.app = app
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await send_json(send, 400, {"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"})
+            return
+        user_id = header_user(headers)
+        if user_id is None:
+            # The route would refuse it too; without a user there is no record to claim
+            await send_json(send, 400, {"detail": f"Invalid {USER_ID_HEADER}"})
+            return
+
+        # The body is read up front to hash it, then handed to the app unchanged
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        digest = request_hash(scope, body)
+
+        # A record can be released or expire between a failed claim and the read, so claim twice
+        for attempt in range(2):
+            expires_at = int(time.time()) + self.lock_seconds
+            claim = await run_blocking(claim_idempotency_key, user_id, key, digest, expires_at)
+            if claim:
+                break
+            record = await run_blocking(get_idempotency_record, user_id, key)
+            if record is not None:
+                await self.replay(record, digest, send)
+                return
+        else:
+            detail = f"{IDEMPOTENCY_KEY_HEADER} is contended; retry"
+            await send_json(send, 409, {"detail": detail}, {"Retry-After": "1"})
+            return
+
+        body_sent = False
+
+        async def replay_body() -> Message:
+            # The body once, then the real channel, which reports the disconnect
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        recorder = ResponseRecorder(send)
+        try:
+            await self.app(scope, replay_body, recorder.send)
+        except Exception:
+            await run_blocking(release_idempotency_key, user_id, key, claim)
+            raise
+        await self.finish(user_id, key, claim, recorder)
+
+    async def replay(self, record: dict, digest: str, send: Send) -> None:
+        """Answer a request whose key another request holds, from that request's record."""
+        if record["request_hash"] != digest:
+            await send_json(send, 422, {"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"})
+        elif record["state"] != "complete":
+            await send_json(send, 409, {"detail": "A request with this Idempotency-Key is in progress"},
+                            {"Retry-After": "1"})
+        else:
+            body = zlib.decompress(bytes(record["body"]))
+            headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+            await send({
+                "type": "http.response.start",
+                "status": int(record["status_code"]),
+                "headers": headers + [
+                    (b"content-length", str(len(body)).encode()),
+                    (REPLAYED_HEADER.lower().encode(), b"true"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+    async def finish(self, user_id: str, key: str, claim: str, recorder: "ResponseRecorder") -> None:
+        """Store the response of a request that ran, or release its key if it can't be replayed."""
+        status_code = recorder.status_code
+        body = zlib.compress(b"".join(recorder.chunks))
+        try:
+            if status_code is None or status_code >= 500 or len(body) > MAX_STORED_BODY:
+                await run_blocking(release_idempotency_key, user_id, key, claim)
+            elif not await run_blocking(
+                complete_idempotency_key, user_id, key, claim, status_code, recorder.headers, body,
+                int(time.time()) + self.ttl_seconds
+            ):
+                logger.warning(f"Idempotency key {key} was claimed again before its response was stored")
+        except ClientError as e:
+            # The response is already sent; retries get 409 until the claim's lease runs out
+            logger.error(f"Storing the response for idempotency key {key} failed: {e}")
+
+
+class ResponseRecorder:
+    """Per-request state: passes the response through while keeping a copy of it."""
+
+    def __init__(self, send: Send):
+        self.downstream = send
+        self.status_code: Optional[int] = None
+        self.headers: List[List[str]] = []
+        self.chunks: List[bytes] = []
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+            # Content-Length is worked out again on replay
+            self.headers = [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in message.get("headers", []) if name.lower() != b"content-length"
+            ]
+        elif message["type"] == "http.response.body":
+            self.chunks.append(message.get("body", b""))
+        await self.downstream(message)
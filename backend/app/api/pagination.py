@@ -0,0 +1,54 @@
+"""
+Keyset (seek) pagination helpers for the list endpoints.
+
+Cursors are opaque to clients: they are the sort key of the last row of a page,
+JSON-encoded and base64url-wrapped. The next page is fetched with a
+``WHERE (sort key) > (cursor)`` predicate instead of an OFFSET, so every page
+costs the same index seek no matter how deep the client has paged.
+"""
+
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Response
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Largest page a list endpoint returns
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string from a previous response
+        size: Number of sort key values the cursor must contain
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page cursor to the client, if there is a next page."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
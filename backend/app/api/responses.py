@@ -0,0 +1,119 @@
+"""
+Fast JSON response path for data read from our own store.
+
+With a ``response_model``, FastAPI validates every returned item against the
+model and then walks it again with ``jsonable_encoder`` before ``json.dumps``.
+For items that came straight out of DynamoDB that work is redundant: we wrote
+them, so they already have the right shape. When FAST_JSON_RESPONSES=true the
+routes instead
+
+1. build response models with ``construct()``, which sets fields without
+   validating them and drops storage-only attributes (PK, SK, GSI1PK, ...),
+2. return an ``ORJSONResponse``, which FastAPI sends as-is, serialised by
+   orjson with native handling of models and DynamoDB ``Decimal`` numbers.
+
+The declared ``response_model`` still documents the endpoint in OpenAPI.
+"""
+
+import os
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+
+def orjson_default(obj: Any) -> Any:
+    """Serialise the types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        # DynamoDB returns every number as Decimal; keep integers integral
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, including Decimal and pydantic models."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def field_plan(model: Type[BaseModel]) -> Tuple[Tuple[str, Any, Optional[Type[BaseModel]], bool], ...]:
+    """
+    Precompute, per model, how to build each field from a stored item.
+
+    Returns:
+        Tuples of (field name, default, nested model or None, is a list of the nested model)
+    """
+    plan = []
+    for name, field in model.__fields__.items():
+        nested = field.type_ if isinstance(field.type_, type) and issubclass(field.type_, BaseModel) else None
+        is_list = nested is not None and field.outer_type_ is not field.type_
+        plan.append((name, field.get_default(), nested, is_list))
+    return tuple(plan)
+
+
+def build_trusted(model: Type[BaseModel], item: Dict[str, Any]) -> BaseModel:
+    """
+    Build a response model from a stored item without validating it.
+
+    Only use this for data read from our own store; nested models are built
+    the same way, and attributes the model does not declare are dropped.
+    """
+    values = {}
+    for name, default, nested, is_list in field_plan(model):
+        value = item.get(name, default)
+        if nested is not None and value is not None:
+            if is_list:
+                value = [build_trusted(nested, child) for child in value]
+            else:
+                value = build_trusted(nested, value)
+        values[name] = value
+    return model.construct(_fields_set=set(values), **values)
+
+
+def build_trusted_list(model: Type[BaseModel], items: List[Dict[str, Any]]) -> List[BaseModel]:
+    """build_trusted over a list of stored items."""
+    return [build_trusted(model, item) for item in items]
+
+
+def trusted_response(model: Type[BaseModel], data: Any, response: Optional[Response] = None,
+                     status_code: int = 200) -> Any:
+    """
+    Return stored data through the fast path when it is enabled.
+
+    Args:
+        model: Response model of the endpoint
+        data: A stored item or list of stored items
+        response: The handler's injected Response; headers set on it (ETag,
+            X-Next-Cursor, ...) are carried over, since FastAPI does not merge
+            them into a Response the handler returns itself
+        status_code: Status code of the endpoint
+
+    Returns:
+        An ORJSONResponse when FAST_JSON_RESPONSES is on, otherwise data
+        unchanged for FastAPI's validating path
+    """
+    if not FAST_JSON_RESPONSES:
+        return data
+    if isinstance(data, list):
+        return fast_response(build_trusted_list(model, data), response, status_code)
+    return fast_response(build_trusted(model, data), response, status_code)
+
+
+def fast_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """Wrap content in an ORJSONResponse carrying the headers set on the handler's injected Response."""
+    fast = ORJSONResponse(content, status_code=status_code)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                fast.headers[name] = value
+    return fast
@@ -0,0 +1,386 @@
+"""
+Batched mutations.
+
+``POST /api/batch`` takes an ordered list of create/update/delete operations
+across recipes, ingredients, meal plans and grocery lists and applies them
+all-or-nothing in a single request, so planning a week in the calendar is
+one API Gateway/Lambda round trip instead of dozens:
+
+- ingredient, meal plan and grocery list operations run in order inside one
+  SQL transaction
+- recipe operations go into one DynamoDB TransactWriteItems call, together
+  with the RECIPE collection version bump; they write the shared catalog, so
+  private recipes are created with ``POST /api/recipes/``
+
+The DynamoDB transaction runs after every SQL operation has been flushed
+without error and before the SQL commit, so a failure on either side leaves
+both untouched (short of the SQL commit itself failing).
+
+Each operation gets the status the equivalent single request would have
+returned. If one fails, nothing is applied: the response carries that
+operation's status code, its error, and 424 for every other operation.
+"""
+
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.api.fields import project
+from app.db.database import get_db
+from app.db.dynamodb import (
+    MAX_TRANSACT_ITEMS,
+    batch_get,
+    collection_version_update,
+    notify_recipe_write,
+    recipe_item,
+    recipe_update,
+    transact_write,
+)
+from app.db.versions import GROCERY_LIST, INGREDIENT, MEAL_PLAN, bump_collection_version
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    grocery_list_item,
+    meal_plan_recipe,
+)
+from app.schemas.schemas import (
+    BatchOperation,
+    BatchRequest,
+    BatchResponse,
+    BatchResult,
+    GroceryListCreate,
+    IngredientCreate,
+    MealPlanCreate,
+    Recipe,
+    RecipeCreate,
+    RecipeUpdate,
+)
+
+router = APIRouter()
+
+# Status of a successful operation, as returned by the single-item endpoints
+STATUS_CODES = {"create": 201, "update": 200, "delete": 204}
+
+# Request body schema of each operation that takes one
+PAYLOAD_SCHEMAS = {
+    ("recipes", "create"): RecipeCreate,
+    ("recipes", "update"): RecipeUpdate,
+    ("ingredients", "create"): IngredientCreate,
+    ("ingredients", "update"): IngredientCreate,
+    ("meal-plans", "create"): MealPlanCreate,
+    ("meal-plans", "update"): MealPlanCreate,
+    ("grocery-lists", "create"): GroceryListCreate,
+    ("grocery-lists", "update"): GroceryListCreate,
+}
+
+# Collection version bumped when a SQL resource is written
+COLLECTIONS = {"ingredients": INGREDIENT, "meal-plans": MEAL_PLAN, "grocery-lists": GROCERY_LIST}
+
+
+class OperationFailed(Exception):
+    """An operation failed, so the whole batch is rolled back."""
+
+    def __init__(self, index: int, status_code: int, detail: str):
+        self.index = index
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_payload(operation: BatchOperation) -> Optional[BaseModel]:
+    schema = PAYLOAD_SCHEMAS.get((operation.resource, operation.method))
+    if operation.method != "create" and operation.id is None:
+        raise HTTPException(status_code=422, detail=f"{operation.method} requires an id")
+    if schema is None:
+        return None
+    return schema.parse_obj(operation.data or {})
+
+
+def parse_sql_id(operation: BatchOperation) -> Optional[int]:
+    if operation.id is None:
+        return None
+    try:
+        return int(operation.id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid id {operation.id}")
+
+
+def get_or_404(db: Session, model: Any, item_id: int, label: str) -> Any:
+    item = db.query(model).filter(model.id == item_id).first()
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return item
+
+
+def row_data(item: Any) -> Dict[str, Any]:
+    """Column values of a SQL row, JSON-ready."""
+    return jsonable_encoder(project(item, tuple(inspect(item).mapper.column_attrs.keys())))
+
+
+# SQL operations: the same checks as the single-item routes, flushed instead of committed
+def create_ingredient(db: Session, item_id: None, ingredient: IngredientCreate) -> IngredientModel:
+    if db.query(IngredientModel).filter(IngredientModel.name == ingredient.name).first():
+        raise HTTPException(status_code=400, detail="Ingredient already exists")
+    db_ingredient = IngredientModel(**ingredient.dict())
+    db.add(db_ingredient)
+    return db_ingredient
+
+
+def update_ingredient(db: Session, ingredient_id: int, ingredient: IngredientCreate) -> IngredientModel:
+    db_ingredient = get_or_404(db, IngredientModel, ingredient_id, "Ingredient")
+    if ingredient.name != db_ingredient.name:
+        if db.query(IngredientModel).filter(IngredientModel.name == ingredient.name).first():
+            raise HTTPException(status_code=400, detail="Ingredient with this name already exists")
+    for key, value in ingredient.dict().items():
+        setattr(db_ingredient, key, value)
+    return db_ingredient
+
+
+def delete_ingredient(db: Session, ingredient_id: int, payload: None) -> None:
+    db.delete(get_or_404(db, IngredientModel, ingredient_id, "Ingredient"))
+
+
+def add_meal_plan_recipes(db: Session, meal_plan_id: int, meal_plan: MealPlanCreate) -> None:
+    recipe_ids = {int(recipe_data.recipe_id) for recipe_data in meal_plan.recipes}
+    found = {row.id for row in db.query(RecipeModel.id).filter(RecipeModel.id.in_(recipe_ids))}
+    for recipe_data in meal_plan.recipes:
+        if int(recipe_data.recipe_id) not in found:
+            raise HTTPException(status_code=404, detail=f"Recipe with id {recipe_data.recipe_id} not found")
+        db.execute(meal_plan_recipe.insert().values(
+            meal_plan_id=meal_plan_id,
+            recipe_id=int(recipe_data.recipe_id),
+            meal_type=recipe_data.meal_type
+        ))
+
+
+def check_meal_plan_date(db: Session, plan_date: date, meal_plan_id: Optional[int] = None) -> None:
+    query = db.query(MealPlanModel.id).filter(MealPlanModel.date == plan_date)
+    if meal_plan_id is not None:
+        query = query.filter(MealPlanModel.id != meal_plan_id)
+    if query.first():
+        raise HTTPException(status_code=400, detail=f"Meal plan for date {plan_date} already exists")
+
+
+def create_meal_plan(db: Session, item_id: None, meal_plan: MealPlanCreate) -> MealPlanModel:
+    plan_date = date.fromisoformat(meal_plan.date)
+    check_meal_plan_date(db, plan_date)
+    db_meal_plan = MealPlanModel(date=plan_date)
+    db.add(db_meal_plan)
+    db.flush()
+    add_meal_plan_recipes(db, db_meal_plan.id, meal_plan)
+    return db_meal_plan
+
+
+def update_meal_plan(db: Session, meal_plan_id: int, meal_plan: MealPlanCreate) -> MealPlanModel:
+    db_meal_plan = get_or_404(db, MealPlanModel, meal_plan_id, "Meal plan")
+    plan_date = date.fromisoformat(meal_plan.date)
+    if plan_date != db_meal_plan.date:
+        check_meal_plan_date(db, plan_date, meal_plan_id)
+        db_meal_plan.date = plan_date
+    db.execute(meal_plan_recipe.delete().where(meal_plan_recipe.c.meal_plan_id == meal_plan_id))
+    add_meal_plan_recipes(db, meal_plan_id, meal_plan)
+    return db_meal_plan
+
+
+def delete_meal_plan(db: Session, meal_plan_id: int, payload: None) -> None:
+    db_meal_plan = get_or_404(db, MealPlanModel, meal_plan_id, "Meal plan")
+    # A grocery list made for the plan loses its link (SET NULL)
+    if db.query(GroceryListModel.id).filter(GroceryListModel.meal_plan_id == meal_plan_id).first():
+        bump_collection_version(db, GROCERY_LIST)
+    db.delete(db_meal_plan)
+
+
+def add_grocery_items(db: Session, grocery_list_id: int, grocery_list: GroceryListCreate) -> None:
+    ingredient_ids = {int(item_data.ingredient_id) for item_data in grocery_list.items}
+    found = {row.id for row in db.query(IngredientModel.id).filter(IngredientModel.id.in_(ingredient_ids))}
+    for item_data in grocery_list.items:
+        if int(item_data.ingredient_id) not in found:
+            raise HTTPException(status_code=404, detail=f"Ingredient with id {item_data.ingredient_id} not found")
+        db.execute(grocery_list_item.insert().values(
+            grocery_list_id=grocery_list_id,
+            ingredient_id=int(item_data.ingredient_id),
+            quantity=item_data.quantity,
+            unit=item_data.unit,
+            checked=1 if item_data.checked else 0
+        ))
+
+
+def create_grocery_list(db: Session, item_id: None, grocery_list: GroceryListCreate) -> GroceryListModel:
+    db_grocery_list = GroceryListModel(name=grocery_list.name, meal_plan_id=grocery_list.meal_plan_id)
+    db.add(db_grocery_list)
+    db.flush()
+    add_grocery_items(db, db_grocery_list.id, grocery_list)
+    return db_grocery_list
+
+
+def update_grocery_list(db: Session, grocery_list_id: int, grocery_list: GroceryListCreate) -> GroceryListModel:
+    db_grocery_list = get_or_404(db, GroceryListModel, grocery_list_id, "Grocery list")
+    db_grocery_list.name = grocery_list.name
+    db_grocery_list.meal_plan_id = grocery_list.meal_plan_id
+    db.execute(grocery_list_item.delete().where(grocery_list_item.c.grocery_list_id == grocery_list_id))
+    add_grocery_items(db, grocery_list_id, grocery_list)
+    return db_grocery_list
+
+
+def delete_grocery_list(db: Session, grocery_list_id: int, payload: None) -> None:
+    db.delete(get_or_404(db, GroceryListModel, grocery_list_id, "Grocery list"))
+
+
+SQL_OPERATIONS: Dict[Tuple[str, str], Callable[[Session, Optional[int], Optional[BaseModel]], Any]] = {
+    ("ingredients", "create"): create_ingredient,
+    ("ingredients", "update"): update_ingredient,
+    ("ingredients", "delete"): delete_ingredient,
+    ("meal-plans", "create"): create_meal_plan,
+    ("meal-plans", "update"): update_meal_plan,
+    ("meal-plans", "delete"): delete_meal_plan,
+    ("grocery-lists", "create"): create_grocery_list,
+    ("grocery-lists", "update"): update_grocery_list,
+    ("grocery-lists", "delete"): delete_grocery_list,
+}
+
+
+def recipe_action(
+    operation: BatchOperation, payload: Optional[BaseModel]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Build the TransactWriteItems action for a recipe operation.
+
+    Returns:
+        The action, and for creates the new item
+    """
+    if operation.method == "create":
+        if not payload.public:
+            # One transaction bumps one collection version: the shared catalog's
+            detail = "Batches write the shared catalog; create private recipes singly"
+            raise HTTPException(status_code=400, detail=detail)
+        item = recipe_item(payload.dict())
+        return {'Put': {'Item': item, 'ConditionExpression': "attribute_not_exists(PK)"}}, item
+    if operation.method == "update":
+        update = recipe_update(operation.id, payload.dict(exclude_unset=True))
+        return {'Update': {**update, 'ConditionExpression': "attribute_exists(PK)"}}, None
+    key = {'PK': 'RECIPE', 'SK': operation.id}
+    return {'Delete': {'Key': key, 'ConditionExpression': "attribute_exists(PK)"}}, None
+
+
+def recipe_data(item: Dict[str, Any]) -> Dict[str, Any]:
+    return jsonable_encoder(project(item, tuple(Recipe.__fields__)))
+
+
+def run_recipe_transaction(operations: List[BatchOperation], actions: List[Tuple[int, Dict[str, Any]]]) -> None:
+    """Apply the recipe actions in one transaction, mapping a cancellation to the operation that caused it."""
+    try:
+        transact_write([action for _, action in actions] + [{'Update': collection_version_update('RECIPE')}])
+    except ClientError as e:
+        first_index = actions[0][0]
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise OperationFailed(first_index, 400, e.response["Error"].get("Message", "Recipe transaction failed"))
+        reasons = e.response.get("CancellationReasons", [])
+        for (index, _), reason in zip(actions, reasons):
+            if reason.get("Code") == "ConditionalCheckFailed":
+                if operations[index].method == "create":
+                    raise OperationFailed(index, 409, "Recipe already exists")
+                raise OperationFailed(index, 404, "Recipe not found")
+            if reason.get("Code") not in (None, "None"):
+                raise OperationFailed(index, 409, reason.get("Message") or reason["Code"])
+        raise OperationFailed(first_index, 409, "Recipe transaction was cancelled")
+
+
+def failed_response(failure: OperationFailed, count: int) -> JSONResponse:
+    results = [
+        BatchResult(status=424, error=f"Not applied: operation {failure.index} failed")
+        for _ in range(count)
+    ]
+    results[failure.index] = BatchResult(status=failure.status_code, error=failure.detail)
+    body = BatchResponse(committed=False, results=results)
+    return JSONResponse(status_code=failure.status_code, content=jsonable_encoder(body))
+
+
+@router.post("/batch", response_model=BatchResponse)
+def run_batch(batch: BatchRequest, db: Session = Depends(get_db)):
+    """Apply an ordered list of operations all-or-nothing"""
+    operations = batch.operations
+    recipe_count = sum(1 for operation in operations if operation.resource == "recipes")
+    # One slot of the transaction goes to the collection version bump
+    if recipe_count >= MAX_TRANSACT_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TRANSACT_ITEMS - 1} recipe operations per batch")
+
+    results: List[Optional[BatchResult]] = [None] * len(operations)
+    recipe_actions: List[Tuple[int, Dict[str, Any]]] = []
+    created_recipes: List[Dict[str, Any]] = []
+    touched = set()
+
+    try:
+        # 1. Validate every payload and apply the SQL operations in order
+        for index, operation in enumerate(operations):
+            try:
+                payload = parse_payload(operation)
+                if operation.resource == "recipes":
+                    action, item = recipe_action(operation, payload)
+                    recipe_actions.append((index, action))
+                    if item:
+                        created_recipes.append(item)
+                    results[index] = BatchResult(
+                        status=STATUS_CODES[operation.method],
+                        id=item["id"] if item else operation.id,
+                        data=recipe_data(item) if item else None
+                    )
+                    continue
+
+                handler = SQL_OPERATIONS[(operation.resource, operation.method)]
+                item = handler(db, parse_sql_id(operation), payload)
+                # Flush each operation so constraint errors are pinned on it
+                db.flush()
+                touched.add(COLLECTIONS[operation.resource])
+                results[index] = BatchResult(
+                    status=STATUS_CODES[operation.method],
+                    id=str(item.id) if item is not None else operation.id,
+                    data=row_data(item) if item is not None else None
+                )
+            except HTTPException as e:
+                raise OperationFailed(index, e.status_code, e.detail)
+            except ValidationError as e:
+                raise OperationFailed(index, 422, str(e))
+            except ValueError as e:
+                # Malformed dates and ids inside otherwise valid payloads
+                raise OperationFailed(index, 422, str(e))
+            except IntegrityError as e:
+                raise OperationFailed(index, 409, str(e.orig))
+
+        for collection in touched:
+            bump_collection_version(db, collection)
+
+        # 2. Recipes in one DynamoDB transaction, before the SQL commit
+        if recipe_actions:
+            run_recipe_transaction(operations, recipe_actions)
+    except OperationFailed as failure:
+        db.rollback()
+        return failed_response(failure, len(operations))
+
+    db.commit()
+
+    # 3. Updates in a transaction return nothing, so read the updated recipes back in one call,
+    # consistently: these items also feed the in-process indexes
+    updated = [index for index, _ in recipe_actions if operations[index].method == "update"]
+    items = {}
+    if updated:
+        keys = [{'PK': 'RECIPE', 'SK': operations[index].id} for index in updated]
+        items = {item["id"]: item for item in batch_get(keys, consistent=True)}
+        for index in updated:
+            if operations[index].id in items:
+                results[index].data = recipe_data(items[operations[index].id])
+
+    # The transaction bumped the recipe version once, so the in-process indexes take one change set
+    if recipe_actions:
+        deleted = [operations[index].id for index, _ in recipe_actions if operations[index].method == "delete"]
+        notify_recipe_write(upserts=created_recipes + list(items.values()), deletes=deleted)
+
+    return BatchResponse(committed=True, results=results)
@@ -0,0 +1,185 @@
+"""
+Week dashboard: everything the calendar week renders, in one request.
+
+Instead of fetching the week's meal plans, then each recipe, then each
+ingredient, then the grocery list, the frontend asks for the whole graph for
+a date range. The graph is resolved level by level through per-request
+DataLoaders, so each level is one batched query no matter how many meal
+plans share a recipe or recipes share an ingredient:
+
+1. meal plans in the range, and their meal rows
+2. the referenced recipes, and their ingredient rows
+3. the grocery lists linked to those meal plans, and their items
+4. every ingredient referenced by the recipes and grocery lists
+
+Recipes and ingredients are returned once each, next to the meal plans and
+grocery lists that reference them by id.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.etag import check_etag, request_etag
+from app.db.dataloader import DataLoader
+from app.db.database import get_db
+from app.db.versions import GROCERY_LIST, INGREDIENT, MEAL_PLAN, get_collection_versions
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    grocery_list_item,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+from app.schemas.schemas import WeekDashboard
+
+router = APIRouter()
+
+# Longest range one dashboard request may cover
+MAX_DASHBOARD_DAYS = 31
+
+
+def recipe_loader(db: Session) -> DataLoader[int, Dict[str, Any]]:
+    """Recipes with their ingredient lines, two queries per batch."""
+
+    def batch_load(recipe_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        recipes = {
+            recipe.id: {
+                "id": str(recipe.id),
+                "name": recipe.name or "",
+                "description": recipe.description or "",
+                "instructions": recipe.instructions or "",
+                "prep_time": recipe.prep_time or 0,
+                "cook_time": recipe.cook_time or 0,
+                "servings": recipe.servings or 0,
+                "image_url": recipe.image_url,
+                "ingredients": [],
+            }
+            for recipe in db.scalars(select(RecipeModel).where(RecipeModel.id.in_(recipe_ids)))
+        }
+        lines = db.execute(select(recipe_ingredient).where(recipe_ingredient.c.recipe_id.in_(recipe_ids)))
+        for line in lines:
+            recipes[line.recipe_id]["ingredients"].append({
+                "ingredient_id": str(line.ingredient_id),
+                "quantity": line.quantity or 0,
+                "unit": line.unit or "",
+            })
+        return recipes
+
+    return DataLoader(batch_load)
+
+
+def ingredient_loader(db: Session) -> DataLoader[int, Dict[str, Any]]:
+    """Ingredients, one query per batch."""
+
+    def batch_load(ingredient_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {
+            ingredient.id: {"id": str(ingredient.id), "name": ingredient.name, "category": ingredient.category}
+            for ingredient in db.scalars(select(IngredientModel).where(IngredientModel.id.in_(ingredient_ids)))
+        }
+
+    return DataLoader(batch_load)
+
+
+def load_week(db: Session, start_date: date, end_date: date) -> Dict[str, Any]:
+    """Resolve the dashboard graph for a date range."""
+    recipes = recipe_loader(db)
+    ingredients = ingredient_loader(db)
+
+    # 1. Meal plans and their meal rows
+    plans = db.scalars(
+        select(MealPlanModel)
+        .where(MealPlanModel.date >= start_date, MealPlanModel.date <= end_date)
+        .order_by(MealPlanModel.date)
+    ).all()
+    plan_ids = [plan.id for plan in plans]
+    meals = db.execute(select(meal_plan_recipe).where(meal_plan_recipe.c.meal_plan_id.in_(plan_ids))).all()
+
+    # 2. Every referenced recipe, once
+    recipe_by_id = recipes.load_many(meal.recipe_id for meal in meals)
+
+    # 3. Grocery lists linked to the meal plans, and their items
+    lists = db.scalars(
+        select(GroceryListModel).where(GroceryListModel.meal_plan_id.in_(plan_ids)).order_by(GroceryListModel.id)
+    ).all()
+    list_ids = [grocery_list.id for grocery_list in lists]
+    items = db.execute(select(grocery_list_item).where(grocery_list_item.c.grocery_list_id.in_(list_ids))).all()
+
+    # 4. Every ingredient referenced by the recipes and grocery lists, once
+    ingredient_ids = [int(line["ingredient_id"]) for recipe in recipe_by_id.values() for line in recipe["ingredients"]]
+    ingredient_ids += [item.ingredient_id for item in items]
+    ingredient_by_id = ingredients.load_many(ingredient_ids)
+
+    for recipe in recipe_by_id.values():
+        for line in recipe["ingredients"]:
+            line["name"] = ingredient_by_id.get(int(line["ingredient_id"]), {}).get("name")
+
+    meals_by_plan: Dict[int, List[Dict[str, Any]]] = {plan_id: [] for plan_id in plan_ids}
+    for meal in meals:
+        meals_by_plan[meal.meal_plan_id].append({
+            "recipe_id": str(meal.recipe_id),
+            "recipe_name": recipe_by_id.get(meal.recipe_id, {}).get("name"),
+            "meal_type": meal.meal_type,
+        })
+
+    items_by_list: Dict[int, List[Dict[str, Any]]] = {list_id: [] for list_id in list_ids}
+    for item in items:
+        items_by_list[item.grocery_list_id].append({
+            "ingredient_id": str(item.ingredient_id),
+            "ingredient_name": ingredient_by_id.get(item.ingredient_id, {}).get("name", ""),
+            "quantity": item.quantity or 0,
+            "unit": item.unit or "",
+            "checked": bool(item.checked),
+        })
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "meal_plans": [
+            {"id": str(plan.id), "date": plan.date.isoformat(), "recipes": meals_by_plan[plan.id]}
+            for plan in plans
+        ],
+        "recipes": list(recipe_by_id.values()),
+        "ingredients": list(ingredient_by_id.values()),
+        "grocery_lists": [
+            {
+                "id": str(grocery_list.id),
+                "name": grocery_list.name,
+                "meal_plan_id": str(grocery_list.meal_plan_id),
+                "items": items_by_list[grocery_list.id],
+            }
+            for grocery_list in lists
+        ],
+    }
+
+
+@router.get("/dashboard/week/", response_model=WeekDashboard)
+def read_week_dashboard(
+    request: Request,
+    response: Response,
+    start_date: date = None,
+    end_date: date = None,
+    db: Session = Depends(get_db)
+):
+    """Get the meal plans, recipes, ingredients and grocery lists for a week (or any date range)"""
+    # If no start date provided, use today; the range defaults to 7 days
+    if not start_date:
+        start_date = date.today()
+    if not end_date:
+        end_date = start_date + timedelta(days=6)
+    if end_date < start_date or (end_date - start_date).days >= MAX_DASHBOARD_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_DASHBOARD_DAYS} days")
+
+    # The response depends on all three collections, and on the defaulted dates
+    versions = get_collection_versions(db, [MEAL_PLAN, GROCERY_LIST, INGREDIENT])
+    etag = request_etag(request, "DASHBOARD", versions, start_date, end_date)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    return load_week(db, start_date, end_date)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.api.export import RESOURCES, export_stream
+from app.db.database import get_db
+
+router = APIRouter()
+
+@router.get("/export")
+def export_data(resources: Optional[str] = None, gzip: bool = False, db: Session = Depends(get_db)):
+    """Stream the dataset as NDJSON, one {"type", "data"} record per line"""
+    selected = RESOURCES
+    if resources:
+        selected = tuple(name.strip() for name in resources.split(",") if name.strip())
+        unknown = set(selected) - set(RESOURCES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown resources: {', '.join(sorted(unknown))}")
+
+    # No Content-Length: uvicorn sends the generator's chunks with chunked transfer encoding
+    filename = "meal-planner-export.ndjson.gz" if gzip else "meal-planner-export.ndjson"
+    return StreamingResponse(
+        export_stream(db, selected, gzip=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
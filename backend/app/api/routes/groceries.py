@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, set_next_cursor
 from app.db.database import get_db
+from app.db.grocery import create_generated_grocery_list
+from app.db.versions import GROCERY_LIST, INGREDIENT, bump_collection_version, get_collection_versions
 from app.models.models import GroceryList as GroceryListModel, Ingredient as IngredientModel, grocery_list_item
-from app.schemas.schemas import GroceryList, GroceryListCreate, GroceryItemBase
+from app.schemas.schemas import (
+    GeneratedGroceryList, GroceryList, GroceryListCreate, GroceryListGenerate, GroceryItemUpdate
+)
 
 router = APIRouter()
 
+# Longest range one generated grocery list may cover
+MAX_GENERATE_DAYS = 31
+
 @router.post("/grocery-lists/", response_model=GroceryList, status_code=status.HTTP_201_CREATED)
 def create_grocery_list(grocery_list: GroceryListCreate, db: Session = Depends(get_db)):
     # Create grocery list
@@ -35,21 +46,78 @@ def create_grocery_list(grocery_list: GroceryListCreate, db: Session = Depends(g
         )
         db.execute(stmt)
     
+    bump_collection_version(db, GROCERY_LIST)
     db.commit()
     db.refresh(db_grocery_list)
     return db_grocery_list
 
+@router.post("/grocery-lists/generate", response_model=GeneratedGroceryList, status_code=status.HTTP_201_CREATED)
+def generate_grocery_list(request: GroceryListGenerate, db: Session = Depends(get_db)):
+    if request.end_date < request.start_date or (request.end_date - request.start_date).days >= MAX_GENERATE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_GENERATE_DAYS} days")
+    
+    name = request.name or f"Groceries {request.start_date} to {request.end_date}"
+    grocery_list = create_generated_grocery_list(db, name, request.start_date, request.end_date, request.servings)
+    db.commit()
+    return grocery_list
+
 @router.get("/grocery-lists/", response_model=List[GroceryList])
-def read_grocery_lists(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    grocery_lists = db.query(GroceryListModel).offset(skip).limit(limit).all()
-    return grocery_lists
+def read_grocery_lists(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Fields = Depends(field_selection(GroceryList)),
+    db: Session = Depends(get_db)
+):
+    # Items carry their ingredient's name, so ingredient writes change lists too
+    versions = get_collection_versions(db, [GROCERY_LIST, INGREDIENT])
+    etag = request_etag(request, GROCERY_LIST, versions[GROCERY_LIST], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    # Legacy offset paging, kept for existing clients
+    if skip is not None:
+        query = db.query(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+        grocery_lists = query.offset(skip).limit(limit).all()
+        return sparse_response(GroceryList, fields, grocery_lists, response)
+    
+    # Keyset paging on the primary key
+    query = db.query(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+    query = query.order_by(GroceryListModel.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.filter(GroceryListModel.id > last_id)
+    
+    # Fetch one extra row to find out whether there is a next page
+    grocery_lists = query.limit(limit + 1).all()
+    if len(grocery_lists) > limit:
+        grocery_lists = grocery_lists[:limit]
+        set_next_cursor(response, encode_cursor([grocery_lists[-1].id]))
+    return sparse_response(GroceryList, fields, grocery_lists, response)
 
 @router.get("/grocery-lists/{grocery_list_id}", response_model=GroceryList)
-def read_grocery_list(grocery_list_id: int, db: Session = Depends(get_db)):
-    grocery_list = db.query(GroceryListModel).filter(GroceryListModel.id == grocery_list_id).first()
+def read_grocery_list(
+    grocery_list_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(GroceryList)),
+    db: Session = Depends(get_db)
+):
+    # Items carry their ingredient's name, so ingredient writes change lists too
+    versions = get_collection_versions(db, [GROCERY_LIST, INGREDIENT])
+    etag = request_etag(request, GROCERY_LIST, versions[GROCERY_LIST], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    query = db.query(GroceryListModel).options(*load_columns(GroceryListModel, fields))
+    grocery_list = query.filter(GroceryListModel.id == grocery_list_id).first()
     if grocery_list is None:
         raise HTTPException(status_code=404, detail="Grocery list not found")
-    return grocery_list
+    return sparse_response(GroceryList, fields, grocery_list, response)
 
 @router.put("/grocery-lists/{grocery_list_id}", response_model=GroceryList)
 def update_grocery_list(grocery_list_id: int, grocery_list: GroceryListCreate, db: Session = Depends(get_db)):
@@ -80,6 +148,7 @@ def update_grocery_list(grocery_list_id: int, grocery_list: GroceryListCreate, d
         )
         db.execute(stmt)
     
+    bump_collection_version(db, GROCERY_LIST)
     db.commit()
     db.refresh(db_grocery_list)
     return db_grocery_list
@@ -88,7 +157,7 @@ def update_grocery_list(grocery_list_id: int, grocery_list: GroceryListCreate, d
 def update_grocery_item(
     grocery_list_id: int, 
     ingredient_id: int, 
-    item: GroceryItemBase, 
+    item: GroceryItemUpdate, 
     db: Session = Depends(get_db)
 ):
     # Check if grocery list exists
@@ -96,20 +165,20 @@ def update_grocery_item(
     if db_grocery_list is None:
         raise HTTPException(status_code=404, detail="Grocery list not found")
     
-    # Update the item
-    stmt = grocery_list_item.update().where(
-        grocery_list_item.c.grocery_list_id == grocery_list_id,
-        grocery_list_item.c.ingredient_id == ingredient_id
-    ).values(
-        quantity=item.quantity,
-        unit=item.unit,
-        checked=1 if item.checked else 0
-    )
-    result = db.execute(stmt)
+    # Update only the fields sent, e.g. just checked
+    values = item.dict(exclude_unset=True)
+    if "checked" in values:
+        values["checked"] = 1 if values["checked"] else 0
+    where = (grocery_list_item.c.grocery_list_id == grocery_list_id, grocery_list_item.c.ingredient_id == ingredient_id)
+    if values:
+        found = (db.execute(grocery_list_item.update().where(*where).values(**values))).rowcount
+    else:
+        found = (db.execute(select(grocery_list_item.c.ingredient_id).where(*where))).first() is not None
     
-    if result.rowcount == 0:
+    if not found:
         raise HTTPException(status_code=404, detail="Item not found in grocery list")
     
+    bump_collection_version(db, GROCERY_LIST)
     db.commit()
     db.refresh(db_grocery_list)
     return db_grocery_list
@@ -121,5 +190,6 @@ def delete_grocery_list(grocery_list_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Grocery list not found")
     
     db.delete(db_grocery_list)
+    bump_collection_version(db, GROCERY_LIST)
     db.commit()
     return None 
\ No newline at end of file
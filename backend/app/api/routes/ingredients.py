@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, set_next_cursor
+from app.db.autocomplete import get_prefix_index
 from app.db.database import get_db
-from app.models.models import Ingredient as IngredientModel
-from app.schemas.schemas import Ingredient, IngredientCreate
+from app.db.nutrition import facts_dict
+from app.db.versions import GROCERY_LIST, INGREDIENT, bump_collection_version, get_collection_version
+from app.models.models import Ingredient as IngredientModel, IngredientNutrition as IngredientNutritionModel
+from app.schemas.schemas import Ingredient, IngredientCreate, IngredientNutrition, IngredientSuggestion, NutritionFacts
 
 router = APIRouter()
 
+# Most suggestions one autocomplete request may return
+MAX_SUGGESTIONS = 25
+
 @router.post("/ingredients/", response_model=Ingredient, status_code=status.HTTP_201_CREATED)
 def create_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db)):
     # Check if ingredient already exists
@@ -17,21 +27,85 @@ def create_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db
     # Create new ingredient
     db_ingredient = IngredientModel(**ingredient.dict())
     db.add(db_ingredient)
+    bump_collection_version(db, INGREDIENT)
     db.commit()
     db.refresh(db_ingredient)
     return db_ingredient
 
 @router.get("/ingredients/", response_model=List[Ingredient])
-def read_ingredients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    ingredients = db.query(IngredientModel).offset(skip).limit(limit).all()
-    return ingredients
+def read_ingredients(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Fields = Depends(field_selection(Ingredient)),
+    db: Session = Depends(get_db)
+):
+    version = get_collection_version(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    # Legacy offset paging, kept for existing clients
+    if skip is not None:
+        query = db.query(IngredientModel).options(*load_columns(IngredientModel, fields))
+        ingredients = query.offset(skip).limit(limit).all()
+        return sparse_response(Ingredient, fields, ingredients, response)
+    
+    # Keyset paging on (name, id), served by the index on Ingredient.name
+    query = db.query(IngredientModel).options(*load_columns(IngredientModel, fields, "name"))
+    query = query.order_by(IngredientModel.name, IngredientModel.id)
+    if cursor:
+        last_name, last_id = decode_cursor(cursor, 2)
+        query = query.filter(or_(
+            IngredientModel.name > last_name,
+            and_(IngredientModel.name == last_name, IngredientModel.id > last_id)
+        ))
+    
+    # Fetch one extra row to find out whether there is a next page
+    ingredients = query.limit(limit + 1).all()
+    if len(ingredients) > limit:
+        ingredients = ingredients[:limit]
+        last = ingredients[-1]
+        set_next_cursor(response, encode_cursor([last.name, last.id]))
+    return sparse_response(Ingredient, fields, ingredients, response)
+
+@router.get("/ingredients/autocomplete", response_model=List[IngredientSuggestion])
+def autocomplete_ingredients(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: Session = Depends(get_db)
+):
+    # Suggestions are ranked by usage in recipes and grocery lists, so both versions feed the ETag
+    index = get_prefix_index(db)
+    etag = request_etag(request, INGREDIENT, index.versions[INGREDIENT], index.versions[GROCERY_LIST])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return index.complete(q, limit)
 
 @router.get("/ingredients/{ingredient_id}", response_model=Ingredient)
-def read_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
-    ingredient = db.query(IngredientModel).filter(IngredientModel.id == ingredient_id).first()
+def read_ingredient(
+    ingredient_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(Ingredient)),
+    db: Session = Depends(get_db)
+):
+    version = get_collection_version(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    query = db.query(IngredientModel).options(*load_columns(IngredientModel, fields))
+    ingredient = query.filter(IngredientModel.id == ingredient_id).first()
     if ingredient is None:
         raise HTTPException(status_code=404, detail="Ingredient not found")
-    return ingredient
+    return sparse_response(Ingredient, fields, ingredient, response)
 
 @router.put("/ingredients/{ingredient_id}", response_model=Ingredient)
 def update_ingredient(ingredient_id: int, ingredient: IngredientCreate, db: Session = Depends(get_db)):
@@ -49,6 +123,7 @@ def update_ingredient(ingredient_id: int, ingredient: IngredientCreate, db: Sess
     for key, value in ingredient.dict().items():
         setattr(db_ingredient, key, value)
     
+    bump_collection_version(db, INGREDIENT)
     db.commit()
     db.refresh(db_ingredient)
     return db_ingredient
@@ -60,5 +135,35 @@ def delete_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Ingredient not found")
     
     db.delete(db_ingredient)
+    bump_collection_version(db, INGREDIENT)
+    db.commit()
+    return None
+
+@router.get("/ingredients/{ingredient_id}/nutrition", response_model=IngredientNutrition)
+def read_ingredient_nutrition(ingredient_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    version = get_collection_version(db, INGREDIENT)
+    not_modified = check_etag(request, response, request_etag(request, INGREDIENT, version))
+    if not_modified:
+        return not_modified
+    
+    facts = db.get(IngredientNutritionModel, ingredient_id)
+    if facts is None or db.get(IngredientModel, ingredient_id) is None:
+        raise HTTPException(status_code=404, detail="Nutrition facts not found")
+    return facts_dict(facts)
+
+@router.put("/ingredients/{ingredient_id}/nutrition", response_model=IngredientNutrition)
+def update_ingredient_nutrition(ingredient_id: int, nutrition: NutritionFacts, db: Session = Depends(get_db)):
+    if db.get(IngredientModel, ingredient_id) is None:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    
+    # Nutrition facts are part of the ingredient, so they share its collection version
+    facts = db.get(IngredientNutritionModel, ingredient_id)
+    if facts is None:
+        facts = IngredientNutritionModel(ingredient_id=ingredient_id)
+        db.add(facts)
+    for key, value in nutrition.dict().items():
+        setattr(facts, key, value)
+    
+    bump_collection_version(db, INGREDIENT)
     db.commit()
-    return None 
\ No newline at end of file
+    return facts_dict(facts)
@@ -0,0 +1,240 @@
+"""
+The requesting user's own meal plans, weeks and grocery lists.
+
+These routes serve the per-user DynamoDB layout: every call acts for the user
+named by ``X-User-Id`` (see app.api.users) and reads and writes only that
+user's ``USER#<user_id>`` partitions, so users never see each other's plans or
+lists. Meal plans may plan catalog recipes and the user's private ones; each
+entry keeps a copy of its recipe's name and image, and a week is read from its
+week document in one request. Grocery list items without a name take it from
+the ingredient catalog in SQL.
+
+The ``/meal-plans`` and ``/grocery-lists`` routes keep serving the SQL data
+the planning features (generation, nutrition, dashboard) are built on.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.etag import check_etag, item_etag, request_etag
+from app.api.users import current_user
+from app.db.database import get_db
+from app.db.dynamodb import (
+    batch_get,
+    create_grocery_list,
+    create_meal_plan,
+    delete_grocery_list,
+    delete_meal_plan,
+    get_collection_version,
+    get_grocery_list,
+    get_grocery_lists,
+    get_meal_plan,
+    get_meal_plans,
+    get_week,
+    recipe_keys,
+    set_grocery_item,
+    update_grocery_list,
+    update_meal_plan,
+    user_key,
+)
+from app.db.search import get_ingredient_catalog
+from app.schemas.schemas import (
+    GroceryItem,
+    GroceryItemUpdate,
+    GroceryList,
+    GroceryListCreate,
+    GroceryListUpdate,
+    MealPlan,
+    MealPlanCreate,
+    MealPlanUpdate,
+    Week,
+)
+
+router = APIRouter()
+
+# ISO weeks as week documents name them, e.g. 2024-W01
+WEEK_PATTERN = r"^\d{4}-W\d{2}$"
+
+
+def check_recipes(user_id: str, recipe_ids: List[str]) -> None:
+    """Refuse a meal plan planning a recipe that is neither in the catalog nor private to the user."""
+    keys = [key for recipe_id in sorted(set(recipe_ids)) for key in recipe_keys(recipe_id, user_id)]
+    found = {item["id"] for item in batch_get(keys)}
+    for recipe_id in recipe_ids:
+        if recipe_id not in found:
+            raise HTTPException(status_code=404, detail=f"Recipe with id {recipe_id} not found")
+
+
+def named_items(db: Session, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Grocery items with the catalog name of every ingredient sent without one."""
+    names = get_ingredient_catalog(db).names
+    named = []
+    for item in items:
+        if item.get("ingredient_id") not in names:
+            raise HTTPException(status_code=404, detail=f"Ingredient with id {item.get('ingredient_id')} not found")
+        named.append({**item, "ingredient_name": item.get("ingredient_name") or names[item["ingredient_id"]]})
+    return named
+
+
+@router.get("/me/meal-plans/", response_model=List[MealPlan])
+def read_my_meal_plans(
+    request: Request,
+    response: Response,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_id: str = Depends(current_user)
+):
+    """Get the user's meal plans by date, optionally between two dates"""
+    collection = user_key(user_id, "MEAL_PLAN")
+    not_modified = check_etag(request, response, request_etag(request, collection, get_collection_version(collection)))
+    if not_modified:
+        return not_modified
+    return get_meal_plans(user_id, start_date, end_date)
+
+
+@router.get("/me/meal-plans/{meal_plan_id}", response_model=MealPlan)
+def read_my_meal_plan(meal_plan_id: str, request: Request, response: Response, user_id: str = Depends(current_user)):
+    """Get one of the user's meal plans"""
+    meal_plan = get_meal_plan(user_id, meal_plan_id)
+    if meal_plan is None:
+        raise HTTPException(status_code=404, detail="Meal plan not found")
+    not_modified = check_etag(request, response, item_etag(meal_plan))
+    if not_modified:
+        return not_modified
+    return meal_plan
+
+
+@router.post("/me/meal-plans/", response_model=MealPlan, status_code=status.HTTP_201_CREATED)
+def create_my_meal_plan(meal_plan: MealPlanCreate, user_id: str = Depends(current_user)):
+    """Create a meal plan for the user"""
+    check_recipes(user_id, [entry.recipe_id for entry in meal_plan.recipes])
+    return create_meal_plan(user_id, meal_plan.dict())
+
+
+@router.put("/me/meal-plans/{meal_plan_id}", response_model=MealPlan)
+def update_my_meal_plan(meal_plan_id: str, meal_plan: MealPlanUpdate, user_id: str = Depends(current_user)):
+    """Update one of the user's meal plans; only the fields sent change"""
+    meal_plan_data = meal_plan.dict(exclude_unset=True)
+    if meal_plan.recipes is not None:
+        check_recipes(user_id, [entry.recipe_id for entry in meal_plan.recipes])
+    updated = update_meal_plan(user_id, meal_plan_id, meal_plan_data)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Meal plan not found")
+    return updated
+
+
+@router.delete("/me/meal-plans/{meal_plan_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_my_meal_plan(meal_plan_id: str, user_id: str = Depends(current_user)):
+    """Delete one of the user's meal plans"""
+    if get_meal_plan(user_id, meal_plan_id) is None:
+        raise HTTPException(status_code=404, detail="Meal plan not found")
+    delete_meal_plan(user_id, meal_plan_id)
+    return None
+
+
+@router.get("/me/weeks/{week}", response_model=Week)
+def read_my_week(
+    request: Request,
+    response: Response,
+    week: str = Path(..., regex=WEEK_PATTERN),
+    user_id: str = Depends(current_user)
+):
+    """Get the seven days of one of the user's ISO weeks with their meals, in one read"""
+    week_document = get_week(user_id, week)
+    # Week documents have no id of their own, and an empty week has version 0
+    not_modified = check_etag(request, response, item_etag(week_document, user_key(user_id, "WEEK", week)))
+    if not_modified:
+        return not_modified
+    return week_document
+
+
+@router.get("/me/grocery-lists/", response_model=List[GroceryList])
+def read_my_grocery_lists(request: Request, response: Response, user_id: str = Depends(current_user)):
+    """Get the user's grocery lists, without their items"""
+    collection = user_key(user_id, "GROCERY_LIST")
+    not_modified = check_etag(request, response, request_etag(request, collection, get_collection_version(collection)))
+    if not_modified:
+        return not_modified
+    return get_grocery_lists(user_id)
+
+
+@router.get("/me/grocery-lists/{grocery_list_id}", response_model=GroceryList)
+def read_my_grocery_list(
+    grocery_list_id: str,
+    request: Request,
+    response: Response,
+    user_id: str = Depends(current_user)
+):
+    """Get one of the user's grocery lists with its items"""
+    grocery_list = get_grocery_list(user_id, grocery_list_id)
+    if grocery_list is None:
+        raise HTTPException(status_code=404, detail="Grocery list not found")
+    not_modified = check_etag(request, response, item_etag(grocery_list))
+    if not_modified:
+        return not_modified
+    return grocery_list
+
+
+@router.post("/me/grocery-lists/", response_model=GroceryList, status_code=status.HTTP_201_CREATED)
+def create_my_grocery_list(
+    grocery_list: GroceryListCreate,
+    user_id: str = Depends(current_user),
+    db: Session = Depends(get_db)
+):
+    """Create a grocery list for the user; repeated ingredients in one unit are merged"""
+    grocery_list_data = grocery_list.dict()
+    grocery_list_data["items"] = named_items(db, grocery_list_data["items"])
+    try:
+        return create_grocery_list(user_id, grocery_list_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/me/grocery-lists/{grocery_list_id}", response_model=GroceryList)
+def update_my_grocery_list(
+    grocery_list_id: str,
+    grocery_list: GroceryListUpdate,
+    user_id: str = Depends(current_user),
+    db: Session = Depends(get_db)
+):
+    """Update one of the user's grocery lists; items sent replace its items"""
+    grocery_list_data = grocery_list.dict(exclude_unset=True)
+    if grocery_list_data.get("items") is not None:
+        grocery_list_data["items"] = named_items(db, grocery_list_data["items"])
+    try:
+        updated = update_grocery_list(user_id, grocery_list_id, grocery_list_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Grocery list not found")
+    return updated
+
+
+@router.patch("/me/grocery-lists/{grocery_list_id}/items/{ingredient_id}", response_model=GroceryItem)
+def update_my_grocery_item(
+    grocery_list_id: str,
+    ingredient_id: str,
+    item: GroceryItemUpdate,
+    user_id: str = Depends(current_user)
+):
+    """Change fields of an item of one of the user's grocery lists; only the item is written"""
+    fields = item.dict(exclude_unset=True)
+    if fields:
+        stored = set_grocery_item(user_id, grocery_list_id, ingredient_id, fields)
+    else:
+        grocery_list = get_grocery_list(user_id, grocery_list_id) or {"items": []}
+        stored = next((entry for entry in grocery_list["items"] if entry["ingredient_id"] == ingredient_id), None)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Item not found in grocery list")
+    return stored
+
+
+@router.delete("/me/grocery-lists/{grocery_list_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_my_grocery_list(grocery_list_id: str, user_id: str = Depends(current_user)):
+    """Delete one of the user's grocery lists"""
+    if get_grocery_list(user_id, grocery_list_id) is None:
+        raise HTTPException(status_code=404, detail="Grocery list not found")
+    delete_grocery_list(user_id, grocery_list_id)
+    return None
@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, timedelta
+from app.api.etag import check_etag, request_etag
+from app.api.fields import Fields, field_selection, load_columns, sparse_response
+from app.api.responses import trusted_response
 from app.db.database import get_db
-from app.models.models import MealPlan as MealPlanModel, Recipe as RecipeModel, meal_plan_recipe
-from app.schemas.schemas import MealPlan, MealPlanCreate
+from app.db.dynamodb import get_collection_version as get_recipe_version
+from app.db.nutrition import meal_plan_nutrition
+from app.db.planner import generate_meal_plans
+from app.db.scaling import scale_meal_plans
+from app.db.versions import (
+    GROCERY_LIST, INGREDIENT, MEAL_PLAN, bump_collection_version, get_collection_version, get_collection_versions
+)
+from app.models.models import GroceryList as GroceryListModel, MealPlan as MealPlanModel, Recipe as RecipeModel, meal_plan_recipe
+from app.schemas.schemas import (
+    GeneratedMealPlans, MealPlan, MealPlanCreate, MealPlanGenerate, MealPlanNutrition, ScaledMealPlans
+)
 
 router = APIRouter()
 
+# Longest range one nutrition rollup may cover
+MAX_NUTRITION_DAYS = 92
+
+# Longest range one generated plan may cover
+MAX_PLAN_DAYS = 31
+
+# Most servings a meal may be scaled to
+MAX_SERVINGS = 100
+
 @router.post("/meal-plans/", response_model=MealPlan, status_code=status.HTTP_201_CREATED)
 def create_meal_plan(meal_plan: MealPlanCreate, db: Session = Depends(get_db)):
     # Check if meal plan for this date already exists
@@ -36,13 +57,26 @@ def create_meal_plan(meal_plan: MealPlanCreate, db: Session = Depends(get_db)):
         )
         db.execute(stmt)
     
+    bump_collection_version(db, MEAL_PLAN)
     db.commit()
     db.refresh(db_meal_plan)
     return db_meal_plan
 
 @router.get("/meal-plans/", response_model=List[MealPlan])
-def read_meal_plans(start_date: date = None, end_date: date = None, db: Session = Depends(get_db)):
-    query = db.query(MealPlanModel)
+def read_meal_plans(
+    request: Request,
+    response: Response,
+    start_date: date = None,
+    end_date: date = None,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: Session = Depends(get_db)
+):
+    version = get_collection_version(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version))
+    if not_modified:
+        return not_modified
+    
+    query = db.query(MealPlanModel).options(*load_columns(MealPlanModel, fields))
     
     # Filter by date range if provided
     if start_date and end_date:
@@ -56,31 +90,116 @@ def read_meal_plans(start_date: date = None, end_date: date = None, db: Session
     query = query.order_by(MealPlanModel.date)
     
     meal_plans = query.all()
-    return meal_plans
+    return sparse_response(MealPlan, fields, meal_plans, response)
 
 @router.get("/meal-plans/week/", response_model=List[MealPlan])
-def read_weekly_meal_plan(start_date: date = None, db: Session = Depends(get_db)):
+def read_weekly_meal_plan(
+    request: Request,
+    response: Response,
+    start_date: date = None,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: Session = Depends(get_db)
+):
     # If no start date provided, use today
     if not start_date:
         start_date = date.today()
     
+    # The defaulted start date is part of the representation
+    version = get_collection_version(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version, start_date))
+    if not_modified:
+        return not_modified
+    
     # Calculate end date (7 days from start)
     end_date = start_date + timedelta(days=6)
     
     # Get meal plans for the week
-    meal_plans = db.query(MealPlanModel).filter(
+    meal_plans = db.query(MealPlanModel).options(*load_columns(MealPlanModel, fields)).filter(
         MealPlanModel.date >= start_date,
         MealPlanModel.date <= end_date
     ).order_by(MealPlanModel.date).all()
     
-    return meal_plans
+    return sparse_response(MealPlan, fields, meal_plans, response)
+
+@router.get("/meal-plans/nutrition", response_model=MealPlanNutrition)
+def read_meal_plan_nutrition(
+    request: Request,
+    response: Response,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    db: Session = Depends(get_db)
+):
+    if end_date < start_date or (end_date - start_date).days >= MAX_NUTRITION_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_NUTRITION_DAYS} days")
+    
+    # Totals depend on the meals planned and on the ingredients' nutrition facts
+    versions = get_collection_versions(db, [MEAL_PLAN, INGREDIENT])
+    etag = request_etag(request, MEAL_PLAN, versions[MEAL_PLAN], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    nutrition = meal_plan_nutrition(db, start_date, end_date, versions[INGREDIENT])
+    return trusted_response(MealPlanNutrition, nutrition, response)
+
+@router.get("/meal-plans/scaled", response_model=ScaledMealPlans)
+def read_scaled_meal_plans(
+    request: Request,
+    response: Response,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    servings: int = Query(..., ge=1, le=MAX_SERVINGS),
+    db: Session = Depends(get_db)
+):
+    if end_date < start_date or (end_date - start_date).days >= MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_PLAN_DAYS} days")
+    
+    # Ingredient names come from the INGREDIENT collection
+    versions = get_collection_versions(db, [MEAL_PLAN, INGREDIENT])
+    etag = request_etag(request, MEAL_PLAN, versions[MEAL_PLAN], versions[INGREDIENT])
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    scaled = scale_meal_plans(db, start_date, end_date, servings)
+    return trusted_response(ScaledMealPlans, scaled, response)
+
+@router.post("/meal-plans/generate", response_model=GeneratedMealPlans)
+def generate_meal_plans_endpoint(request: MealPlanGenerate, response: Response):
+    """Plan every meal of a date range under the given constraints; nothing is saved, POST the plans to keep them"""
+    if request.end_date < request.start_date or (request.end_date - request.start_date).days >= MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must cover 1 to {MAX_PLAN_DAYS} days")
+    
+    version = get_recipe_version("RECIPE")
+    try:
+        # Bounded by time_budget_ms
+        plans = generate_meal_plans(
+            request.start_date, request.end_date, [slot.dict() for slot in request.slots], request.max_total_time,
+            request.difficulty, request.tags, request.exclude_tags, request.no_repeat_days,
+            request.time_budget_ms, request.restarts, request.seed, version
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return trusted_response(GeneratedMealPlans, plans, response)
 
 @router.get("/meal-plans/{meal_plan_id}", response_model=MealPlan)
-def read_meal_plan(meal_plan_id: int, db: Session = Depends(get_db)):
-    meal_plan = db.query(MealPlanModel).filter(MealPlanModel.id == meal_plan_id).first()
+def read_meal_plan(
+    meal_plan_id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(MealPlan)),
+    db: Session = Depends(get_db)
+):
+    version = get_collection_version(db, MEAL_PLAN)
+    not_modified = check_etag(request, response, request_etag(request, MEAL_PLAN, version))
+    if not_modified:
+        return not_modified
+    
+    query = db.query(MealPlanModel).options(*load_columns(MealPlanModel, fields))
+    meal_plan = query.filter(MealPlanModel.id == meal_plan_id).first()
     if meal_plan is None:
         raise HTTPException(status_code=404, detail="Meal plan not found")
-    return meal_plan
+    return sparse_response(MealPlan, fields, meal_plan, response)
 
 @router.put("/meal-plans/{meal_plan_id}", response_model=MealPlan)
 def update_meal_plan(meal_plan_id: int, meal_plan: MealPlanCreate, db: Session = Depends(get_db)):
@@ -117,6 +236,7 @@ def update_meal_plan(meal_plan_id: int, meal_plan: MealPlanCreate, db: Session =
         )
         db.execute(stmt)
     
+    bump_collection_version(db, MEAL_PLAN)
     db.commit()
     db.refresh(db_meal_plan)
     return db_meal_plan
@@ -127,6 +247,10 @@ def delete_meal_plan(meal_plan_id: int, db: Session = Depends(get_db)):
     if db_meal_plan is None:
         raise HTTPException(status_code=404, detail="Meal plan not found")
     
+    # A grocery list made for the plan loses its link (SET NULL)
+    if db.query(GroceryListModel.id).filter(GroceryListModel.meal_plan_id == meal_plan_id).first():
+        bump_collection_version(db, GROCERY_LIST)
     db.delete(db_meal_plan)
+    bump_collection_version(db, MEAL_PLAN)
     db.commit()
     return None 
\ No newline at end of file
@@ -1,49 +1,203 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.dynamodb import get_recipes, get_recipe, create_recipe, update_recipe, delete_recipe
-from app.schemas.schemas import Recipe, RecipeCreate, RecipeUpdate
+from app.api.etag import check_etag, item_etag, request_etag
+from app.api.fields import Fields, field_selection, sparse_response
+from app.api.responses import trusted_response
+from app.api.users import current_user
+from app.db.dynamodb import (
+    create_recipe, delete_recipe, get_collection_version, get_recipe, get_recipes, update_recipe, user_key
+)
+from app.db.coverage import find_cookable
+from app.db.database import get_db
+from app.db.nutrition import get_nutrition_matrix, recipe_nutrition
+from app.db.scaling import scale_recipe
+from app.db.search import find_recipes, get_ingredient_catalog
+from app.db.similarity import find_similar
+from app.schemas.schemas import (
+    CookableRecipe, Recipe, RecipeCreate, RecipeNutrition, RecipeSearchResult, RecipeUpdate, ScaledRecipe, SimilarRecipe
+)
 
 router = APIRouter()
 
+# Most hits one search may return
+MAX_SEARCH_RESULTS = 50
+
+# Most ingredients one "what can I cook" query may list
+MAX_ON_HAND = 200
+
+# Most servings a recipe may be scaled to
+MAX_SERVINGS = 100
+
 @router.post("/recipes/", response_model=Recipe, status_code=status.HTTP_201_CREATED)
-def create_recipe_endpoint(recipe: RecipeCreate):
-    """Create a new recipe"""
+def create_recipe_endpoint(recipe: RecipeCreate, user_id: str = Depends(current_user)):
+    """Create a new recipe, in the shared catalog or, with public false, private to the user"""
     try:
         # Convert Pydantic model to dict
         recipe_data = recipe.dict()
         
         # Create recipe in DynamoDB
-        created_recipe = create_recipe(recipe_data)
-        return created_recipe
+        created_recipe = create_recipe(recipe_data, None if recipe.public else user_id)
+        return trusted_response(Recipe, created_recipe, status_code=status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create recipe: {str(e)}")
 
 @router.get("/recipes/", response_model=List[Recipe])
-def read_recipes_endpoint(skip: int = 0, limit: int = 100):
-    """Get all recipes with optional pagination"""
+def read_recipes_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Fields = Depends(field_selection(Recipe)),
+    user_id: str = Depends(current_user)
+):
+    """Get the catalog's recipes and the user's private ones with optional pagination"""
     try:
-        recipes = get_recipes()
+        # Answer conditional requests from the collection versions alone
+        private = user_key(user_id, "RECIPE")
+        etag = request_etag(
+            request, "RECIPE", get_collection_version("RECIPE"), private, get_collection_version(private)
+        )
+        not_modified = check_etag(request, response, etag)
+        if not_modified:
+            return not_modified
+        
+        recipes = get_recipes(fields, user_id)
         
         # Apply pagination
         start = skip
         end = skip + limit if skip + limit < len(recipes) else len(recipes)
-        return recipes[start:end]
+        if fields:
+            return sparse_response(Recipe, fields, recipes[start:end], response)
+        return trusted_response(Recipe, recipes[start:end], response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch recipes: {str(e)}")
 
+@router.get("/recipes/search", response_model=List[RecipeSearchResult])
+def search_recipes_endpoint(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over recipe names, tags, ingredients, descriptions and instructions, best match first"""
+    version = get_collection_version("RECIPE")
+    # Unnamed ingredient lines are searched by their catalog names, so ingredient writes change results too
+    catalog = get_ingredient_catalog(db)
+    not_modified = check_etag(request, response, request_etag(request, "RECIPE", version, catalog.version))
+    if not_modified:
+        return not_modified
+    
+    hits = find_recipes(q, limit, version, catalog.version)
+    return trusted_response(RecipeSearchResult, hits, response)
+
+@router.get("/recipes/cookable", response_model=List[CookableRecipe])
+def cookable_recipes_endpoint(
+    request: Request,
+    response: Response,
+    ingredients: str = Query(..., min_length=1),
+    min_coverage: int = Query(50, ge=1, le=100),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS)
+):
+    """Recipes that can be made from the given ingredient ids, covering at least min_coverage percent of each, fewest missing first"""
+    on_hand = list(dict.fromkeys(ingredient_id.strip() for ingredient_id in ingredients.split(",") if ingredient_id.strip()))
+    if len(on_hand) > MAX_ON_HAND:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ON_HAND} ingredients per query")
+    
+    version = get_collection_version("RECIPE")
+    not_modified = check_etag(request, response, request_etag(request, "RECIPE", version))
+    if not_modified:
+        return not_modified
+    
+    matches = find_cookable(on_hand, min_coverage / 100, limit, version)
+    return trusted_response(CookableRecipe, matches, response)
+
 @router.get("/recipes/{recipe_id}", response_model=Recipe)
-def read_recipe_endpoint(recipe_id: str):
+def read_recipe_endpoint(
+    recipe_id: str,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(field_selection(Recipe)),
+    user_id: str = Depends(current_user)
+):
     """Get a specific recipe by ID"""
-    recipe = get_recipe(recipe_id)
+    recipe = get_recipe(recipe_id, fields, user_id)
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    
+    not_modified = check_etag(request, response, item_etag(recipe, fields))
+    if not_modified:
+        return not_modified
+    if fields:
+        return sparse_response(Recipe, fields, recipe, response)
+    return trusted_response(Recipe, recipe, response)
+
+@router.get("/recipes/{recipe_id}/nutrition", response_model=RecipeNutrition)
+def read_recipe_nutrition_endpoint(
+    recipe_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(current_user)
+):
+    """Total and per-serving nutrition of a recipe, from its ingredients' nutrition facts"""
+    recipe = get_recipe(recipe_id, user_id=user_id)
+    if recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    
+    # Ingredient nutrition lives in SQL; the matrix is cached per INGREDIENT version
+    matrix = get_nutrition_matrix(db)
+    not_modified = check_etag(request, response, item_etag(recipe, "nutrition", matrix.version))
+    if not_modified:
+        return not_modified
+    
+    nutrition = recipe_nutrition(matrix, recipe.get("ingredients") or [], recipe.get("servings"))
+    return trusted_response(RecipeNutrition, {"recipe_id": recipe_id, **nutrition}, response)
+
+@router.get("/recipes/{recipe_id}/scaled", response_model=ScaledRecipe)
+def read_scaled_recipe_endpoint(
+    recipe_id: str,
+    request: Request,
+    response: Response,
+    servings: int = Query(..., ge=1, le=MAX_SERVINGS),
+    user_id: str = Depends(current_user)
+):
+    """A recipe's ingredients scaled to a number of servings and rounded to measurable amounts"""
+    recipe = get_recipe(recipe_id, user_id=user_id)
+    if recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    
+    stamp = item_etag(recipe)
+    not_modified = check_etag(request, response, item_etag(recipe, "scaled", servings))
+    if not_modified:
+        return not_modified
+    
+    return trusted_response(ScaledRecipe, scale_recipe(recipe, stamp, servings), response)
+
+@router.get("/recipes/{recipe_id}/similar", response_model=List[SimilarRecipe])
+def similar_recipes_endpoint(
+    recipe_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS)
+):
+    """Recipes sharing the most distinctive ingredients and tags with a recipe, most similar first"""
+    version = get_collection_version("RECIPE")
+    not_modified = check_etag(request, response, request_etag(request, "RECIPE", version))
+    if not_modified:
+        return not_modified
+    
+    similar = find_similar(recipe_id, limit, version)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return trusted_response(SimilarRecipe, similar, response)
 
 @router.put("/recipes/{recipe_id}", response_model=Recipe)
-def update_recipe_endpoint(recipe_id: str, recipe: RecipeUpdate):
+def update_recipe_endpoint(recipe_id: str, recipe: RecipeUpdate, user_id: str = Depends(current_user)):
     """Update an existing recipe"""
     # Check if recipe exists
-    existing_recipe = get_recipe(recipe_id)
+    existing_recipe = get_recipe(recipe_id, user_id=user_id)
     if existing_recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -52,22 +206,22 @@ def update_recipe_endpoint(recipe_id: str, recipe: RecipeUpdate):
         recipe_data = recipe.dict(exclude_unset=True)
         
         # Update recipe in DynamoDB
-        updated_recipe = update_recipe(recipe_id, recipe_data)
-        return updated_recipe
+        updated_recipe = update_recipe(recipe_id, recipe_data, existing_recipe.get('user_id'))
+        return trusted_response(Recipe, updated_recipe)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update recipe: {str(e)}")
 
 @router.delete("/recipes/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_recipe_endpoint(recipe_id: str):
+def delete_recipe_endpoint(recipe_id: str, user_id: str = Depends(current_user)):
     """Delete a recipe"""
     # Check if recipe exists
-    existing_recipe = get_recipe(recipe_id)
+    existing_recipe = get_recipe(recipe_id, user_id=user_id)
     if existing_recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     try:
         # Delete recipe from DynamoDB
-        delete_recipe(recipe_id)
+        delete_recipe(recipe_id, existing_recipe.get('user_id'))
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete recipe: {str(e)}") 
\ No newline at end of file
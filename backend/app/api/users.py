@@ -0,0 +1,52 @@
+"""
+The user a request acts for.
+
+Meal plans, weeks, grocery lists, private recipes and idempotency keys are
+stored per user (see ``user_key`` in app.db.dynamodb). Every request names its
+user in the ``X-User-Id`` header; requests without one act for DEFAULT_USER_ID
+(default "default"), the user migration v005 gave the existing data to, so
+single-household deployments and older clients keep working unchanged.
+
+The API does not authenticate users: the header is trusted as sent, so it
+must be set by whatever authenticates requests in front of the API (an API
+Gateway authorizer, a reverse proxy), which should drop any value the client
+sent itself.
+"""
+
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from starlette.datastructures import Headers
+
+USER_ID_HEADER = "X-User-Id"
+
+DEFAULT_USER_ID = os.environ.get("DEFAULT_USER_ID", "default")
+
+# Ids become part of DynamoDB keys, which are capped at 1 KB per key
+MAX_USER_ID_LENGTH = 128
+
+
+def valid_user_id(user_id: Optional[str]) -> Optional[str]:
+    """A user id from a request, DEFAULT_USER_ID when absent, or None if it can't be used in a key."""
+    if user_id is None:
+        return DEFAULT_USER_ID
+    if not user_id or "#" in user_id or len(user_id) > MAX_USER_ID_LENGTH:
+        return None
+    return user_id
+
+
+def header_user(headers: Headers) -> Optional[str]:
+    """The user of a request from its raw headers, for ASGI middleware; None if the header is invalid."""
+    return valid_user_id(headers.get(USER_ID_HEADER))
+
+
+def current_user(x_user_id: Optional[str] = Header(None)) -> str:
+    """Dependency: the user the request acts for."""
+    user_id = valid_user_id(x_user_id)
+    if user_id is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{USER_ID_HEADER} must be 1 to {MAX_USER_ID_LENGTH} characters without '#'"
+        )
+    return user_id
@@ -0,0 +1,141 @@
+"""
+Ingredient name autocomplete from an in-memory prefix index.
+
+Type-ahead needs an answer per keystroke, so rather than querying the catalog
+each time, a warm container keeps every ingredient name, lowercased, in a
+sorted array. Each word of a name gets its own entry ("black pepper" is
+found by "bla" and by "pep"), so one bisect finds the range of entries
+starting with the typed prefix. Matches are ranked by:
+
+1. whole-name prefix matches before matches on a later word
+2. usage: how many recipes and grocery lists use the ingredient
+3. name
+
+The index is rebuilt from one query whenever the INGREDIENT or GROCERY_LIST
+collection version changes; answers per prefix are memoised until then.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from heapq import nsmallest
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.versions import GROCERY_LIST, INGREDIENT, get_collection_versions, get_collection_versions_async
+from app.models.models import Ingredient as IngredientModel, grocery_list_item, recipe_ingredient
+
+# Prefixes whose answers are memoised per index
+MEMO_SIZE = 1024
+
+# Sorts after every character a name can contain
+PREFIX_END = "\uffff"
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace, as names are keyed."""
+    return " ".join(text.lower().split())
+
+
+def ingredient_rows_query():
+    """Every ingredient with its usage count."""
+    recipe_uses = (
+        select(func.count())
+        .where(recipe_ingredient.c.ingredient_id == IngredientModel.id)
+        .scalar_subquery()
+    )
+    list_uses = (
+        select(func.count())
+        .where(grocery_list_item.c.ingredient_id == IngredientModel.id)
+        .scalar_subquery()
+    )
+    return select(IngredientModel.id, IngredientModel.name, IngredientModel.category, recipe_uses + list_uses)
+
+
+class PrefixIndex:
+    """
+    Sorted word-prefix entries over ingredient names.
+
+    Args:
+        rows: (id, name, category, usage) per ingredient
+        versions: Collection versions the rows were read at
+    """
+
+    def __init__(self, rows: Iterable[Tuple[Any, str, Optional[str], int]], versions: Dict[str, int]):
+        self.versions = versions
+        self.ingredients: List[Dict[str, Any]] = []
+        self.names: List[str] = []
+        self.usage: List[int] = []
+        entries: List[Tuple[str, int]] = []
+        for ingredient_id, name, category, usage in rows:
+            position = len(self.ingredients)
+            self.ingredients.append({"id": str(ingredient_id), "name": name, "category": category, "usage": usage or 0})
+            key = normalize(name or "")
+            self.names.append(key)
+            self.usage.append(usage or 0)
+            words = key.split(" ")
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.owners = [position for _, position in entries]
+        self.memo: "OrderedDict[Tuple[str, int], List[Dict[str, Any]]]" = OrderedDict()
+        self.memo_lock = threading.Lock()
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The best ingredients whose name, or a word of it, starts with prefix."""
+        prefix = normalize(prefix)
+        memo_key = (prefix, limit)
+        with self.memo_lock:
+            if memo_key in self.memo:
+                self.memo.move_to_end(memo_key)
+                return self.memo[memo_key]
+
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + PREFIX_END, low)
+        matches = set(self.owners[low:high])
+        best = nsmallest(limit, matches, key=lambda position: (
+            not self.names[position].startswith(prefix),
+            -self.usage[position],
+            self.names[position],
+        ))
+        result = [self.ingredients[position] for position in best]
+
+        with self.memo_lock:
+            self.memo[memo_key] = result
+            if len(self.memo) > MEMO_SIZE:
+                self.memo.popitem(last=False)
+        return result
+
+
+_index: Optional[PrefixIndex] = None
+
+
+def get_prefix_index(db: Session) -> PrefixIndex:
+    """The prefix index for the current collection versions, rebuilt if they moved."""
+    global _index
+    versions = get_collection_versions(db, [INGREDIENT, GROCERY_LIST])
+    index = _index
+    if index is None or index.versions != versions:
+        index = _index = PrefixIndex(db.execute(ingredient_rows_query()).all(), versions)
+    return index
+
+
+async def get_prefix_index_async(db: AsyncSession) -> PrefixIndex:
+    """Async variant of get_prefix_index."""
+    global _index
+    versions = await get_collection_versions_async(db, [INGREDIENT, GROCERY_LIST])
+    index = _index
+    if index is None or index.versions != versions:
+        result = await db.execute(ingredient_rows_query())
+        index = _index = PrefixIndex(result.all(), versions)
+    return index
+
+
+def reset_prefix_index() -> None:
+    """Forget the in-memory index, e.g. between tests."""
+    global _index
+    _index = None
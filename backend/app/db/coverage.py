@@ -0,0 +1,172 @@
+"""
+"What can I cook" index: recipes ranked by how much of them is on hand.
+
+Recipes only list the ingredient ids they need, so the index keeps the
+reverse lookup, ingredient id -> recipes using it, as a posting list. Each
+recipe gets a dense integer slot, and each posting list is cached as a sorted
+NumPy array of slots. A query concatenates the posting lists of the
+ingredients on hand and counts slots with np.bincount, which gives, for every
+recipe at once, how many of its ingredients are covered:
+
+    coverage = covered ingredients / recipe ingredients
+    missing  = recipe ingredients - covered ingredients
+
+Recipes under the requested coverage are dropped and the rest are ranked
+fewest missing first, then most covered; the cost is proportional to the
+length of the posting lists involved, not to the number of recipes.
+
+The index is built lazily and kept current by recipe writes (see
+app.db.recipe_index).
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.db.dynamodb import batch_get
+from app.db.recipe_index import LiveRecipeIndex
+
+
+def recipe_ingredient_ids(recipe: Dict[str, Any]) -> Set[str]:
+    """The distinct ingredient ids a recipe item needs."""
+    return {
+        str(line["ingredient_id"])
+        for line in recipe.get("ingredients") or []
+        if isinstance(line, dict) and line.get("ingredient_id") is not None
+    }
+
+
+class CoverageIndex:
+    """
+    Ingredient -> recipes posting lists over dense recipe slots.
+
+    Args:
+        version: RECIPE collection version the index reflects
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.slots: Dict[str, int] = {}
+        self.recipe_ids: List[Optional[str]] = []
+        self.ingredients: List[Set[str]] = []
+        # Slots of deleted recipes, reused by the next additions
+        self.free: List[int] = []
+        # Number of distinct ingredients per slot, 0 for empty slots
+        self.sizes = np.zeros(1024, dtype=np.int32)
+        self.postings: Dict[str, Set[int]] = {}
+        # Sorted slot arrays per ingredient, rebuilt on first use after a change
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> None:
+        """Index a recipe's ingredients, replacing any previous version of it."""
+        recipe_id = recipe["id"]
+        self.remove(recipe_id)
+        ingredient_ids = recipe_ingredient_ids(recipe)
+        if self.free:
+            slot = self.free.pop()
+            self.recipe_ids[slot] = recipe_id
+            self.ingredients[slot] = ingredient_ids
+        else:
+            slot = len(self.recipe_ids)
+            self.recipe_ids.append(recipe_id)
+            self.ingredients.append(ingredient_ids)
+            if slot >= len(self.sizes):
+                self.sizes = np.concatenate([self.sizes, np.zeros(len(self.sizes), dtype=np.int32)])
+        self.slots[recipe_id] = slot
+        self.sizes[slot] = len(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            self.postings.setdefault(ingredient_id, set()).add(slot)
+            self.arrays.pop(ingredient_id, None)
+
+    def remove(self, recipe_id: str) -> None:
+        """Drop a recipe from the index, if present."""
+        slot = self.slots.pop(recipe_id, None)
+        if slot is None:
+            return
+        for ingredient_id in self.ingredients[slot]:
+            postings = self.postings[ingredient_id]
+            postings.discard(slot)
+            if not postings:
+                del self.postings[ingredient_id]
+            self.arrays.pop(ingredient_id, None)
+        self.recipe_ids[slot] = None
+        self.ingredients[slot] = set()
+        self.sizes[slot] = 0
+        self.free.append(slot)
+
+    def posting(self, ingredient_id: str) -> np.ndarray:
+        array = self.arrays.get(ingredient_id)
+        if array is None:
+            array = np.array(sorted(self.postings[ingredient_id]), dtype=np.int32)
+            self.arrays[ingredient_id] = array
+        return array
+
+    def match(self, on_hand: Iterable[str], min_coverage: float = 0.5,
+              limit: int = 20) -> List[Tuple[str, int, int]]:
+        """
+        The recipes best covered by the ingredients on hand.
+
+        Args:
+            on_hand: Ingredient ids available
+            min_coverage: Least fraction of a recipe's ingredients that must be on hand
+            limit: Most recipes to return
+
+        Returns:
+            (recipe_id, covered, needed) tuples, fewest missing first
+        """
+        arrays = [self.posting(ingredient_id) for ingredient_id in set(on_hand) if ingredient_id in self.postings]
+        if not arrays:
+            return []
+        count = len(self.recipe_ids)
+        covered = np.bincount(np.concatenate(arrays), minlength=count)
+        sizes = self.sizes[:count]
+        # Integer form of covered / sizes >= min_coverage, with a little slack for float rounding
+        candidates = np.flatnonzero((covered > 0) & (covered >= min_coverage * sizes - 1e-9))
+        if not len(candidates):
+            return []
+        missing = (sizes[candidates] - covered[candidates]).astype(np.int64)
+        # One sort key: fewest missing first, then most covered
+        key = missing * (int(sizes.max()) + 1) - covered[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(key, limit - 1)[:limit]
+            candidates, key = candidates[top], key[top]
+        # Ties go to the lower recipe id so results are stable
+        ranked = sorted(zip(key.tolist(), candidates.tolist()), key=lambda hit: (hit[0], self.recipe_ids[hit[1]]))
+        return [(self.recipe_ids[slot], int(covered[slot]), int(sizes[slot])) for _, slot in ranked]
+
+    def missing(self, recipe_id: str, on_hand: Iterable[str]) -> List[str]:
+        """The ingredient ids of a recipe that are not on hand."""
+        return sorted(self.ingredients[self.slots[recipe_id]] - set(on_hand))
+
+
+live_index = LiveRecipeIndex(CoverageIndex)
+
+
+def find_cookable(on_hand: List[str], min_coverage: float = 0.5, limit: int = 20,
+                  version: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    The recipe items best covered by the ingredients on hand, fewest missing first.
+
+    Each item gets "covered" and "coverage" and the "missing_ingredient_ids".
+    """
+    def query(index: CoverageIndex) -> Tuple[List[Tuple[str, int, int]], Dict[str, List[str]]]:
+        hits = index.match(on_hand, min_coverage, limit)
+        return hits, {recipe_id: index.missing(recipe_id, on_hand) for recipe_id, _, _ in hits}
+
+    hits, missing = live_index.query(query, version)
+    if not hits:
+        return []
+    items = {item["id"]: item for item in batch_get([{'PK': 'RECIPE', 'SK': recipe_id} for recipe_id, _, _ in hits])}
+    return [
+        {
+            **items[recipe_id],
+            "covered": covered,
+            "coverage": round(covered / needed, 4),
+            "missing_ingredient_ids": missing[recipe_id],
+        }
+        for recipe_id, covered, needed in hits
+        if recipe_id in items
+    ]
@@ -0,0 +1,55 @@
+"""
+Per-request batching loader for composite reads.
+
+A DataLoader wraps a batch function that fetches many items by key in one
+storage call. Resolving an object graph level by level, each level asks the
+loader for every key it references at once; the loader drops duplicates and
+keys it has already fetched, and sends whatever is left as a single batch.
+However many meal plans share a recipe, or recipes share an ingredient, each
+item is read once and each level costs one round trip.
+
+Loaders cache for their own lifetime only, so create them per request.
+"""
+
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Deduplicating, caching batch loader.
+
+    Args:
+        batch_load: Fetches the given keys, returning {key: value} for those that exist
+        max_batch_size: Largest number of keys per batch_load call, e.g. to stay
+            under a database's bound parameter limit
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Dict[K, V]], max_batch_size: int = 500):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self.cache: Dict[K, Optional[V]] = {}
+        self.batches = 0
+
+    def load_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """Get the values for keys, fetching the uncached ones in as few batches as possible."""
+        keys = list(dict.fromkeys(keys))
+        missing = [key for key in keys if key not in self.cache]
+        for start in range(0, len(missing), self.max_batch_size):
+            chunk = missing[start:start + self.max_batch_size]
+            found = self.batch_load(chunk)
+            self.batches += 1
+            for key in chunk:
+                # Cache misses too, so a missing key is not fetched again
+                self.cache[key] = found.get(key)
+        return {key: self.cache[key] for key in keys if self.cache[key] is not None}
+
+    def load(self, key: K) -> Optional[V]:
+        """Get a single value, or None if it does not exist."""
+        return self.load_many([key]).get(key)
+
+    def prime(self, key: K, value: V) -> None:
+        """Seed the cache with a value fetched some other way."""
+        self.cache[key] = value
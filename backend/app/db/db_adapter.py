@@ -2,7 +2,7 @@ import os
 import json
 import boto3
 import sqlite3
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 from datetime import datetime
 from uuid import uuid4
 
@@ -194,6 +194,117 @@ class DatabaseAdapter:
                 
             return items
     
+    def query_pages(self, key_condition: Dict[str, Any], index_name: Optional[str] = None,
+                    page_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Query items from the database one page at a time.
+        
+        Unlike query(), this reads every matching item however many there are,
+        holding only one page in memory. Pages follow key order, so items of
+        pages already read may be written or deleted while iterating.
+        
+        Args:
+            key_condition: Key condition expression, as for query()
+            index_name: Optional index name to query
+            page_size: Most items per page
+            
+        Yields:
+            Lists of at most page_size items
+        """
+        if self.backend == "dynamodb":
+            params = {
+                "KeyConditionExpression": key_condition["expression"],
+                "ExpressionAttributeValues": key_condition["values"],
+                "Limit": page_size
+            }
+            
+            if index_name:
+                params["IndexName"] = index_name
+            
+            while True:
+                response = self.table.query(**params)
+                if response.get("Items"):
+                    yield response["Items"]
+                if "LastEvaluatedKey" not in response:
+                    return
+                params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        elif self.backend == "sqlite":
+            if "PK = :pk" not in key_condition["expression"]:
+                raise NotImplementedError("Complex queries not implemented for SQLite")
+            pk_value = key_condition["values"][":pk"]
+            partition, sort = ("GSI1PK", "GSI1SK") if index_name == "GSI1" else ("PK", "SK")
+            
+            # Keyset paging on the sort key, then the primary key for ties on an index
+            last = None
+            cursor = self.conn.cursor()
+            while True:
+                if last is None:
+                    cursor.execute(
+                        f"SELECT * FROM items WHERE {partition} = ? ORDER BY {sort}, PK, SK LIMIT ?",
+                        (pk_value, page_size)
+                    )
+                else:
+                    cursor.execute(
+                        f"SELECT * FROM items WHERE {partition} = ? AND ({sort}, PK, SK) > (?, ?, ?) "
+                        f"ORDER BY {sort}, PK, SK LIMIT ?",
+                        (pk_value, *last, page_size)
+                    )
+                rows = cursor.fetchall()
+                if not rows:
+                    return
+                yield [self._row_item(row) for row in rows]
+                last = (rows[-1][sort], rows[-1]["PK"], rows[-1]["SK"])
+    
+    def batch_write(self, puts: Iterable[Dict[str, Any]] = (),
+                    deletes: Iterable[Tuple[str, str]] = ()) -> None:
+        """
+        Put and delete many items, batched; not atomic.
+        
+        Args:
+            puts: Items to put
+            deletes: (partition key, sort key) of items to delete
+        """
+        if self.backend == "dynamodb":
+            with self.table.batch_writer() as batch:
+                for item in puts:
+                    batch.put_item(Item=item)
+                for pk, sk in deletes:
+                    batch.delete_item(Key={"PK": pk, "SK": sk})
+        elif self.backend == "sqlite":
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO items (PK, SK, GSI1PK, GSI1SK, data)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (item["PK"], item["SK"], item.get("GSI1PK"), item.get("GSI1SK"), json.dumps({
+                        k: v for k, v in item.items() if k not in ["PK", "SK", "GSI1PK", "GSI1SK"]
+                    }))
+                    for item in puts
+                ]
+            )
+            cursor.executemany("DELETE FROM items WHERE PK = ? AND SK = ?", list(deletes))
+            self.conn.commit()
+    
+    def _row_item(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Reconstruct an item from a SQLite row."""
+        item = {
+            "PK": row["PK"],
+            "SK": row["SK"]
+        }
+        
+        if row["GSI1PK"]:
+            item["GSI1PK"] = row["GSI1PK"]
+        
+        if row["GSI1SK"]:
+            item["GSI1SK"] = row["GSI1SK"]
+        
+        if row["data"]:
+            item.update(json.loads(row["data"]))
+        
+        return item
+    
     def delete_item(self, pk: str, sk: str) -> Dict[str, str]:
         """
         Delete an item from the database.
@@ -1,8 +1,14 @@
 import os
+import logging
 import boto3
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 import uuid
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
@@ -25,31 +31,200 @@ def format_date(date_obj):
         return date_obj.strftime('%Y-%m-%d')
     return date_obj
 
-# Recipe operations
-def get_recipes():
-    """Get all recipes"""
-    response = table.query(
-        KeyConditionExpression=Key('PK').eq('RECIPE')
-    )
-    return response.get('Items', [])
+def projection(fields, *keys):
+    """
+    ProjectionExpression arguments reading only the given attributes.
 
-def get_recipe(recipe_id):
-    """Get a specific recipe"""
-    response = table.get_item(
-        Key={
-            'PK': 'RECIPE',
-            'SK': recipe_id
+    Args:
+        fields: Attribute names to read, or None for the whole item
+        *keys: Attributes the caller needs regardless, e.g. 'version' for ETags
+
+    Returns:
+        Keyword arguments for query/get_item; empty when fields is None
+    """
+    if not fields:
+        return {}
+    names = list(dict.fromkeys((*fields, *keys)))
+    # Placeholders for every attribute, since names like 'name' are reserved words
+    return {
+        'ProjectionExpression': ', '.join(f"#{name}" for name in names),
+        'ExpressionAttributeNames': {f"#{name}": name for name in names}
+    }
+
+# Per-user data
+# Meal plans, their weeks, grocery lists and private recipes belong to one user and are
+# keyed under USER#<user_id>, so one user's reads and writes touch only that user's
+# partitions and index keys, and never see another user's items. Public recipes are one
+# catalog shared by every user, in the RECIPE partition.
+def user_key(user_id, *parts):
+    """A key under a user's prefix, e.g. user_key('u1', 'MEAL_PLAN') == 'USER#u1#MEAL_PLAN'"""
+    if not user_id or '#' in str(user_id):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return '#'.join(('USER', str(user_id), *parts))
+
+# Collection versions, bumped on every write and used to build collection ETags
+COLLECTION_VERSION_PK = 'COLLECTION_VERSION'
+
+def collection_version_key(collection):
+    # A user's collections (user_key(user_id, 'MEAL_PLAN'), ...) keep their versions in the user's partition
+    if collection.startswith('USER#'):
+        user_pk, name = collection.rsplit('#', 1)
+        return {
+            'PK': user_pk,
+            'SK': f"{COLLECTION_VERSION_PK}#{name}"
         }
-    )
-    return response.get('Item')
+    return {
+        'PK': COLLECTION_VERSION_PK,
+        'SK': collection
+    }
+
+def get_collection_version(collection):
+    """Get the current version of a collection ('RECIPE', user_key(user_id, 'MEAL_PLAN'), ...)"""
+    response = table.get_item(Key=collection_version_key(collection))
+    return int(response.get('Item', {}).get('version', 0))
+
+def write_versioned(action, collection):
+    """
+    Apply one write action and bump its collection's version in one transaction,
+    so the version never lags the data it covers.
+    """
+    transact_write([action, {'Update': collection_version_update(collection)}])
+
+def transact_write_chunks(actions, final):
+    """
+    Apply actions, then the final actions, in transactions of at most MAX_TRANSACT_ITEMS.
+    
+    Everything is one transaction when it fits. Otherwise leading chunks of actions
+    land first and the final actions, which should be the ones making the write
+    visible (a collection's header), go in the last transaction.
+    """
+    room = MAX_TRANSACT_ITEMS - len(final)
+    while len(actions) > room:
+        transact_write(actions[:MAX_TRANSACT_ITEMS])
+        actions = actions[MAX_TRANSACT_ITEMS:]
+    transact_write(actions + final)
+
+def collection_version_update(collection):
+    """Build the update_item arguments bumping a collection version"""
+    return {
+        'Key': collection_version_key(collection),
+        'UpdateExpression': "ADD #version :one",
+        'ExpressionAttributeNames': {"#version": "version"},
+        'ExpressionAttributeValues': {":one": 1}
+    }
+
+# Transactions
+# TransactWriteItems accepts at most this many actions
+MAX_TRANSACT_ITEMS = 100
+
+def to_dynamodb(value):
+    """Convert floats, which DynamoDB rejects, to Decimal"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_dynamodb(item) for item in value]
+    return value
 
-def create_recipe(recipe_data):
-    """Create a new recipe"""
+def transact_write(actions):
+    """
+    Apply writes atomically with TransactWriteItems.
+    
+    Each action is {'Put' | 'Update' | 'Delete' | 'ConditionCheck': arguments},
+    with the same arguments as the table's put_item/update_item/delete_item.
+    Raises botocore's TransactionCanceledException, whose CancellationReasons
+    hold one entry per action, if any condition fails.
+    """
+    transact_items = []
+    for action in actions:
+        for kind, arguments in action.items():
+            transact_items.append({kind: {**to_dynamodb(arguments), 'TableName': TABLE_NAME}})
+    table.meta.client.transact_write_items(TransactItems=transact_items)
+
+def batch_get(keys, consistent=False):
+    """Get many items by key with BatchGetItem"""
+    items = []
+    # BatchGetItem reads at most 100 keys per call
+    for start in range(0, len(keys), 100):
+        request_items = {TABLE_NAME: {'Keys': keys[start:start + 100], 'ConsistentRead': consistent}}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(TABLE_NAME, []))
+            request_items = response.get('UnprocessedKeys')
+    return items
+
+def iter_partition(pk, page_size=100, consistent=False):
+    """Yield every item of a partition, reading one page of page_size items at a time"""
+    query_args = {
+        'KeyConditionExpression': Key('PK').eq(pk),
+        'Limit': page_size,
+        'ConsistentRead': consistent
+    }
+    while True:
+        response = table.query(**query_args)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+# Recipe operations
+# Called as listener(upserts, deletes) after every committed recipe write, to keep in-process indexes current
+recipe_write_listeners = []
+
+def notify_recipe_write(upserts=(), deletes=()):
+    """Tell the listeners about one committed recipe write (one RECIPE version bump)"""
+    for listener in recipe_write_listeners:
+        listener(upserts, deletes)
+
+# A private recipe lives in its owner's user_key(user_id, 'RECIPE') partition, under
+# that collection's version, and carries user_id and public=False. Only the catalog is
+# indexed for search, similarity, cookable and planning, so private writes skip the
+# listeners except the fan-out, which keeps the owner's plans current.
+def recipe_pk(owner=None):
+    """The partition of the shared catalog, or of an owner's private recipes"""
+    return 'RECIPE' if owner is None else user_key(owner, 'RECIPE')
+
+def recipe_keys(recipe_id, user_id=None):
+    """The keys a recipe id may have for a user: in the catalog, then among the user's private recipes"""
+    keys = [{'PK': 'RECIPE', 'SK': recipe_id}]
+    if user_id is not None:
+        keys.append({'PK': user_key(user_id, 'RECIPE'), 'SK': recipe_id})
+    return keys
+
+def notify_owned_recipe_write(owner, upserts=(), deletes=()):
+    """Tell the listeners about a committed recipe write; private ones only reach the fan-out"""
+    if owner is None:
+        notify_recipe_write(upserts, deletes)
+    else:
+        fan_out_recipe_write(upserts, deletes, owner)
+
+def get_recipes(fields=None, user_id=None):
+    """Get the catalog's recipes, then the user's private ones if given a user, optionally only the given attributes"""
+    items = []
+    for pk in ['RECIPE'] + ([user_key(user_id, 'RECIPE')] if user_id is not None else []):
+        response = table.query(
+            KeyConditionExpression=Key('PK').eq(pk),
+            **projection(fields)
+        )
+        items += response.get('Items', [])
+    return items
+
+def get_recipe(recipe_id, fields=None, user_id=None):
+    """Get a specific recipe from the catalog or the user's private recipes, optionally only the given attributes"""
+    for key in recipe_keys(recipe_id, user_id):
+        item = table.get_item(Key=key, **projection(fields, 'id', 'version', 'user_id')).get('Item')
+        if item is not None:
+            return item
+    return None
+
+def recipe_item(recipe_data, owner=None):
+    """Build a new recipe item, private to owner if given"""
     recipe_id = generate_id()
     item = {
-        'PK': 'RECIPE',
+        'PK': recipe_pk(owner),
         'SK': recipe_id,
-        'GSI1PK': 'RECIPE',
+        'GSI1PK': recipe_pk(owner),
         'GSI1SK': recipe_data.get('name', ''),
         'id': recipe_id,
         'name': recipe_data.get('name', ''),
@@ -60,53 +235,68 @@ def create_recipe(recipe_data):
         'servings': recipe_data.get('servings', 0),
         'image_url': recipe_data.get('image_url', ''),
         'created_at': datetime.now().isoformat(),
-        'ingredients': recipe_data.get('ingredients', [])
+        'ingredients': recipe_data.get('ingredients', []),
+        'version': 1
     }
-    table.put_item(Item=item)
+    if owner is not None:
+        item.update({'user_id': owner, 'public': False})
+    return to_dynamodb(item)
+
+def create_recipe(recipe_data, owner=None):
+    """Create a new recipe, in the catalog or private to owner"""
+    item = recipe_item(recipe_data, owner)
+    write_versioned({'Put': {'Item': item}}, recipe_pk(owner))
+    notify_owned_recipe_write(owner, upserts=[item])
     return item
 
-def update_recipe(recipe_id, recipe_data):
-    """Update an existing recipe"""
-    update_expression = "SET "
+def recipe_update(recipe_id, recipe_data, owner=None):
+    """Build the update_item arguments for a recipe update"""
+    assignments = []
     expression_attribute_values = {}
     
     for key, value in recipe_data.items():
         if key not in ['PK', 'SK', 'id']:
-            update_expression += f"#{key} = :{key}, "
+            assignments.append(f"#{key} = :{key}")
             expression_attribute_values[f":{key}"] = value
     
-    # Remove trailing comma and space
-    update_expression = update_expression[:-2]
-    
     # Create expression attribute names
     expression_attribute_names = {f"#{key}": key for key in recipe_data if key not in ['PK', 'SK', 'id']}
     
     # Update GSI1SK if name is being updated
     if 'name' in recipe_data:
-        update_expression += ", #GSI1SK = :GSI1SK"
+        assignments.append("#GSI1SK = :GSI1SK")
         expression_attribute_values[":GSI1SK"] = recipe_data['name']
         expression_attribute_names["#GSI1SK"] = "GSI1SK"
     
-    response = table.update_item(
-        Key={
-            'PK': 'RECIPE',
+    update_expression = f"SET {', '.join(assignments)} " if assignments else ""
+    
+    # Bump the item version used for its ETag
+    update_expression += "ADD #version :one"
+    expression_attribute_values[":one"] = 1
+    expression_attribute_names["#version"] = "version"
+    
+    return to_dynamodb({
+        'Key': {
+            'PK': recipe_pk(owner),
             'SK': recipe_id
         },
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_attribute_values,
-        ExpressionAttributeNames=expression_attribute_names,
-        ReturnValues="ALL_NEW"
-    )
-    return response.get('Attributes')
+        'UpdateExpression': update_expression,
+        'ExpressionAttributeValues': expression_attribute_values,
+        'ExpressionAttributeNames': expression_attribute_names
+    })
 
-def delete_recipe(recipe_id):
-    """Delete a recipe"""
-    table.delete_item(
-        Key={
-            'PK': 'RECIPE',
-            'SK': recipe_id
-        }
-    )
+def update_recipe(recipe_id, recipe_data, owner=None):
+    """Update an existing recipe, in the catalog or private to owner"""
+    write_versioned({'Update': recipe_update(recipe_id, recipe_data, owner)}, recipe_pk(owner))
+    # Transactions return nothing, so read the recipe back
+    item = table.get_item(Key={'PK': recipe_pk(owner), 'SK': recipe_id}, ConsistentRead=True).get('Item')
+    notify_owned_recipe_write(owner, upserts=[item])
+    return item
+
+def delete_recipe(recipe_id, owner=None):
+    """Delete a recipe, from the catalog or private to owner"""
+    write_versioned({'Delete': {'Key': {'PK': recipe_pk(owner), 'SK': recipe_id}}}, recipe_pk(owner))
+    notify_owned_recipe_write(owner, deletes=[recipe_id])
     return {"message": "Recipe deleted"}
 
 # Ingredient operations
@@ -128,174 +318,880 @@ def create_ingredient(ingredient_data):
         'id': ingredient_id,
         'name': ingredient_data.get('name', ''),
         'category': ingredient_data.get('category', ''),
-        'created_at': datetime.now().isoformat()
+        'created_at': datetime.now().isoformat(),
+        'version': 1
     }
-    table.put_item(Item=item)
+    write_versioned({'Put': {'Item': item}}, 'INGREDIENT')
     return item
 
 # Meal Plan operations
-def get_meal_plans(start_date=None, end_date=None):
-    """Get meal plans with optional date filtering"""
-    response = table.query(
-        KeyConditionExpression=Key('PK').eq('MEAL_PLAN')
-    )
-    meal_plans = response.get('Items', [])
-    
-    # Filter by date if provided
-    if start_date or end_date:
-        filtered_plans = []
-        for plan in meal_plans:
-            plan_date = plan.get('date', '')
-            if start_date and end_date:
-                if start_date <= plan_date <= end_date:
-                    filtered_plans.append(plan)
-            elif start_date and plan_date >= start_date:
-                filtered_plans.append(plan)
-            elif end_date and plan_date <= end_date:
-                filtered_plans.append(plan)
-        return filtered_plans
-    
-    return meal_plans
-
-def create_meal_plan(meal_plan_data):
-    """Create a new meal plan"""
+# A meal plan is an item collection under USER#<user_id>#MEAL_PLAN#<id>: a PLAN header
+# item with the plan's own fields and one ENTRY#<position> item per planned recipe, so a
+# plan is one Query and a write touches only the items that change. Headers and entries
+# share GSI1PK USER#<user_id>#MEAL_PLAN with GSI1SK '<date>#<id>[#<position>]', so a
+# user's plans of a date range, entries included, are one Query of GSI1.
+MEAL_PLAN_SK = 'PLAN'
+
+# Entry attributes that place the entry rather than describe the planned recipe
+ENTRY_KEYS = ('PK', 'SK', 'GSI1PK', 'GSI1SK', 'meal_plan_id', 'position')
+
+def meal_plan_pk(user_id, meal_plan_id):
+    return user_key(user_id, 'MEAL_PLAN', meal_plan_id)
+
+def meal_plan_header(meal_plan):
+    """The header item of a meal plan: its fields but the recipes"""
+    header = {key: value for key, value in meal_plan.items() if key != 'recipes'}
+    header.update({
+        'PK': meal_plan_pk(meal_plan['user_id'], meal_plan['id']),
+        'SK': MEAL_PLAN_SK,
+        'GSI1PK': user_key(meal_plan['user_id'], 'MEAL_PLAN'),
+        'GSI1SK': f"{meal_plan['date']}#{meal_plan['id']}"
+    })
+    return header
+
+def meal_plan_entry(meal_plan, position, entry):
+    """The item of the recipe entry at a position of a meal plan"""
+    return {
+        **entry,
+        'PK': meal_plan_pk(meal_plan['user_id'], meal_plan['id']),
+        'SK': f"ENTRY#{position:04d}",
+        'GSI1PK': user_key(meal_plan['user_id'], 'MEAL_PLAN'),
+        'GSI1SK': f"{meal_plan['date']}#{meal_plan['id']}#{position:04d}",
+        'meal_plan_id': meal_plan['id'],
+        'position': position
+    }
+
+def assemble_meal_plans(items):
+    """Meal plans, each header with its entries as 'recipes', from the items of their collections"""
+    headers, entries = {}, {}
+    for item in items:
+        if item['SK'] == MEAL_PLAN_SK:
+            headers[item['id']] = item
+        elif item['SK'].startswith('ENTRY#'):
+            entries.setdefault(item['meal_plan_id'], []).append(item)
+    return [
+        {**header, 'recipes': [
+            {key: value for key, value in entry.items() if key not in ENTRY_KEYS}
+            for entry in sorted(entries.get(meal_plan_id, []), key=lambda entry: entry['position'])
+        ]}
+        for meal_plan_id, header in headers.items()
+    ]
+
+def get_meal_plans(user_id, start_date=None, end_date=None):
+    """Get a user's meal plans by date, with optional date filtering"""
+    query_args = {
+        'IndexName': 'GSI1',
+        # '~' sorts after the '#<id>' following the date
+        'KeyConditionExpression': Key('GSI1PK').eq(user_key(user_id, 'MEAL_PLAN')) & Key('GSI1SK').between(
+            start_date or '0000-00-00', f"{end_date or '9999-12-31'}~"
+        )
+    }
+    items = []
+    while True:
+        response = table.query(**query_args)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return assemble_meal_plans(items)
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_meal_plan(user_id, meal_plan_id):
+    """Get a specific meal plan of a user, as last written"""
+    plans = assemble_meal_plans(iter_partition(meal_plan_pk(user_id, meal_plan_id), consistent=True))
+    return plans[0] if plans else None
+
+def create_meal_plan(user_id, meal_plan_data):
+    """Create a new meal plan for a user"""
     meal_plan_id = generate_id()
-    date = format_date(meal_plan_data.get('date'))
     
     item = {
-        'PK': 'MEAL_PLAN',
-        'SK': meal_plan_id,
-        'GSI1PK': 'MEAL_PLAN',
-        'GSI1SK': date,
         'id': meal_plan_id,
-        'date': date,
+        'user_id': user_id,
+        'date': format_date(meal_plan_data.get('date')),
         'recipes': meal_plan_data.get('recipes', []),
-        'created_at': datetime.now().isoformat()
+        'created_at': datetime.now().isoformat(),
+        'version': 1
     }
-    table.put_item(Item=item)
-    return item
+    return write_meal_plan(user_id, meal_plan_id, lambda old_plan: item, create=True)
 
-def update_meal_plan(meal_plan_id, meal_plan_data):
-    """Update an existing meal plan"""
-    update_expression = "SET "
-    expression_attribute_values = {}
+def update_meal_plan(user_id, meal_plan_id, meal_plan_data):
+    """Update an existing meal plan of a user; None if it doesn't exist"""
+    changes = {
+        key: value for key, value in meal_plan_data.items()
+        if key not in ['PK', 'SK', 'GSI1PK', 'GSI1SK', 'id', 'user_id']
+    }
+    if 'date' in changes:
+        changes['date'] = format_date(changes['date'])
     
-    for key, value in meal_plan_data.items():
-        if key not in ['PK', 'SK', 'id']:
-            if key == 'date':
-                value = format_date(value)
-                update_expression += f"#GSI1SK = :{key}, "
-                expression_attribute_values[f":{key}"] = value
-                update_expression += f"#{key} = :{key}, "
-            else:
-                update_expression += f"#{key} = :{key}, "
-                expression_attribute_values[f":{key}"] = value
-    
-    # Remove trailing comma and space
-    update_expression = update_expression[:-2]
+    # Bump the item version used for its ETag
+    return write_meal_plan(
+        user_id,
+        meal_plan_id,
+        lambda old_plan: {**old_plan, **changes, 'version': old_plan['version'] + 1}
+    )
+
+def delete_meal_plan(user_id, meal_plan_id):
+    """Delete a meal plan of a user"""
+    write_meal_plan(user_id, meal_plan_id, lambda old_plan: None)
+    return {"message": "Meal plan deleted"}
+
+# Every recipe entry of a meal plan carries a copy of the recipe's display fields, made
+# when the plan is written. Each planned recipe has one item per meal plan under
+# PLANNED#<recipe_id>, whichever user it belongs to, so a recipe write finds the plans
+# holding copies with a Query.
+# Recipe attribute -> attribute of meal plan entries and week meals
+RECIPE_DISPLAY_FIELDS = {'name': 'recipe_name', 'image_url': 'image_url'}
+
+# Conditional writes that lose a race re-read the items and try again this many times in all
+WRITE_ATTEMPTS = 3
+
+def planned_key(recipe_id, user_id, meal_plan_id):
+    return {
+        'PK': f"PLANNED#{recipe_id}",
+        'SK': meal_plan_pk(user_id, meal_plan_id)
+    }
+
+def plan_recipe_ids(meal_plan):
+    """The distinct recipe ids of a meal plan, which may be None"""
+    if not meal_plan:
+        return set()
+    return {entry['recipe_id'] for entry in meal_plan.get('recipes', []) if entry.get('recipe_id')}
+
+def display_fields(recipe):
+    """The copies of a recipe's display fields, all None for a missing recipe"""
+    return {field: recipe.get(attribute) for attribute, field in RECIPE_DISPLAY_FIELDS.items()}
+
+def unchanged_condition(version):
+    """Condition arguments for writing an item only if it still has the version it was read at (0: absent)"""
+    if not version:
+        return {'ConditionExpression': "attribute_not_exists(PK)"}
+    return {
+        'ConditionExpression': "#version = :expected",
+        'ExpressionAttributeNames': {"#version": "version"},
+        'ExpressionAttributeValues': {":expected": version}
+    }
+
+def transaction_conflict(error):
+    return error.response['Error']['Code'] == 'TransactionCanceledException'
+
+def condition_failed(error):
+    """Whether a transaction was cancelled because the condition of one of its writes failed"""
+    reasons = error.response.get('CancellationReasons', [])
+    return transaction_conflict(error) and any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+
+def meal_plan_writes(old_plan, new_plan):
+    """
+    The actions replacing a meal plan's collection as old_plan by new_plan; either may be None.
     
-    # Create expression attribute names
-    expression_attribute_names = {f"#{key}": key for key in meal_plan_data if key not in ['PK', 'SK', 'id']}
-    if 'date' in meal_plan_data:
-        expression_attribute_names["#GSI1SK"] = "GSI1SK"
+    The header is written on the condition that it still has old_plan's version.
+    Entries are written only where they change, or all of them if the date moves.
+    """
+    header = meal_plan_header(new_plan or old_plan)
+    condition = unchanged_condition(old_plan['version'] if old_plan else 0)
+    if new_plan is None:
+        actions = [{'Delete': {'Key': {'PK': header['PK'], 'SK': MEAL_PLAN_SK}, **condition}}]
+    else:
+        actions = [{'Put': {'Item': header, **condition}}]
     
-    response = table.update_item(
-        Key={
-            'PK': 'MEAL_PLAN',
-            'SK': meal_plan_id
-        },
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_attribute_values,
-        ExpressionAttributeNames=expression_attribute_names,
-        ReturnValues="ALL_NEW"
-    )
-    return response.get('Attributes')
-
-def delete_meal_plan(meal_plan_id):
-    """Delete a meal plan"""
-    table.delete_item(
-        Key={
-            'PK': 'MEAL_PLAN',
-            'SK': meal_plan_id
+    old_entries = old_plan.get('recipes', []) if old_plan else []
+    new_entries = new_plan.get('recipes', []) if new_plan else []
+    moved = old_plan and new_plan and old_plan.get('date') != new_plan.get('date')
+    for position, entry in enumerate(new_entries):
+        if moved or position >= len(old_entries) or old_entries[position] != entry:
+            actions.append({'Put': {'Item': meal_plan_entry(new_plan, position, entry)}})
+    for position in range(len(new_entries), len(old_entries)):
+        actions.append({'Delete': {'Key': {'PK': header['PK'], 'SK': f"ENTRY#{position:04d}"}}})
+    return actions
+
+def write_meal_plan(user_id, meal_plan_id, change, create=False):
+    """
+    Write a meal plan with its recipe index items and the week items it leaves and joins, in one transaction.
+    
+    Args:
+        user_id: The user the plan belongs to
+        meal_plan_id: The plan to write
+        change: Called with the stored plan (None when creating), returns the plan to store or None to delete it
+        create: The plan is new
+    
+    Every item is written on the condition that it is unchanged since it was read,
+    so a concurrent write to the plan or to one of its weeks starts the write over.
+    
+    Returns:
+        The stored plan; None if it was deleted or didn't exist
+    """
+    for attempt in range(WRITE_ATTEMPTS):
+        old_plan = None if create else get_meal_plan(user_id, meal_plan_id)
+        if old_plan is None and not create:
+            return None
+        new_plan = change(old_plan)
+        old_recipe_ids, new_recipe_ids = plan_recipe_ids(old_plan), plan_recipe_ids(new_plan)
+        
+        if new_plan is not None:
+            # Catalog recipes first, so a private recipe can't shadow a catalog one
+            keys = [key for recipe_id in sorted(new_recipe_ids) for key in recipe_keys(recipe_id, user_id)]
+            recipes = {}
+            for item in batch_get(keys):
+                if item['id'] not in recipes or item['PK'] == 'RECIPE':
+                    recipes[item['id']] = item
+            new_plan = {**meal_plan_header(new_plan), 'recipes': [
+                {**entry, **display_fields(recipes.get(entry.get('recipe_id'), {}))}
+                for entry in new_plan.get('recipes', [])
+            ]}
+        actions = meal_plan_writes(old_plan, new_plan)
+        actions += [
+            {'Put': {'Item': {
+                **planned_key(recipe_id, user_id, meal_plan_id), 'user_id': user_id, 'meal_plan_id': meal_plan_id
+            }}}
+            for recipe_id in sorted(new_recipe_ids - old_recipe_ids)
+        ]
+        actions += [
+            {'Delete': {'Key': planned_key(recipe_id, user_id, meal_plan_id)}}
+            for recipe_id in sorted(old_recipe_ids - new_recipe_ids)
+        ]
+        actions += week_writes([(meal_plan_id, old_plan, new_plan)])
+        actions.append({'Update': collection_version_update(user_key(user_id, 'MEAL_PLAN'))})
+        try:
+            transact_write(actions)
+            return new_plan
+        except ClientError as e:
+            if not transaction_conflict(e) or attempt == WRITE_ATTEMPTS - 1:
+                raise
+
+# Recipe fan-out
+# A recipe write updates the copies of its display fields in every meal plan planning
+# it, and in their weeks. That can be many plans, so the copies are rewritten in the
+# background, FAN_OUT_BATCH_SIZE plans read at a time and as many per transaction as fit
+# in its MAX_TRANSACT_ITEMS actions, by one worker that applies the recipe writes in the
+# order they were committed. With FAN_OUT_ASYNC=false the copies are rewritten before
+# the recipe write returns; that is the default on Lambda, which freezes background
+# threads between invocations and drops what they had queued.
+FAN_OUT_BATCH_SIZE = 25
+ON_LAMBDA = 'AWS_LAMBDA_FUNCTION_NAME' in os.environ
+FAN_OUT_ASYNC = os.environ.get('FAN_OUT_ASYNC', 'false' if ON_LAMBDA else 'true').lower() == 'true'
+
+fan_out_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fan-out")
+
+def fan_out_recipe_write(upserts=(), deletes=(), owner=None):
+    """
+    Recipe write listener copying the display fields of written recipes into the plans planning them.
+    
+    The fields of an owner's private recipes are copied into that owner's plans only.
+    """
+    fields = {item['id']: display_fields(item) for item in upserts}
+    fields.update({recipe_id: display_fields({}) for recipe_id in deletes})
+    if not fields:
+        return
+    if FAN_OUT_ASYNC:
+        fan_out_executor.submit(fan_out, fields, owner)
+    else:
+        fan_out(fields, owner)
+
+recipe_write_listeners.append(fan_out_recipe_write)
+
+def wait_for_fan_out():
+    """Block until every fan-out submitted so far has been applied"""
+    fan_out_executor.submit(lambda: None).result()
+
+def fan_out(fields, owner=None):
+    """
+    Copy display fields, {recipe_id: fields}, into the meal plans planning each recipe, batch by batch,
+    only into owner's plans if given
+    """
+    for recipe_id, values in fields.items():
+        try:
+            batch = []
+            for planned in iter_partition(f"PLANNED#{recipe_id}", FAN_OUT_BATCH_SIZE):
+                if owner is not None and planned['user_id'] != owner:
+                    continue
+                batch.append((planned['user_id'], planned['meal_plan_id']))
+                if len(batch) == FAN_OUT_BATCH_SIZE:
+                    refresh_meal_plans(batch, recipe_id, values)
+                    batch = []
+            if batch:
+                refresh_meal_plans(batch, recipe_id, values)
+        except Exception as e:
+            # The next write of the recipe or of the plans brings the copies up to date;
+            # on the worker an uncaught error would vanish with its future
+            logger.exception(f"Fan-out of recipe {recipe_id} failed: {e}")
+
+def refresh_meal_plans(meal_plans, recipe_id, values):
+    """
+    Set one recipe's display fields in some meal plans, (user_id, meal_plan_id), and their weeks.
+    
+    Plans are written with their weeks and collection versions in as few transactions
+    as hold them. A conflict starts over with the plans not yet refreshed.
+    """
+    for attempt in range(WRITE_ATTEMPTS):
+        changes = []
+        for user_id, meal_plan_id in meal_plans:
+            plan = get_meal_plan(user_id, meal_plan_id)
+            if plan is None:
+                continue
+            entries = [
+                {**entry, **values} if entry.get('recipe_id') == recipe_id else entry
+                for entry in plan['recipes']
+            ]
+            if entries != plan['recipes']:
+                changes.append((meal_plan_id, plan, {**plan, 'recipes': entries, 'version': plan['version'] + 1}))
+        try:
+            for batch in refresh_batches(changes):
+                actions = [action for _, old_plan, new_plan in batch for action in meal_plan_writes(old_plan, new_plan)]
+                actions += week_writes(batch)
+                actions += [
+                    {'Update': collection_version_update(user_key(user_id, 'MEAL_PLAN'))}
+                    for user_id in sorted({old_plan['user_id'] for _, old_plan, _ in batch})
+                ]
+                transact_write(actions)
+            return
+        except ClientError as e:
+            if not transaction_conflict(e) or attempt == WRITE_ATTEMPTS - 1:
+                raise
+
+def refresh_batches(changes):
+    """
+    Split meal plan changes, (meal_plan_id, old_plan, new_plan) with the same date, into
+    batches whose plan, week and version actions fit in one transaction.
+    """
+    batch, size, weeks, users = [], 0, set(), set()
+    for change in changes:
+        _, old_plan, new_plan = change
+        user_id = old_plan['user_id']
+        plan_weeks = {(user_id, iso_week(old_plan['date']))} if old_plan.get('date') else set()
+        writes = len(meal_plan_writes(old_plan, new_plan))
+        if batch and size + writes + len(plan_weeks - weeks) + (user_id not in users) > MAX_TRANSACT_ITEMS:
+            yield batch
+            batch, size, weeks, users = [], 0, set(), set()
+        size += writes + len(plan_weeks - weeks) + (user_id not in users)
+        batch.append(change)
+        weeks |= plan_weeks
+        users.add(user_id)
+    if batch:
+        yield batch
+
+# Week documents
+# Each ISO week with meal plans of a user has one item holding its days and every meal
+# with the display fields of its recipe, so a weekly calendar is a single GetItem.
+# Whatever writes a meal plan rewrites the weeks it touches in the same transaction.
+
+def iso_week(date):
+    """The ISO week of a 'YYYY-MM-DD' date, e.g. '2024-W01'"""
+    year, week, _ = datetime.strptime(str(date)[:10], '%Y-%m-%d').isocalendar()
+    return f"{year}-W{week:02d}"
+
+def week_key(user_id, week):
+    return {
+        'PK': user_key(user_id, 'WEEK'),
+        'SK': f"WEEK#{week}"
+    }
+
+def empty_week(user_id, week):
+    """The document of a user's week with nothing planned"""
+    monday = datetime.strptime(f"{week}-1", '%G-W%V-%u')
+    return {
+        **week_key(user_id, week),
+        'user_id': user_id,
+        'week': week,
+        'days': [{'date': format_date(monday + timedelta(days=offset)), 'meals': []} for offset in range(7)],
+        'recipe_ids': [],
+        'version': 0
+    }
+
+def get_week(user_id, week):
+    """
+    Get the document of a user's ISO week ('2024-W01') in one read.
+    
+    Returns:
+        The week's seven days, each with its meals in the order they were planned;
+        an empty week with version 0 if nothing is planned
+    """
+    response = table.get_item(Key=week_key(user_id, week))
+    return response.get('Item') or empty_week(user_id, week)
+
+def week_meals(meal_plan):
+    """The meals of a meal plan as stored in its week document"""
+    return [
+        {
+            'meal_plan_id': meal_plan['id'],
+            'recipe_id': entry.get('recipe_id'),
+            'meal_type': entry.get('meal_type'),
+            **{field: entry.get(field) for field in RECIPE_DISPLAY_FIELDS.values()}
         }
-    )
-    return {"message": "Meal plan deleted"}
+        for entry in meal_plan.get('recipes', [])
+    ]
+
+def place_meals(day, replacements):
+    """Replace the meals of some meal plans in a week day, {meal_plan_id: meals}, keeping their place"""
+    meals, placed = [], set()
+    for meal in day['meals']:
+        meal_plan_id = meal['meal_plan_id']
+        if meal_plan_id not in replacements:
+            meals.append(meal)
+        elif meal_plan_id not in placed:
+            meals += replacements[meal_plan_id]
+            placed.add(meal_plan_id)
+    for meal_plan_id, replacement in replacements.items():
+        if meal_plan_id not in placed:
+            meals += replacement
+    day['meals'] = meals
+
+def week_write(week):
+    """The transaction action storing a week document read at week['version'], or None if there's nothing to do"""
+    version = week['version']
+    if not any(day['meals'] for day in week['days']):
+        if not version:
+            return None
+        return {'Delete': {'Key': week_key(week['user_id'], week['week']), **unchanged_condition(version)}}
+    recipe_ids = sorted({meal['recipe_id'] for day in week['days'] for meal in day['meals']})
+    item = {**week, 'recipe_ids': recipe_ids, 'version': version + 1}
+    return {'Put': {'Item': item, **unchanged_condition(version)}}
+
+def week_writes(changes):
+    """The week document actions for meal plan changes, (meal_plan_id, old_plan, new_plan) with either plan None"""
+    weeks = sorted({
+        (plan['user_id'], iso_week(plan['date']))
+        for _, old_plan, new_plan in changes for plan in (old_plan, new_plan) if plan and plan.get('date')
+    })
+    documents = {
+        (item['user_id'], item['week']): item
+        for item in batch_get([week_key(*week) for week in weeks], consistent=True)
+    }
+    actions = []
+    for week in weeks:
+        document = documents.get(week) or empty_week(*week)
+        user_changes = [
+            (meal_plan_id, new_plan) for meal_plan_id, old_plan, new_plan in changes
+            if (old_plan or new_plan)['user_id'] == document['user_id']
+        ]
+        for day in document['days']:
+            place_meals(day, {
+                meal_plan_id: week_meals(new_plan) if new_plan and new_plan.get('date') == day['date'] else []
+                for meal_plan_id, new_plan in user_changes
+            })
+        action = week_write(document)
+        if action:
+            actions.append(action)
+    return actions
 
 # Grocery List operations
-def get_grocery_lists():
-    """Get all grocery lists"""
-    response = table.query(
-        KeyConditionExpression=Key('PK').eq('GROCERY_LIST')
-    )
-    return response.get('Items', [])
+# A grocery list is an item collection under USER#<user_id>#GROCERY_LIST#<id>: a LIST
+# header item with the list's own fields and one ITEM#<ingredient_id> item per grocery
+# item, so a list is one Query, an item edit writes only that item, and a list can
+# outgrow the 400 KB item limit. Headers alone carry GSI1 keys, GSI1PK
+# USER#<user_id>#GROCERY_LIST, for listing a user's lists by name.
+# A list's version is its header's plus its items', so a write to any one item changes
+# it; removing an item moves the item's version, plus one, onto the header.
+GROCERY_LIST_SK = 'LIST'
 
-def get_grocery_list(grocery_list_id):
-    """Get a specific grocery list"""
-    response = table.get_item(
-        Key={
-            'PK': 'GROCERY_LIST',
-            'SK': grocery_list_id
-        }
+# Attributes of a grocery item as returned in a list's 'items'
+GROCERY_ITEM_FIELDS = ('ingredient_id', 'ingredient_name', 'quantity', 'unit', 'checked')
+
+def grocery_list_pk(user_id, grocery_list_id):
+    return user_key(user_id, 'GROCERY_LIST', grocery_list_id)
+
+def grocery_item_key(user_id, grocery_list_id, ingredient_id):
+    return {
+        'PK': grocery_list_pk(user_id, grocery_list_id),
+        'SK': f"ITEM#{ingredient_id}"
+    }
+
+def grocery_item(user_id, grocery_list_id, position, item_data):
+    """The item of one grocery item, at a position of a user's list"""
+    return {
+        **grocery_item_key(user_id, grocery_list_id, item_data['ingredient_id']),
+        'grocery_list_id': grocery_list_id,
+        'ingredient_id': item_data['ingredient_id'],
+        'ingredient_name': item_data.get('ingredient_name'),
+        'quantity': item_data.get('quantity', 0),
+        'unit': item_data.get('unit', ''),
+        'checked': item_data.get('checked', False),
+        'position': position,
+        # The header holds the list's first version; items count their own writes
+        'version': 0
+    }
+
+def merged_grocery_items(items_data):
+    """
+    A list's item lines with one line per ingredient, as items are keyed by ingredient.
+
+    Repeated lines in the same unit add up, and stay checked only if all were;
+    repeated lines in different units are refused with a ValueError.
+    """
+    merged = {}
+    for item_data in items_data:
+        ingredient_id = item_data['ingredient_id']
+        line = merged.get(ingredient_id)
+        if line is None:
+            merged[ingredient_id] = dict(item_data)
+        elif line.get('unit', '') != item_data.get('unit', ''):
+            raise ValueError(f"Ingredient {ingredient_id} is listed in more than one unit")
+        else:
+            line['quantity'] = line.get('quantity', 0) + item_data.get('quantity', 0)
+            line['checked'] = line.get('checked', False) and item_data.get('checked', False)
+    return list(merged.values())
+
+def assemble_grocery_list(items):
+    """A grocery list from the items of its collection, or None without a header"""
+    header = next((item for item in items if item['SK'] == GROCERY_LIST_SK), None)
+    if header is None:
+        return None
+    entries = sorted(
+        (item for item in items if item['SK'].startswith('ITEM#')),
+        key=lambda item: (item['position'], item['SK'])
     )
-    return response.get('Item')
+    return {
+        **header,
+        'items': [{field: entry.get(field) for field in GROCERY_ITEM_FIELDS} for entry in entries],
+        'version': header['version'] + sum(entry['version'] for entry in entries)
+    }
+
+def get_grocery_lists(user_id):
+    """
+    Get a user's grocery lists, ordered by name, without their items, in one Query of GSI1.
+    
+    The headers carry only the list's own version, so it is left out;
+    get_grocery_list reads a list with its items and version.
+    """
+    query_args = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': Key('GSI1PK').eq(user_key(user_id, 'GROCERY_LIST'))
+    }
+    grocery_lists = []
+    while True:
+        response = table.query(**query_args)
+        grocery_lists += [
+            {key: value for key, value in header.items() if key != 'version'}
+            for header in response.get('Items', [])
+        ]
+        if 'LastEvaluatedKey' not in response:
+            return grocery_lists
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_grocery_list(user_id, grocery_list_id):
+    """Get a specific grocery list of a user with its items in one Query"""
+    return assemble_grocery_list(list(iter_partition(grocery_list_pk(user_id, grocery_list_id), consistent=True)))
 
-def create_grocery_list(grocery_list_data):
-    """Create a new grocery list"""
+def create_grocery_list(user_id, grocery_list_data):
+    """
+    Create a new grocery list for a user.
+    
+    The list is one transaction with its items, unless it has more than fit in one;
+    then the items go first and the header, which makes the list exist, last.
+    Repeated ingredients are merged (see merged_grocery_items).
+    """
     grocery_list_id = generate_id()
-    item = {
-        'PK': 'GROCERY_LIST',
-        'SK': grocery_list_id,
-        'GSI1PK': 'GROCERY_LIST',
+    header = {
+        'PK': grocery_list_pk(user_id, grocery_list_id),
+        'SK': GROCERY_LIST_SK,
+        'GSI1PK': user_key(user_id, 'GROCERY_LIST'),
         'GSI1SK': grocery_list_data.get('name', ''),
         'id': grocery_list_id,
+        'user_id': user_id,
         'name': grocery_list_data.get('name', ''),
         'meal_plan_id': grocery_list_data.get('meal_plan_id', ''),
-        'items': grocery_list_data.get('items', []),
-        'created_at': datetime.now().isoformat()
+        'created_at': datetime.now().isoformat(),
+        'version': 1
     }
-    table.put_item(Item=item)
-    return item
+    items = to_dynamodb([
+        grocery_item(user_id, grocery_list_id, position, item_data)
+        for position, item_data in enumerate(merged_grocery_items(grocery_list_data.get('items', [])))
+    ])
+    transact_write_chunks(
+        [{'Put': {'Item': item}} for item in items],
+        [{'Put': {'Item': header}}, {'Update': collection_version_update(user_key(user_id, 'GROCERY_LIST'))}]
+    )
+    return assemble_grocery_list([header] + items)
 
-def update_grocery_list(grocery_list_id, grocery_list_data):
-    """Update an existing grocery list"""
-    update_expression = "SET "
-    expression_attribute_values = {}
+def update_grocery_list(user_id, grocery_list_id, grocery_list_data):
+    """
+    Update an existing grocery list of a user; None if it doesn't exist.
     
-    for key, value in grocery_list_data.items():
-        if key not in ['PK', 'SK', 'id']:
-            update_expression += f"#{key} = :{key}, "
-            expression_attribute_values[f":{key}"] = value
+    New 'items' replace the list's items. The items that change and the header are
+    one transaction, conditional on the header being unchanged since it was read,
+    unless more items change than fit in one; then the items go first, and a
+    concurrent reader may see some of them before the rest.
+    """
+    for attempt in range(WRITE_ATTEMPTS):
+        stored = list(iter_partition(grocery_list_pk(user_id, grocery_list_id), consistent=True))
+        header = next((item for item in stored if item['SK'] == GROCERY_LIST_SK), None)
+        if header is None:
+            return None
+        try:
+            transact_write_chunks(*grocery_list_writes(user_id, header, stored, grocery_list_data))
+            return get_grocery_list(user_id, grocery_list_id)
+        except ClientError as e:
+            if not transaction_conflict(e) or attempt == WRITE_ATTEMPTS - 1:
+                raise
+
+def grocery_list_writes(user_id, header, stored, grocery_list_data):
+    """The item actions and the header and version actions updating a stored grocery list"""
+    grocery_list_id = header['id']
+    fields = {
+        key: value for key, value in grocery_list_data.items()
+        if key not in ['PK', 'SK', 'GSI1PK', 'GSI1SK', 'id', 'user_id', 'items']
+    }
     
-    # Remove trailing comma and space
-    update_expression = update_expression[:-2]
+    # Bump the header version used for its ETag, and take over the versions of removed items
+    actions = []
+    version_increment = 1
+    if grocery_list_data.get('items') is not None:
+        old_items = {item['SK']: item for item in stored if item['SK'].startswith('ITEM#')}
+        new_items = {}
+        for position, item_data in enumerate(merged_grocery_items(grocery_list_data['items'])):
+            item = to_dynamodb(grocery_item(user_id, grocery_list_id, position, item_data))
+            new_items[item['SK']] = item
+        for sort_key, item in new_items.items():
+            old_item = old_items.get(sort_key)
+            if old_item is None:
+                actions.append({'Put': {'Item': item}})
+            elif any(old_item.get(field) != item[field] for field in (*GROCERY_ITEM_FIELDS, 'position')):
+                actions.append({'Put': {'Item': {**item, 'version': old_item['version'] + 1}}})
+        for sort_key, old_item in old_items.items():
+            if sort_key not in new_items:
+                actions.append({'Delete': {'Key': {'PK': old_item['PK'], 'SK': sort_key}}})
+                version_increment += old_item['version']
     
-    # Create expression attribute names
-    expression_attribute_names = {f"#{key}": key for key in grocery_list_data if key not in ['PK', 'SK', 'id']}
+    assignments = [f"#{key} = :{key}" for key in fields]
+    expression_attribute_values = {f":{key}": value for key, value in fields.items()}
+    expression_attribute_names = {f"#{key}": key for key in fields}
     
     # Update GSI1SK if name is being updated
-    if 'name' in grocery_list_data:
-        update_expression += ", #GSI1SK = :GSI1SK"
-        expression_attribute_values[":GSI1SK"] = grocery_list_data['name']
+    if 'name' in fields:
+        assignments.append("#GSI1SK = :GSI1SK")
+        expression_attribute_values[":GSI1SK"] = fields['name']
         expression_attribute_names["#GSI1SK"] = "GSI1SK"
     
-    response = table.update_item(
-        Key={
-            'PK': 'GROCERY_LIST',
-            'SK': grocery_list_id
-        },
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_attribute_values,
-        ExpressionAttributeNames=expression_attribute_names,
-        ReturnValues="ALL_NEW"
-    )
-    return response.get('Attributes')
-
-def delete_grocery_list(grocery_list_id):
-    """Delete a grocery list"""
-    table.delete_item(
-        Key={
-            'PK': 'GROCERY_LIST',
-            'SK': grocery_list_id
-        }
+    update_expression = f"SET {', '.join(assignments)} " if assignments else ""
+    update_expression += "ADD #version :increment"
+    expression_attribute_values[":increment"] = version_increment
+    expression_attribute_names["#version"] = "version"
+    
+    condition = unchanged_condition(header['version'])
+    header_update = {
+        'Key': {'PK': header['PK'], 'SK': GROCERY_LIST_SK},
+        'UpdateExpression': update_expression,
+        'ConditionExpression': condition['ConditionExpression'],
+        'ExpressionAttributeValues': {**expression_attribute_values, **condition['ExpressionAttributeValues']},
+        'ExpressionAttributeNames': {**expression_attribute_names, **condition['ExpressionAttributeNames']}
+    }
+    version_update = collection_version_update(user_key(user_id, 'GROCERY_LIST'))
+    return actions, [{'Update': header_update}, {'Update': version_update}]
+
+def delete_grocery_list(user_id, grocery_list_id):
+    """Delete a grocery list of a user"""
+    # Without its header the list is gone; its items follow
+    write_versioned(
+        {'Delete': {'Key': {'PK': grocery_list_pk(user_id, grocery_list_id), 'SK': GROCERY_LIST_SK}}},
+        user_key(user_id, 'GROCERY_LIST')
     )
-    return {"message": "Grocery list deleted"} 
\ No newline at end of file
+    with table.batch_writer() as batch:
+        for item in iter_partition(grocery_list_pk(user_id, grocery_list_id)):
+            batch.delete_item(Key={'PK': item['PK'], 'SK': item['SK']})
+    return {"message": "Grocery list deleted"}
+
+# Grocery item operations
+# Each edit writes the one item it changes, on the condition that it exists and
+# differs from what is stored, so an edit changing nothing costs no version bump.
+def set_grocery_item(user_id, grocery_list_id, ingredient_id, fields):
+    """
+    Change fields of a grocery list item, {field: value}.
+    
+    Returns:
+        The stored item; None if it doesn't exist
+    """
+    key = grocery_item_key(user_id, grocery_list_id, ingredient_id)
+    assignments = [f"#{field} = :{field}" for field in fields]
+    differs = " OR ".join(f"#{field} <> :{field}" for field in fields)
+    try:
+        write_versioned({'Update': {
+            'Key': key,
+            'UpdateExpression': f"SET {', '.join(assignments)} ADD #version :one",
+            'ConditionExpression': f"attribute_exists(PK) AND ({differs})",
+            'ExpressionAttributeNames': {**{f"#{field}": field for field in fields}, "#version": "version"},
+            'ExpressionAttributeValues': {**{f":{field}": value for field, value in fields.items()}, ":one": 1}
+        }}, user_key(user_id, 'GROCERY_LIST'))
+    except ClientError as e:
+        # Missing, or already as asked
+        if not condition_failed(e):
+            raise
+    return table.get_item(Key=key, ConsistentRead=True).get('Item')
+
+def set_grocery_item_quantity(user_id, grocery_list_id, ingredient_id, quantity, unit=None):
+    """Change the quantity, and optionally the unit, of a grocery list item"""
+    fields = {'quantity': quantity}
+    if unit is not None:
+        fields['unit'] = unit
+    return set_grocery_item(user_id, grocery_list_id, ingredient_id, fields)
+
+def add_grocery_item(user_id, grocery_list_id, item_data):
+    """
+    Add an item to the end of a grocery list; an item of the same ingredient takes the new fields instead.
+    
+    Returns:
+        The stored item; None if the list doesn't exist
+    """
+    stored = list(iter_partition(grocery_list_pk(user_id, grocery_list_id), consistent=True))
+    if not any(item['SK'] == GROCERY_LIST_SK for item in stored):
+        return None
+    item = grocery_item(user_id, grocery_list_id, 0, item_data)
+    if any(existing['SK'] == item['SK'] for existing in stored):
+        return set_grocery_item(user_id, grocery_list_id, item['ingredient_id'], {
+            field: item[field] for field in GROCERY_ITEM_FIELDS if field != 'ingredient_id'
+        })
+    item['position'] = max((existing.get('position', -1) for existing in stored), default=-1) + 1
+    item['version'] = 1
+    try:
+        write_versioned(
+            {'Put': {'Item': item, 'ConditionExpression': "attribute_not_exists(PK)"}},
+            user_key(user_id, 'GROCERY_LIST')
+        )
+    except ClientError as e:
+        if not condition_failed(e):
+            raise
+        # Added concurrently
+        return add_grocery_item(user_id, grocery_list_id, item_data)
+    return to_dynamodb(item)
+
+def remove_grocery_item(user_id, grocery_list_id, ingredient_id):
+    """
+    Remove an item from a grocery list.
+    
+    Returns:
+        The removed item; None if it doesn't exist
+    """
+    key = grocery_item_key(user_id, grocery_list_id, ingredient_id)
+    for attempt in range(WRITE_ATTEMPTS):
+        item = table.get_item(Key=key, ConsistentRead=True).get('Item')
+        if item is None:
+            return None
+        try:
+            transact_write([
+                {'Delete': {'Key': key, **unchanged_condition(item['version'])}},
+                {'Update': {
+                    'Key': {'PK': key['PK'], 'SK': GROCERY_LIST_SK},
+                    'UpdateExpression': "ADD #version :increment",
+                    'ExpressionAttributeNames': {"#version": "version"},
+                    'ExpressionAttributeValues': {":increment": item['version'] + 1}
+                }},
+                {'Update': collection_version_update(user_key(user_id, 'GROCERY_LIST'))}
+            ])
+            return item
+        except ClientError as e:
+            if not transaction_conflict(e) or attempt == WRITE_ATTEMPTS - 1:
+                raise
+
+# Check toggles
+# A shopper ticking items off sends bursts of check/uncheck toggles. Each is written
+# before it returns, as one conditional update of its item that is skipped when the
+# item is already as asked; clients coalesce bursts before sending them. Holding
+# toggles on the server would lose them when a process exits or a Lambda container
+# freezes, and hide them from every other process.
+def check_grocery_item(user_id, grocery_list_id, ingredient_id, checked=True):
+    """
+    Check (or with checked=False uncheck) a grocery list item.
+    
+    Returns:
+        The stored item; None if it doesn't exist
+    """
+    return set_grocery_item(user_id, grocery_list_id, ingredient_id, {'checked': checked})
+
+def uncheck_grocery_item(user_id, grocery_list_id, ingredient_id):
+    """Uncheck a grocery list item"""
+    return check_grocery_item(user_id, grocery_list_id, ingredient_id, checked=False)
+
+# Idempotency records
+# A POST carrying an Idempotency-Key claims the key with a conditional put before it
+# runs, and stores its response on the claim once it has one, so a retry of the same
+# request gets the stored response instead of running again (see app.api.idempotency).
+# A pending claim holds the key only for a short lease, so a request whose process
+# died frees its key soon; the stored response is kept longer. Records carry their
+# expiry in expires_at, the table's TTL attribute; TTL deletes lag, so an expired
+# record counts as absent straight away. Each claim has its own token, and only the
+# request holding it can complete or release the key. Keys are the client's own, so each
+# user's keys live under that user's prefix: one user can't replay or block another's.
+def idempotency_key(user_id, key):
+    return {
+        'PK': user_key(user_id, 'IDEMPOTENCY', key),
+        'SK': 'REQUEST'
+    }
+
+def claim_idempotency_key(user_id, key, request_hash, expires_at):
+    """
+    Claim a user's idempotency key for a request until expires_at (epoch seconds).
+    
+    Returns:
+        The claim's token; None if an unexpired record holds the key
+    """
+    claim = generate_id()
+    try:
+        table.put_item(
+            Item={
+                **idempotency_key(user_id, key),
+                'request_hash': request_hash,
+                'state': 'pending',
+                'claim': claim,
+                'expires_at': expires_at
+            },
+            ConditionExpression="attribute_not_exists(PK) OR expires_at < :now",
+            ExpressionAttributeValues={":now": int(datetime.now().timestamp())}
+        )
+        return claim
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return None
+
+def get_idempotency_record(user_id, key):
+    """Get the unexpired record of a user's idempotency key, or None"""
+    item = table.get_item(Key=idempotency_key(user_id, key), ConsistentRead=True).get('Item')
+    if item is None or item['expires_at'] < int(datetime.now().timestamp()):
+        return None
+    return item
+
+def held_claim(claim):
+    """Condition arguments for writing an idempotency record only while a claim still holds it"""
+    return {
+        'ConditionExpression': "#claim = :claim AND #state = :pending",
+        'ExpressionAttributeNames': {"#claim": "claim", "#state": "state"},
+        'ExpressionAttributeValues': {":claim": claim, ":pending": 'pending'}
+    }
+
+def complete_idempotency_key(user_id, key, claim, status_code, headers, body, expires_at):
+    """
+    Store the response of the request holding a user's idempotency key until expires_at.
+    
+    Args:
+        headers: The response headers to replay, [[name, value], ...]
+        body: The zlib-compressed response body
+    
+    Returns:
+        True if stored; False if the claim was lost, e.g. its lease ran out and another request took the key
+    """
+    condition = held_claim(claim)
+    try:
+        table.update_item(
+            Key=idempotency_key(user_id, key),
+            UpdateExpression="SET #state = :complete, status_code = :status_code, headers = :headers, "
+                             "body = :body, expires_at = :expires_at",
+            ConditionExpression=condition['ConditionExpression'],
+            ExpressionAttributeNames=condition['ExpressionAttributeNames'],
+            ExpressionAttributeValues={
+                **condition['ExpressionAttributeValues'],
+                ":complete": 'complete',
+                ":status_code": status_code,
+                ":headers": headers,
+                ":body": body,
+                ":expires_at": expires_at
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+def release_idempotency_key(user_id, key, claim):
+    """Drop a claim on an idempotency key whose request failed, so a retry runs it again; a lost claim is left alone"""
+    try:
+        table.delete_item(Key=idempotency_key(user_id, key), **held_claim(claim))
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
@@ -0,0 +1,41 @@
+"""
+Dedicated thread pool for blocking boto3 calls made from async handlers.
+
+boto3 has no async API, so async routes hand DynamoDB calls to this pool
+instead of blocking the event loop. The pool is separate from the anyio
+threadpool that serves sync handlers, so slow DynamoDB calls cannot starve
+the rest of the app, and it can be sized to the expected request
+concurrency with the DYNAMODB_EXECUTOR_WORKERS environment variable.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# boto3's default connection pool holds 10 connections; size the two together
+DYNAMODB_EXECUTOR_WORKERS = int(os.environ.get("DYNAMODB_EXECUTOR_WORKERS", "10"))
+
+executor = ThreadPoolExecutor(
+    max_workers=DYNAMODB_EXECUTOR_WORKERS,
+    thread_name_prefix="dynamodb"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on the DynamoDB executor and await its result.
+
+    Args:
+        func: Blocking callable, typically one of the app.db.dynamodb functions
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,257 @@
+"""
+Grocery list generation from the meal plans of a date range.
+
+Meal plans reference recipes and recipes reference ingredients with a
+quantity and unit, so the shopping list for a range is the sum, per
+ingredient, of every recipe line of every planned meal, scaled to the
+servings cooked. The expansion is done column-wise with NumPy:
+
+1. meals in the range -> a multiplier per recipe: how often it is planned
+   (np.bincount over the meals) x serving override / recipe servings
+2. recipe lines -> quantity x multiplier of the line's recipe
+3. convert the lines to common units (app.db.units) and group by
+   (ingredient, unit) with np.unique + np.bincount
+
+so the cost is four queries plus a handful of array operations, however many
+meals share a recipe or recipes share an ingredient.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.units import (
+    BASE_CODES,
+    MASS,
+    UNIT_DIMENSIONS,
+    UNIT_FACTORS,
+    UNIT_NAMES,
+    VOLUME,
+    convert,
+    density,
+    normalize_unit,
+    readable,
+    unit_codes,
+)
+from app.db.versions import GROCERY_LIST, bump_collection_version
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    grocery_list_item,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+
+def aggregate_lines(ingredient_ids: np.ndarray, units: List[str], quantities: np.ndarray,
+                    densities: Optional[Mapping[int, float]] = None) -> List[Tuple[int, str, float]]:
+    """
+    Sum quantities per ingredient, converting between units where possible.
+
+    Lines in known units are summed in their dimension's base unit (see
+    app.db.units); volume lines of an ingredient that also has mass lines are
+    weighed through its density, when known. A group whose lines all used the
+    same unit keeps it, so "2 tbsp" + "1 tbsp" stays tbsp while "2 tbsp" +
+    "30 ml" becomes 60 ml. Lines in units the registry doesn't know are summed
+    by their spelling.
+
+    Args:
+        ingredient_ids: Ingredient id per line
+        units: Unit per line
+        quantities: Quantity per line
+        densities: Grams per millilitre by ingredient id
+
+    Returns:
+        (ingredient_id, unit, total) per group, ordered by ingredient id then unit
+    """
+    if not len(ingredient_ids):
+        return []
+    ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    codes = unit_codes(units)
+    dimensions = UNIT_DIMENSIONS[codes]
+    known = dimensions >= 0
+    ingredients, ingredient_of_line = np.unique(ingredient_ids, return_inverse=True)
+
+    # Weigh the volume lines of ingredients that are also measured by mass
+    line_densities = np.array([
+        (densities or {}).get(ingredient_id) or np.nan for ingredient_id in ingredients.tolist()
+    ], dtype=np.float64)[ingredient_of_line]
+    has_mass = np.bincount(ingredient_of_line, weights=dimensions == MASS, minlength=len(ingredients)) > 0
+    weighed = has_mass[ingredient_of_line] & (dimensions == VOLUME) & ~np.isnan(line_densities)
+    targets = np.where(weighed, MASS, dimensions)
+
+    # Known lines go to their base unit; unknown ones are summed by spelling
+    base_codes = BASE_CODES[np.where(known, targets, 0)]
+    totals = np.where(known, convert(quantities, codes, base_codes, line_densities), quantities)
+    labels = np.array([
+        UNIT_NAMES[base_code] if is_known else normalize_unit(unit)
+        for base_code, is_known, unit in zip(base_codes.tolist(), known.tolist(), units)
+    ], dtype=object).astype(str)
+    label_names, label_codes = np.unique(labels, return_inverse=True)
+
+    # One integer key per (ingredient, label) pair
+    keys = ingredient_ids * len(label_names) + label_codes
+    groups, first_line, group_of_line = np.unique(keys, return_index=True, return_inverse=True)
+    sums = np.bincount(group_of_line, weights=totals, minlength=len(groups))
+    # Groups of known units whose lines all share one unit are given back in it
+    first_codes = codes[first_line]
+    uniform = np.bincount(group_of_line, weights=codes != first_codes[group_of_line], minlength=len(groups)) == 0
+    uniform &= known[first_line]
+    sums = np.where(uniform, sums / np.where(uniform, UNIT_FACTORS[first_codes], 1.0), sums)
+
+    result = []
+    for key, total, same_unit, code in zip(groups.tolist(), sums.tolist(), uniform.tolist(), first_codes.tolist()):
+        unit = UNIT_NAMES[code] if same_unit else str(label_names[key % len(label_names)])
+        total, unit = readable(total, unit)
+        result.append((int(key // len(label_names)), unit, float(total)))
+    return result
+
+
+def merge_units(lines: List[Tuple[str, float]]) -> Tuple[float, str]:
+    """
+    Fold the (unit, total) lines of one ingredient into a single grocery item.
+
+    A grocery list holds one item per ingredient; if its lines are in units
+    that don't convert into each other, the largest line gives the item's
+    quantity and unit and the rest are appended to the unit, e.g. 2 "pcs + 100 g".
+    """
+    lines = sorted(lines, key=lambda line: -line[1])
+    (unit, quantity), rest = lines[0], lines[1:]
+    for other_unit, other_quantity in rest:
+        unit = f"{unit} + {round(other_quantity, 2):g} {other_unit}".strip()
+    return round(quantity, 2), unit
+
+
+def expand_meal_plans(db: Session, start_date: date, end_date: date,
+                      servings: Optional[Mapping[str, int]] = None) -> Dict[str, Any]:
+    """
+    The ingredient totals for every meal planned between two dates.
+
+    Args:
+        db: Database session
+        start_date: First day, inclusive
+        end_date: Last day, inclusive
+        servings: Servings to cook per recipe id, instead of the recipe's own
+
+    Returns:
+        {"meal_plan_ids": [...], "items": [{"ingredient_id", "ingredient_name",
+        "category", "quantity", "unit"}, ...]} with items ordered by category then name
+    """
+    servings = servings or {}
+    meals = db.execute(
+        select(meal_plan_recipe.c.meal_plan_id, meal_plan_recipe.c.recipe_id)
+        .join(MealPlanModel, MealPlanModel.id == meal_plan_recipe.c.meal_plan_id)
+        .where(MealPlanModel.date >= start_date, MealPlanModel.date <= end_date)
+    ).all()
+    meal_plan_ids = sorted({meal.meal_plan_id for meal in meals})
+    if not meals:
+        return {"meal_plan_ids": meal_plan_ids, "items": []}
+
+    # 1. Servings multiplier per recipe
+    meal_recipes = np.array([meal.recipe_id for meal in meals], dtype=np.int64)
+    recipe_ids, recipe_of_meal = np.unique(meal_recipes, return_inverse=True)
+    recipe_servings = dict(db.execute(
+        select(RecipeModel.id, RecipeModel.servings).where(RecipeModel.id.in_(recipe_ids.tolist()))
+    ).all())
+    factors = np.array([
+        servings[str(recipe_id)] / recipe_servings[recipe_id]
+        if str(recipe_id) in servings and recipe_servings.get(recipe_id) else 1.0
+        for recipe_id in recipe_ids.tolist()
+    ])
+    multipliers = np.bincount(recipe_of_meal, minlength=len(recipe_ids)) * factors
+
+    # 2. Scale every line of those recipes
+    lines = db.execute(
+        select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id,
+               recipe_ingredient.c.quantity, recipe_ingredient.c.unit)
+        .where(recipe_ingredient.c.recipe_id.in_(recipe_ids.tolist()))
+    ).all()
+    if not lines:
+        return {"meal_plan_ids": meal_plan_ids, "items": []}
+    line_recipes = np.searchsorted(recipe_ids, np.array([line.recipe_id for line in lines], dtype=np.int64))
+    quantities = np.array([line.quantity or 0.0 for line in lines], dtype=np.float64) * multipliers[line_recipes]
+
+    # 3. Convert and group by (ingredient, unit)
+    ingredient_ids = np.array([line.ingredient_id for line in lines], dtype=np.int64)
+    ingredients = {
+        ingredient.id: ingredient
+        for ingredient in db.scalars(
+            select(IngredientModel).where(IngredientModel.id.in_(np.unique(ingredient_ids).tolist()))
+        )
+    }
+    densities = {ingredient_id: density(ingredient.name) for ingredient_id, ingredient in ingredients.items()}
+    totals = aggregate_lines(ingredient_ids, [line.unit or "" for line in lines], quantities, densities)
+
+    by_ingredient: Dict[int, List[Tuple[str, float]]] = {}
+    for ingredient_id, unit, total in totals:
+        by_ingredient.setdefault(ingredient_id, []).append((unit, total))
+    items = []
+    for ingredient_id, unit_lines in by_ingredient.items():
+        ingredient = ingredients.get(ingredient_id)
+        quantity, unit = merge_units(unit_lines)
+        items.append({
+            "ingredient_id": str(ingredient_id),
+            "ingredient_name": ingredient.name if ingredient else "",
+            "category": ingredient.category if ingredient else None,
+            "quantity": quantity,
+            "unit": unit,
+        })
+    items.sort(key=lambda item: (item["category"] is None, item["category"] or "", item["ingredient_name"].lower()))
+    return {"meal_plan_ids": meal_plan_ids, "items": items}
+
+
+def group_by_category(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Split items sorted by category into [{"category", "items"}] sections."""
+    sections: List[Dict[str, Any]] = []
+    for item in items:
+        if not sections or sections[-1]["category"] != item["category"]:
+            sections.append({"category": item["category"], "items": []})
+        sections[-1]["items"].append(item)
+    return sections
+
+
+def create_generated_grocery_list(db: Session, name: str, start_date: date, end_date: date,
+                                  servings: Optional[Mapping[str, int]] = None) -> Dict[str, Any]:
+    """
+    Expand the meal plans of a range and store the result as a grocery list.
+
+    The list is linked to the meal plan when the range holds exactly one.
+    Flushes but does not commit.
+    """
+    expanded = expand_meal_plans(db, start_date, end_date, servings)
+    meal_plan_ids = expanded["meal_plan_ids"]
+    grocery_list = GroceryListModel(name=name, meal_plan_id=meal_plan_ids[0] if len(meal_plan_ids) == 1 else None)
+    db.add(grocery_list)
+    db.flush()
+
+    items = expanded["items"]
+    if items:
+        db.execute(grocery_list_item.insert(), [
+            {
+                "grocery_list_id": grocery_list.id,
+                "ingredient_id": int(item["ingredient_id"]),
+                "quantity": item["quantity"],
+                "unit": item["unit"],
+                "checked": 0,
+            }
+            for item in items
+        ])
+    bump_collection_version(db, GROCERY_LIST)
+
+    for item in items:
+        item["checked"] = False
+    return {
+        "id": str(grocery_list.id),
+        "name": grocery_list.name,
+        "meal_plan_id": str(grocery_list.meal_plan_id) if grocery_list.meal_plan_id else None,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "items": items,
+        "sections": group_by_category(items),
+    }
@@ -0,0 +1,181 @@
+"""
+Migration to split meal plans and grocery lists into item collections.
+
+This migration:
+1. Moves every meal plan from the MEAL_PLAN partition to its own MEAL_PLAN#<id>
+   partition: a PLAN header item and one ENTRY#<position> item per recipe entry
+2. Moves every grocery list from the GROCERY_LIST partition to its own
+   GROCERY_LIST#<id> partition: a LIST header item and one ITEM#<ingredient_id>
+   item per grocery item
+
+Both partitions are read and rewritten a page at a time, so the migration runs
+in constant memory however many plans and lists there are. The item layouts are
+spelled out here rather than imported so the migration keeps meaning what it
+meant when later versions change the data layer.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Fields of an embedded recipe entry or grocery item that become key attributes
+ENTRY_KEYS = ("PK", "SK", "GSI1PK", "GSI1SK", "meal_plan_id", "position")
+GROCERY_ITEM_FIELDS = ("ingredient_id", "ingredient_name", "quantity", "unit", "checked")
+
+
+def meal_plan_items(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The header and entry items of an embedded meal plan item."""
+    meal_plan_id = plan["id"]
+    header = {key: value for key, value in plan.items() if key != "recipes"}
+    header.update({
+        "PK": f"MEAL_PLAN#{meal_plan_id}",
+        "SK": "PLAN",
+        "GSI1PK": "MEAL_PLAN",
+        "GSI1SK": f"{plan['date']}#{meal_plan_id}",
+        "version": plan.get("version", 1)
+    })
+    items = [header]
+    for position, entry in enumerate(plan.get("recipes", [])):
+        items.append({
+            **entry,
+            "PK": header["PK"],
+            "SK": f"ENTRY#{position:04d}",
+            "GSI1PK": "MEAL_PLAN",
+            "GSI1SK": f"{plan['date']}#{meal_plan_id}#{position:04d}",
+            "meal_plan_id": meal_plan_id,
+            "position": position
+        })
+    return items
+
+
+def grocery_list_items(grocery_list: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The header and item items of an embedded grocery list item."""
+    grocery_list_id = grocery_list["id"]
+    header = {key: value for key, value in grocery_list.items() if key != "items"}
+    header.update({
+        "PK": f"GROCERY_LIST#{grocery_list_id}",
+        "SK": "LIST",
+        "GSI1PK": "GROCERY_LIST",
+        "GSI1SK": grocery_list.get("name", ""),
+        "version": grocery_list.get("version", 1)
+    })
+    items = {}
+    for position, item_data in enumerate(grocery_list.get("items", [])):
+        # A list naming an ingredient twice keeps its last line, as a list of ITEM#<ingredient_id> must
+        items[item_data["ingredient_id"]] = {
+            "PK": header["PK"],
+            "SK": f"ITEM#{item_data['ingredient_id']}",
+            "grocery_list_id": grocery_list_id,
+            "ingredient_id": item_data["ingredient_id"],
+            "ingredient_name": item_data.get("ingredient_name"),
+            "quantity": item_data.get("quantity", 0),
+            "unit": item_data.get("unit", ""),
+            "checked": item_data.get("checked", False),
+            "position": position,
+            # The header carries the list's version over; items count only their own writes
+            "version": 0
+        }
+    return [header] + list(items.values())
+
+
+def up(db: Any) -> None:
+    """
+    Apply the migration - split embedded meal plans and grocery lists into item collections.
+
+    Args:
+        db: Database adapter instance
+    """
+    logger.info("Splitting meal plans into item collections...")
+
+    meal_plans = 0
+    key_condition = {
+        "expression": "PK = :pk",
+        "values": {":pk": "MEAL_PLAN"}
+    }
+    for page in db.query_pages(key_condition):
+        puts = [item for plan in page for item in meal_plan_items(plan)]
+        db.batch_write(puts, [(plan["PK"], plan["SK"]) for plan in page])
+        meal_plans += len(page)
+
+    logger.info("Splitting grocery lists into item collections...")
+
+    grocery_lists = 0
+    key_condition = {
+        "expression": "PK = :pk",
+        "values": {":pk": "GROCERY_LIST"}
+    }
+    for page in db.query_pages(key_condition):
+        puts = [item for grocery_list in page for item in grocery_list_items(grocery_list)]
+        db.batch_write(puts, [(grocery_list["PK"], grocery_list["SK"]) for grocery_list in page])
+        grocery_lists += len(page)
+
+    logger.info(f"Migration complete: Split {meal_plans} meal plans and {grocery_lists} grocery lists")
+
+
+def down(db: Any) -> None:
+    """
+    Revert the migration - embed entries and items in single meal plan and grocery list items again.
+
+    Args:
+        db: Database adapter instance
+    """
+    logger.info("Embedding meal plan entries...")
+
+    meal_plans = 0
+    key_condition = {
+        "expression": "GSI1PK = :pk",
+        "values": {":pk": "MEAL_PLAN"}
+    }
+    for page in db.query_pages(key_condition, index_name="GSI1"):
+        puts, deletes = [], []
+        for header in page:
+            if header["SK"] != "PLAN":
+                continue
+            collection = [
+                item for collection_page in db.query_pages({"expression": "PK = :pk", "values": {":pk": header["PK"]}})
+                for item in collection_page
+            ]
+            entries = sorted((item for item in collection if item["SK"].startswith("ENTRY#")), key=lambda item: item["SK"])
+            plan = {key: value for key, value in header.items() if key not in ("PK", "SK", "GSI1SK")}
+            plan.update({
+                "PK": "MEAL_PLAN",
+                "SK": header["id"],
+                "GSI1SK": header["date"],
+                "recipes": [{key: value for key, value in entry.items() if key not in ENTRY_KEYS} for entry in entries]
+            })
+            puts.append(plan)
+            deletes += [(item["PK"], item["SK"]) for item in collection]
+        db.batch_write(puts, deletes)
+        meal_plans += len(puts)
+
+    logger.info("Embedding grocery list items...")
+
+    grocery_lists = 0
+    key_condition = {
+        "expression": "GSI1PK = :pk",
+        "values": {":pk": "GROCERY_LIST"}
+    }
+    for page in db.query_pages(key_condition, index_name="GSI1"):
+        puts, deletes = [], []
+        for header in page:
+            if header["SK"] != "LIST":
+                continue
+            collection = [
+                item for collection_page in db.query_pages({"expression": "PK = :pk", "values": {":pk": header["PK"]}})
+                for item in collection_page
+            ]
+            items = sorted((item for item in collection if item["SK"].startswith("ITEM#")), key=lambda item: item["position"])
+            grocery_list = {key: value for key, value in header.items() if key not in ("PK", "SK")}
+            grocery_list.update({
+                "PK": "GROCERY_LIST",
+                "SK": header["id"],
+                "version": header["version"] + sum(item["version"] for item in items),
+                "items": [{field: item.get(field) for field in GROCERY_ITEM_FIELDS} for item in items]
+            })
+            puts.append(grocery_list)
+            deletes += [(item["PK"], item["SK"]) for item in collection]
+        db.batch_write(puts, deletes)
+        grocery_lists += len(puts)
+
+    logger.info(f"Migration rollback complete: Embedded {meal_plans} meal plans and {grocery_lists} grocery lists")
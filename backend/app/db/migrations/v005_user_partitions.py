@@ -0,0 +1,150 @@
+"""
+Migration to key meal plans, weeks and grocery lists by user.
+
+This migration gives every meal plan, week document and grocery list to one user,
+DEFAULT_USER_ID (default "default"), the household the deployment served so far:
+1. Moves each meal plan collection from MEAL_PLAN#<id> to USER#<user>#MEAL_PLAN#<id>,
+   indexed under GSI1PK USER#<user>#MEAL_PLAN, and re-keys its PLANNED#<recipe_id> items
+2. Moves week documents from the WEEK partition to USER#<user>#WEEK
+3. Moves each grocery list collection from GROCERY_LIST#<id> to
+   USER#<user>#GROCERY_LIST#<id>, indexed under GSI1PK USER#<user>#GROCERY_LIST
+4. Moves the MEAL_PLAN and GROCERY_LIST collection versions to the user's partition
+
+Recipes stay in the shared RECIPE catalog. Like v004, everything is streamed a page
+at a time. Rolling back gathers only DEFAULT_USER_ID's data back into the shared
+partitions; other users' data has no place in the old layout and is left alone.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OWNER_ID = os.environ.get("DEFAULT_USER_ID", "default")
+
+COLLECTION_VERSION_PK = "COLLECTION_VERSION"
+
+
+def owned(item: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+    """An item with its owner set, or removed for user_id None."""
+    item = {key: value for key, value in item.items() if key != "user_id"}
+    if user_id is not None:
+        item["user_id"] = user_id
+    return item
+
+
+def planned_sort_key(prefix: str, meal_plan_id: str) -> str:
+    """The sort key of a PLANNED#<recipe_id> item for a meal plan indexed under a GSI1PK prefix."""
+    # Before v005 the sort key was the bare meal plan id
+    return f"{prefix}#{meal_plan_id}" if prefix.startswith("USER#") else meal_plan_id
+
+
+def move_collections(db: Any, header_sk: str, old_prefix: str, new_prefix: str, user_id: Optional[str]) -> int:
+    """
+    Move the collections whose headers are indexed under GSI1PK old_prefix to
+    <new_prefix>#<id> partitions indexed under new_prefix, a page of headers at a time,
+    along with the PLANNED#<recipe_id> items of their entries.
+
+    Returns:
+        The number of collections moved
+    """
+    moved = 0
+    key_condition = {
+        "expression": "GSI1PK = :pk",
+        "values": {":pk": old_prefix}
+    }
+    for page in db.query_pages(key_condition, index_name="GSI1"):
+        puts, deletes, entries = [], [], []
+        for header in page:
+            if header["SK"] != header_sk:
+                continue
+            collection = [
+                item for collection_page in db.query_pages({"expression": "PK = :pk", "values": {":pk": header["PK"]}})
+                for item in collection_page
+            ]
+            for item in collection:
+                new_item = {**item, "PK": f"{new_prefix}#{header['id']}"}
+                if "GSI1PK" in item:
+                    new_item["GSI1PK"] = new_prefix
+                if item["SK"] == header_sk:
+                    new_item = owned(new_item, user_id)
+                elif item.get("recipe_id"):
+                    entries.append((item["recipe_id"], header["id"]))
+                puts.append(new_item)
+                deletes.append((item["PK"], item["SK"]))
+            moved += 1
+        db.batch_write(puts, deletes)
+        move_planned(db, entries, old_prefix, new_prefix, user_id)
+    return moved
+
+
+def move_planned(db: Any, entries: List[Tuple[str, str]], old_prefix: str, new_prefix: str,
+                 user_id: Optional[str]) -> None:
+    """Re-key the PLANNED#<recipe_id> items of moved meal plan entries."""
+    puts = {}
+    for recipe_id, meal_plan_id in entries:
+        pk = f"PLANNED#{recipe_id}"
+        sk = planned_sort_key(new_prefix, meal_plan_id)
+        puts[(pk, sk)] = owned({"PK": pk, "SK": sk, "meal_plan_id": meal_plan_id}, user_id)
+    deletes = {
+        (f"PLANNED#{recipe_id}", planned_sort_key(old_prefix, meal_plan_id)) for recipe_id, meal_plan_id in entries
+    }
+    db.batch_write(list(puts.values()), sorted(deletes))
+
+
+def move_partition(db: Any, old_pk: str, new_pk: str, user_id: Optional[str]) -> int:
+    """Move every item of a partition to another under the same sort keys; returns how many moved."""
+    moved = 0
+    for page in db.query_pages({"expression": "PK = :pk", "values": {":pk": old_pk}}):
+        db.batch_write(
+            [owned({**item, "PK": new_pk}, user_id) for item in page],
+            [(item["PK"], item["SK"]) for item in page]
+        )
+        moved += len(page)
+    return moved
+
+
+def move_version(db: Any, old_key: Tuple[str, str], new_key: Tuple[str, str]) -> None:
+    """Move a collection version item, if the collection was ever written."""
+    version = db.get_item(*old_key)
+    if version:
+        db.batch_write([{**version, "PK": new_key[0], "SK": new_key[1]}], [old_key])
+
+
+def up(db: Any) -> None:
+    """
+    Apply the migration - move meal plans, weeks and grocery lists under the default user.
+
+    Args:
+        db: Database adapter instance
+    """
+    user = f"USER#{OWNER_ID}"
+    logger.info(f"Moving meal plans, weeks and grocery lists to {user}...")
+
+    meal_plans = move_collections(db, "PLAN", "MEAL_PLAN", f"{user}#MEAL_PLAN", OWNER_ID)
+    weeks = move_partition(db, "WEEK", f"{user}#WEEK", OWNER_ID)
+    grocery_lists = move_collections(db, "LIST", "GROCERY_LIST", f"{user}#GROCERY_LIST", OWNER_ID)
+    for collection in ("MEAL_PLAN", "GROCERY_LIST"):
+        move_version(db, (COLLECTION_VERSION_PK, collection), (user, f"{COLLECTION_VERSION_PK}#{collection}"))
+
+    logger.info(f"Migration complete: Moved {meal_plans} meal plans, {weeks} weeks and {grocery_lists} grocery lists")
+
+
+def down(db: Any) -> None:
+    """
+    Revert the migration - move the default user's meal plans, weeks and grocery lists back to shared partitions.
+
+    Args:
+        db: Database adapter instance
+    """
+    user = f"USER#{OWNER_ID}"
+    logger.info(f"Moving meal plans, weeks and grocery lists of {user} back...")
+
+    meal_plans = move_collections(db, "PLAN", f"{user}#MEAL_PLAN", "MEAL_PLAN", None)
+    weeks = move_partition(db, f"{user}#WEEK", "WEEK", None)
+    grocery_lists = move_collections(db, "LIST", f"{user}#GROCERY_LIST", "GROCERY_LIST", None)
+    for collection in ("MEAL_PLAN", "GROCERY_LIST"):
+        move_version(db, (user, f"{COLLECTION_VERSION_PK}#{collection}"), (COLLECTION_VERSION_PK, collection))
+
+    logger.info(f"Migration rollback complete: Moved back {meal_plans} meal plans, {weeks} weeks and {grocery_lists} grocery lists")
@@ -0,0 +1,286 @@
+"""
+Nutrition of recipes and meal plans from per-ingredient nutrient vectors.
+
+Each ingredient's nutrition facts (per 100 g) are one row of a dense
+ingredients x nutrients matrix, held per gram on a warm container and rebuilt
+from one query whenever the INGREDIENT collection version moves. Any set of
+recipe lines then totals as one product: the lines' quantities, converted to
+grams (app.db.units), form a sparse (groups x ingredients) matrix, and
+
+    totals = quantities @ nutrients
+
+is computed as a single weighted np.bincount over (group, nutrient) pairs, so
+a recipe, a day or a month of meals costs the same few array operations.
+
+Meal plans roll up in two such products: recipe lines -> per-serving recipe
+vectors, then planned meals -> days, counting one serving per planned meal;
+days sum into ISO weeks (Monday to Sunday).
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.units import COUNT, UNIT_CODES, UNIT_DIMENSIONS, UNIT_FACTORS, convert, density, unit_codes
+from app.db.versions import INGREDIENT, get_collection_version
+from app.models.models import (
+    Ingredient as IngredientModel,
+    IngredientNutrition as IngredientNutritionModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+# Nutrient columns, in matrix order; all per 100 g in the table
+NUTRIENTS = ("calories", "protein", "fat", "carbohydrates", "fiber", "sugar", "sodium")
+
+GRAM = UNIT_CODES["g"]
+
+
+def line_totals(group_of_line: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    """
+    Sum (lines x nutrients) values into (groups x nutrients) in one pass.
+
+    Equivalent to the sparse product G @ values, where G[group, line] = 1 for
+    each line's group.
+    """
+    width = values.shape[1]
+    cells = group_of_line[:, None] * width + np.arange(width)
+    return np.bincount(cells.ravel(), weights=values.ravel(), minlength=group_count * width).reshape(group_count, width)
+
+
+def nutrients(vector: Sequence[float]) -> Dict[str, float]:
+    """A nutrient vector as a {nutrient: amount} dict."""
+    return {name: round(float(value), 2) for name, value in zip(NUTRIENTS, vector)}
+
+
+class NutritionMatrix:
+    """
+    Per-gram nutrient vectors of every ingredient with nutrition facts.
+
+    Args:
+        rows: (ingredient_id, name, grams_per_piece, density, *nutrients per 100 g) per ingredient
+        version: INGREDIENT collection version the rows were read at
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]], version: int):
+        self.version = version
+        rows = sorted(rows, key=lambda row: row[0])
+        self.ingredient_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        # One extra all-zero row stands in for ingredients without facts
+        self.matrix = np.zeros((len(rows) + 1, len(NUTRIENTS)))
+        self.densities = np.full(len(rows) + 1, np.nan)
+        self.piece_grams = np.full(len(rows) + 1, np.nan)
+        for position, (_, name, grams_per_piece, row_density, *values) in enumerate(rows):
+            self.matrix[position] = np.array(values, dtype=np.float64) / 100
+            if row_density is None:
+                row_density = density(name)
+            if row_density:
+                self.densities[position] = row_density
+            if grams_per_piece:
+                self.piece_grams[position] = grams_per_piece
+
+    def __len__(self) -> int:
+        return len(self.ingredient_ids)
+
+    def rows(self, ingredient_ids: np.ndarray) -> np.ndarray:
+        """Matrix row per ingredient id, the zero row for ids without facts."""
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ingredient_ids, ingredient_ids)
+        found = positions < len(self.ingredient_ids)
+        found[found] = self.ingredient_ids[positions[found]] == ingredient_ids[found]
+        return np.where(found, positions, len(self.ingredient_ids))
+
+    def grams(self, rows: np.ndarray, quantities: np.ndarray, units: Sequence[Optional[str]]) -> np.ndarray:
+        """Each line's quantity in grams, NaN where its unit can't be weighed."""
+        codes = unit_codes(units)
+        weighed = convert(quantities, codes, GRAM, self.densities[rows])
+        counted = np.asarray(quantities, dtype=np.float64) * UNIT_FACTORS[codes] * self.piece_grams[rows]
+        return np.where(UNIT_DIMENSIONS[codes] == COUNT, counted, weighed)
+
+    def totals(self, group_of_line: np.ndarray, ingredient_ids: np.ndarray, quantities: np.ndarray,
+               units: Sequence[Optional[str]], group_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nutrient totals of groups of recipe lines.
+
+        Args:
+            group_of_line: Group index per line, e.g. the line's recipe
+            ingredient_ids: Ingredient id per line
+            quantities: Quantity per line
+            units: Unit per line
+            group_count: Number of groups
+
+        Returns:
+            (group_count x nutrients) totals, and a mask of the lines left out
+            because the ingredient has no facts or the unit can't be weighed
+        """
+        if not len(ingredient_ids):
+            return np.zeros((group_count, len(NUTRIENTS))), np.zeros(0, dtype=bool)
+        rows = self.rows(ingredient_ids)
+        grams = self.grams(rows, quantities, units)
+        counted = ~np.isnan(grams) & (rows < len(self.ingredient_ids))
+        values = self.matrix[rows] * np.where(counted, grams, 0.0)[:, None]
+        return line_totals(np.asarray(group_of_line, dtype=np.int64), values, group_count), ~counted
+
+
+def facts_dict(facts: IngredientNutritionModel) -> Dict[str, Any]:
+    """An ingredient_nutrition row as the IngredientNutrition schema."""
+    return {
+        "ingredient_id": str(facts.ingredient_id),
+        **{name: getattr(facts, name) for name in NUTRIENTS},
+        "grams_per_piece": facts.grams_per_piece,
+        "density": facts.density,
+    }
+
+
+def nutrition_rows_query():
+    """Every ingredient's nutrition facts, with the ingredient name for density lookups."""
+    return select(
+        IngredientNutritionModel.ingredient_id,
+        IngredientModel.name,
+        IngredientNutritionModel.grams_per_piece,
+        IngredientNutritionModel.density,
+        *(getattr(IngredientNutritionModel, name) for name in NUTRIENTS)
+    ).join(IngredientModel, IngredientModel.id == IngredientNutritionModel.ingredient_id)
+
+
+_matrix: Optional[NutritionMatrix] = None
+
+
+def get_nutrition_matrix(db: Session, version: Optional[int] = None) -> NutritionMatrix:
+    """The nutrition matrix for the current INGREDIENT version, rebuilt if it moved."""
+    global _matrix
+    if version is None:
+        version = get_collection_version(db, INGREDIENT)
+    matrix = _matrix
+    if matrix is None or matrix.version != version:
+        matrix = _matrix = NutritionMatrix(db.execute(nutrition_rows_query()).all(), version)
+    return matrix
+
+
+def reset_nutrition_matrix() -> None:
+    """Forget the in-memory matrix, e.g. between tests."""
+    global _matrix
+    _matrix = None
+
+
+def recipe_nutrition(matrix: NutritionMatrix, lines: List[Dict[str, Any]],
+                     servings: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Total and per-serving nutrition of one recipe's ingredient lines.
+
+    Args:
+        matrix: Nutrition matrix
+        lines: {"ingredient_id", "quantity", "unit"} per ingredient
+        servings: Servings the recipe makes
+    """
+    lines = [line for line in lines if isinstance(line, dict) and str(line.get("ingredient_id", "")).isdigit()]
+    servings = int(servings or 1)
+    ingredient_ids = np.array([int(line["ingredient_id"]) for line in lines], dtype=np.int64)
+    quantities = np.array([float(line.get("quantity") or 0) for line in lines], dtype=np.float64)
+    totals, left_out = matrix.totals(
+        np.zeros(len(lines), dtype=np.int64), ingredient_ids, quantities, [line.get("unit") for line in lines], 1
+    )
+    return {
+        "servings": servings,
+        "total": nutrients(totals[0]),
+        "per_serving": nutrients(totals[0] / servings),
+        "unmeasured_ingredient_ids": sorted({str(i) for i in ingredient_ids[left_out].tolist()}),
+    }
+
+
+def meal_plan_nutrition(db: Session, start_date: date, end_date: date,
+                        ingredient_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Nutrition per day and per ISO week of the meals planned between two dates.
+
+    Each planned meal counts as one serving of its recipe.
+
+    Args:
+        db: Database session
+        start_date: First day, inclusive
+        end_date: Last day, inclusive
+        ingredient_version: Current INGREDIENT version, if the caller already read it
+
+    Returns:
+        {"start_date", "end_date", "total", "days": [{"date", "meals", "total"}],
+        "weeks": [{"week_start", "days", "total", "daily_average"}],
+        "unmeasured_ingredient_ids"} with a day for every date of the range
+    """
+    matrix = get_nutrition_matrix(db, ingredient_version)
+    day_count = (end_date - start_date).days + 1
+    meals = db.execute(
+        select(MealPlanModel.date, meal_plan_recipe.c.recipe_id)
+        .join(MealPlanModel, MealPlanModel.id == meal_plan_recipe.c.meal_plan_id)
+        .where(MealPlanModel.date >= start_date, MealPlanModel.date <= end_date)
+    ).all()
+
+    day_totals = np.zeros((day_count, len(NUTRIENTS)))
+    meal_counts = np.zeros(day_count, dtype=np.int64)
+    unmeasured: List[str] = []
+    if meals:
+        # 1. Recipe lines -> per-serving nutrient vector per recipe
+        recipe_ids, recipe_of_meal = np.unique(
+            np.array([meal.recipe_id for meal in meals], dtype=np.int64), return_inverse=True
+        )
+        servings = dict(db.execute(
+            select(RecipeModel.id, RecipeModel.servings).where(RecipeModel.id.in_(recipe_ids.tolist()))
+        ).all())
+        lines = db.execute(
+            select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id,
+                   recipe_ingredient.c.quantity, recipe_ingredient.c.unit)
+            .where(recipe_ingredient.c.recipe_id.in_(recipe_ids.tolist()))
+        ).all()
+        # Columns rather than rows: one pass over the result instead of one per attribute
+        line_recipes, line_ingredients, line_quantities, line_units = (list(column) for column in zip(*lines)) \
+            if lines else ([], [], [], [])
+        line_ingredients = np.array(line_ingredients, dtype=np.int64)
+        recipe_totals, left_out = matrix.totals(
+            np.searchsorted(recipe_ids, np.array(line_recipes, dtype=np.int64)),
+            line_ingredients,
+            np.array([quantity or 0.0 for quantity in line_quantities], dtype=np.float64),
+            line_units,
+            len(recipe_ids)
+        )
+        recipe_servings = np.array([servings.get(recipe_id) or 1 for recipe_id in recipe_ids.tolist()])
+        per_serving = recipe_totals / recipe_servings[:, None]
+        unmeasured = sorted({str(i) for i in line_ingredients[left_out].tolist()}, key=int)
+
+        # 2. Planned meals -> days
+        day_of_meal = np.array([(meal.date - start_date).days for meal in meals], dtype=np.int64)
+        day_totals = line_totals(day_of_meal, per_serving[recipe_of_meal], day_count)
+        meal_counts = np.bincount(day_of_meal, minlength=day_count)
+
+    # 3. Days -> ISO weeks
+    days = [start_date + timedelta(days=offset) for offset in range(day_count)]
+    week_starts = sorted({day - timedelta(days=day.weekday()) for day in days})
+    week_of_day = np.searchsorted(
+        np.array([week.toordinal() for week in week_starts]),
+        np.array([(day - timedelta(days=day.weekday())).toordinal() for day in days])
+    )
+    week_totals = line_totals(week_of_day, day_totals, len(week_starts))
+    days_per_week = np.bincount(week_of_day, minlength=len(week_starts))
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "total": nutrients(day_totals.sum(axis=0)),
+        "days": [
+            {"date": day.isoformat(), "meals": int(count), "total": nutrients(totals)}
+            for day, count, totals in zip(days, meal_counts.tolist(), day_totals)
+        ],
+        "weeks": [
+            {
+                "week_start": week.isoformat(),
+                "days": int(count),
+                "total": nutrients(totals),
+                "daily_average": nutrients(totals / count),
+            }
+            for week, count, totals in zip(week_starts, days_per_week.tolist(), week_totals)
+        ],
+        "unmeasured_ingredient_ids": unmeasured,
+    }
@@ -0,0 +1,390 @@
+"""
+Meal plan auto-generation.
+
+Fills every meal slot of a date range with a recipe so that
+
+- each slot's recipes pass the filters: total time (prep_time + cook_time),
+  difficulty, required and excluded tags, per slot and overall
+- a recipe is not planned twice within no_repeat_days of itself
+- the plan needs as few distinct ingredients as possible, so recipes that
+  share ingredients end up together and the grocery list stays short
+
+Recipes are compiled into feature arrays once per RECIPE version (see
+app.db.recipe_index): total time, difficulty code and a tag matrix for the
+filters, and each recipe's ingredients as CSR rows over a dense ingredient
+numbering for the objective. The search keeps a count of planned uses per
+ingredient, so the cost of putting any candidate into a slot, i.e. how many
+ingredients it would add to the list, is one pass over the candidates' CSR
+rows.
+
+The solver is a randomised greedy construction followed by local search:
+repeatedly empty a random slot and refill it with the best allowed
+candidate, taking improvements and, now and then, equal-cost moves to get
+off plateaus, until the time budget runs out or no move has helped for a
+while. Restarts use different seeds and the best plan wins; with
+PLANNER_PROCESSES set they run in parallel worker processes.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.db.coverage import recipe_ingredient_ids
+from app.db.recipe_index import LiveRecipeIndex
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for parallel restarts; 0 runs restarts one after another.
+# Leave at 0 on AWS Lambda, which has no shared memory for process pools.
+PLANNER_PROCESSES = int(os.environ.get("PLANNER_PROCESSES", "0"))
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Cost of one repeat inside the no-repeat window, in ingredients
+REPEAT_PENALTY = 1000
+
+# The construction picks at random among this many cheapest candidates
+GREEDY_CHOICES = 3
+
+# Chance of taking a move that neither helps nor hurts
+SIDEWAYS_PROBABILITY = 0.3
+
+# Local search stops after this many moves per slot without an improvement
+STALL_MOVES_PER_SLOT = 30
+
+
+def recipe_features(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """The planner's view of a recipe item."""
+    # v002 renamed prep_time to preparation_time; accept either
+    prep_time = recipe.get("prep_time")
+    if prep_time is None:
+        prep_time = recipe.get("preparation_time")
+    return {
+        "total_time": int(prep_time or 0) + int(recipe.get("cook_time") or 0),
+        "difficulty": recipe.get("difficulty"),
+        "tags": {str(tag).lower() for tag in recipe.get("tags") or []},
+        "ingredients": recipe_ingredient_ids(recipe),
+    }
+
+
+class FeatureArrays:
+    """
+    Recipe features compiled into arrays, one row per recipe.
+
+    Picklable, so restarts can run in worker processes.
+    """
+
+    def __init__(self, features: Dict[str, Dict[str, Any]]):
+        self.recipe_ids = sorted(features)
+        rows = [features[recipe_id] for recipe_id in self.recipe_ids]
+        self.total_times = np.array([row["total_time"] for row in rows], dtype=np.int32)
+        self.difficulties = np.array([
+            DIFFICULTIES.index(row["difficulty"]) if row["difficulty"] in DIFFICULTIES else -1 for row in rows
+        ], dtype=np.int8)
+        self.tag_names = sorted({tag for row in rows for tag in row["tags"]})
+        tag_codes = {tag: code for code, tag in enumerate(self.tag_names)}
+        self.tags = np.zeros((len(rows), len(self.tag_names)), dtype=bool)
+        for position, row in enumerate(rows):
+            self.tags[position, [tag_codes[tag] for tag in row["tags"]]] = True
+        ingredient_codes: Dict[str, int] = {}
+        indices = [
+            [
+                ingredient_codes.setdefault(ingredient_id, len(ingredient_codes))
+                for ingredient_id in sorted(row["ingredients"])
+            ]
+            for row in rows
+        ]
+        self.ingredient_count = len(ingredient_codes)
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(codes) for codes in indices])
+        self.indices = np.array([code for codes in indices for code in codes], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def select(self, max_total_time: Optional[int] = None, difficulties: Iterable[str] = (),
+               tags: Iterable[str] = (), exclude_tags: Iterable[str] = ()) -> np.ndarray:
+        """Mask of the recipes that pass the filters; tags must all be present."""
+        mask = np.ones(len(self), dtype=bool)
+        if max_total_time is not None:
+            mask &= self.total_times <= max_total_time
+        difficulties = [DIFFICULTIES.index(difficulty) for difficulty in difficulties if difficulty in DIFFICULTIES]
+        if difficulties:
+            mask &= np.isin(self.difficulties, difficulties)
+        for tag in {str(tag).lower() for tag in tags}:
+            if tag not in self.tag_names:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.tags[:, self.tag_names.index(tag)]
+        for tag in {str(tag).lower() for tag in exclude_tags}:
+            if tag in self.tag_names:
+                mask &= ~self.tags[:, self.tag_names.index(tag)]
+        return mask
+
+
+class RecipeFeatures:
+    """
+    Planner features of every recipe, compiled into FeatureArrays on demand.
+
+    Args:
+        version: RECIPE collection version the features reflect
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.features: Dict[str, Dict[str, Any]] = {}
+        self.compiled: Optional[FeatureArrays] = None
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> None:
+        self.features[recipe["id"]] = recipe_features(recipe)
+        self.compiled = None
+
+    def remove(self, recipe_id: str) -> None:
+        if self.features.pop(recipe_id, None) is not None:
+            self.compiled = None
+
+    def arrays(self) -> FeatureArrays:
+        """The compiled arrays, rebuilt after any change."""
+        if self.compiled is None:
+            self.compiled = FeatureArrays(self.features)
+        return self.compiled
+
+
+live_index = LiveRecipeIndex(RecipeFeatures)
+
+
+class PlanSearch:
+    """
+    One randomised greedy construction plus local search over a (days x slots) plan.
+
+    Args:
+        arrays: Compiled recipe features
+        slot_candidates: Recipe rows allowed in each slot
+        days: Number of days
+        no_repeat_days: A recipe may not recur within this many days of itself
+        rng: Random generator of this restart
+    """
+
+    def __init__(self, arrays: FeatureArrays, slot_candidates: Sequence[np.ndarray], days: int,
+                 no_repeat_days: int, rng: np.random.Generator):
+        self.arrays = arrays
+        self.rng = rng
+        self.no_repeat_days = no_repeat_days
+        self.plan = np.full((days, len(slot_candidates)), -1, dtype=np.int64)
+        self.counts = np.zeros(arrays.ingredient_count, dtype=np.int32)
+        # Each slot's candidates get their own CSR rows, so evaluating a slot
+        # touches only its candidates' ingredients
+        self.slots = []
+        for candidates in slot_candidates:
+            starts, ends = arrays.indptr[candidates], arrays.indptr[candidates + 1]
+            lengths = ends - starts
+            indptr = np.zeros(len(candidates) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum(lengths)
+            positions = np.arange(indptr[-1]) + np.repeat(starts - indptr[:-1], lengths)
+            indices = arrays.indices[positions]
+            self.slots.append((candidates, indptr, indices, lengths))
+
+    def ingredients(self, recipe: int) -> np.ndarray:
+        return self.arrays.indices[self.arrays.indptr[recipe]:self.arrays.indptr[recipe + 1]]
+
+    def place(self, day: int, slot: int, recipe: int) -> None:
+        self.plan[day, slot] = recipe
+        self.counts[self.ingredients(recipe)] += 1
+
+    def clear(self, day: int, slot: int) -> int:
+        recipe = int(self.plan[day, slot])
+        self.plan[day, slot] = -1
+        self.counts[self.ingredients(recipe)] -= 1
+        return recipe
+
+    def window(self, day: int) -> np.ndarray:
+        """Recipes planned within no_repeat_days of a day."""
+        if self.no_repeat_days <= 0:
+            return np.zeros(0, dtype=np.int64)
+        planned = self.plan[max(0, day - self.no_repeat_days + 1):day + self.no_repeat_days].ravel()
+        return planned[planned >= 0]
+
+    def repeats_in_window(self, day: int, recipes: np.ndarray) -> np.ndarray:
+        """How often each recipe is planned within no_repeat_days of a day."""
+        planned, times = np.unique(self.window(day), return_counts=True)
+        if not len(planned):
+            return np.zeros(len(recipes), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(planned, recipes), len(planned) - 1)
+        return np.where(planned[positions] == recipes, times[positions], 0)
+
+    def evaluate(self, day: int, slot: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        For an empty slot: its candidates, how many ingredients each would add
+        to the plan, and how many planned recipes inside the window each repeats.
+        """
+        candidates, indptr, indices, lengths = self.slots[slot]
+        present = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(self.counts[indices] > 0, out=present[1:])
+        added = lengths - (present[indptr[1:]] - present[indptr[:-1]])
+        return candidates, added, self.repeats_in_window(day, candidates)
+
+    def build(self) -> None:
+        """Fill the plan slot by slot, each time among the cheapest candidates."""
+        days, slot_count = self.plan.shape
+        for day in range(days):
+            for slot in self.rng.permutation(slot_count):
+                candidates, added, repeats = self.evaluate(day, slot)
+                cheapest = np.argsort(added + REPEAT_PENALTY * repeats, kind="stable")[:GREEDY_CHOICES]
+                # Never pick a repeat when a candidate without one is among the cheapest
+                cheapest = cheapest[repeats[cheapest] == repeats[cheapest[0]]]
+                self.place(day, slot, int(candidates[self.rng.choice(cheapest)]))
+
+    def improve(self, deadline: float) -> None:
+        """Refill random slots with cheaper candidates until the deadline or a long stall."""
+        days, slot_count = self.plan.shape
+        stall_limit = STALL_MOVES_PER_SLOT * days * slot_count
+        stalled = 0
+        while stalled < stall_limit and time.monotonic() < deadline:
+            stalled += 1
+            day, slot = int(self.rng.integers(days)), int(self.rng.integers(slot_count))
+            old = self.clear(day, slot)
+            freed = int(np.count_nonzero(self.counts[self.ingredients(old)] == 0))
+            old_repeats = int(np.count_nonzero(self.window(day) == old))
+            candidates, added, repeats = self.evaluate(day, slot)
+            # Change in plan cost per candidate; putting the old recipe back is 0
+            delta = added - freed + REPEAT_PENALTY * (repeats - old_repeats)
+            best = delta.min()
+            if best < 0 or (best == 0 and self.rng.random() < SIDEWAYS_PROBABILITY):
+                choices = np.flatnonzero(delta == best)
+                recipe = int(candidates[self.rng.choice(choices)])
+                if best < 0:
+                    stalled = 0
+            else:
+                recipe = old
+            self.place(day, slot, recipe)
+
+    def repeats(self) -> int:
+        """Pairs of the same recipe planned within no_repeat_days of each other."""
+        if self.no_repeat_days <= 0:
+            return 0
+        days = self.plan.shape[0]
+        pairs = 0
+        for day in range(days):
+            later = self.plan[day + 1:day + self.no_repeat_days].ravel()
+            row = self.plan[day]
+            pairs += int(np.isin(later, row).sum())
+            # Same recipe twice on one day
+            pairs += len(row) - len(np.unique(row))
+        return pairs
+
+    def distinct_ingredients(self) -> int:
+        return int(np.count_nonzero(self.counts))
+
+
+def search(arrays: FeatureArrays, slot_candidates: Sequence[np.ndarray], days: int, no_repeat_days: int,
+           seed: int, budget: float) -> Tuple[int, int, np.ndarray]:
+    """
+    One restart: build and improve a plan within budget seconds.
+
+    Returns:
+        (repeats, distinct ingredients, plan of recipe rows)
+    """
+    deadline = time.monotonic() + budget
+    plan_search = PlanSearch(arrays, slot_candidates, days, no_repeat_days, np.random.default_rng(seed))
+    plan_search.build()
+    plan_search.improve(deadline)
+    return plan_search.repeats(), plan_search.distinct_ingredients(), plan_search.plan
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PLANNER_PROCESSES)
+    return _pool
+
+
+def run_restarts(arrays: FeatureArrays, slot_candidates: Sequence[np.ndarray], days: int,
+                 no_repeat_days: int, seeds: List[int], budget: float) -> List[Tuple[int, int, np.ndarray]]:
+    """Run every restart, in worker processes when configured, else one after another."""
+    if PLANNER_PROCESSES > 0 and len(seeds) > 1:
+        try:
+            futures = [
+                process_pool().submit(search, arrays, slot_candidates, days, no_repeat_days, seed, budget)
+                for seed in seeds
+            ]
+            return [future.result() for future in futures]
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Planner process pool unavailable, running restarts in-process: {e}")
+    # Sequential restarts share the budget
+    return [
+        search(arrays, slot_candidates, days, no_repeat_days, seed, budget / len(seeds))
+        for seed in seeds
+    ]
+
+
+def generate_meal_plans(start_date: date, end_date: date, slots: List[Dict[str, Any]],
+                        max_total_time: Optional[int] = None, difficulties: Sequence[str] = (),
+                        tags: Sequence[str] = (), exclude_tags: Sequence[str] = (), no_repeat_days: int = 7,
+                        time_budget_ms: int = 500, restarts: int = 1, seed: Optional[int] = None,
+                        version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Plan the meals of a date range.
+
+    Args:
+        start_date: First day, inclusive
+        end_date: Last day, inclusive
+        slots: {"meal_type", "tags", "max_total_time"} per meal of the day
+        max_total_time: Most prep_time + cook_time minutes of any recipe
+        difficulties: Allowed difficulties, all if empty
+        tags: Tags every recipe must have
+        exclude_tags: Tags no recipe may have
+        no_repeat_days: A recipe may not recur within this many days of itself
+        time_budget_ms: Search time budget
+        restarts: Independent searches; the best plan wins
+        seed: Random seed, for reproducible plans
+        version: Current RECIPE version, if the caller already read it
+
+    Returns:
+        {"start_date", "end_date", "meal_plans": [MealPlanCreate payloads],
+        "distinct_ingredients", "repeats"}
+
+    Raises:
+        ValueError: If no recipe passes the filters of a slot
+    """
+    arrays = live_index.query(lambda index: index.arrays(), version)
+    allowed = arrays.select(max_total_time, difficulties, tags, exclude_tags)
+    slot_candidates = []
+    for slot in slots:
+        mask = allowed & arrays.select(slot.get("max_total_time"), (), slot.get("tags") or ())
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            raise ValueError(f"No recipes match the constraints for {slot['meal_type']}")
+        slot_candidates.append(candidates)
+
+    days = (end_date - start_date).days + 1
+    seeds = [int(entropy) for entropy in np.random.SeedSequence(seed).generate_state(restarts)]
+    results = run_restarts(arrays, slot_candidates, days, no_repeat_days, seeds, time_budget_ms / 1000)
+    repeats, distinct, plan = min(results, key=lambda result: (result[0], result[1]))
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "meal_plans": [
+            {
+                "date": (start_date + timedelta(days=day)).isoformat(),
+                "recipes": [
+                    {"recipe_id": arrays.recipe_ids[recipe], "meal_type": slot["meal_type"]}
+                    for slot, recipe in zip(slots, plan[day].tolist())
+                ],
+            }
+            for day in range(days)
+        ],
+        "distinct_ingredients": distinct,
+        "repeats": repeats,
+    }
@@ -0,0 +1,133 @@
+"""
+In-process indexes derived from the RECIPE partition.
+
+A derived index (full-text search, ingredient coverage, ...) is built lazily,
+on the first query of a warm container, and remembers the RECIPE collection
+version it reflects. Recipe writes made through this process are applied to
+it incrementally as they commit, advancing that version by one just like the
+write did; a write made by any other process shows up as a version mismatch
+on the next query and triggers a rebuild.
+
+Index classes implement the RecipeIndex protocol. Snapshot support is
+optional: with a snapshot path, every rebuild is saved there and a cold start
+loads it instead of scanning the table when its version is still current.
+"""
+
+import logging
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, Protocol, Type, TypeVar
+
+from app.db.dynamodb import get_collection_version, iter_partition, recipe_write_listeners
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeIndex(Protocol):
+    version: int
+
+    def __init__(self, version: int = 0) -> None: ...
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> None: ...
+
+    def remove(self, recipe_id: str) -> None: ...
+
+
+IndexT = TypeVar("IndexT", bound=RecipeIndex)
+T = TypeVar("T")
+
+
+class LiveRecipeIndex(Generic[IndexT]):
+    """
+    Lazily built, incrementally maintained holder of one derived index.
+
+    Args:
+        index_class: The index type, built empty with a version then fed every recipe
+        snapshot_path: File to save rebuilds to and load on a cold start; the
+            index class must then implement save(path) and load(path)
+    """
+
+    def __init__(self, index_class: Type[IndexT], snapshot_path: Optional[str] = None):
+        self.index_class = index_class
+        self.snapshot_path = snapshot_path
+        self.index: Optional[IndexT] = None
+        self.lock = threading.Lock()
+        recipe_write_listeners.append(self.apply)
+
+    def build(self, version: int) -> IndexT:
+        """Index every recipe, a page at a time."""
+        index = self.index_class(version)
+        for recipe in iter_partition('RECIPE'):
+            index.add_recipe(recipe)
+        return index
+
+    def load_snapshot(self) -> Optional[IndexT]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            return self.index_class.load(self.snapshot_path)
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Ignoring unreadable {self.index_class.__name__} snapshot: {e}")
+            return None
+
+    def save_snapshot(self, index: IndexT) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            index.save(self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not save {self.index_class.__name__} snapshot: {e}")
+
+    def fresh(self, version: int, current: Optional[Callable[[IndexT], bool]] = None) -> IndexT:
+        """
+        The index at the given RECIPE version, loading or rebuilding it if needed; hold the lock.
+
+        Args:
+            version: Current RECIPE collection version
+            current: Whether an index is otherwise up to date, for indexes that
+                also depend on data outside the RECIPE partition
+        """
+        if self.index is None:
+            self.index = self.load_snapshot()
+        if self.index is None or self.index.version != version or (current is not None and not current(self.index)):
+            # Read the version before scanning: a write racing the scan
+            # leaves the index behind and the next query rebuilds it
+            self.index = self.build(version)
+            self.save_snapshot(self.index)
+        return self.index
+
+    def query(
+        self,
+        func: Callable[[IndexT], T],
+        version: Optional[int] = None,
+        current: Optional[Callable[[IndexT], bool]] = None
+    ) -> T:
+        """
+        Run func against the index for the current RECIPE version, holding off writes meanwhile.
+
+        Args:
+            func: Reads the index and returns the answer
+            version: Current collection version, if the caller already read it
+            current: Passed on to fresh
+        """
+        if version is None:
+            version = get_collection_version('RECIPE')
+        with self.lock:
+            return func(self.fresh(version, current))
+
+    def apply(self, upserts: Iterable[Dict[str, Any]] = (), deletes: Iterable[str] = ()) -> None:
+        """Reflect one committed recipe write; does nothing until the index has been built."""
+        with self.lock:
+            if self.index is None:
+                return
+            for recipe in upserts:
+                self.index.add_recipe(recipe)
+            for recipe_id in deletes:
+                self.index.remove(recipe_id)
+            self.index.version += 1
+
+    def reset(self) -> None:
+        """Forget the in-memory index, e.g. between tests."""
+        with self.lock:
+            self.index = None
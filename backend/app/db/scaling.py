@@ -0,0 +1,296 @@
+"""
+Recipes scaled to a number of servings.
+
+Every quantity of a batch of recipes is scaled in one vectorised pass, then
+rounded the way a cook would measure it:
+
+- cups and spoons move up or down the tsp -> tbsp -> cup ladder, so 12 tsp
+  becomes 1/4 cup, and oz becomes lb from a pound up
+- g, ml and their multiples move between g and kg, ml and l, and are kept to
+  two significant figures
+- kitchen measures round to the nearest 1/8, 1/4, 1/3, 1/2, 2/3 or 3/4,
+  counts and unknown units to the nearest quarter, and anything from 10 up
+  to a whole number; a non-zero quantity never rounds to nothing
+
+Scaled lines are memoised per (recipe, servings). The key includes a stamp
+of the recipe's content, its item version for DynamoDB recipes and its lines
+for SQL ones, so an edited recipe simply misses the cache.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.units import UNIT_CODES, UNIT_FACTORS, UNIT_NAMES, UNKNOWN, unit_codes
+from app.models.models import (
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+# Scaled recipes kept in memory, least recently used dropped first
+MEMO_SIZE = 4096
+
+# Units each family of units may be expressed in, with the base-unit quantity
+# from which each one is used
+LADDERS = (
+    (("tsp", 0.0), ("tbsp", 15.0), ("cup", 60.0)),
+    (("mg", 0.0), ("g", 1.0), ("kg", 1000.0)),
+    (("ml", 0.0), ("l", 1000.0)),
+    (("oz", 0.0), ("lb", 453.59237)),
+)
+LADDER_UNITS = (("tsp", "tbsp", "cup"), ("mg", "g", "kg"), ("ml", "cl", "dl", "l"), ("oz", "lb"))
+
+KITCHEN_FRACTIONS = np.array([0, 1 / 8, 1 / 4, 1 / 3, 1 / 2, 2 / 3, 3 / 4, 1])
+COUNT_FRACTIONS = np.array([0, 1 / 4, 1 / 2, 3 / 4, 1])
+FRACTION_TEXT = {1 / 8: "1/8", 1 / 4: "1/4", 1 / 3: "1/3", 1 / 2: "1/2", 2 / 3: "2/3", 3 / 4: "3/4"}
+
+# Quantities from here up round to whole numbers
+WHOLE_FROM = 10
+
+# Codes of the units rounded to two significant figures, and to kitchen fractions
+METRIC = np.zeros(UNKNOWN + 1, dtype=bool)
+METRIC[[UNIT_CODES[name] for name in ("mg", "g", "kg", "ml", "cl", "dl", "l")]] = True
+KITCHEN = np.zeros(UNKNOWN + 1, dtype=bool)
+KITCHEN[[UNIT_CODES[name] for name in ("tsp", "tbsp", "cup", "fl oz", "pint", "quart", "gallon", "oz", "lb")]] = True
+
+# Ladder of each unit code, -1 for units that stay as they are
+LADDER_OF = np.full(UNKNOWN + 1, -1, dtype=np.int64)
+for _ladder, _names in enumerate(LADDER_UNITS):
+    LADDER_OF[[UNIT_CODES[name] for name in _names]] = _ladder
+
+
+def round_fractions(values: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """Round to a whole number plus the nearest of fractions; whole numbers from WHOLE_FROM."""
+    whole = np.floor(values)
+    nearest = fractions[np.abs((values - whole)[:, None] - fractions[None, :]).argmin(axis=1)]
+    rounded = np.where(values >= WHOLE_FROM, np.round(values), whole + nearest)
+    return np.where((rounded == 0) & (values > 0), fractions[1], rounded)
+
+
+def round_significant(values: np.ndarray, digits: int = 2) -> np.ndarray:
+    magnitude = 10.0 ** (np.floor(np.log10(np.where(values > 0, values, 1))) - (digits - 1))
+    return np.round(values / magnitude) * magnitude
+
+
+def nice_quantities(quantities: np.ndarray, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Express quantities in the unit a cook would use and round them to measurable amounts.
+
+    Args:
+        quantities: Quantity per line
+        codes: Registry code of each quantity's unit
+
+    Returns:
+        (rounded quantities, unit code of each)
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int64).copy()
+    base = quantities * UNIT_FACTORS[codes]
+    ladders = LADDER_OF[codes]
+    for ladder, steps in enumerate(LADDERS):
+        on_ladder = ladders == ladder
+        if not on_ladder.any():
+            continue
+        thresholds = np.array([threshold for _, threshold in steps])
+        step_codes = np.array([UNIT_CODES[name] for name, _ in steps])
+        step = np.maximum(np.searchsorted(thresholds, base[on_ladder], side="right") - 1, 0)
+        codes[on_ladder] = step_codes[step]
+    quantities = np.where(ladders >= 0, base / UNIT_FACTORS[codes], quantities)
+
+    rounded = round_fractions(quantities, COUNT_FRACTIONS)
+    rounded = np.where(KITCHEN[codes], round_fractions(quantities, KITCHEN_FRACTIONS), rounded)
+    rounded = np.where(METRIC[codes], round_significant(quantities), rounded)
+    # Strip float noise such as 7.300000000000001
+    return np.round(rounded, 6), codes
+
+
+def quantity_text(quantity: float) -> str:
+    """A rounded quantity as a cook reads it: "1 1/2", "1/3", "250", "7.5"."""
+    whole = int(quantity)
+    for value, text in FRACTION_TEXT.items():
+        if abs(quantity - whole - value) < 1e-6:
+            return f"{whole} {text}" if whole else text
+    return f"{quantity:g}"
+
+
+class ScaledLines:
+    """
+    Memo of scaled ingredient lines per (recipe stamp, servings).
+
+    A recipe's stamp is anything that changes whenever the recipe does.
+    """
+
+    def __init__(self):
+        self.memo: "OrderedDict[Tuple[Hashable, int], List[Dict[str, Any]]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def scale(self, recipes: Sequence[Tuple[Hashable, Optional[int], List[Dict[str, Any]]]],
+              servings: int) -> List[List[Dict[str, Any]]]:
+        """
+        Scale many recipes to the same servings, computing every cache miss in one pass.
+
+        Args:
+            recipes: (stamp, own servings, lines) per recipe, each line with
+                "ingredient_id", "name", "quantity" and "unit"
+            servings: Servings to scale to
+
+        Returns:
+            The scaled lines of each recipe, each line with "ingredient_id",
+            "name", "quantity", "unit" and "text"
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(recipes)
+        with self.lock:
+            for position, (stamp, _, _) in enumerate(recipes):
+                key = (stamp, servings)
+                if key in self.memo:
+                    self.memo.move_to_end(key)
+                    results[position] = self.memo[key]
+        misses = [position for position, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+
+        lines = [line for position in misses for line in recipes[position][2]]
+        factors = np.repeat(
+            [servings / recipes[position][1] if recipes[position][1] else 1.0 for position in misses],
+            [len(recipes[position][2]) for position in misses],
+        )
+        units = [line.get("unit") or "" for line in lines]
+        codes = unit_codes(units)
+        quantities, scaled_codes = nice_quantities(
+            np.array([float(line.get("quantity") or 0) for line in lines], dtype=np.float64) * factors, codes
+        )
+        scaled = [
+            {
+                "ingredient_id": str(line["ingredient_id"]),
+                "name": line.get("name"),
+                "quantity": quantity,
+                # Unknown units keep the recipe's own spelling
+                "unit": UNIT_NAMES[code] if code != UNKNOWN else unit,
+                "text": quantity_text(quantity),
+            }
+            for line, unit, quantity, code in zip(lines, units, quantities.tolist(), scaled_codes.tolist())
+        ]
+
+        start = 0
+        with self.lock:
+            for position in misses:
+                count = len(recipes[position][2])
+                results[position] = scaled[start:start + count]
+                start += count
+                self.memo[(recipes[position][0], servings)] = results[position]
+                if len(self.memo) > MEMO_SIZE:
+                    self.memo.popitem(last=False)
+        return results
+
+    def clear(self) -> None:
+        """Forget every scaled recipe, e.g. between tests."""
+        with self.lock:
+            self.memo.clear()
+
+
+scaled_lines = ScaledLines()
+
+
+def scale_recipe(recipe: Dict[str, Any], stamp: Hashable, servings: int) -> Dict[str, Any]:
+    """
+    A DynamoDB recipe item scaled to servings.
+
+    Args:
+        recipe: The recipe item
+        stamp: Changes whenever the item does, e.g. its ETag
+        servings: Servings to scale to
+    """
+    own_servings = int(recipe.get("servings") or 0) or None
+    lines = [line for line in recipe.get("ingredients") or [] if isinstance(line, dict) and "ingredient_id" in line]
+    [ingredients] = scaled_lines.scale([(("RECIPE", stamp), own_servings, lines)], servings)
+    return {
+        "recipe_id": recipe["id"],
+        "name": recipe.get("name"),
+        "servings": servings,
+        "original_servings": own_servings,
+        "factor": round(servings / own_servings, 6) if own_servings else 1.0,
+        "ingredients": ingredients,
+    }
+
+
+def scale_meal_plans(db: Session, start_date: date, end_date: date, servings: int) -> Dict[str, Any]:
+    """
+    Every meal planned between two dates, each recipe scaled to servings.
+
+    Args:
+        db: Database session
+        start_date: First day, inclusive
+        end_date: Last day, inclusive
+        servings: Servings to scale every recipe to
+
+    Returns:
+        {"start_date", "end_date", "servings", "days": [{"date", "meal_plan_id",
+        "meals": [{"meal_type", scaled recipe fields...}]}]} with only planned days
+    """
+    meals = db.execute(
+        select(MealPlanModel.date, MealPlanModel.id, meal_plan_recipe.c.meal_type, meal_plan_recipe.c.recipe_id)
+        .select_from(meal_plan_recipe)
+        .join(MealPlanModel, MealPlanModel.id == meal_plan_recipe.c.meal_plan_id)
+        .where(MealPlanModel.date >= start_date, MealPlanModel.date <= end_date)
+        .order_by(MealPlanModel.date, MealPlanModel.id, meal_plan_recipe.c.meal_type, meal_plan_recipe.c.recipe_id)
+    ).all()
+    recipe_ids = sorted({meal.recipe_id for meal in meals})
+    recipes = {
+        recipe.id: recipe
+        for recipe in db.execute(
+            select(RecipeModel.id, RecipeModel.name, RecipeModel.servings).where(RecipeModel.id.in_(recipe_ids))
+        )
+    }
+    lines: Dict[int, List[Dict[str, Any]]] = {recipe_id: [] for recipe_id in recipe_ids}
+    for line in db.execute(
+        select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id, IngredientModel.name,
+               recipe_ingredient.c.quantity, recipe_ingredient.c.unit)
+        .outerjoin(IngredientModel, IngredientModel.id == recipe_ingredient.c.ingredient_id)
+        .where(recipe_ingredient.c.recipe_id.in_(recipe_ids))
+        .order_by(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id)
+    ):
+        lines[line.recipe_id].append(
+            {"ingredient_id": line.ingredient_id, "name": line.name, "quantity": line.quantity, "unit": line.unit}
+        )
+
+    own_servings = {recipe_id: recipe.servings or None for recipe_id, recipe in recipes.items()}
+    # SQL recipes carry no version, so their content is the stamp
+    batch = [
+        (
+            ("SQL", recipe_id, own_servings.get(recipe_id), tuple(tuple(line.values()) for line in lines[recipe_id])),
+            own_servings.get(recipe_id),
+            lines[recipe_id],
+        )
+        for recipe_id in recipe_ids
+    ]
+    scaled = dict(zip(recipe_ids, scaled_lines.scale(batch, servings)))
+
+    days: List[Dict[str, Any]] = []
+    for meal in meals:
+        meal_plan_id = str(meal.id)
+        if not days or days[-1]["meal_plan_id"] != meal_plan_id:
+            days.append({"date": meal.date.isoformat(), "meal_plan_id": meal_plan_id, "meals": []})
+        recipe_servings = own_servings.get(meal.recipe_id)
+        days[-1]["meals"].append({
+            "meal_type": meal.meal_type,
+            "recipe_id": str(meal.recipe_id),
+            "name": recipes[meal.recipe_id].name if meal.recipe_id in recipes else None,
+            "servings": servings,
+            "original_servings": recipe_servings,
+            "factor": round(servings / recipe_servings, 6) if recipe_servings else 1.0,
+            "ingredients": scaled[meal.recipe_id],
+        })
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "servings": servings,
+        "days": days,
+    }
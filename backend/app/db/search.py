@@ -0,0 +1,335 @@
+"""
+In-process full-text search over recipes.
+
+An inverted index maps each stemmed term to the recipes containing it and how
+often, weighted by field: a match in the name counts more than one buried in
+the instructions. Queries are ranked with BM25 and the top hits are picked
+with a heap, so a search touches only the postings of its own terms.
+
+The index is built lazily and kept current by recipe writes (see
+app.db.recipe_index). Ingredient lines without a display name are indexed by
+their ingredient's name in the SQL catalog; the index remembers the INGREDIENT
+version it read, and a query at a newer one rebuilds it. If SEARCH_INDEX_SNAPSHOT names a file, every rebuild is
+saved there as a compressed snapshot, and a cold start loads it instead of
+scanning the table when its version is still current.
+"""
+
+import heapq
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.dynamodb import batch_get
+from app.db.recipe_index import LiveRecipeIndex
+from app.db.versions import INGREDIENT, get_collection_version
+from app.models.models import Ingredient as IngredientModel
+
+SEARCH_INDEX_SNAPSHOT = os.environ.get("SEARCH_INDEX_SNAPSHOT")
+
+# How much one occurrence of a term counts, by field
+FIELD_WEIGHTS = {
+    "name": 3,
+    "tags": 2,
+    "ingredients": 2,
+    "description": 1,
+    "instructions": 1,
+}
+
+# BM25 parameters: term frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+SNAPSHOT_FORMAT = 2
+
+# catalog_version of an index mixing names from several INGREDIENT versions
+STALE_CATALOG = -1
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the then to with".split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Suffix rewrites, first match wins
+SUFFIXES = (
+    ("sses", "ss"),
+    ("ies", "y"),
+    ("ied", "y"),
+    ("oes", "o"),
+    ("ing", ""),
+    ("ed", ""),
+    ("ly", ""),
+    ("ss", "ss"),
+    ("s", ""),
+)
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix-stripping stemmer for English cooking vocabulary.
+
+    Maps inflections onto one stem, e.g. bake/baked/baking/bakes -> bak,
+    chopped/chops -> chop, tomatoes -> tomato, berries -> berry.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            break
+    # chopp -> chop, but keep grill, glass
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+        word = word[:-1]
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into stemmed terms, dropping stop words."""
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class IngredientCatalog(NamedTuple):
+    """Ingredient names by id, as of an INGREDIENT collection version."""
+    version: int
+    names: Dict[str, str]
+
+
+_catalog: Optional[IngredientCatalog] = None
+
+
+def get_ingredient_catalog(db: Session, version: Optional[int] = None) -> IngredientCatalog:
+    """The ingredient names for the current INGREDIENT version, reloaded if it moved."""
+    global _catalog
+    if version is None:
+        version = get_collection_version(db, INGREDIENT)
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        rows = db.execute(select(IngredientModel.id, IngredientModel.name)).all()
+        catalog = _catalog = IngredientCatalog(version, {str(row.id): row.name or "" for row in rows})
+    return catalog
+
+
+def current_ingredient_catalog() -> IngredientCatalog:
+    """The catalog queries last loaded, for indexing recipe writes between queries."""
+    if _catalog is None:
+        with SessionLocal() as db:
+            return get_ingredient_catalog(db)
+    return _catalog
+
+
+def reset_ingredient_catalog() -> None:
+    """Forget the in-memory catalog, e.g. between tests."""
+    global _catalog
+    _catalog = None
+
+
+def unnamed_lines(recipe: Dict[str, Any]) -> bool:
+    """Whether any ingredient line of a recipe needs its name from the catalog."""
+    return any(
+        isinstance(line, dict) and not line.get("name") and line.get("ingredient_id") is not None
+        for line in recipe.get("ingredients") or []
+    )
+
+
+def line_name(line: Dict[str, Any], ingredient_names: Dict[str, str]) -> str:
+    """An ingredient line's display name, else its catalog ingredient's name."""
+    if line.get("name"):
+        return line["name"]
+    return ingredient_names.get(str(line.get("ingredient_id")), "")
+
+
+def recipe_text(recipe: Dict[str, Any], ingredient_names: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    The searchable text of a recipe item, by field.
+
+    Args:
+        recipe: Recipe item
+        ingredient_names: Catalog names by ingredient id, for lines without a display name
+    """
+    ingredients = [line for line in recipe.get("ingredients") or [] if isinstance(line, dict)]
+    return {
+        "name": recipe.get("name") or "",
+        "tags": " ".join(recipe.get("tags") or []),
+        "ingredients": " ".join(line_name(line, ingredient_names or {}) for line in ingredients),
+        "description": recipe.get("description") or "",
+        "instructions": recipe.get("instructions") or "",
+    }
+
+
+def document_terms(recipe: Dict[str, Any], ingredient_names: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """Field-weighted term frequencies of a recipe."""
+    terms: Counter = Counter()
+    for field, text in recipe_text(recipe, ingredient_names).items():
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(text):
+            terms[term] += weight
+    return dict(terms)
+
+
+class SearchIndex:
+    """
+    Inverted index over recipes with BM25 ranking.
+
+    Args:
+        version: RECIPE collection version the index reflects
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        # term -> {recipe_id: weighted term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # recipe_id -> {term: weighted term frequency}, kept for removal and snapshots
+        self.documents: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # INGREDIENT version of the catalog names indexed, None while none were needed
+        self.catalog_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, recipe_id: str, terms: Dict[str, int]) -> None:
+        """Index a recipe's terms, replacing any previous version of it."""
+        self.remove(recipe_id)
+        self.documents[recipe_id] = terms
+        length = sum(terms.values())
+        self.lengths[recipe_id] = length
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[recipe_id] = frequency
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> None:
+        self.add(recipe["id"], document_terms(recipe, self.catalog_names(recipe)))
+
+    def catalog_names(self, recipe: Dict[str, Any]) -> Dict[str, str]:
+        """Catalog names for the recipe's unnamed ingredient lines, noting the version they come from."""
+        if not unnamed_lines(recipe):
+            return {}
+        catalog = current_ingredient_catalog()
+        if self.catalog_version is None:
+            self.catalog_version = catalog.version
+        elif self.catalog_version != catalog.version:
+            # Recipes indexed earlier used other names, so the next query rebuilds
+            self.catalog_version = STALE_CATALOG
+        return catalog.names
+
+    def catalog_current(self, ingredient_version: int) -> bool:
+        """Whether the catalog names indexed are those of the given INGREDIENT version."""
+        return self.catalog_version is None or self.catalog_version == ingredient_version
+
+    def remove(self, recipe_id: str) -> None:
+        """Drop a recipe from the index, if present."""
+        terms = self.documents.pop(recipe_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(recipe_id)
+        for term in terms:
+            postings = self.postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """The top recipes for a query as (recipe_id, score), best first."""
+        count = len(self.documents)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores: Dict[str, float] = {}
+        for term in dict.fromkeys(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for recipe_id, frequency in postings.items():
+                norm = K1 * (1 - B + B * self.lengths[recipe_id] / average_length)
+                scores[recipe_id] = scores.get(recipe_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        # Ties go to the lower id so results are stable
+        best = heapq.nsmallest(limit, scores.items(), key=lambda hit: (-hit[1], hit[0]))
+        return [(recipe_id, round(score, 6)) for recipe_id, score in best]
+
+    def to_bytes(self) -> bytes:
+        """Serialise the index as a compact snapshot; postings are rebuilt on load."""
+        # Number the vocabulary once so each document stores small integers
+        vocabulary = sorted(self.postings)
+        term_ids = {term: term_id for term_id, term in enumerate(vocabulary)}
+        documents = {
+            recipe_id: [value for term, frequency in terms.items() for value in (term_ids[term], frequency)]
+            for recipe_id, terms in self.documents.items()
+        }
+        payload = {
+            "format": SNAPSHOT_FORMAT,
+            "version": self.version,
+            "catalog_version": self.catalog_version,
+            "terms": vocabulary,
+            "documents": documents,
+        }
+        return zlib.compress(orjson.dumps(payload), 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SearchIndex":
+        payload = orjson.loads(zlib.decompress(data))
+        if payload.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported search index snapshot format {payload.get('format')}")
+        index = cls(payload["version"])
+        index.catalog_version = payload["catalog_version"]
+        vocabulary = payload["terms"]
+        for recipe_id, pairs in payload["documents"].items():
+            index.add(recipe_id, {vocabulary[pairs[i]]: pairs[i + 1] for i in range(0, len(pairs), 2)})
+        return index
+
+    def save(self, path: str) -> None:
+        """Write a snapshot atomically, so a reader never sees half a file."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as snapshot:
+            snapshot.write(self.to_bytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        with open(path, "rb") as snapshot:
+            return cls.from_bytes(snapshot.read())
+
+
+live_index = LiveRecipeIndex(SearchIndex, SEARCH_INDEX_SNAPSHOT)
+
+
+def search_recipes(
+    query: str, limit: int = 10, version: Optional[int] = None, ingredient_version: Optional[int] = None
+) -> List[Tuple[str, float]]:
+    """
+    The top recipes for a query as (recipe_id, score), best first.
+
+    Args:
+        query: Search text
+        limit: Most hits to return
+        version: Current RECIPE collection version, if the caller already read it
+        ingredient_version: Current INGREDIENT collection version, if the caller already loaded its catalog
+    """
+    if ingredient_version is None:
+        ingredient_version = current_ingredient_catalog().version
+    return live_index.query(
+        lambda index: index.search(query, limit), version, lambda index: index.catalog_current(ingredient_version)
+    )
+
+
+def find_recipes(
+    query: str, limit: int = 10, version: Optional[int] = None, ingredient_version: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """The top recipe items for a query, best first, each with its "score"."""
+    hits = search_recipes(query, limit, version, ingredient_version)
+    if not hits:
+        return []
+    items = {item["id"]: item for item in batch_get([{'PK': 'RECIPE', 'SK': recipe_id} for recipe_id, _ in hits])}
+    # A recipe deleted since the index was built is simply skipped
+    return [{**items[recipe_id], "score": score} for recipe_id, score in hits if recipe_id in items]
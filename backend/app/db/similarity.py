@@ -0,0 +1,241 @@
+"""
+Recipe similarity over TF-IDF vectors of ingredients and tags.
+
+Every recipe is a sparse vector with one feature per ingredient id and per
+tag, weighted by IDF so that sharing saffron says more than sharing salt.
+The vectors are the rows of an L2-normalised CSR matrix, so cosine
+similarity is a dot product. A term-major copy of the same matrix lets a
+query touch only the recipes sharing at least one of its features.
+
+The index is built lazily and kept current by recipe writes (see
+app.db.recipe_index). A write only re-reads the changed recipe's features;
+the matrix is recompiled from the stored features in one vectorised pass on
+the next query, since every IDF shifts with the collection. If
+SIMILARITY_INDEX_SNAPSHOT names a file, every rebuild is saved there as a
+flat binary file that a cold start memory-maps instead of scanning the
+table and recomputing the matrix.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from app.db.coverage import recipe_ingredient_ids
+from app.db.dynamodb import batch_get
+from app.db.recipe_index import LiveRecipeIndex
+
+SIMILARITY_INDEX_SNAPSHOT = os.environ.get("SIMILARITY_INDEX_SNAPSHOT")
+
+# Weight of a feature before IDF, by kind; a shared tag says less than a shared ingredient
+INGREDIENT_WEIGHT = 1.0
+TAG_WEIGHT = 0.5
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_MAGIC = b"RSIM"
+
+# Snapshot arrays start on this boundary so memory-mapped views are aligned
+SNAPSHOT_ALIGNMENT = 64
+
+# The compiled matrix, as stored in a snapshot
+MATRIX_ARRAYS = ("indptr", "indices", "weights", "data", "term_indptr", "term_rows", "term_data")
+
+
+def recipe_terms(recipe: Dict[str, Any]) -> Dict[str, float]:
+    """The features of a recipe item with their weights before IDF."""
+    terms = {f"ingredient:{ingredient_id}": INGREDIENT_WEIGHT for ingredient_id in recipe_ingredient_ids(recipe)}
+    terms.update({f"tag:{str(tag).lower()}": TAG_WEIGHT for tag in recipe.get("tags") or []})
+    return terms
+
+
+def aligned(offset: int) -> int:
+    return -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+class SimilarityIndex:
+    """
+    Normalised TF-IDF matrix over recipes with cosine top-k queries.
+
+    Args:
+        version: RECIPE collection version the index reflects
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.terms: List[str] = []
+        self.term_ids: Dict[str, int] = {}
+        # Recipe rows over term columns: feature weights before IDF, and the
+        # normalised TF-IDF values
+        self.recipe_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.data = np.zeros(0, dtype=np.float32)
+        # The same matrix term-major: for each term, the rows having it and their values
+        self.term_indptr = np.zeros(1, dtype=np.int64)
+        self.term_rows = np.zeros(0, dtype=np.int32)
+        self.term_data = np.zeros(0, dtype=np.float32)
+        # Writes since the matrix was compiled: recipe_id -> (term ids, weights), None if removed
+        self.pending: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+
+    def __len__(self) -> int:
+        self.compile()
+        return len(self.recipe_ids)
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> None:
+        terms = recipe_terms(recipe)
+        term_ids = []
+        for term in terms:
+            if term not in self.term_ids:
+                self.term_ids[term] = len(self.terms)
+                self.terms.append(term)
+            term_ids.append(self.term_ids[term])
+        self.pending[recipe["id"]] = (
+            np.array(term_ids, dtype=np.int32), np.array(list(terms.values()), dtype=np.float32)
+        )
+
+    def remove(self, recipe_id: str) -> None:
+        self.pending[recipe_id] = None
+
+    def compile(self) -> None:
+        """Fold pending writes into the matrix and reweigh it; cheap when nothing changed."""
+        if not self.pending:
+            return
+        keep = np.array([recipe_id not in self.pending for recipe_id in self.recipe_ids], dtype=bool)
+        lengths = np.diff(self.indptr)
+        kept_entries = np.repeat(keep, lengths)
+        added = [(recipe_id, change) for recipe_id, change in self.pending.items() if change is not None]
+        self.pending = {}
+
+        self.recipe_ids = [recipe_id for recipe_id, kept in zip(self.recipe_ids, keep.tolist()) if kept]
+        self.recipe_ids += [recipe_id for recipe_id, _ in added]
+        self.rows = {recipe_id: row for row, recipe_id in enumerate(self.recipe_ids)}
+        lengths = np.concatenate([lengths[keep], [len(term_ids) for _, (term_ids, _) in added]]).astype(np.int64)
+        self.indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.concatenate([self.indices[kept_entries]] + [term_ids for _, (term_ids, _) in added])
+        self.weights = np.concatenate([self.weights[kept_entries]] + [weights for _, (_, weights) in added])
+        self.reweigh()
+
+    def reweigh(self) -> None:
+        """Recompute the IDF weights, row norms and the term-major copy from indptr, indices and weights."""
+        count = len(self.recipe_ids)
+        term_count = len(self.terms)
+        document_frequency = np.bincount(self.indices, minlength=term_count)
+        idf = np.log((1 + count) / (1 + document_frequency)) + 1
+        rows = np.repeat(np.arange(count, dtype=np.int32), np.diff(self.indptr))
+        data = self.weights * idf[self.indices]
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=count))
+        self.data = (data / np.where(norms > 0, norms, 1)[rows]).astype(np.float32)
+
+        order = np.argsort(self.indices, kind="stable")
+        self.term_indptr = np.zeros(term_count + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.term_indptr[1:])
+        self.term_rows = rows[order]
+        self.term_data = self.data[order]
+
+    def similar(self, recipe_id: str, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        The recipes most like one, as (recipe_id, cosine similarity), best first.
+
+        Returns:
+            None if the recipe isn't indexed; recipes sharing no feature are never listed
+        """
+        self.compile()
+        row = self.rows.get(recipe_id)
+        if row is None:
+            return None
+        start, end = self.indptr[row], self.indptr[row + 1]
+        terms, values = self.indices[start:end], self.data[start:end]
+        # Gather the term-major postings of the recipe's own terms
+        starts, ends = self.term_indptr[terms], self.term_indptr[terms + 1]
+        lengths = ends - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+        scores = np.bincount(
+            self.term_rows[positions],
+            weights=self.term_data[positions] * np.repeat(values, lengths),
+            minlength=len(self.recipe_ids),
+        )
+        scores[row] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            # Keep everything tied with the limit-th score so ties break by id below
+            threshold = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= threshold]
+        best = sorted(candidates.tolist(), key=lambda candidate: (-scores[candidate], self.recipe_ids[candidate]))
+        return [(self.recipe_ids[candidate], round(float(scores[candidate]), 6)) for candidate in best[:limit]]
+
+    def save(self, path: str) -> None:
+        """
+        Write a snapshot atomically: a JSON header, then every matrix array raw
+        and aligned, so load() can map them without parsing or copying.
+        """
+        self.compile()
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in MATRIX_ARRAYS}
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = [array.dtype.str, len(array), offset]
+            offset = aligned(offset + array.nbytes)
+        header = orjson.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "version": self.version,
+            "terms": self.terms,
+            "recipe_ids": self.recipe_ids,
+            "arrays": layout,
+        })
+        start = aligned(len(SNAPSHOT_MAGIC) + 8 + len(header))
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as snapshot:
+            snapshot.write(SNAPSHOT_MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, array in arrays.items():
+                snapshot.seek(start + layout[name][2])
+                snapshot.write(array.tobytes())
+            snapshot.truncate(start + offset)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        """Map a snapshot read-only; later writes replace the arrays rather than touch the file."""
+        with open(path, "rb") as snapshot:
+            if snapshot.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError("Not a similarity index snapshot")
+            header_length = int.from_bytes(snapshot.read(8), "little")
+            header = orjson.loads(snapshot.read(header_length))
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported similarity index snapshot format {header.get('format')}")
+        start = aligned(len(SNAPSHOT_MAGIC) + 8 + header_length)
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        index = cls(header["version"])
+        index.terms = header["terms"]
+        index.term_ids = {term: term_id for term_id, term in enumerate(index.terms)}
+        index.recipe_ids = header["recipe_ids"]
+        index.rows = {recipe_id: row for row, recipe_id in enumerate(index.recipe_ids)}
+        for name in MATRIX_ARRAYS:
+            dtype, length, offset = header["arrays"][name]
+            dtype = np.dtype(dtype)
+            view = mapped[start + offset:start + offset + length * dtype.itemsize]
+            if len(view) != length * dtype.itemsize:
+                raise ValueError(f"Truncated similarity index snapshot: {name}")
+            setattr(index, name, view.view(dtype))
+        return index
+
+
+live_index = LiveRecipeIndex(SimilarityIndex, SIMILARITY_INDEX_SNAPSHOT)
+
+
+def find_similar(recipe_id: str, limit: int = 10, version: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    The recipe items most like one, best first, each with its "similarity".
+
+    Returns:
+        None if the recipe doesn't exist
+    """
+    hits = live_index.query(lambda index: index.similar(recipe_id, limit), version)
+    if not hits:
+        return hits
+    items = {item["id"]: item for item in batch_get([{'PK': 'RECIPE', 'SK': hit_id} for hit_id, _ in hits])}
+    # A recipe deleted since the index was built is simply skipped
+    return [{**items[hit_id], "similarity": similarity} for hit_id, similarity in hits if hit_id in items]
@@ -0,0 +1,214 @@
+"""
+Unit registry and vectorised quantity conversion.
+
+Recipe and grocery quantities carry free-form unit strings. The registry maps
+every spelling it knows ("Tablespoons", "tbs.", "tbsp") onto a canonical unit,
+and every canonical unit onto a dimension and its size in that dimension's
+base unit:
+
+    mass    g     mg, g, kg, oz, lb
+    volume  ml    ml, cl, dl, l, tsp, tbsp, fl oz, cup, pint, quart, gallon
+    count   pcs   pcs, dozen
+
+Units are turned into small integer codes once, and the registry is compiled
+into NumPy arrays indexed by code, so converting any number of quantities is a
+few array lookups and multiplications. Volume and mass convert into each
+other through the ingredient's density; anything else that can't be
+converted comes out as NaN. Unknown units get the UNKNOWN code and are left
+for the caller to handle by name.
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+MASS, VOLUME, COUNT = 0, 1, 2
+DIMENSION_NAMES = ("mass", "volume", "count")
+BASE_UNITS = ("g", "ml", "pcs")
+
+# Canonical unit -> (dimension, size in the base unit). Spoons and cups use the
+# rounded metric values recipes are written with.
+UNITS = {
+    "mg": (MASS, 0.001),
+    "g": (MASS, 1.0),
+    "kg": (MASS, 1000.0),
+    "oz": (MASS, 28.349523125),
+    "lb": (MASS, 453.59237),
+    "ml": (VOLUME, 1.0),
+    "cl": (VOLUME, 10.0),
+    "dl": (VOLUME, 100.0),
+    "l": (VOLUME, 1000.0),
+    "tsp": (VOLUME, 5.0),
+    "tbsp": (VOLUME, 15.0),
+    "fl oz": (VOLUME, 29.5735295625),
+    "cup": (VOLUME, 240.0),
+    "pint": (VOLUME, 473.176473),
+    "quart": (VOLUME, 946.352946),
+    "gallon": (VOLUME, 3785.411784),
+    "pcs": (COUNT, 1.0),
+    "dozen": (COUNT, 12.0),
+}
+
+# Other spellings -> canonical unit, matched after lowercasing and dropping
+# periods; a trailing plural "s" is tried too
+ALIASES = {
+    "milligram": "mg",
+    "gr": "g",
+    "gram": "g",
+    "gramme": "g",
+    "kilo": "kg",
+    "kilogram": "kg",
+    "ounce": "oz",
+    "pound": "lb",
+    "lbs": "lb",
+    "milliliter": "ml",
+    "millilitre": "ml",
+    "centiliter": "cl",
+    "centilitre": "cl",
+    "deciliter": "dl",
+    "decilitre": "dl",
+    "liter": "l",
+    "litre": "l",
+    "lt": "l",
+    "teaspoon": "tsp",
+    "tsps": "tsp",
+    "tablespoon": "tbsp",
+    "tbsps": "tbsp",
+    "tbs": "tbsp",
+    "tbl": "tbsp",
+    "fluid ounce": "fl oz",
+    "floz": "fl oz",
+    "c": "cup",
+    "pt": "pint",
+    "qt": "quart",
+    "gal": "gallon",
+    "": "pcs",
+    "pc": "pcs",
+    "piece": "pcs",
+    "each": "pcs",
+    "ea": "pcs",
+    "whole": "pcs",
+    "x": "pcs",
+    "doz": "dozen",
+}
+
+# Grams per millilitre, by lowercased ingredient name. A name without an entry
+# is matched by its trailing words, so "extra virgin olive oil" uses "olive oil".
+DENSITIES = {
+    "water": 1.0,
+    "milk": 1.03,
+    "buttermilk": 1.03,
+    "cream": 1.0,
+    "yogurt": 1.03,
+    "butter": 0.96,
+    "oil": 0.92,
+    "olive oil": 0.92,
+    "honey": 1.42,
+    "maple syrup": 1.32,
+    "flour": 0.53,
+    "sugar": 0.85,
+    "brown sugar": 0.93,
+    "powdered sugar": 0.56,
+    "salt": 1.2,
+    "rice": 0.85,
+    "oats": 0.38,
+    "cocoa powder": 0.42,
+}
+
+# The compiled registry: one row per canonical unit, plus a last row for
+# units the registry doesn't know
+UNIT_NAMES: Tuple[str, ...] = tuple(UNITS)
+UNIT_CODES = {name: code for code, name in enumerate(UNIT_NAMES)}
+UNKNOWN = len(UNIT_NAMES)
+UNIT_DIMENSIONS = np.array([dimension for dimension, _ in UNITS.values()] + [-1], dtype=np.int8)
+UNIT_FACTORS = np.array([factor for _, factor in UNITS.values()] + [np.nan])
+BASE_CODES = np.array([UNIT_CODES[name] for name in BASE_UNITS], dtype=np.int64)
+
+
+def normalize_unit(text: Optional[str]) -> str:
+    """Lowercase, drop periods and collapse whitespace."""
+    return " ".join((text or "").lower().replace(".", " ").split())
+
+
+@lru_cache(maxsize=4096)
+def parse_unit(text: Optional[str]) -> Optional[str]:
+    """The canonical unit for a spelling, or None if the registry doesn't know it."""
+    key = normalize_unit(text)
+    for candidate in (key, key[:-1] if key.endswith("s") else None):
+        if candidate is None:
+            continue
+        if candidate in UNITS:
+            return candidate
+        if candidate in ALIASES:
+            return ALIASES[candidate]
+    return None
+
+
+def unit_code(text: Optional[str]) -> int:
+    """The registry code for a unit spelling, UNKNOWN if it isn't known."""
+    unit = parse_unit(text)
+    return UNIT_CODES[unit] if unit is not None else UNKNOWN
+
+
+def unit_codes(units: Iterable[Optional[str]]) -> np.ndarray:
+    """Registry codes for a sequence of unit spellings, parsing each distinct spelling once."""
+    units = ["" if unit is None else unit for unit in units]
+    if not units:
+        return np.zeros(0, dtype=np.int64)
+    spellings, spelling_of_unit = np.unique(np.array(units, dtype=object).astype(str), return_inverse=True)
+    codes = np.array([unit_code(spelling) for spelling in spellings.tolist()], dtype=np.int64)
+    return codes[spelling_of_unit]
+
+
+def density(name: Optional[str]) -> Optional[float]:
+    """Grams per millilitre for an ingredient name, if the registry has it."""
+    words = " ".join((name or "").lower().split()).split(" ")
+    for start in range(len(words)):
+        value = DENSITIES.get(" ".join(words[start:]))
+        if value is not None:
+            return value
+    return None
+
+
+def convert(quantities: np.ndarray, from_codes: np.ndarray, to_codes: Union[np.ndarray, int],
+            densities: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert quantities between units in one vectorised pass.
+
+    Args:
+        quantities: Quantity per line
+        from_codes: Registry code of each quantity's unit
+        to_codes: Registry code to convert each line to, or one code for all
+        densities: Grams per millilitre per line, NaN where unknown; needed
+            only for volume <-> mass
+
+    Returns:
+        The converted quantities, NaN where the units can't be converted
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    from_codes = np.asarray(from_codes, dtype=np.int64)
+    to_codes = np.broadcast_to(np.asarray(to_codes, dtype=np.int64), from_codes.shape)
+    from_dimensions = UNIT_DIMENSIONS[from_codes]
+    to_dimensions = UNIT_DIMENSIONS[to_codes]
+    base = quantities * UNIT_FACTORS[from_codes]
+    if densities is not None:
+        densities = np.broadcast_to(np.asarray(densities, dtype=np.float64), from_codes.shape)
+        base = np.where((from_dimensions == VOLUME) & (to_dimensions == MASS), base * densities, base)
+        base = np.where((from_dimensions == MASS) & (to_dimensions == VOLUME), base / densities, base)
+        convertible = (from_dimensions == to_dimensions) | (
+            (((from_dimensions == VOLUME) & (to_dimensions == MASS))
+             | ((from_dimensions == MASS) & (to_dimensions == VOLUME)))
+            & ~np.isnan(densities)
+        )
+    else:
+        convertible = from_dimensions == to_dimensions
+    converted = base / UNIT_FACTORS[to_codes]
+    return np.where(convertible & (from_dimensions >= 0), converted, np.nan)
+
+
+def readable(quantity: float, unit: str) -> Tuple[float, str]:
+    """Express a base-unit quantity in kg or l once it reaches a thousand."""
+    if unit in ("g", "ml") and abs(quantity) >= 1000:
+        return quantity / 1000, "kg" if unit == "g" else "l"
+    return quantity, unit
@@ -0,0 +1,80 @@
+"""
+Collection version counters for the SQLAlchemy-backed collections.
+
+Each write route bumps its collection's version inside the same transaction
+as the write, so the counter only moves when the data does. Read routes turn
+the version into an ETag (see app.api.etag) with a single primary key lookup.
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.models import CollectionVersion
+
+INGREDIENT = "INGREDIENT"
+MEAL_PLAN = "MEAL_PLAN"
+GROCERY_LIST = "GROCERY_LIST"
+
+# Dialects whose INSERT supports ON CONFLICT, for the version upsert
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def get_collection_version(db: Session, name: str) -> int:
+    """Get the current version of a collection, 0 if it was never written."""
+    version = db.scalar(select(CollectionVersion.version).where(CollectionVersion.name == name))
+    return version or 0
+
+
+def get_collection_versions(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Get the current versions of several collections in one query."""
+    names = list(names)
+    rows = db.execute(
+        select(CollectionVersion.name, CollectionVersion.version).where(CollectionVersion.name.in_(names))
+    )
+    versions = dict(rows.all())
+    return {name: versions.get(name) or 0 for name in names}
+
+
+def version_upsert(dialect: str, name: str):
+    """
+    One statement that creates a collection's version row at 1 or increments it.
+
+    A single upsert, rather than an UPDATE followed by an INSERT when no row
+    matched, lets two transactions make a collection's first write at once
+    without one of them failing on the primary key.
+    """
+    insert = UPSERT_INSERTS[dialect]
+    statement = insert(CollectionVersion).values(name=name, version=1)
+    return statement.on_conflict_do_update(
+        index_elements=[CollectionVersion.name], set_={"version": CollectionVersion.version + 1}
+    )
+
+
+def bump_collection_version(db: Session, name: str) -> None:
+    """Increment a collection's version as part of the current transaction."""
+    db.execute(version_upsert(db.get_bind().dialect.name, name))
+
+
+async def get_collection_version_async(db: AsyncSession, name: str) -> int:
+    """Async variant of get_collection_version."""
+    version = await db.scalar(select(CollectionVersion.version).where(CollectionVersion.name == name))
+    return version or 0
+
+
+async def get_collection_versions_async(db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+    """Async variant of get_collection_versions."""
+    names = list(names)
+    rows = await db.execute(
+        select(CollectionVersion.name, CollectionVersion.version).where(CollectionVersion.name.in_(names))
+    )
+    versions = dict(rows.all())
+    return {name: versions.get(name) or 0 for name in names}
+
+
+async def bump_collection_version_async(db: AsyncSession, name: str) -> None:
+    """Async variant of bump_collection_version."""
+    await db.execute(version_upsert(db.sync_session.get_bind().dialect.name, name))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Text, Date, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, Table, Text, Date, Float
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -6,30 +6,34 @@ from app.db.database import Base
 recipe_ingredient = Table(
     "recipe_ingredient",
     Base.metadata,
-    Column("recipe_id", Integer, ForeignKey("recipes.id"), primary_key=True),
-    Column("ingredient_id", Integer, ForeignKey("ingredients.id"), primary_key=True),
+    Column("recipe_id", Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True),
+    Column("ingredient_id", Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True),
     Column("quantity", Float),
     Column("unit", String(50)),
+    # The primary key covers recipe -> ingredients; this covers ingredient -> recipes
+    Index("ix_recipe_ingredient_ingredient_id", "ingredient_id"),
 )
 
 # Association table for meal plan recipes
 meal_plan_recipe = Table(
     "meal_plan_recipe",
     Base.metadata,
-    Column("meal_plan_id", Integer, ForeignKey("meal_plans.id"), primary_key=True),
-    Column("recipe_id", Integer, ForeignKey("recipes.id"), primary_key=True),
+    Column("meal_plan_id", Integer, ForeignKey("meal_plans.id", ondelete="CASCADE"), primary_key=True),
+    Column("recipe_id", Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True),
     Column("meal_type", String(20)),  # breakfast, lunch, dinner
+    Index("ix_meal_plan_recipe_recipe_id", "recipe_id"),
 )
 
 # Association table for grocery list items
 grocery_list_item = Table(
     "grocery_list_item",
     Base.metadata,
-    Column("grocery_list_id", Integer, ForeignKey("grocery_lists.id"), primary_key=True),
-    Column("ingredient_id", Integer, ForeignKey("ingredients.id"), primary_key=True),
+    Column("grocery_list_id", Integer, ForeignKey("grocery_lists.id", ondelete="CASCADE"), primary_key=True),
+    Column("ingredient_id", Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True),
     Column("quantity", Float),
     Column("unit", String(50)),
     Column("checked", Integer, default=0),  # 0 for unchecked, 1 for checked
+    Index("ix_grocery_list_item_ingredient_id", "ingredient_id"),
 )
 
 class Recipe(Base):
@@ -74,8 +78,31 @@ class GroceryList(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100))
-    meal_plan_id = Column(Integer, ForeignKey("meal_plans.id"), nullable=True)
+    meal_plan_id = Column(Integer, ForeignKey("meal_plans.id", ondelete="SET NULL"), nullable=True, index=True)
     
     # Relationships
     meal_plan = relationship("MealPlan", back_populates="grocery_list")
-    ingredients = relationship("Ingredient", secondary=grocery_list_item, back_populates="grocery_lists") 
\ No newline at end of file
+    ingredients = relationship("Ingredient", secondary=grocery_list_item, back_populates="grocery_lists")
+
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+
+    name = Column(String(50), primary_key=True)  # e.g., INGREDIENT, MEAL_PLAN, GROCERY_LIST
+    version = Column(Integer, nullable=False, default=0)
+
+class IngredientNutrition(Base):
+    __tablename__ = "ingredient_nutrition"
+
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True)
+    # Per 100 g of the ingredient
+    calories = Column(Float, nullable=False, default=0)  # kcal
+    protein = Column(Float, nullable=False, default=0)  # g
+    fat = Column(Float, nullable=False, default=0)  # g
+    carbohydrates = Column(Float, nullable=False, default=0)  # g
+    fiber = Column(Float, nullable=False, default=0)  # g
+    sugar = Column(Float, nullable=False, default=0)  # g
+    sodium = Column(Float, nullable=False, default=0)  # mg
+    # For quantities given by count or by volume
+    grams_per_piece = Column(Float, nullable=True)
+    density = Column(Float, nullable=True)  # g per ml
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, conint
+from typing import List, Literal, Optional, Dict, Any
 from datetime import date, datetime
 
 # Ingredient schemas
@@ -23,6 +23,66 @@ class Ingredient(IngredientBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class IngredientSuggestion(IngredientBase):
+    id: str
+    usage: int = 0
+
+# Nutrition schemas
+class NutritionFacts(BaseModel):
+    # Per 100 g of the ingredient
+    calories: float = Field(0, ge=0)  # kcal
+    protein: float = Field(0, ge=0)  # g
+    fat: float = Field(0, ge=0)  # g
+    carbohydrates: float = Field(0, ge=0)  # g
+    fiber: float = Field(0, ge=0)  # g
+    sugar: float = Field(0, ge=0)  # g
+    sodium: float = Field(0, ge=0)  # mg
+    grams_per_piece: Optional[float] = Field(None, gt=0)  # weight of one, for counted quantities
+    density: Optional[float] = Field(None, gt=0)  # g per ml, for measured volumes
+
+class IngredientNutrition(NutritionFacts):
+    ingredient_id: str
+
+    class Config:
+        from_attributes = True
+        orm_mode = True
+
+class Nutrients(BaseModel):
+    calories: float = 0
+    protein: float = 0
+    fat: float = 0
+    carbohydrates: float = 0
+    fiber: float = 0
+    sugar: float = 0
+    sodium: float = 0
+
+class RecipeNutrition(BaseModel):
+    recipe_id: str
+    servings: int
+    total: Nutrients
+    per_serving: Nutrients
+    unmeasured_ingredient_ids: List[str] = []  # no nutrition facts, or a unit that can't be weighed
+
+class DayNutrition(BaseModel):
+    date: str
+    meals: int
+    total: Nutrients
+
+class WeekNutrition(BaseModel):
+    week_start: str  # Monday
+    days: int  # days of the week inside the requested range
+    total: Nutrients
+    daily_average: Nutrients
+
+class MealPlanNutrition(BaseModel):
+    start_date: str
+    end_date: str
+    total: Nutrients
+    days: List[DayNutrition]
+    weeks: List[WeekNutrition]
+    unmeasured_ingredient_ids: List[str] = []
 
 # Recipe schemas
 class RecipeIngredient(BaseModel):
@@ -42,6 +102,7 @@ class RecipeBase(BaseModel):
 
 class RecipeCreate(RecipeBase):
     ingredients: List[RecipeIngredient]
+    public: bool = True  # false keeps the recipe private to the user creating it
 
 class RecipeUpdate(BaseModel):
     name: Optional[str] = None
@@ -57,9 +118,37 @@ class Recipe(RecipeBase):
     id: str
     ingredients: List[RecipeIngredient] = []
     created_at: Optional[str] = None
+    public: bool = True
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class RecipeSearchResult(Recipe):
+    score: float
+
+class ScaledIngredient(BaseModel):
+    ingredient_id: str
+    name: Optional[str] = None
+    quantity: float  # rounded to what can be measured
+    unit: str
+    text: str  # the quantity as a cook reads it, e.g. "1 1/2"
+
+class ScaledRecipe(BaseModel):
+    recipe_id: str
+    name: Optional[str] = None
+    servings: int
+    original_servings: Optional[int] = None  # None if the recipe has none; quantities are then unscaled
+    factor: float
+    ingredients: List[ScaledIngredient]
+
+class SimilarRecipe(Recipe):
+    similarity: float  # cosine of the TF-IDF ingredient and tag vectors, 0 to 1
+
+class CookableRecipe(Recipe):
+    covered: int
+    coverage: float
+    missing_ingredient_ids: List[str] = []
 
 # Meal Plan schemas
 class MealPlanRecipe(BaseModel):
@@ -72,13 +161,56 @@ class MealPlanBase(BaseModel):
 class MealPlanCreate(MealPlanBase):
     recipes: List[MealPlanRecipe]
 
+class PlanSlot(BaseModel):
+    meal_type: str
+    tags: List[str] = []  # required on top of the plan-wide tags
+    max_total_time: Optional[int] = Field(None, ge=0)  # minutes, prep_time + cook_time
+
+def default_plan_slots() -> List[PlanSlot]:
+    return [PlanSlot(meal_type=meal_type) for meal_type in ("breakfast", "lunch", "dinner")]
+
+class MealPlanGenerate(BaseModel):
+    start_date: date
+    end_date: date
+    slots: List[PlanSlot] = Field(default_factory=default_plan_slots, min_items=1)
+    max_total_time: Optional[int] = Field(None, ge=0)  # minutes, prep_time + cook_time
+    difficulty: List[Literal["easy", "medium", "hard"]] = []  # any if empty
+    tags: List[str] = []
+    exclude_tags: List[str] = []
+    no_repeat_days: int = Field(7, ge=0, le=31)
+    time_budget_ms: int = Field(500, ge=10, le=5000)
+    restarts: int = Field(1, ge=1, le=8)
+    seed: Optional[int] = None  # same seed and recipes, same plan
+
+class GeneratedMealPlans(BaseModel):
+    start_date: str
+    end_date: str
+    meal_plans: List[MealPlanCreate]
+    distinct_ingredients: int
+    repeats: int  # recipe pairs inside no_repeat_days, 0 unless the filters leave too few recipes
+
+class ScaledMeal(ScaledRecipe):
+    meal_type: str
+
+class ScaledDay(BaseModel):
+    date: str
+    meal_plan_id: str
+    meals: List[ScaledMeal]
+
+class ScaledMealPlans(BaseModel):
+    start_date: str
+    end_date: str
+    servings: int
+    days: List[ScaledDay]  # planned days only
+
 class MealPlanUpdate(BaseModel):
     date: Optional[str] = None
     recipes: Optional[List[MealPlanRecipe]] = None
 
 class MealPlanRecipeDetail(BaseModel):
     recipe_id: str
-    recipe_name: Optional[str] = None
+    recipe_name: Optional[str] = None  # copied from the recipe when the plan is written
+    image_url: Optional[str] = None
     meal_type: str
 
 class MealPlan(MealPlanBase):
@@ -88,6 +220,22 @@ class MealPlan(MealPlanBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class WeekMeal(BaseModel):
+    meal_plan_id: str
+    recipe_id: str
+    meal_type: str
+    recipe_name: Optional[str] = None
+    image_url: Optional[str] = None
+
+class WeekDay(BaseModel):
+    date: str
+    meals: List[WeekMeal] = []
+
+class Week(BaseModel):
+    week: str  # ISO week, e.g. 2024-W01
+    days: List[WeekDay]
 
 # Grocery List schemas
 class GroceryItemBase(BaseModel):
@@ -97,6 +245,11 @@ class GroceryItemBase(BaseModel):
     unit: str
     checked: bool = False
 
+class GroceryItemUpdate(BaseModel):
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    checked: Optional[bool] = None
+
 class GroceryListBase(BaseModel):
     name: str
     meal_plan_id: Optional[str] = None
@@ -122,4 +275,53 @@ class GroceryList(GroceryListBase):
     created_at: Optional[str] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+        orm_mode = True
+
+class GroceryListGenerate(BaseModel):
+    start_date: date
+    end_date: date
+    name: Optional[str] = None
+    servings: Dict[str, conint(ge=1)] = {}  # recipe_id -> servings to cook instead of the recipe's own
+
+class GeneratedGroceryItem(GroceryItem):
+    category: Optional[str] = None
+
+class GrocerySection(BaseModel):
+    category: Optional[str] = None
+    items: List[GeneratedGroceryItem]
+
+class GeneratedGroceryList(GroceryList):
+    start_date: str
+    end_date: str
+    items: List[GeneratedGroceryItem] = []
+    sections: List[GrocerySection] = []
+
+# Dashboard schemas
+class WeekDashboard(BaseModel):
+    start_date: str
+    end_date: str
+    meal_plans: List[MealPlan]
+    recipes: List[Recipe]  # every recipe the meal plans reference
+    ingredients: List[Ingredient]  # every ingredient the recipes and grocery lists reference
+    grocery_lists: List[GroceryList]  # grocery lists linked to the meal plans
+
+# Batch schemas
+class BatchOperation(BaseModel):
+    method: Literal["create", "update", "delete"]
+    resource: Literal["recipes", "ingredients", "meal-plans", "grocery-lists"]
+    id: Optional[str] = None  # required for update and delete
+    data: Optional[Dict[str, Any]] = None  # body of the equivalent POST/PUT request
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_items=1, max_items=100)
+
+class BatchResult(BaseModel):
+    status: int  # HTTP status the equivalent single request would have returned
+    id: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchResult]
@@ -2,7 +2,19 @@ import os
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
-from app.routers import recipes, ingredients, meal_plans, grocery_lists
+from app.api.compression import CompressionMiddleware
+from app.api.etag import ETAG_HEADER
+from app.api.idempotency import REPLAYED_HEADER, IdempotencyMiddleware
+from app.api.pagination import NEXT_CURSOR_HEADER
+
+# ASYNC_ROUTES=true serves the API from async handlers (AsyncSession and the DynamoDB executor)
+if os.environ.get("ASYNC_ROUTES", "false").lower() == "true":
+    from app.api.async_routes import recipes, ingredients, meal_plans, groceries as grocery_lists
+else:
+    from app.api.routes import recipes, ingredients, meal_plans, groceries as grocery_lists
+
+# Sync in both stacks; FastAPI runs them in the threadpool
+from app.api.routes import batch, dashboard, export, me
 
 # Create FastAPI app
 app = FastAPI(
@@ -11,6 +23,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Run POSTs sent with an Idempotency-Key once per key; innermost, so it stores uncompressed bodies
+app.add_middleware(
+    IdempotencyMiddleware,
+    ttl_seconds=int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400")),
+    lock_seconds=int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60")),
+)
+
 # Configure CORS
 origins = os.environ.get("CORS_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
@@ -19,6 +38,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER, REPLAYED_HEADER],
+)
+
+# Compress JSON responses (brotli if the client supports it, else gzip)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "1000")),
+    gzip_level=int(os.environ.get("GZIP_COMPRESSION_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("BROTLI_COMPRESSION_QUALITY", "4")),
 )
 
 # Include routers
@@ -26,6 +54,10 @@ app.include_router(recipes.router, prefix="/api", tags=["recipes"])
 app.include_router(ingredients.router, prefix="/api", tags=["ingredients"])
 app.include_router(meal_plans.router, prefix="/api", tags=["meal-plans"])
 app.include_router(grocery_lists.router, prefix="/api", tags=["grocery-lists"])
+app.include_router(batch.router, prefix="/api", tags=["batch"])
+app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
+app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(me.router, prefix="/api", tags=["me"])
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Load benchmark comparing the sync and async route stacks.
+
+Start the API twice, once with the default sync routes and once with
+ASYNC_ROUTES=true, then point this script at both:
+
+    uvicorn main:app --port 8001
+    ASYNC_ROUTES=true uvicorn main:app --port 8002
+    python scripts/benchmark_async.py --target sync=http://localhost:8001 \\
+        --target async=http://localhost:8002 --path /api/recipes/ --concurrency 200
+
+Each target gets the same number of GET requests from a fixed number of
+concurrent workers; the script reports requests per second and latency
+percentiles for each.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+
+async def run_load(base_url: str, path: str, concurrency: int, total_requests: int) -> Dict[str, float]:
+    """Send total_requests GETs to base_url + path from concurrency workers."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total_requests
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    """Main entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description="Compare RPS of the sync and async API stacks")
+    parser.add_argument("--target", action="append", required=True,
+                        help="label=base_url of a running API, may be repeated")
+    parser.add_argument("--path", default="/api/recipes/", help="Path to request")
+    parser.add_argument("--concurrency", type=int, default=100, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<10} {'requests':>8} {'errors':>6} {'rps':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for target in args.target:
+        label, _, base_url = target.partition("=")
+        result = asyncio.run(run_load(base_url, args.path, args.concurrency, args.requests))
+        print(f"{label:<10} {result['requests']:>8} {result['errors']:>6} {result['rps']:>10.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
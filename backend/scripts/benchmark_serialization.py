@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the recipe list response serialisation paths.
+
+Builds a page of recipes shaped like items read from DynamoDB (Decimal
+numbers, storage keys alongside the recipe fields) and times turning it into
+response bytes:
+
+- default: FastAPI's own path, i.e. validating against the response model,
+  jsonable_encoder and JSONResponse
+- fast: the FAST_JSON_RESPONSES path, i.e. construct()-built models and
+  ORJSONResponse
+
+    python scripts/benchmark_serialization.py --recipes 100 --ingredients 12
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.responses import ORJSONResponse, build_trusted_list
+from app.schemas.schemas import Recipe
+
+
+def make_items(recipes: int, ingredients: int) -> List[Dict[str, Any]]:
+    """Recipes as get_recipes() returns them."""
+    return [
+        {
+            'PK': f'RECIPE#{i}',
+            'SK': 'METADATA',
+            'GSI1PK': 'RECIPE',
+            'GSI1SK': f'Recipe {i}',
+            'id': str(i),
+            'name': f'Recipe {i}',
+            'description': 'A hearty weeknight dinner with plenty of vegetables',
+            'instructions': 'Chop everything, then simmer gently for half an hour. ' * 4,
+            'prep_time': Decimal(15),
+            'cook_time': Decimal(30),
+            'servings': Decimal(4),
+            'image_url': None,
+            'ingredients': [
+                {'ingredient_id': str(j), 'name': f'Ingredient {j}', 'quantity': Decimal('1.5'), 'unit': 'cup'}
+                for j in range(ingredients)
+            ],
+            'created_at': '2024-01-01T12:00:00',
+            'version': Decimal(3),
+        }
+        for i in range(recipes)
+    ]
+
+
+def default_path(items: List[Dict[str, Any]]) -> bytes:
+    field = create_response_field(name="Response_read_recipes", type_=List[Recipe])
+
+    async def serialize():
+        return await serialize_response(field=field, response_content=items)
+
+    return JSONResponse(asyncio.run(serialize())).body
+
+
+def fast_path(items: List[Dict[str, Any]]) -> bytes:
+    return ORJSONResponse(build_trusted_list(Recipe, items)).body
+
+
+def time_path(func: Callable[[List[Dict[str, Any]]], bytes], items: List[Dict[str, Any]], rounds: int) -> float:
+    """Best time of rounds calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """Main entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description="Compare the default and fast response serialisation paths")
+    parser.add_argument("--recipes", type=int, default=100, help="Recipes per response")
+    parser.add_argument("--ingredients", type=int, default=12, help="Ingredients per recipe")
+    parser.add_argument("--rounds", type=int, default=50, help="Timed rounds per path")
+    args = parser.parse_args()
+
+    items = make_items(args.recipes, args.ingredients)
+
+    print(f"{'path':<8} {'best ms':>8} {'bytes':>8}")
+    results = {}
+    for label, func in (("default", default_path), ("fast", fast_path)):
+        results[label] = time_path(func, items, args.rounds)
+        print(f"{label:<8} {results[label]:>8.2f} {len(func(items)):>8}")
+    print(f"speed-up: {results['default'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Export the Meal Planner dataset as NDJSON.
+
+Reads recipes from DynamoDB and everything else from the SQL database (as
+configured by the usual environment variables) and writes one JSON record
+per line, streaming page by page so memory use does not grow with the data:
+
+    python scripts/export_data.py --output backup.ndjson.gz --gzip
+    python scripts/export_data.py --resources recipes,ingredients > recipes.ndjson
+
+A running API serves the same stream from GET /api/export.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.export import PAGE_SIZE, RESOURCES, export_stream
+from app.db.database import SessionLocal
+
+
+def main():
+    """Main entry point for the export."""
+    parser = argparse.ArgumentParser(description="Export the dataset as NDJSON")
+    parser.add_argument("--output", "-o", help="File to write, default stdout")
+    parser.add_argument("--resources", default=",".join(RESOURCES),
+                        help=f"Comma-separated resources to export (default: {','.join(RESOURCES)})")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Items read per storage call")
+    args = parser.parse_args()
+
+    resources = [name.strip() for name in args.resources.split(",") if name.strip()]
+    unknown = set(resources) - set(RESOURCES)
+    if unknown:
+        parser.error(f"unknown resources: {', '.join(sorted(unknown))}")
+
+    db = SessionLocal()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_stream(db, resources, gzip=args.gzip, page_size=args.page_size):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,12 @@ def create_table():
     # Wait for table to be created
     print("Waiting for table to be created...")
     table.meta.client.get_waiter("table_exists").wait(TableName=TABLE_NAME)
+
+    # Idempotency records expire on their own
+    table.meta.client.update_time_to_live(
+        TableName=TABLE_NAME,
+        TimeToLiveSpecification={"Enabled": True, "AttributeName": "expires_at"}
+    )
     print(f"Table {TABLE_NAME} created successfully")
 
 def create_sample_data():
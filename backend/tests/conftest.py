@@ -4,7 +4,11 @@ import boto3
 import sqlite3
 from moto import mock_dynamodb
 from fastapi.testclient import TestClient
-from app.db.dynamodb import table, TABLE_NAME
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.database import Base, configure_engine, get_db
+from app.db.dynamodb import table, TABLE_NAME, wait_for_fan_out
 from main import app
 
 @pytest.fixture(scope="function")
@@ -54,6 +58,8 @@ def dynamodb(aws_credentials):
         table.meta.client.get_waiter("table_exists").wait(TableName=TABLE_NAME)
         
         yield dynamodb
+        # Recipe writes fan out in the background; finish before the mock goes away
+        wait_for_fan_out()
 
 @pytest.fixture(scope="function")
 def sqlite_db():
@@ -96,6 +102,31 @@ def client(dynamodb):
     with TestClient(app) as client:
         yield client
 
+@pytest.fixture(scope="function")
+def sql_session():
+    """A session factory over a fresh in-memory database with the SQLAlchemy tables."""
+    engine = configure_engine(
+        create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture(scope="function")
+def sql_client(dynamodb, sql_session):
+    """Test client whose SQLAlchemy routes use the sql_session database."""
+    def get_test_db():
+        db = sql_session()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db, None)
+
 @pytest.fixture(scope="function")
 def sqlite_client(sqlite_db):
     """Test client for FastAPI app using SQLite."""
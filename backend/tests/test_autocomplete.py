@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.autocomplete import PrefixIndex, get_prefix_index, normalize, reset_prefix_index
+from app.db.database import Base
+from app.db.versions import INGREDIENT, bump_collection_version
+from app.models.models import Ingredient as IngredientModel, Recipe as RecipeModel, recipe_ingredient
+
+ROWS = [
+    (1, "Black Pepper", "spices", 40),
+    (2, "Pepperoni", "meat", 3),
+    (3, "Bell pepper", "produce", 12),
+    (4, "Basil", "herbs", 25),
+    (5, "Bay leaves", "herbs", 25),
+]
+
+def names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+def test_normalize():
+    """Test that names are keyed lowercased with collapsed whitespace."""
+    assert normalize("  Black   PEPPER ") == "black pepper"
+
+def test_complete_ranks_name_prefix_then_usage():
+    """Test that whole-name matches come first, then word matches, each by usage."""
+    index = PrefixIndex(ROWS, {})
+
+    assert names(index.complete("pep")) == ["Pepperoni", "Black Pepper", "Bell pepper"]
+    assert names(index.complete("B")) == ["Black Pepper", "Basil", "Bay leaves", "Bell pepper"]
+    assert names(index.complete("ba", limit=1)) == ["Basil"]
+    assert names(index.complete("black p")) == ["Black Pepper"]
+    assert index.complete("saffron") == []
+    assert index.complete("basil")[0] == {"id": "4", "name": "Basil", "category": "herbs", "usage": 25}
+
+def test_prefix_index_follows_collection_version():
+    """Test that the index is built from SQL with usage counts and rebuilt when ingredients change."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    reset_prefix_index()
+    try:
+        db.add_all([IngredientModel(id=1, name="Garlic"), IngredientModel(id=2, name="Ginger"), RecipeModel(id=1, name="Stir fry")])
+        db.flush()
+        db.execute(recipe_ingredient.insert().values(recipe_id=1, ingredient_id=2, quantity=1, unit="tbsp"))
+        db.commit()
+
+        index = get_prefix_index(db)
+        assert names(index.complete("g")) == ["Ginger", "Garlic"]
+        assert get_prefix_index(db) is index
+
+        db.add(IngredientModel(id=3, name="Green beans"))
+        bump_collection_version(db, INGREDIENT)
+        db.commit()
+        assert names(get_prefix_index(db).complete("gr")) == ["Green beans"]
+    finally:
+        reset_prefix_index()
+        db.close()
@@ -0,0 +1,48 @@
+from fastapi import status
+
+def test_batch_recipe_operations(client, sample_recipe):
+    """Test that recipe operations in a batch are applied together with per-operation results."""
+    # 1. Create a recipe to update
+    recipe_id = client.post("/api/recipes/", json=sample_recipe).json()["id"]
+
+    # 2. Create another and rename the first in one batch
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "create", "resource": "recipes", "data": {**sample_recipe, "name": "Second"}},
+        {"method": "update", "resource": "recipes", "id": recipe_id, "data": {"name": "Renamed"}},
+    ]})
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["status"] for result in body["results"]] == [201, 200]
+    assert body["results"][0]["data"]["name"] == "Second"
+    assert body["results"][1]["data"]["name"] == "Renamed"
+
+    # 3. Both writes are visible
+    names = sorted(recipe["name"] for recipe in client.get("/api/recipes/").json())
+    assert names == ["Renamed", "Second"]
+
+def test_batch_is_all_or_nothing(client, sample_recipe):
+    """Test that one failing operation leaves every other operation unapplied."""
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "create", "resource": "recipes", "data": sample_recipe},
+        {"method": "delete", "resource": "recipes", "id": "missing"},
+    ]})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    body = response.json()
+    assert body["committed"] is False
+    assert [result["status"] for result in body["results"]] == [424, 404]
+    assert client.get("/api/recipes/").json() == []
+
+def test_batch_validates_operations(client):
+    """Test that invalid operations are reported against their index."""
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "update", "resource": "recipes", "data": {"name": "No id"}},
+    ]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["results"][0]["error"] == "update requires an id"
+
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "create", "resource": "recipes", "data": {"name": "Incomplete"}},
+    ]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
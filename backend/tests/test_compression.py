@@ -0,0 +1,120 @@
+import base64
+import gzip
+import json
+import pytest
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from mangum import Mangum
+from app.api.compression import CompressionMiddleware, choose_encoding
+
+def make_recipes(count):
+    """Build a recipe list shaped like GET /api/recipes/ output."""
+    return [
+        {
+            "id": f"recipe-{i}",
+            "name": f"Test Recipe {i}",
+            "description": "A test recipe for unit tests",
+            "instructions": "Mix the ingredients, then bake at 350F for 30 minutes until golden.",
+            "prep_time": 15,
+            "cook_time": 30,
+            "servings": 4,
+            "ingredients": [
+                {"ingredient_id": f"ingredient-{j}", "quantity": 2.0, "unit": "cups"} for j in range(5)
+            ],
+        }
+        for i in range(100)
+    ][:count]
+
+@pytest.fixture(scope="function")
+def compression_app():
+    """Small app serving a large JSON body, a small one and a stream."""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1000)
+    
+    @app.get("/recipes")
+    def recipes():
+        return make_recipes(100)
+    
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+    
+    @app.get("/stream")
+    def stream():
+        rows = (json.dumps(recipe) + "\n" for recipe in make_recipes(100))
+        return StreamingResponse(rows, media_type="application/x-ndjson")
+    
+    return app
+
+def test_choose_encoding():
+    """Test Accept-Encoding negotiation."""
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_large_json_is_compressed(compression_app, encoding):
+    """Test that large JSON responses are compressed and shrink substantially."""
+    client = TestClient(compression_app)
+    identity = client.get("/recipes", headers={"Accept-Encoding": "identity"})
+    
+    # Read the raw bytes so the test client does not decode them for us
+    with client.stream("GET", "/recipes", headers={"Accept-Encoding": encoding}) as response:
+        compressed = b"".join(response.iter_raw())
+    
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(compressed)
+    
+    decompress = brotli.decompress if encoding == "br" else gzip.decompress
+    assert decompress(compressed) == identity.content
+    
+    ratio = len(identity.content) / len(compressed)
+    assert ratio > 5
+
+def test_small_response_not_compressed(compression_app):
+    """Test that responses below the minimum size are sent as-is."""
+    response = TestClient(compression_app).get("/small", headers={"Accept-Encoding": "gzip, br"})
+    
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+def test_streaming_response_is_compressed(compression_app):
+    """Test that streamed responses are compressed chunk by chunk."""
+    client = TestClient(compression_app)
+    
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        compressed = b"".join(response.iter_raw())
+    
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    rows = gzip.decompress(compressed).decode().splitlines()
+    assert len(rows) == 100
+
+def test_mangum_returns_base64_body(compression_app):
+    """Test that compressed responses survive the Lambda/API Gateway round trip."""
+    handler = Mangum(compression_app, lifespan="off")
+    event = {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": "/recipes",
+        "rawQueryString": "",
+        "headers": {"accept-encoding": "gzip", "host": "api.example.com"},
+        "requestContext": {
+            "http": {"method": "GET", "path": "/recipes", "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1"},
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+    
+    result = handler(event, None)
+    
+    assert result["headers"]["content-encoding"] == "gzip"
+    assert result["isBase64Encoded"] is True
+    body = json.loads(gzip.decompress(base64.b64decode(result["body"])))
+    assert len(body) == 100
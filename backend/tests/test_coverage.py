@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+
+from app.db import coverage
+from app.db.coverage import CoverageIndex
+from app.db.dynamodb import create_recipe
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Every test starts without a built index."""
+    coverage.live_index.reset()
+    yield
+    coverage.live_index.reset()
+
+def recipe(recipe_id, *ingredient_ids):
+    return {"id": recipe_id, "ingredients": [{"ingredient_id": i, "quantity": 1, "unit": "g"} for i in ingredient_ids]}
+
+def test_match_ranks_fewest_missing_first():
+    """Test that recipes are filtered by coverage and ranked by missing, then covered, ingredients."""
+    index = CoverageIndex()
+    index.add_recipe(recipe("omelette", "egg", "butter"))
+    index.add_recipe(recipe("pancakes", "egg", "flour", "milk", "butter"))
+    index.add_recipe(recipe("toast", "bread", "butter"))
+    index.add_recipe(recipe("salad", "lettuce", "tomato"))
+
+    on_hand = ["egg", "butter", "flour"]
+    assert index.match(on_hand, min_coverage=0.5) == [
+        ("omelette", 2, 2),
+        ("pancakes", 3, 4),
+        ("toast", 1, 2),
+    ]
+    assert index.match(on_hand, min_coverage=1.0) == [("omelette", 2, 2)]
+    assert index.match(on_hand, min_coverage=0.5, limit=1) == [("omelette", 2, 2)]
+    assert index.missing("pancakes", on_hand) == ["milk"]
+    assert index.match(["saffron"]) == []
+
+def test_updates_reuse_slots():
+    """Test that replaced and removed recipes leave no stale postings behind."""
+    index = CoverageIndex()
+    index.add_recipe(recipe("a", "egg"))
+    index.add_recipe(recipe("b", "egg", "milk"))
+    assert index.match(["egg"], min_coverage=0.5) == [("a", 1, 1), ("b", 1, 2)]
+
+    index.add_recipe(recipe("a", "rice"))
+    index.remove("b")
+    assert index.match(["egg"]) == []
+    assert "egg" not in index.postings
+
+    index.add_recipe(recipe("c", "egg"))
+    assert len(index.recipe_ids) == 2
+    assert index.match(["egg", "rice"]) == [("a", 1, 1), ("c", 1, 1)]
+
+def test_cookable_endpoint_follows_writes(client, sample_recipe):
+    """Test that the endpoint answers from the index and sees writes made after it was built."""
+    # Written through app.db.dynamodb, which stores quantities as Decimal
+    lines = [{"ingredient_id": "1", "quantity": Decimal("2"), "unit": "pcs"}, {"ingredient_id": "2", "quantity": Decimal("1"), "unit": "pcs"}]
+    first = create_recipe({**sample_recipe, "ingredients": lines})
+
+    response = client.get("/api/recipes/cookable?ingredients=1")
+    assert response.status_code == status.HTTP_200_OK
+    [match] = response.json()
+    assert (match["id"], match["covered"], match["coverage"], match["missing_ingredient_ids"]) == (first["id"], 1, 0.5, ["2"])
+    assert client.get("/api/recipes/cookable?ingredients=1&min_coverage=100").json() == []
+
+    second = create_recipe({**sample_recipe, "ingredients": lines[:1]})
+    assert [match["id"] for match in client.get("/api/recipes/cookable?ingredients=1").json()] == [second["id"], first["id"]]
+
+    client.delete(f"/api/recipes/{second['id']}")
+    assert [match["id"] for match in client.get("/api/recipes/cookable?ingredients=1").json()] == [first["id"]]
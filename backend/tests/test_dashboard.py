@@ -0,0 +1,104 @@
+from datetime import date
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    grocery_list_item,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+@pytest.fixture(scope="function")
+def week(sql_session):
+    """A week of dinners alternating between two recipes that share eggs, with a grocery list for Monday."""
+    with sql_session() as db:
+        db.add_all([
+            IngredientModel(id=1, name="Egg", category="dairy"),
+            IngredientModel(id=2, name="Flour", category="baking"),
+            IngredientModel(id=3, name="Cheese", category="dairy"),
+            RecipeModel(id=1, name="Pancakes", servings=2),
+            RecipeModel(id=2, name="Omelette", servings=1),
+        ])
+        db.add_all([MealPlanModel(id=day, date=date(2024, 1, day)) for day in range(1, 8)])
+        db.add(GroceryListModel(id=1, name="Monday", meal_plan_id=1))
+        db.flush()
+        db.execute(recipe_ingredient.insert(), [
+            {"recipe_id": 1, "ingredient_id": 1, "quantity": 2, "unit": "pcs"},
+            {"recipe_id": 1, "ingredient_id": 2, "quantity": 100, "unit": "g"},
+            {"recipe_id": 2, "ingredient_id": 1, "quantity": 3, "unit": "pcs"},
+        ])
+        db.execute(meal_plan_recipe.insert(), [
+            {"meal_plan_id": day, "recipe_id": 1 + day % 2, "meal_type": "dinner"} for day in range(1, 8)
+        ])
+        db.execute(grocery_list_item.insert(), [{"grocery_list_id": 1, "ingredient_id": 3, "quantity": 1, "unit": "pcs"}])
+        db.commit()
+
+def count_queries(sql_session):
+    """Record every SELECT run on the sql_session database."""
+    queries = []
+
+    @event.listens_for(sql_session.kw["bind"], "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append(statement)
+
+    return queries
+
+def test_week_dashboard_returns_the_graph_once(sql_client, week):
+    """Test that shared recipes and ingredients come back once, linked by id."""
+    response = sql_client.get("/api/dashboard/week/", params={"start_date": "2024-01-01"})
+    assert response.status_code == status.HTTP_200_OK
+    dashboard = response.json()
+
+    assert (dashboard["start_date"], dashboard["end_date"]) == ("2024-01-01", "2024-01-07")
+    assert [plan["date"] for plan in dashboard["meal_plans"]] == [f"2024-01-0{day}" for day in range(1, 8)]
+    assert [meal["recipe_name"] for meal in dashboard["meal_plans"][0]["recipes"]] == ["Omelette"]
+    assert sorted(recipe["name"] for recipe in dashboard["recipes"]) == ["Omelette", "Pancakes"]
+    assert sorted(ingredient["name"] for ingredient in dashboard["ingredients"]) == ["Cheese", "Egg", "Flour"]
+    assert [item["ingredient_name"] for item in dashboard["grocery_lists"][0]["items"]] == ["Cheese"]
+
+def test_week_dashboard_batches_each_level(sql_client, sql_session, week):
+    """Test that a week of plans costs the same number of queries as a single day."""
+    queries = count_queries(sql_session)
+    sql_client.get("/api/dashboard/week/", params={"start_date": "2024-01-01", "end_date": "2024-01-01"})
+    single_day = len(queries)
+    assert single_day
+
+    queries.clear()
+    sql_client.get("/api/dashboard/week/", params={"start_date": "2024-01-01", "end_date": "2024-01-07"})
+    assert len(queries) == single_day
+
+@pytest.mark.parametrize("params", [
+    {"start_date": "2024-01-07", "end_date": "2024-01-01"},
+    {"start_date": "2024-01-01", "end_date": "2024-02-01"},
+])
+def test_week_dashboard_refuses_bad_ranges(sql_client, params):
+    """Test that a reversed range or one longer than the maximum is refused."""
+    assert sql_client.get("/api/dashboard/week/", params=params).status_code == status.HTTP_400_BAD_REQUEST
+
+def test_week_dashboard_refuses_malformed_dates(sql_client):
+    """Test that a date that does not parse is a validation error."""
+    response = sql_client.get("/api/dashboard/week/", params={"start_date": "next monday"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_week_dashboard_etag(sql_client, week):
+    """Test that the dashboard is revalidated with its ETag until an ingredient changes."""
+    params = {"start_date": "2024-01-01"}
+    etag = sql_client.get("/api/dashboard/week/", params=params).headers["etag"]
+    response = sql_client.get("/api/dashboard/week/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Another range is another representation
+    other = sql_client.get("/api/dashboard/week/", params={"start_date": "2024-01-02"})
+    assert other.headers["etag"] != etag
+
+    sql_client.put("/api/ingredients/1", json={"name": "Duck egg"})
+    response = sql_client.get("/api/dashboard/week/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert "Duck egg" in [ingredient["name"] for ingredient in response.json()["ingredients"]]
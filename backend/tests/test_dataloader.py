@@ -0,0 +1,43 @@
+from app.db.dataloader import DataLoader
+
+def make_loader(max_batch_size=500):
+    """A loader over squares of 0-99 that records every batch it is asked for."""
+    calls = []
+
+    def batch_load(keys):
+        calls.append(list(keys))
+        return {key: key * key for key in keys if key < 100}
+
+    return DataLoader(batch_load, max_batch_size=max_batch_size), calls
+
+def test_load_many_deduplicates_and_caches():
+    """Test that repeated keys are fetched once and cached keys not at all."""
+    loader, calls = make_loader()
+
+    assert loader.load_many([3, 4, 3, 4]) == {3: 9, 4: 16}
+    assert loader.load_many([4, 5]) == {4: 16, 5: 25}
+    assert calls == [[3, 4], [5]]
+
+def test_missing_keys_are_cached():
+    """Test that keys that do not exist are left out and not fetched again."""
+    loader, calls = make_loader()
+
+    assert loader.load(150) is None
+    assert loader.load_many([150, 2]) == {2: 4}
+    assert calls == [[150], [2]]
+
+def test_batches_are_split():
+    """Test that large key sets are fetched in batches of at most max_batch_size."""
+    loader, calls = make_loader(max_batch_size=4)
+
+    assert len(loader.load_many(range(10))) == 10
+    assert [len(batch) for batch in calls] == [4, 4, 2]
+    assert loader.batches == 3
+
+def test_prime():
+    """Test that primed values are served without a fetch."""
+    loader, calls = make_loader()
+    loader.prime(7, 49)
+
+    assert loader.load(7) == 49
+    assert calls == []
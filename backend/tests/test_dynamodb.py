@@ -1,12 +1,23 @@
 import pytest
+from boto3.dynamodb.conditions import Key
 from datetime import datetime
+from decimal import Decimal
+from app.db import dynamodb as dynamodb_module
 from app.db.dynamodb import (
-    generate_id, format_date, 
+    generate_id, format_date, get_collection_version, 
     get_recipes, get_recipe, create_recipe, update_recipe, delete_recipe,
     get_ingredients, create_ingredient,
     get_meal_plans, create_meal_plan, update_meal_plan, delete_meal_plan,
-    get_grocery_lists, get_grocery_list, create_grocery_list, update_grocery_list, delete_grocery_list
+    get_week, empty_week, iso_week, get_meal_plan, wait_for_fan_out,
+    get_grocery_lists, get_grocery_list, create_grocery_list, update_grocery_list, delete_grocery_list,
+    add_grocery_item, remove_grocery_item, set_grocery_item_quantity, check_grocery_item, uncheck_grocery_item,
+    user_key, TABLE_NAME
 )
+from app.db.db_adapter import DatabaseAdapter
+from app.db.migrations import v004_item_collections, v005_user_partitions
+
+# The user owning the meal plans and grocery lists written by the tests
+USER = "household-1"
 
 # Recipe Tests
 def test_generate_id():
@@ -112,35 +123,35 @@ def test_create_and_get_ingredient(dynamodb, sample_ingredient):
 def test_create_and_get_meal_plan(dynamodb, sample_meal_plan):
     """Test creating and retrieving a meal plan."""
     # Create meal plan
-    created = create_meal_plan(sample_meal_plan)
+    created = create_meal_plan(USER, sample_meal_plan)
     
     assert created["date"] == sample_meal_plan["date"]
     assert len(created["recipes"]) == len(sample_meal_plan["recipes"])
     assert "id" in created
     
     # Get all meal plans
-    meal_plans = get_meal_plans()
+    meal_plans = get_meal_plans(USER)
     
     assert len(meal_plans) == 1
     assert meal_plans[0]["date"] == sample_meal_plan["date"]
     
     # Get meal plans with date filtering
-    filtered_plans = get_meal_plans(start_date="2023-05-01")
+    filtered_plans = get_meal_plans(USER, start_date="2023-05-01")
     assert len(filtered_plans) == 1
     
-    filtered_plans = get_meal_plans(end_date="2023-05-01")
+    filtered_plans = get_meal_plans(USER, end_date="2023-05-01")
     assert len(filtered_plans) == 1
     
-    filtered_plans = get_meal_plans(start_date="2023-05-01", end_date="2023-05-01")
+    filtered_plans = get_meal_plans(USER, start_date="2023-05-01", end_date="2023-05-01")
     assert len(filtered_plans) == 1
     
-    filtered_plans = get_meal_plans(start_date="2023-05-02")
+    filtered_plans = get_meal_plans(USER, start_date="2023-05-02")
     assert len(filtered_plans) == 0
 
 def test_update_meal_plan_db(dynamodb, sample_meal_plan):
     """Test updating a meal plan in the database."""
     # Create meal plan
-    created = create_meal_plan(sample_meal_plan)
+    created = create_meal_plan(USER, sample_meal_plan)
     meal_plan_id = created["id"]
     
     # Update meal plan
@@ -153,36 +164,36 @@ def test_update_meal_plan_db(dynamodb, sample_meal_plan):
             }
         ]
     }
-    updated = update_meal_plan(meal_plan_id, updated_data)
+    updated = update_meal_plan(USER, meal_plan_id, updated_data)
     
     assert updated["id"] == meal_plan_id
     assert updated["date"] == updated_data["date"]
     assert len(updated["recipes"]) == len(updated_data["recipes"])
     
     # Verify update with date filtering
-    filtered_plans = get_meal_plans(start_date="2023-05-02")
+    filtered_plans = get_meal_plans(USER, start_date="2023-05-02")
     assert len(filtered_plans) == 1
     assert filtered_plans[0]["id"] == meal_plan_id
 
 def test_delete_meal_plan_db(dynamodb, sample_meal_plan):
     """Test deleting a meal plan from the database."""
     # Create meal plan
-    created = create_meal_plan(sample_meal_plan)
+    created = create_meal_plan(USER, sample_meal_plan)
     meal_plan_id = created["id"]
     
     # Delete meal plan
-    result = delete_meal_plan(meal_plan_id)
+    result = delete_meal_plan(USER, meal_plan_id)
     assert "message" in result
     
     # Verify deletion
-    meal_plans = get_meal_plans()
+    meal_plans = get_meal_plans(USER)
     assert len(meal_plans) == 0
 
 # Grocery List Tests
 def test_create_and_get_grocery_list(dynamodb, sample_grocery_list):
     """Test creating and retrieving a grocery list."""
     # Create grocery list
-    created = create_grocery_list(sample_grocery_list)
+    created = create_grocery_list(USER, sample_grocery_list)
     
     assert created["name"] == sample_grocery_list["name"]
     assert created["meal_plan_id"] == sample_grocery_list["meal_plan_id"]
@@ -190,14 +201,14 @@ def test_create_and_get_grocery_list(dynamodb, sample_grocery_list):
     assert "id" in created
     
     # Get all grocery lists
-    grocery_lists = get_grocery_lists()
+    grocery_lists = get_grocery_lists(USER)
     
     assert len(grocery_lists) == 1
     assert grocery_lists[0]["name"] == sample_grocery_list["name"]
     
     # Get grocery list by ID
     grocery_list_id = created["id"]
-    retrieved = get_grocery_list(grocery_list_id)
+    retrieved = get_grocery_list(USER, grocery_list_id)
     
     assert retrieved["id"] == grocery_list_id
     assert retrieved["name"] == sample_grocery_list["name"]
@@ -206,7 +217,7 @@ def test_create_and_get_grocery_list(dynamodb, sample_grocery_list):
 def test_update_grocery_list_db(dynamodb, sample_grocery_list):
     """Test updating a grocery list in the database."""
     # Create grocery list
-    created = create_grocery_list(sample_grocery_list)
+    created = create_grocery_list(USER, sample_grocery_list)
     grocery_list_id = created["id"]
     
     # Update grocery list
@@ -222,27 +233,360 @@ def test_update_grocery_list_db(dynamodb, sample_grocery_list):
             }
         ]
     }
-    updated = update_grocery_list(grocery_list_id, updated_data)
+    updated = update_grocery_list(USER, grocery_list_id, updated_data)
     
     assert updated["id"] == grocery_list_id
     assert updated["name"] == updated_data["name"]
     assert len(updated["items"]) == len(updated_data["items"])
     
     # Verify update
-    retrieved = get_grocery_list(grocery_list_id)
+    retrieved = get_grocery_list(USER, grocery_list_id)
     assert retrieved["name"] == updated_data["name"]
     assert len(retrieved["items"]) == len(updated_data["items"])
 
 def test_delete_grocery_list_db(dynamodb, sample_grocery_list):
     """Test deleting a grocery list from the database."""
     # Create grocery list
-    created = create_grocery_list(sample_grocery_list)
+    created = create_grocery_list(USER, sample_grocery_list)
     grocery_list_id = created["id"]
     
     # Delete grocery list
-    result = delete_grocery_list(grocery_list_id)
+    result = delete_grocery_list(USER, grocery_list_id)
     assert "message" in result
     
     # Verify deletion
-    grocery_lists = get_grocery_lists()
-    assert len(grocery_lists) == 0 
\ No newline at end of file
+    grocery_lists = get_grocery_lists(USER)
+    assert len(grocery_lists) == 0 
+
+# Collection version tests
+def test_collection_version_bumped_on_write(dynamodb, sample_recipe):
+    """Test that recipe writes bump the collection version and item version."""
+    assert get_collection_version("RECIPE") == 0
+    
+    created = create_recipe(sample_recipe)
+    assert created["version"] == 1
+    assert get_collection_version("RECIPE") == 1
+    
+    updated = update_recipe(created["id"], {"name": "Updated Recipe Name"})
+    assert updated["version"] == 2
+    assert get_collection_version("RECIPE") == 2
+    
+    delete_recipe(created["id"])
+    assert get_collection_version("RECIPE") == 3
+    
+    # Other collections are unaffected
+    assert get_collection_version(user_key(USER, "MEAL_PLAN")) == 0
+
+# Week document tests
+def week_meals(week):
+    return [
+        (day["date"], meal["meal_type"], meal["recipe_name"])
+        for day in get_week(USER, week)["days"] for meal in day["meals"]
+    ]
+
+def test_week_document_follows_meal_plan_writes(dynamodb, sample_recipe):
+    """Test that meal plan writes keep the week document of their ISO week current."""
+    pancakes = create_recipe({**sample_recipe, "name": "Pancakes", "image_url": "https://example.com/p.jpg"})
+    soup = create_recipe({**sample_recipe, "name": "Soup"})
+    assert iso_week("2024-01-07") == "2024-W01" and iso_week("2024-01-08") == "2024-W02"
+    empty = get_week(USER, "2024-W01")
+    assert [day["date"] for day in empty["days"]] == [f"2024-01-0{day}" for day in range(1, 8)]
+    assert empty["version"] == 0
+    
+    created = create_meal_plan(USER, {"date": "2024-01-03", "recipes": [
+        {"recipe_id": pancakes["id"], "meal_type": "breakfast"},
+        {"recipe_id": soup["id"], "meal_type": "dinner"},
+    ]})
+    create_meal_plan(USER, {"date": "2024-01-05", "recipes": [{"recipe_id": "missing", "meal_type": "lunch"}]})
+    week = get_week(USER, "2024-W01")
+    assert week["version"] == 2
+    assert week_meals("2024-W01") == [
+        ("2024-01-03", "breakfast", "Pancakes"), ("2024-01-03", "dinner", "Soup"), ("2024-01-05", "lunch", None),
+    ]
+    assert week["days"][2]["meals"][0]["image_url"] == "https://example.com/p.jpg"
+    assert week["days"][2]["meals"][0]["meal_plan_id"] == created["id"]
+    
+    # Moving the plan to the next week takes its meals along
+    updated = update_meal_plan(USER, created["id"], {"date": "2024-01-08"})
+    assert updated["version"] == 2 and updated["GSI1SK"] == f"2024-01-08#{created['id']}"
+    assert week_meals("2024-W01") == [("2024-01-05", "lunch", None)]
+    assert week_meals("2024-W02") == [("2024-01-08", "breakfast", "Pancakes"), ("2024-01-08", "dinner", "Soup")]
+    
+    delete_meal_plan(USER, created["id"])
+    assert get_week(USER, "2024-W02")["version"] == 0
+    assert update_meal_plan(USER, created["id"], {"date": "2024-01-09"}) is None
+    assert get_collection_version(user_key(USER, "MEAL_PLAN")) == 4
+
+def test_meal_plans_copy_recipe_display_fields(dynamodb, sample_recipe):
+    """Test that meal plan entries carry the recipe name and image, and recipe writes fan out to them."""
+    stew = create_recipe({**sample_recipe, "name": "Stew", "image_url": "https://example.com/stew.jpg"})
+    salad = create_recipe({**sample_recipe, "name": "Salad", "image_url": ""})
+    plan = create_meal_plan(USER, {"date": "2024-01-01", "recipes": [
+        {"recipe_id": stew["id"], "meal_type": "dinner"},
+        {"recipe_id": salad["id"], "meal_type": "lunch"},
+    ]})
+    assert [(entry["recipe_name"], entry["image_url"]) for entry in plan["recipes"]] == [
+        ("Stew", "https://example.com/stew.jpg"), ("Salad", ""),
+    ]
+    # Each planned recipe indexes the plans planning it
+    planned = dynamodb.Table(TABLE_NAME).get_item(Key={"PK": f"PLANNED#{stew['id']}", "SK": f"USER#{USER}#MEAL_PLAN#{plan['id']}"})
+    assert planned["Item"]["meal_plan_id"] == plan["id"]
+    
+    update_recipe(stew["id"], {"name": "Beef Stew"})
+    wait_for_fan_out()
+    stored = get_meal_plan(USER, plan["id"])
+    assert [entry["recipe_name"] for entry in stored["recipes"]] == ["Beef Stew", "Salad"]
+    assert stored["version"] == 2
+    
+    # A plan dropping the recipe drops its index item, so later writes leave it alone
+    update_meal_plan(USER, plan["id"], {"recipes": [{"recipe_id": salad["id"], "meal_type": "lunch"}]})
+    planned = dynamodb.Table(TABLE_NAME).get_item(Key={"PK": f"PLANNED#{stew['id']}", "SK": f"USER#{USER}#MEAL_PLAN#{plan['id']}"})
+    assert "Item" not in planned
+    update_recipe(stew["id"], {"name": "Irish Stew"})
+    wait_for_fan_out()
+    assert get_meal_plan(USER, plan["id"])["version"] == 3
+
+def test_week_document_follows_recipe_writes(dynamodb, sample_recipe, monkeypatch):
+    """Test that renaming or deleting a planned recipe refreshes its plans and weeks in batches."""
+    monkeypatch.setattr(dynamodb_module, "FAN_OUT_BATCH_SIZE", 2)
+    recipe = create_recipe({**sample_recipe, "name": "Stew"})
+    for day in ("2024-01-01", "2024-01-02", "2024-02-01"):
+        create_meal_plan(USER, {"date": day, "recipes": [{"recipe_id": recipe["id"], "meal_type": "dinner"}]})
+    create_meal_plan(USER, {"date": "2024-03-01", "recipes": []})
+    
+    update_recipe(recipe["id"], {"name": "Beef Stew"})
+    wait_for_fan_out()
+    assert week_meals("2024-W01") == [("2024-01-01", "dinner", "Beef Stew"), ("2024-01-02", "dinner", "Beef Stew")]
+    assert week_meals("2024-W05") == [("2024-02-01", "dinner", "Beef Stew")]
+    
+    # Writes leaving the display fields alone don't touch the plans or weeks
+    versions = get_collection_version(user_key(USER, "MEAL_PLAN")), get_week(USER, "2024-W01")["version"]
+    update_recipe(recipe["id"], {"servings": 6})
+    wait_for_fan_out()
+    assert (get_collection_version(user_key(USER, "MEAL_PLAN")), get_week(USER, "2024-W01")["version"]) == versions
+    
+    delete_recipe(recipe["id"])
+    wait_for_fan_out()
+    assert week_meals("2024-W05") == [("2024-02-01", "dinner", None)]
+    assert get_week(USER, "2024-W05")["days"][3]["meals"][0]["recipe_id"] == recipe["id"]
+
+def test_fan_out_splits_transactions_by_action_count(dynamodb, sample_recipe):
+    """Test that plans using a recipe in many entries are refreshed in several transactions."""
+    recipe = create_recipe({**sample_recipe, "name": "Stew"})
+    entries = [{"recipe_id": recipe["id"], "meal_type": "dinner"}] * 10
+    plans = [create_meal_plan(USER, {"date": f"2024-01-{day:02d}", "recipes": entries}) for day in range(1, 21)]
+    
+    # 20 plans of 11 writes each are far beyond one transaction's 100 actions
+    update_recipe(recipe["id"], {"name": "Beef Stew"})
+    wait_for_fan_out()
+    for plan in plans:
+        assert {entry["recipe_name"] for entry in get_meal_plan(USER, plan["id"])["recipes"]} == {"Beef Stew"}
+    assert {meal[2] for meal in week_meals("2024-W02")} == {"Beef Stew"}
+
+# Grocery item tests
+def grocery_items(grocery_list):
+    return [(item["ingredient_id"], item["quantity"], item["unit"], item["checked"]) for item in grocery_list["items"]]
+
+def create_list_with_items():
+    return create_grocery_list(USER, {"name": "Weekly", "items": [
+        {"ingredient_id": "flour", "ingredient_name": "Flour", "quantity": Decimal("2"), "unit": "cups", "checked": False},
+        {"ingredient_id": "eggs", "ingredient_name": "Eggs", "quantity": Decimal("6"), "unit": "pcs", "checked": False},
+    ]})
+
+def test_grocery_items_are_edited_in_place(dynamodb):
+    """Test that item edits write single items, and a missing list or item is reported as None."""
+    grocery_list = create_list_with_items()
+    stored = dynamodb.Table(TABLE_NAME).get_item(Key={"PK": f"USER#{USER}#GROCERY_LIST#{grocery_list['id']}", "SK": "ITEM#eggs"})
+    assert stored["Item"]["ingredient_name"] == "Eggs"
+    
+    updated = set_grocery_item_quantity(USER, grocery_list["id"], "eggs", 12)
+    assert (updated["quantity"], updated["unit"], updated["version"]) == (12, "pcs", 1)
+    assert grocery_items(get_grocery_list(USER, grocery_list["id"])) == [("flour", 2, "cups", False), ("eggs", 12, "pcs", False)]
+    
+    added = add_grocery_item(USER, grocery_list["id"], {"ingredient_id": "milk", "quantity": 1.5, "unit": "l"})
+    assert (added["quantity"], added["position"]) == (Decimal("1.5"), 2)
+    # Adding an ingredient already on the list updates it
+    add_grocery_item(USER, grocery_list["id"], {"ingredient_id": "flour", "ingredient_name": "Flour", "quantity": 3, "unit": "cups"})
+    stored = get_grocery_list(USER, grocery_list["id"])
+    assert grocery_items(stored)[0] == ("flour", 3, "cups", False) and len(stored["items"]) == 3
+    assert stored["version"] == 4
+    
+    assert remove_grocery_item(USER, grocery_list["id"], "flour")["ingredient_id"] == "flour"
+    stored = get_grocery_list(USER, grocery_list["id"])
+    assert [item["ingredient_id"] for item in stored["items"]] == ["eggs", "milk"]
+    assert stored["version"] == 5
+    
+    # Writes changing nothing are skipped
+    assert set_grocery_item_quantity(USER, grocery_list["id"], "eggs", 12)["version"] == 1
+    assert get_collection_version(user_key(USER, "GROCERY_LIST")) == 5
+    
+    assert remove_grocery_item(USER, grocery_list["id"], "flour") is None
+    assert set_grocery_item_quantity(USER, "missing", "eggs", 1) is None
+    assert add_grocery_item(USER, "missing", {"ingredient_id": "eggs"}) is None
+
+def test_grocery_lists_beyond_one_transaction(dynamodb):
+    """Test that lists with more items than one transaction holds are written whole, and listed by header."""
+    items = [{"ingredient_id": f"ingredient-{n:03d}", "quantity": 1, "unit": "pcs"} for n in range(150)]
+    grocery_list = create_grocery_list(USER, {"name": "Party", "items": items})
+    assert len(get_grocery_list(USER, grocery_list["id"])["items"]) == 150
+    assert get_collection_version(user_key(USER, "GROCERY_LIST")) == 1
+    
+    updated = update_grocery_list(USER, grocery_list["id"], {"name": "Big party", "items": items[50:] + [
+        {"ingredient_id": f"ingredient-{n:03d}", "quantity": 2, "unit": "pcs"} for n in range(150, 230)
+    ]})
+    assert len(updated["items"]) == 180
+    assert updated["version"] == get_grocery_list(USER, grocery_list["id"])["version"]
+    
+    # One Query of headers, without items
+    create_grocery_list(USER, {"name": "Apples", "items": items[:3]})
+    headers = get_grocery_lists(USER)
+    assert [(entry["name"], "items" in entry) for entry in headers] == [("Apples", False), ("Big party", False)]
+
+def test_repeated_grocery_ingredients_are_merged(dynamodb):
+    """Test that lines repeating an ingredient add up instead of failing the transaction, unless units differ."""
+    items = [
+        {"ingredient_id": "eggs", "quantity": 2, "unit": "pcs", "checked": True},
+        {"ingredient_id": "flour", "quantity": 100, "unit": "g"},
+        {"ingredient_id": "eggs", "quantity": 4, "unit": "pcs"},
+    ]
+    grocery_list = create_grocery_list(USER, {"name": "Baking", "items": items})
+    stored = get_grocery_list(USER, grocery_list["id"])["items"]
+    assert [(item["ingredient_id"], item["quantity"], item["checked"]) for item in stored] == [
+        ("eggs", 6, False), ("flour", 100, False)
+    ]
+
+    updated = update_grocery_list(USER, grocery_list["id"], {"items": items + [items[1]]})
+    assert [item["quantity"] for item in updated["items"]] == [6, 200]
+    in_kilograms = {"ingredient_id": "flour", "quantity": 1, "unit": "kg"}
+    with pytest.raises(ValueError):
+        update_grocery_list(USER, grocery_list["id"], {"items": items + [in_kilograms]})
+
+def test_grocery_check_toggles_are_written_at_once(dynamodb):
+    """Test that each toggle is written before it returns, and a toggle changing nothing writes nothing."""
+    grocery_list = create_list_with_items()
+    
+    assert check_grocery_item(USER, grocery_list["id"], "flour")["checked"] is True
+    assert uncheck_grocery_item(USER, grocery_list["id"], "flour")["checked"] is False
+    check_grocery_item(USER, grocery_list["id"], "eggs")
+    stored = get_grocery_list(USER, grocery_list["id"])
+    assert [item["checked"] for item in stored["items"]] == [False, True]
+    assert stored["version"] == 4
+    assert get_collection_version(user_key(USER, "GROCERY_LIST")) == 4
+    
+    check_grocery_item(USER, grocery_list["id"], "eggs")
+    assert get_grocery_list(USER, grocery_list["id"])["version"] == 4
+    assert check_grocery_item(USER, grocery_list["id"], "milk") is None
+
+def test_item_collections_and_user_partitions_migrations(dynamodb, monkeypatch):
+    """Test that v004 and v005 move embedded meal plans and grocery lists into a user's collections and back."""
+    monkeypatch.setenv("DB_BACKEND", "dynamodb")
+    monkeypatch.setenv("DYNAMODB_TABLE", TABLE_NAME)
+    monkeypatch.setattr(v005_user_partitions, "OWNER_ID", USER)
+    db = DatabaseAdapter()
+    table = dynamodb.Table(TABLE_NAME)
+    for day in range(1, 4):
+        table.put_item(Item={
+            "PK": "MEAL_PLAN", "SK": f"plan-{day}", "GSI1PK": "MEAL_PLAN", "GSI1SK": f"2024-01-0{day}",
+            "id": f"plan-{day}", "date": f"2024-01-0{day}", "version": 2,
+            "recipes": [{"recipe_id": "stew", "meal_type": "dinner"}, {"recipe_id": "soup", "meal_type": "lunch"}],
+        })
+        table.put_item(Item={"PK": "PLANNED#stew", "SK": f"plan-{day}", "meal_plan_id": f"plan-{day}"})
+    table.put_item(Item={
+        "PK": "GROCERY_LIST", "SK": "list-1", "GSI1PK": "GROCERY_LIST", "GSI1SK": "Weekly",
+        "id": "list-1", "name": "Weekly", "meal_plan_id": "", "version": 3,
+        "items": [
+            {"ingredient_id": "eggs", "ingredient_name": "Eggs", "quantity": Decimal("6"), "unit": "pcs", "checked": True},
+            {"ingredient_id": "flour", "ingredient_name": "Flour", "quantity": Decimal("2"), "unit": "cups", "checked": False},
+        ],
+    })
+    table.put_item(Item={**empty_week(USER, "2024-W01"), "PK": "WEEK", "version": 4})
+    table.put_item(Item={"PK": "COLLECTION_VERSION", "SK": "MEAL_PLAN", "version": 7})
+    embedded = table.get_item(Key={"PK": "GROCERY_LIST", "SK": "list-1"})["Item"]
+    
+    # Pages smaller than the data exercise the streaming
+    query_pages = db.query_pages
+    monkeypatch.setattr(db, "query_pages", lambda *args, **kwargs: query_pages(*args, **{**kwargs, "page_size": 2}))
+    v004_item_collections.up(db)
+    assert db.query({"expression": "PK = :pk", "values": {":pk": "MEAL_PLAN"}}) == []
+    assert len(db.query({"expression": "PK = :pk", "values": {":pk": "MEAL_PLAN#plan-1"}})) == 3
+    v005_user_partitions.up(db)
+    
+    plans = get_meal_plans(USER, "2024-01-02")
+    assert [(plan["id"], plan["version"]) for plan in plans] == [("plan-2", 2), ("plan-3", 2)]
+    assert [entry["recipe_id"] for entry in plans[0]["recipes"]] == ["stew", "soup"]
+    assert get_meal_plans("someone-else") == []
+    grocery_list = get_grocery_list(USER, "list-1")
+    assert grocery_items(grocery_list) == [("eggs", 6, "pcs", True), ("flour", 2, "cups", False)]
+    assert grocery_list["version"] == 3
+    assert get_week(USER, "2024-W01")["version"] == 4
+    assert get_collection_version(user_key(USER, "MEAL_PLAN")) == 7
+    planned = table.query(KeyConditionExpression=Key("PK").eq("PLANNED#stew"))["Items"]
+    assert [(item["SK"], item["user_id"]) for item in planned] == [
+        (f"USER#{USER}#MEAL_PLAN#plan-{day}", USER) for day in range(1, 4)
+    ]
+    
+    v005_user_partitions.down(db)
+    v004_item_collections.down(db)
+    assert get_meal_plans(USER) == [] and get_grocery_list(USER, "list-1") is None
+    assert table.get_item(Key={"PK": "GROCERY_LIST", "SK": "list-1"})["Item"] == embedded
+    restored = table.get_item(Key={"PK": "MEAL_PLAN", "SK": "plan-1"})["Item"]
+    assert restored["GSI1SK"] == "2024-01-01" and len(restored["recipes"]) == 2
+    assert "user_id" not in table.get_item(Key={"PK": "WEEK", "SK": "WEEK#2024-W01"})["Item"]
+    assert [item["SK"] for item in table.query(KeyConditionExpression=Key("PK").eq("PLANNED#stew"))["Items"]] == [
+        f"plan-{day}" for day in range(1, 4)
+    ]
+    assert get_collection_version("MEAL_PLAN") == 7
+
+def test_users_see_only_their_own_data(dynamodb, sample_recipe):
+    """Test that meal plans, weeks and grocery lists are kept apart by user while recipes are shared."""
+    stew = create_recipe({**sample_recipe, "name": "Stew"})
+    mine = create_meal_plan(USER, {"date": "2024-01-01", "recipes": [{"recipe_id": stew["id"], "meal_type": "dinner"}]})
+    theirs = create_meal_plan("household-2", {"date": "2024-01-01", "recipes": [{"recipe_id": stew["id"], "meal_type": "lunch"}]})
+    create_grocery_list("household-2", {"name": "Theirs", "items": []})
+    
+    assert [plan["id"] for plan in get_meal_plans(USER)] == [mine["id"]]
+    assert get_meal_plan(USER, theirs["id"]) is None
+    assert update_meal_plan(USER, theirs["id"], {"date": "2024-01-02"}) is None
+    assert week_meals("2024-W01") == [("2024-01-01", "dinner", "Stew")]
+    assert get_grocery_lists(USER) == []
+    assert get_collection_version(user_key(USER, "MEAL_PLAN")) == 1
+    
+    # A shared recipe's rename reaches every user's plans and weeks
+    update_recipe(stew["id"], {"name": "Beef Stew"})
+    wait_for_fan_out()
+    assert get_meal_plan("household-2", theirs["id"])["recipes"][0]["recipe_name"] == "Beef Stew"
+    assert week_meals("2024-W01") == [("2024-01-01", "dinner", "Beef Stew")]
+    
+    with pytest.raises(ValueError):
+        get_meal_plans("bad#user")
+
+def test_private_recipes_stay_with_their_owner(dynamodb, sample_recipe):
+    """Test that a private recipe is read, planned and renamed only by its owner, apart from the catalog."""
+    shared = create_recipe({**sample_recipe, "name": "Stew"})
+    private = create_recipe({**sample_recipe, "name": "Grandma's Soup"}, USER)
+    assert (private["PK"], private["user_id"], private["public"]) == (user_key(USER, "RECIPE"), USER, False)
+    assert get_collection_version("RECIPE") == 1
+    assert get_collection_version(user_key(USER, "RECIPE")) == 1
+    
+    assert [recipe["id"] for recipe in get_recipes(user_id=USER)] == [shared["id"], private["id"]]
+    assert [recipe["id"] for recipe in get_recipes(user_id="household-2")] == [shared["id"]]
+    assert get_recipe(private["id"], user_id=USER)["name"] == "Grandma's Soup"
+    assert get_recipe(private["id"], user_id="household-2") is None
+    assert get_recipe(private["id"]) is None
+    
+    lunch = {"date": "2024-01-01", "recipes": [{"recipe_id": private["id"], "meal_type": "lunch"}]}
+    plan = create_meal_plan(USER, lunch)
+    assert plan["recipes"][0]["recipe_name"] == "Grandma's Soup"
+    # Planning someone else's private recipe copies nothing of it
+    theirs = create_meal_plan("household-2", lunch)
+    assert theirs["recipes"][0]["recipe_name"] is None
+    
+    update_recipe(private["id"], {"name": "Soup"}, USER)
+    wait_for_fan_out()
+    assert get_meal_plan(USER, plan["id"])["recipes"][0]["recipe_name"] == "Soup"
+    assert get_meal_plan("household-2", theirs["id"])["recipes"][0]["recipe_name"] is None
+    assert get_collection_version("RECIPE") == 1
+    
+    delete_recipe(private["id"], USER)
+    assert get_recipe(private["id"], user_id=USER) is None
+    assert get_collection_version(user_key(USER, "RECIPE")) == 3
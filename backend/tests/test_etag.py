@@ -0,0 +1,105 @@
+from datetime import date
+from fastapi import status
+from starlette.requests import Request
+from app.api.etag import make_etag, item_etag, etag_matches
+from app.db.versions import GROCERY_LIST, MEAL_PLAN, bump_collection_version, get_collection_versions
+from app.models.models import (
+    GroceryList as GroceryListModel, Ingredient as IngredientModel, MealPlan as MealPlanModel, grocery_list_item
+)
+
+def make_request(headers=None):
+    """Build a bare GET request with the given headers."""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": raw_headers})
+
+def test_make_etag_is_strong_and_stable():
+    """Test that ETags are quoted, deterministic and sensitive to their inputs."""
+    etag = make_etag("RECIPE", 3)
+    
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("RECIPE", 3)
+    assert etag != make_etag("RECIPE", 4)
+
+def test_item_etag_uses_version():
+    """Test that item ETags follow the item version, not unrelated content."""
+    item = {"id": "abc", "name": "Soup", "version": 2}
+    
+    assert item_etag(item) == item_etag({**item, "name": "Stew"})
+    assert item_etag(item) != item_etag({**item, "version": 3})
+
+def test_etag_matches():
+    """Test If-None-Match parsing, including lists, weak tags and wildcards."""
+    etag = make_etag("RECIPE", 1)
+    
+    assert not etag_matches(make_request(), etag)
+    assert etag_matches(make_request({"If-None-Match": etag}), etag)
+    assert etag_matches(make_request({"If-None-Match": f'"other", W/{etag}'}), etag)
+    assert etag_matches(make_request({"If-None-Match": "*"}), etag)
+    assert not etag_matches(make_request({"If-None-Match": '"other"'}), etag)
+
+def test_recipe_conditional_get(client, sample_recipe):
+    """Test that recipe GETs return 304 until the recipe changes."""
+    # 1. Create a recipe and fetch it
+    recipe_id = client.post("/api/recipes/", json=sample_recipe).json()["id"]
+    response = client.get(f"/api/recipes/{recipe_id}")
+    etag = response.headers["etag"]
+    
+    # 2. A matching conditional GET returns 304 with no body
+    response = client.get(f"/api/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    
+    # 3. Updating the recipe invalidates the ETag
+    client.put(f"/api/recipes/{recipe_id}", json={"name": "Updated Recipe Name"})
+    response = client.get(f"/api/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+
+def test_recipe_list_conditional_get(client, sample_recipe):
+    """Test that the recipe list ETag follows the collection version."""
+    etag = client.get("/api/recipes/").headers["etag"]
+    
+    response = client.get("/api/recipes/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    # Any write to the collection invalidates the list ETag
+    client.post("/api/recipes/", json=sample_recipe)
+    response = client.get("/api/recipes/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+def test_grocery_list_etag_follows_ingredients_and_meal_plans(sql_client, sql_session):
+    """Test that renaming an ingredient or deleting a linked meal plan changes grocery list ETags."""
+    with sql_session() as db:
+        db.add_all([
+            IngredientModel(id=1, name="Flour"),
+            MealPlanModel(id=1, date=date(2024, 1, 1)),
+            GroceryListModel(id=1, name="Weekly", meal_plan_id=1),
+        ])
+        db.flush()
+        db.execute(grocery_list_item.insert(), [
+            {"grocery_list_id": 1, "ingredient_id": 1, "quantity": 2, "unit": "cups"}
+        ])
+        db.commit()
+    
+    for path in ("/api/grocery-lists/1", "/api/grocery-lists/"):
+        etag = sql_client.get(path).headers["etag"]
+        assert sql_client.get(path, headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+        sql_client.put("/api/ingredients/1", json={"name": f"Flour {path}"})
+        assert sql_client.get(path, headers={"If-None-Match": etag}).status_code == status.HTTP_200_OK
+    
+    etag = sql_client.get("/api/grocery-lists/1").headers["etag"]
+    assert sql_client.delete("/api/meal-plans/1").status_code == status.HTTP_204_NO_CONTENT
+    response = sql_client.get("/api/grocery-lists/1", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["meal_plan_id"] is None
+
+def test_collection_versions_are_upserted(sql_session):
+    """Test that a collection's first bump creates its version row and later bumps count up."""
+    with sql_session() as db:
+        bump_collection_version(db, MEAL_PLAN)
+        db.commit()
+        bump_collection_version(db, MEAL_PLAN)
+        bump_collection_version(db, MEAL_PLAN)
+        db.commit()
+        assert get_collection_versions(db, [MEAL_PLAN, GROCERY_LIST]) == {MEAL_PLAN: 3, GROCERY_LIST: 0}
@@ -0,0 +1,17 @@
+import asyncio
+import threading
+from app.db.executor import run_blocking
+
+def test_run_blocking_returns_result():
+    """Test that blocking calls are awaited with their arguments passed through."""
+    result = asyncio.run(run_blocking(lambda a, b=0: a + b, 2, b=3))
+    
+    assert result == 5
+
+def test_run_blocking_uses_dynamodb_executor():
+    """Test that blocking calls run on the dedicated executor, not the event loop thread."""
+    loop_thread = threading.current_thread().name
+    worker_thread = asyncio.run(run_blocking(lambda: threading.current_thread().name))
+    
+    assert worker_thread != loop_thread
+    assert worker_thread.startswith("dynamodb")
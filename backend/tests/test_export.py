@@ -0,0 +1,48 @@
+import gzip
+import json
+from decimal import Decimal
+
+from app.api.export import buffered, export_recipes, gzipped, ndjson_lines
+from app.db.dynamodb import table
+
+def test_ndjson_lines_are_one_record_per_line():
+    """Test that records serialise as newline-terminated JSON, DynamoDB numbers included."""
+    lines = list(ndjson_lines([{"type": "recipes", "data": {"servings": Decimal("4"), "quantity": Decimal("1.5")}}]))
+    assert lines == [b'{"type":"recipes","data":{"servings":4,"quantity":1.5}}\n']
+
+def test_buffered_joins_small_chunks():
+    """Test that small chunks are coalesced without losing or reordering bytes."""
+    chunks = list(buffered((b"x" * 10 for _ in range(25)), size=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert b"".join(chunks) == b"x" * 250
+
+def test_gzipped_stream_decompresses():
+    """Test that the incremental compressor writes one valid gzip member."""
+    data = [b'{"a":1}\n'] * 1000
+    assert gzip.decompress(b"".join(gzipped(data))) == b"".join(data)
+
+def test_export_recipes_follows_pages(dynamodb):
+    """Test that recipes are read across DynamoDB pages without storage keys."""
+    for index in range(5):
+        table.put_item(Item={"PK": "RECIPE", "SK": f"RECIPE#{index}", "id": str(index), "name": f"Recipe {index}"})
+    table.put_item(Item={"PK": "INGREDIENT", "SK": "INGREDIENT#1", "id": "1", "name": "Salt"})
+
+    recipes = list(export_recipes(page_size=2))
+    assert sorted(recipe["id"] for recipe in recipes) == ["0", "1", "2", "3", "4"]
+    assert all(set(recipe) == {"id", "name"} for recipe in recipes)
+
+def test_export_endpoint_streams_ndjson(client, sample_recipe):
+    """Test that the export endpoint streams the stored recipes as NDJSON."""
+    client.post("/api/recipes/", json=sample_recipe)
+
+    response = client.get("/api/export?resources=recipes")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.content.splitlines()]
+    assert [(record["type"], record["data"]["name"]) for record in records] == [("recipes", sample_recipe["name"])]
+
+    response = client.get("/api/export?resources=recipes&gzip=true")
+    assert response.headers["content-type"] == "application/gzip"
+    assert len(gzip.decompress(response.content).splitlines()) == 1
+
+    assert client.get("/api/export?resources=unknown").status_code == 400
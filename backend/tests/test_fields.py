@@ -0,0 +1,52 @@
+import pytest
+from fastapi import HTTPException, status
+from app.api.fields import parse_fields, sparse_model
+from app.db.dynamodb import projection
+from app.schemas.schemas import Recipe
+
+def test_parse_fields():
+    """Test that field selections are validated and put in model order."""
+    assert parse_fields(None, Recipe) is None
+    assert parse_fields("", Recipe) is None
+    assert parse_fields("id, name,id", Recipe) == ("name", "id")
+
+    with pytest.raises(HTTPException) as exc_info:
+        parse_fields("name,PK", Recipe)
+    assert exc_info.value.status_code == 400
+    assert "PK" in exc_info.value.detail
+
+def test_sparse_model_is_cached():
+    """Test that sparse models only have the selected fields and are built once."""
+    model = sparse_model(Recipe, ("name", "id"))
+
+    assert list(model.__fields__) == ["name", "id"]
+    assert sparse_model(Recipe, ("name", "id")) is model
+    assert model.parse_obj({"name": "Soup", "id": "abc", "servings": 2}).dict() == {"name": "Soup", "id": "abc"}
+
+def test_projection_expression():
+    """Test that DynamoDB projections use placeholders and include required keys."""
+    assert projection(None) == {}
+
+    kwargs = projection(("name", "id"), "id", "version")
+    assert kwargs["ProjectionExpression"] == "#name, #id, #version"
+    assert kwargs["ExpressionAttributeNames"] == {"#name": "name", "#id": "id", "#version": "version"}
+
+def test_recipe_sparse_fieldsets(client, sample_recipe):
+    """Test that recipe GETs return only the requested fields."""
+    # 1. Create a recipe
+    recipe_id = client.post("/api/recipes/", json=sample_recipe).json()["id"]
+
+    # 2. List only names and ids
+    response = client.get("/api/recipes/?fields=id,name")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"name": sample_recipe["name"], "id": recipe_id}]
+
+    # 3. Each selection of the same recipe is its own representation
+    response = client.get(f"/api/recipes/{recipe_id}?fields=prep_time")
+    assert response.json() == {"prep_time": sample_recipe["prep_time"]}
+    etag = response.headers["ETag"]
+    assert client.get(f"/api/recipes/{recipe_id}?fields=name").headers["ETag"] != etag
+
+    # 4. Unknown fields are rejected
+    response = client.get("/api/recipes/?fields=name,secret")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,137 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.db.grocery import aggregate_lines, create_generated_grocery_list, expand_meal_plans, merge_units
+from app.models.models import (
+    GroceryList as GroceryListModel,
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    grocery_list_item,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+def make_session():
+    """An in-memory database with two days of meals: pancakes twice, an omelette once."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        IngredientModel(id=1, name="Egg", category="dairy"),
+        IngredientModel(id=2, name="Flour", category="baking"),
+        IngredientModel(id=3, name="Milk", category="dairy"),
+        RecipeModel(id=1, name="Pancakes", servings=2),
+        RecipeModel(id=2, name="Omelette", servings=1),
+        MealPlanModel(id=1, date=date(2024, 1, 1)),
+        MealPlanModel(id=2, date=date(2024, 1, 2)),
+    ])
+    db.flush()
+    db.execute(recipe_ingredient.insert(), [
+        {"recipe_id": 1, "ingredient_id": 1, "quantity": 2, "unit": "pcs"},
+        {"recipe_id": 1, "ingredient_id": 2, "quantity": 100, "unit": "g"},
+        {"recipe_id": 1, "ingredient_id": 3, "quantity": 200, "unit": "ml"},
+        {"recipe_id": 2, "ingredient_id": 1, "quantity": 3, "unit": "pcs"},
+        {"recipe_id": 2, "ingredient_id": 3, "quantity": 2, "unit": "tbsp"},
+    ])
+    db.execute(meal_plan_recipe.insert(), [
+        {"meal_plan_id": 1, "recipe_id": 1, "meal_type": "breakfast"},
+        {"meal_plan_id": 2, "recipe_id": 1, "meal_type": "breakfast"},
+        {"meal_plan_id": 2, "recipe_id": 2, "meal_type": "lunch"},
+    ])
+    db.commit()
+    return db
+
+def test_aggregate_lines_groups_by_ingredient_and_unit():
+    """Test that quantities are summed per (ingredient, unit) pair."""
+    totals = aggregate_lines(np.array([3, 1, 3, 1]), ["g", "pcs", "g", "g"], np.array([1.0, 2.0, 3.0, 4.0]))
+    assert totals == [(1, "g", 4.0), (1, "pcs", 2.0), (3, "g", 4.0)]
+    assert aggregate_lines(np.array([], dtype=np.int64), [], np.array([])) == []
+
+def test_aggregate_lines_converts_units():
+    """Test that lines in convertible units are summed, keeping a unit all lines share."""
+    totals = aggregate_lines(
+        np.array([1, 1, 2, 2, 3, 3, 4, 4]),
+        ["tbsp", "Tablespoons", "tbsp", "ml", "kg", "g", "clove", " Clove"],
+        np.array([2.0, 1.0, 2.0, 30.0, 1.0, 500.0, 2.0, 1.0])
+    )
+    assert totals == [(1, "tbsp", 3.0), (2, "ml", 60.0), (3, "kg", 1.5), (4, "clove", 3.0)]
+
+def test_aggregate_lines_weighs_volume_with_density():
+    """Test that volume lines are weighed when the ingredient is also measured by mass."""
+    ingredient_ids, quantities = np.array([1, 1, 2, 2]), np.array([100.0, 1.0, 100.0, 1.0])
+    totals = aggregate_lines(ingredient_ids, ["g", "cup", "g", "cup"], quantities, densities={1: 0.5})
+    # Ingredient 2 has no density, so its cup stays a separate line
+    assert totals == [(1, "g", 220.0), (2, "g", 100.0), (2, "cup", 1.0)]
+
+def test_merge_units():
+    """Test that one ingredient in several units becomes one item led by its largest line."""
+    assert merge_units([("g", 250.0)]) == (250.0, "g")
+    assert merge_units([("tbsp", 2.0), ("ml", 400.0)]) == (400.0, "ml + 2 tbsp")
+
+def test_expand_meal_plans_scales_and_sums():
+    """Test that the meals of a range expand to ingredient totals, scaled by serving overrides."""
+    db = make_session()
+    try:
+        expanded = expand_meal_plans(db, date(2024, 1, 1), date(2024, 1, 2), servings={"1": 4})
+        assert expanded["meal_plan_ids"] == [1, 2]
+        items = {item["ingredient_name"]: (item["quantity"], item["unit"], item["category"]) for item in expanded["items"]}
+        # Pancakes planned twice, cooked for 4 instead of 2; one omelette
+        assert items == {
+            "Egg": (11.0, "pcs", "dairy"),
+            "Flour": (400.0, "g", "baking"),
+            "Milk": (830.0, "ml", "dairy"),
+        }
+        assert [item["ingredient_name"] for item in expanded["items"]] == ["Flour", "Egg", "Milk"]
+        assert expand_meal_plans(db, date(2024, 2, 1), date(2024, 2, 7))["items"] == []
+    finally:
+        db.close()
+
+def test_create_generated_grocery_list():
+    """Test that the generated list is stored with its items and grouped by category."""
+    db = make_session()
+    try:
+        grocery_list = create_generated_grocery_list(db, "Week 1", date(2024, 1, 2), date(2024, 1, 2))
+        db.commit()
+
+        assert grocery_list["meal_plan_id"] == "2"
+        assert [(section["category"], len(section["items"])) for section in grocery_list["sections"]] == [
+            ("baking", 1), ("dairy", 2)
+        ]
+        stored = db.execute(
+            select(grocery_list_item.c.ingredient_id, grocery_list_item.c.quantity, grocery_list_item.c.unit)
+            .where(grocery_list_item.c.grocery_list_id == int(grocery_list["id"]))
+            .order_by(grocery_list_item.c.ingredient_id)
+        ).all()
+        assert [tuple(row) for row in stored] == [(1, 5.0, "pcs"), (2, 100.0, "g"), (3, 230.0, "ml")]
+        assert db.get(GroceryListModel, int(grocery_list["id"])).name == "Week 1"
+    finally:
+        db.close()
+
+def test_generate_refuses_non_positive_servings(sql_client):
+    """Test that a servings override below one is rejected rather than stored."""
+    body = {"start_date": "2024-01-01", "end_date": "2024-01-02"}
+    for servings in (0, -2):
+        response = sql_client.post("/api/grocery-lists/generate", json={**body, "servings": {"1": servings}})
+        assert response.status_code == 422
+    assert sql_client.post("/api/grocery-lists/generate", json={**body, "servings": {"1": 3}}).status_code == 201
+
+def test_checking_an_item_leaves_the_rest_alone(sql_client, sql_session):
+    """Test that a PATCH with only checked toggles the item without touching its quantity or unit."""
+    with sql_session() as db:
+        db.add_all([IngredientModel(id=1, name="Egg"), GroceryListModel(id=1, name="Weekly")])
+        db.flush()
+        db.execute(grocery_list_item.insert(), [{"grocery_list_id": 1, "ingredient_id": 1, "quantity": 6, "unit": "pcs"}])
+        db.commit()
+
+    assert sql_client.patch("/api/grocery-lists/1/items/1", json={"checked": True}).status_code == 200
+    assert sql_client.patch("/api/grocery-lists/1/items/1", json={}).status_code == 200
+    with sql_session() as db:
+        item = db.execute(select(grocery_list_item)).one()
+    assert (item.quantity, item.unit, item.checked) == (6, "pcs", 1)
+    assert sql_client.patch("/api/grocery-lists/1/items/2", json={"checked": True}).status_code == 404
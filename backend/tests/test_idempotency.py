@@ -0,0 +1,118 @@
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI, HTTPException, Response, status
+from fastapi.testclient import TestClient
+from app.api.idempotency import IdempotencyMiddleware, request_hash
+from app.api.users import DEFAULT_USER_ID as USER
+from app.db.dynamodb import (
+    claim_idempotency_key, complete_idempotency_key, get_idempotency_record, release_idempotency_key
+)
+
+@pytest.fixture(scope="function")
+def idempotent_app(dynamodb):
+    """Small app whose creates make a new id per run and count their runs."""
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, ttl_seconds=3600, lock_seconds=60)
+    app.state.runs = 0
+
+    @app.post("/items", status_code=status.HTTP_201_CREATED)
+    def create_item(item: dict, response: Response):
+        app.state.runs += 1
+        item_id = str(uuid.uuid4())
+        response.headers["Location"] = f"/items/{item_id}"
+        return {"id": item_id, **item}
+
+    @app.post("/broken")
+    def broken():
+        app.state.runs += 1
+        raise HTTPException(status_code=503, detail="Try again")
+
+    return app
+
+def test_retries_replay_the_first_response(idempotent_app):
+    """Test that a retried POST gets the stored response without running again."""
+    client = TestClient(idempotent_app)
+    headers = {"Idempotency-Key": "key-1"}
+    first = client.post("/items", json={"name": "Soup"}, headers=headers)
+    assert first.status_code == status.HTTP_201_CREATED
+    assert "idempotent-replayed" not in first.headers
+
+    retry = client.post("/items", json={"name": "Soup"}, headers=headers)
+    assert (retry.status_code, retry.json()) == (status.HTTP_201_CREATED, first.json())
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["location"] == first.headers["location"]
+    assert retry.headers["content-type"] == "application/json"
+    assert idempotent_app.state.runs == 1
+    # The response is kept for the TTL, not the claim's lease
+    assert get_idempotency_record(USER, "key-1")["expires_at"] > time.time() + 3000
+
+    # Without a key, or with another one, every request runs
+    assert client.post("/items", json={"name": "Soup"}).json()["id"] != first.json()["id"]
+    other_key = client.post("/items", json={"name": "Soup"}, headers={"Idempotency-Key": "key-2"})
+    assert other_key.json()["id"] != first.json()["id"]
+    assert idempotent_app.state.runs == 3
+
+def test_keys_are_scoped_to_their_user(idempotent_app):
+    """Test that users sending the same key neither replay nor block each other's requests."""
+    client = TestClient(idempotent_app)
+    alice = client.post("/items", json={"name": "Soup"}, headers={"Idempotency-Key": "key-1", "X-User-Id": "alice"})
+    bob = client.post("/items", json={"name": "Soup"}, headers={"Idempotency-Key": "key-1", "X-User-Id": "bob"})
+    assert "idempotent-replayed" not in bob.headers
+    assert bob.json()["id"] != alice.json()["id"]
+    assert get_idempotency_record("alice", "key-1")["state"] == "complete"
+    assert get_idempotency_record(USER, "key-1") is None
+
+    # A different request under the same key is only refused within the user who used it
+    stew = client.post("/items", json={"name": "Stew"}, headers={"Idempotency-Key": "key-1"})
+    assert stew.status_code == status.HTTP_201_CREATED
+    invalid = client.post("/items", json={}, headers={"Idempotency-Key": "key-2", "X-User-Id": "a#b"})
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+    assert idempotent_app.state.runs == 3
+
+def test_reused_and_pending_keys_are_refused(idempotent_app):
+    """Test that a key reused for another request is refused, as is a retry while the first still runs."""
+    client = TestClient(idempotent_app)
+    client.post("/items", json={"name": "Soup"}, headers={"Idempotency-Key": "key-1"})
+    reused = client.post("/items", json={"name": "Stew"}, headers={"Idempotency-Key": "key-1"})
+    assert reused.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    body = b'{"name": "Soup"}'
+    in_flight = request_hash({"method": "POST", "path": "/items", "query_string": b""}, body)
+    assert claim_idempotency_key(USER, "key-2", in_flight, int(time.time()) + 60)
+    headers = {"Idempotency-Key": "key-2", "Content-Type": "application/json"}
+    pending = client.post("/items", content=body, headers=headers)
+    assert pending.status_code == status.HTTP_409_CONFLICT and pending.headers["retry-after"] == "1"
+
+    too_long = client.post("/items", json={}, headers={"Idempotency-Key": "k" * 256})
+    assert too_long.status_code == status.HTTP_400_BAD_REQUEST
+    assert idempotent_app.state.runs == 1
+
+def test_failures_and_expired_keys_run_again(idempotent_app):
+    """Test that a 5xx response releases its key, and an expired record no longer holds one."""
+    client = TestClient(idempotent_app)
+    for _ in range(2):
+        assert client.post("/broken", headers={"Idempotency-Key": "key-1"}).status_code == 503
+    assert idempotent_app.state.runs == 2
+    assert get_idempotency_record(USER, "key-1") is None
+
+    assert claim_idempotency_key(USER, "key-2", "stale", int(time.time()) - 1)
+    assert get_idempotency_record(USER, "key-2") is None
+    assert client.post("/items", json={"name": "Soup"}, headers={"Idempotency-Key": "key-2"}).status_code == 201
+    assert get_idempotency_record(USER, "key-2")["state"] == "complete"
+
+def test_lost_claims_leave_the_key_alone(dynamodb):
+    """Test that a request whose lease ran out can neither complete nor release the claim that took over."""
+    stale = claim_idempotency_key(USER, "key-1", "hash", int(time.time()) - 1)
+    current = claim_idempotency_key(USER, "key-1", "hash", int(time.time()) + 60)
+    assert stale and current and stale != current
+
+    assert not complete_idempotency_key(USER, "key-1", stale, 201, [], b"", int(time.time()) + 3600)
+    release_idempotency_key(USER, "key-1", stale)
+    assert get_idempotency_record(USER, "key-1")["claim"] == current
+
+    headers = [["content-type", "application/json"]]
+    assert complete_idempotency_key(USER, "key-1", current, 201, headers, b"", int(time.time()) + 3600)
+    release_idempotency_key(USER, "key-1", current)
+    assert get_idempotency_record(USER, "key-1")["state"] == "complete"
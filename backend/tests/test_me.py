@@ -0,0 +1,79 @@
+import pytest
+from fastapi import status
+
+from app.models.models import Ingredient as IngredientModel
+
+ALICE = {"X-User-Id": "alice"}
+BOB = {"X-User-Id": "bob"}
+
+@pytest.fixture(scope="function")
+def eggs(sql_session):
+    """The ingredient catalog the grocery lists name their items from."""
+    with sql_session() as db:
+        db.add_all([IngredientModel(id=1, name="Egg", category="dairy"), IngredientModel(id=2, name="Flour")])
+        db.commit()
+
+def test_meal_plans_and_weeks_belong_to_their_user(client, sample_recipe):
+    """Test that a user's plans, private recipes included, are served to that user only."""
+    stew = client.post("/api/recipes/", json={**sample_recipe, "name": "Stew"}).json()
+    soup = client.post("/api/recipes/", json={**sample_recipe, "name": "Soup", "public": False}, headers=ALICE).json()
+    meals = [{"recipe_id": stew["id"], "meal_type": "lunch"}, {"recipe_id": soup["id"], "meal_type": "dinner"}]
+    
+    response = client.post("/api/me/meal-plans/", json={"date": "2024-01-02", "recipes": meals}, headers=ALICE)
+    assert response.status_code == status.HTTP_201_CREATED
+    plan = response.json()
+    assert [meal["recipe_name"] for meal in plan["recipes"]] == ["Stew", "Soup"]
+    
+    # Bob can't plan Alice's private recipe or see her plan
+    refused = client.post("/api/me/meal-plans/", json={"date": "2024-01-02", "recipes": meals}, headers=BOB)
+    assert refused.status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/api/me/meal-plans/", headers=BOB).json() == []
+    assert client.get(f"/api/me/meal-plans/{plan['id']}", headers=BOB).status_code == status.HTTP_404_NOT_FOUND
+    assert client.delete(f"/api/me/meal-plans/{plan['id']}", headers=BOB).status_code == status.HTTP_404_NOT_FOUND
+    
+    week = client.get("/api/me/weeks/2024-W01", headers=ALICE)
+    assert [meal["recipe_name"] for meal in week.json()["days"][1]["meals"]] == ["Stew", "Soup"]
+    assert client.get("/api/me/weeks/2024-W01", headers=BOB).json()["days"][1]["meals"] == []
+    assert week.headers["etag"] != client.get("/api/me/weeks/2024-W02", headers=ALICE).headers["etag"]
+    
+    etag = client.get("/api/me/meal-plans/", headers=ALICE).headers["etag"]
+    updated = client.put(f"/api/me/meal-plans/{plan['id']}", json={"date": "2024-01-09"}, headers=ALICE).json()
+    assert (updated["date"], len(updated["recipes"])) == ("2024-01-09", 2)
+    response = client.get("/api/me/meal-plans/", headers={**ALICE, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/api/me/weeks/2024-W01", headers=ALICE).json()["days"][1]["meals"] == []
+    
+    assert client.delete(f"/api/me/meal-plans/{plan['id']}", headers=ALICE).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/me/meal-plans/", headers=ALICE).json() == []
+    assert client.get("/api/me/weeks/2024-1", headers=ALICE).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_grocery_lists_belong_to_their_user(sql_client, eggs):
+    """Test that a user's grocery lists take catalog names and are served and changed by that user only."""
+    items = [
+        {"ingredient_id": "1", "quantity": 6, "unit": "pcs"},
+        {"ingredient_id": "2", "ingredient_name": "Bread flour", "quantity": 500, "unit": "g"},
+    ]
+    response = sql_client.post("/api/me/grocery-lists/", json={"name": "Weekend", "items": items}, headers=ALICE)
+    assert response.status_code == status.HTTP_201_CREATED
+    grocery_list = response.json()
+    assert [item["ingredient_name"] for item in grocery_list["items"]] == ["Egg", "Bread flour"]
+    
+    assert [header["name"] for header in sql_client.get("/api/me/grocery-lists/", headers=ALICE).json()] == ["Weekend"]
+    assert sql_client.get("/api/me/grocery-lists/", headers=BOB).json() == []
+    path = f"/api/me/grocery-lists/{grocery_list['id']}"
+    assert sql_client.get(path, headers=BOB).status_code == status.HTTP_404_NOT_FOUND
+    assert sql_client.patch(f"{path}/items/1", json={"checked": True}, headers=BOB).status_code == 404
+    
+    checked = sql_client.patch(f"{path}/items/1", json={"checked": True}, headers=ALICE).json()
+    assert (checked["quantity"], checked["unit"], checked["checked"]) == (6, "pcs", True)
+    assert sql_client.patch(f"{path}/items/1", json={}, headers=ALICE).json()["checked"] is True
+    assert sql_client.patch(f"{path}/items/3", json={}, headers=ALICE).status_code == status.HTTP_404_NOT_FOUND
+    
+    renamed = sql_client.put(path, json={"name": "Saturday"}, headers=ALICE).json()
+    assert (renamed["name"], len(renamed["items"])) == ("Saturday", 2)
+    unknown = sql_client.put(path, json={"items": [{"ingredient_id": "9", "quantity": 1, "unit": "g"}]}, headers=ALICE)
+    assert unknown.status_code == status.HTTP_404_NOT_FOUND
+    
+    assert sql_client.delete(path, headers=BOB).status_code == status.HTTP_404_NOT_FOUND
+    assert sql_client.delete(path, headers=ALICE).status_code == status.HTTP_204_NO_CONTENT
+    assert sql_client.get("/api/me/grocery-lists/", headers=ALICE).json() == []
@@ -0,0 +1,117 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.db.nutrition import NutritionMatrix, get_nutrition_matrix, meal_plan_nutrition, recipe_nutrition, reset_nutrition_matrix
+from app.db.versions import INGREDIENT, bump_collection_version
+from app.models.models import (
+    Ingredient as IngredientModel,
+    IngredientNutrition as IngredientNutritionModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+def make_session():
+    """An in-memory database with pancakes planned on Sunday 7 and Monday 8 January 2024."""
+    reset_nutrition_matrix()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        IngredientModel(id=1, name="Egg", category="dairy"),
+        IngredientModel(id=2, name="Flour", category="baking"),
+        IngredientModel(id=3, name="Milk", category="dairy"),
+        IngredientModel(id=4, name="Vanilla", category="baking"),
+        RecipeModel(id=1, name="Pancakes", servings=2),
+        MealPlanModel(id=1, date=date(2024, 1, 7)),
+        MealPlanModel(id=2, date=date(2024, 1, 8)),
+    ])
+    db.flush()
+    db.add_all([
+        IngredientNutritionModel(ingredient_id=1, calories=140, protein=12, fat=10, grams_per_piece=50),
+        IngredientNutritionModel(ingredient_id=2, calories=360, protein=10, carbohydrates=76),
+        IngredientNutritionModel(ingredient_id=3, calories=60, protein=3, fat=3, carbohydrates=5, density=1.0),
+    ])
+    db.execute(recipe_ingredient.insert(), [
+        {"recipe_id": 1, "ingredient_id": 1, "quantity": 2, "unit": "pcs"},
+        {"recipe_id": 1, "ingredient_id": 2, "quantity": 100, "unit": "g"},
+        {"recipe_id": 1, "ingredient_id": 3, "quantity": 1, "unit": "cup"},
+        {"recipe_id": 1, "ingredient_id": 4, "quantity": 1, "unit": "tsp"},
+    ])
+    db.execute(meal_plan_recipe.insert(), [
+        {"meal_plan_id": 1, "recipe_id": 1, "meal_type": "breakfast"},
+        {"meal_plan_id": 2, "recipe_id": 1, "meal_type": "breakfast"},
+    ])
+    bump_collection_version(db, INGREDIENT)
+    db.commit()
+    return db
+
+# Pancakes: 2 eggs (100 g) 140 kcal + 100 g flour 360 kcal + 240 ml milk 144 kcal; vanilla has no facts
+PANCAKES = {"calories": 644.0, "protein": 29.2, "fat": 17.2, "carbohydrates": 88.0, "fiber": 0.0, "sugar": 0.0, "sodium": 0.0}
+
+def test_matrix_totals_groups_of_lines():
+    """Test that lines are weighed per unit and summed per group in one product."""
+    matrix = NutritionMatrix([(1, "Egg", 50, None, 140, 12, 10, 0, 0, 0, 0), (3, "Milk", None, None, 60, 3, 3, 5, 0, 5, 40)], 1)
+    totals, left_out = matrix.totals(
+        np.array([0, 0, 1, 1]), np.array([1, 3, 3, 9]), np.array([2.0, 100.0, 1.0, 5.0]), ["", "ml", "l", "g"], 2
+    )
+    # Milk's density comes from the unit registry
+    assert totals[:, 0].round(2).tolist() == [201.8, 618.0]
+    assert left_out.tolist() == [False, False, False, True]
+
+def test_recipe_nutrition():
+    """Test that a recipe's lines total and divide by its servings."""
+    db = make_session()
+    try:
+        matrix = get_nutrition_matrix(db)
+        lines = [
+            {"ingredient_id": "1", "quantity": 2, "unit": "pcs"},
+            {"ingredient_id": "2", "quantity": 100, "unit": "g"},
+            {"ingredient_id": "3", "quantity": 1, "unit": "cup"},
+            {"ingredient_id": "4", "quantity": 1, "unit": "tsp"},
+        ]
+        nutrition = recipe_nutrition(matrix, lines, 2)
+        assert nutrition["total"] == PANCAKES
+        assert nutrition["per_serving"]["calories"] == 322.0
+        assert nutrition["unmeasured_ingredient_ids"] == ["4"]
+    finally:
+        db.close()
+
+def test_matrix_is_rebuilt_when_ingredients_change():
+    """Test that the cached matrix follows the INGREDIENT version."""
+    db = make_session()
+    try:
+        matrix = get_nutrition_matrix(db)
+        assert get_nutrition_matrix(db) is matrix
+        db.get(IngredientNutritionModel, 2).calories = 400
+        bump_collection_version(db, INGREDIENT)
+        db.commit()
+        assert get_nutrition_matrix(db) is not matrix
+        assert recipe_nutrition(get_nutrition_matrix(db), [{"ingredient_id": "2", "quantity": 50, "unit": "g"}])["total"]["calories"] == 200.0
+    finally:
+        db.close()
+
+def test_meal_plan_nutrition_rolls_up_days_and_weeks():
+    """Test that each planned meal counts one serving, per day and per ISO week."""
+    db = make_session()
+    try:
+        nutrition = meal_plan_nutrition(db, date(2024, 1, 6), date(2024, 1, 9))
+        assert [(day["date"], day["meals"], day["total"]["calories"]) for day in nutrition["days"]] == [
+            ("2024-01-06", 0, 0.0), ("2024-01-07", 1, 322.0), ("2024-01-08", 1, 322.0), ("2024-01-09", 0, 0.0)
+        ]
+        # Saturday and Sunday belong to the week of Monday 1 January
+        assert [(week["week_start"], week["days"], week["total"]["calories"], week["daily_average"]["calories"])
+                for week in nutrition["weeks"]] == [("2024-01-01", 2, 322.0, 161.0), ("2024-01-08", 2, 322.0, 161.0)]
+        assert nutrition["total"]["calories"] == 644.0
+        assert nutrition["unmeasured_ingredient_ids"] == ["4"]
+
+        empty = meal_plan_nutrition(db, date(2024, 2, 1), date(2024, 2, 1))
+        assert empty["total"]["calories"] == 0.0 and empty["days"][0]["meals"] == 0
+    finally:
+        db.close()
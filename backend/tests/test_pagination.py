@@ -0,0 +1,40 @@
+import pytest
+from fastapi import HTTPException, Response
+from app.api.pagination import decode_cursor, encode_cursor, set_next_cursor, NEXT_CURSOR_HEADER
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes back to the sort key it was built from."""
+    cursor = encode_cursor(["Basil", 42])
+    
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == ["Basil", 42]
+
+def test_decode_cursor_rejects_garbage():
+    """Test that malformed cursors are rejected with a 400."""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor", 2)
+    assert exc_info.value.status_code == 400
+
+def test_decode_cursor_rejects_wrong_size():
+    """Test that a cursor from a different endpoint is rejected."""
+    cursor = encode_cursor([7])
+    
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, 2)
+    assert exc_info.value.status_code == 400
+
+def test_set_next_cursor():
+    """Test that the next cursor header is only set when there is a next page."""
+    response = Response()
+    set_next_cursor(response, None)
+    assert NEXT_CURSOR_HEADER not in response.headers
+    
+    set_next_cursor(response, "abc")
+    assert response.headers[NEXT_CURSOR_HEADER] == "abc"
+
+@pytest.mark.parametrize("path", ["/api/ingredients/", "/api/grocery-lists/"])
+@pytest.mark.parametrize("query", ["limit=0", "limit=501", "skip=-1"])
+def test_page_parameters_are_validated(client, path, query):
+    """Test that empty, oversized and negative pages are rejected before querying."""
+    response = client.get(f"{path}?{query}")
+    assert response.status_code == 422
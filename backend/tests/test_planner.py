@@ -0,0 +1,109 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi import status
+
+from app.db import planner
+from app.db.dynamodb import create_recipe, update_recipe
+from app.db.planner import FeatureArrays, PlanSearch, recipe_features
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Every test starts without built features."""
+    planner.live_index.reset()
+    yield
+    planner.live_index.reset()
+
+def recipe(recipe_id, ingredient_ids, prep_time=10, cook_time=20, difficulty="easy", tags=()):
+    item = {
+        "name": f"Recipe {recipe_id}",
+        "prep_time": prep_time,
+        "cook_time": cook_time,
+        "difficulty": difficulty,
+        "tags": list(tags),
+        "ingredients": [{"ingredient_id": i, "quantity": 1, "unit": "g"} for i in ingredient_ids],
+    }
+    if recipe_id is not None:
+        item["id"] = recipe_id
+    return item
+
+def arrays(*recipes):
+    return FeatureArrays({item["id"]: recipe_features(item) for item in recipes})
+
+def test_select_applies_filters():
+    """Test that recipes are filtered by total time, difficulty and required and excluded tags."""
+    features = arrays(
+        recipe("quick", ["egg"], prep_time=5, cook_time=5, tags=["Vegetarian"]),
+        recipe("slow", ["beef"], prep_time=30, cook_time=90, difficulty="hard"),
+        recipe("spicy", ["chili"], difficulty="medium", tags=["vegetarian", "spicy"]),
+        # Migrated by v002, which renamed prep_time
+        {**recipe("renamed", ["rice"], difficulty=None), "prep_time": None, "preparation_time": 50},
+    )
+    assert features.recipe_ids == ["quick", "renamed", "slow", "spicy"]
+    assert features.total_times.tolist() == [10, 70, 120, 30]
+
+    def selected(**filters):
+        return [features.recipe_ids[row] for row in np.flatnonzero(features.select(**filters))]
+
+    assert selected(max_total_time=60) == ["quick", "spicy"]
+    assert selected(difficulties=["easy", "hard"]) == ["quick", "slow"]
+    assert selected(tags=["vegetarian"]) == ["quick", "spicy"]
+    assert selected(tags=["vegetarian"], exclude_tags=["SPICY"]) == ["quick"]
+    assert selected(tags=["vegan"]) == []
+
+def test_search_avoids_repeats_and_shares_ingredients():
+    """Test that the plan keeps repeats out of the window and prefers recipes with common ingredients."""
+    features = arrays(
+        recipe("a", ["pasta", "tomato"]),
+        recipe("b", ["pasta", "tomato", "basil"]),
+        recipe("c", ["pasta", "basil"]),
+        recipe("d", ["tomato", "basil"]),
+        recipe("x", ["lobster", "saffron", "truffle"]),
+        recipe("y", ["duck", "cherry", "port"]),
+    )
+    candidates = [np.arange(len(features))]
+    search = PlanSearch(features, candidates, days=8, no_repeat_days=4, rng=np.random.default_rng(0))
+    search.build()
+    search.improve(deadline=float("inf"))
+
+    assert search.repeats() == 0
+    assert search.distinct_ingredients() == 3
+    planned = [features.recipe_ids[row] for row in search.plan[:, 0]]
+    assert set(planned) == {"a", "b", "c", "d"}
+    assert all(len(set(planned[day:day + 4])) == 4 for day in range(5))
+
+def create_tagged(item):
+    """Create a recipe; tags and difficulty are added after creation, as the migrations do."""
+    created = create_recipe(item)
+    return update_recipe(created["id"], {"tags": item["tags"], "difficulty": item["difficulty"]})
+
+def test_generate_endpoint(client):
+    """Test that the endpoint fills every slot from the matching recipes, reproducibly for a seed."""
+    breakfasts = [create_tagged(recipe(None, ["egg", "milk"], tags=["breakfast"])) for _ in range(3)]
+    dinners = [create_tagged(recipe(None, ["rice", "beans"], cook_time=40)) for _ in range(3)]
+    create_tagged(recipe(None, ["rice"], cook_time=120))
+
+    body = {
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-03",
+        "slots": [{"meal_type": "breakfast", "tags": ["breakfast"]}, {"meal_type": "dinner", "max_total_time": 60}],
+        "no_repeat_days": 3,
+        "seed": 7,
+    }
+    response = client.post("/api/meal-plans/generate", json=body)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [plan["date"] for plan in data["meal_plans"]] == [str(date(2024, 1, day)) for day in (1, 2, 3)]
+    assert data["repeats"] == 0
+    breakfast_ids = {item["id"] for item in breakfasts}
+    for plan in data["meal_plans"]:
+        [breakfast, dinner] = plan["recipes"]
+        assert breakfast["meal_type"] == "breakfast" and breakfast["recipe_id"] in breakfast_ids
+        assert dinner["meal_type"] == "dinner" and dinner["recipe_id"] in {item["id"] for item in dinners + breakfasts}
+    assert client.post("/api/meal-plans/generate", json=body).json() == data
+
+    response = client.post("/api/meal-plans/generate", json={**body, "tags": ["vegan"]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/api/meal-plans/generate", json={**body, "end_date": "2024-03-01"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
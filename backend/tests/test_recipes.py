@@ -118,4 +118,27 @@ def test_delete_recipe_not_found(client):
     response = client.delete("/api/recipes/nonexistent-id")
     
     assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert "detail" in response.json() 
\ No newline at end of file
+    assert "detail" in response.json() 
+def test_private_recipes_are_served_to_their_owner(client, sample_recipe):
+    """Test that a private recipe is listed, read and changed only with its owner's X-User-Id."""
+    alice, bob = {"X-User-Id": "alice"}, {"X-User-Id": "bob"}
+    shared = client.post("/api/recipes/", json=sample_recipe, headers=alice).json()
+    private = client.post("/api/recipes/", json={**sample_recipe, "public": False}, headers=alice).json()
+    assert (shared["public"], private["public"]) == (True, False)
+    
+    listed = {name: [recipe["id"] for recipe in client.get("/api/recipes/", headers=headers).json()]
+              for name, headers in (("alice", alice), ("bob", bob))}
+    assert listed == {"alice": [shared["id"], private["id"]], "bob": [shared["id"]]}
+    assert client.get(f"/api/recipes/{private['id']}", headers=alice).status_code == status.HTTP_200_OK
+    assert client.get(f"/api/recipes/{private['id']}", headers=bob).status_code == status.HTTP_404_NOT_FOUND
+    assert client.put(f"/api/recipes/{private['id']}", json={"name": "Mine"}, headers=bob).status_code == 404
+    assert client.delete(f"/api/recipes/{private['id']}", headers=bob).status_code == 404
+    
+    # Each user's list has its own ETag, which only their own writes change
+    etag = client.get("/api/recipes/", headers=bob).headers["etag"]
+    assert client.get("/api/recipes/", headers=alice).headers["etag"] != etag
+    client.put(f"/api/recipes/{private['id']}", json={"name": "Mine"}, headers=alice)
+    assert client.get("/api/recipes/", headers={**bob, "If-None-Match": etag}).status_code == 304
+    
+    assert client.delete(f"/api/recipes/{private['id']}", headers=alice).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/recipes/", headers={"X-User-Id": "a#b"}).status_code == status.HTTP_400_BAD_REQUEST
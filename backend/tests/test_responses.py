@@ -0,0 +1,79 @@
+import json
+import pytest
+from decimal import Decimal
+from fastapi import status
+from app.api import responses
+from app.api.responses import ORJSONResponse, build_trusted, trusted_response
+from app.schemas.schemas import Recipe
+
+@pytest.fixture(scope="function")
+def stored_recipe():
+    """A recipe as DynamoDB returns it: Decimal numbers and storage keys."""
+    return {
+        "PK": "RECIPE#abc",
+        "SK": "METADATA",
+        "GSI1PK": "RECIPE",
+        "GSI1SK": "Soup",
+        "id": "abc",
+        "name": "Soup",
+        "description": "Warming",
+        "instructions": "Simmer",
+        "prep_time": Decimal(10),
+        "cook_time": Decimal(20),
+        "servings": Decimal(2),
+        "ingredients": [
+            {"ingredient_id": "i1", "name": "Leek", "quantity": Decimal("1.5"), "unit": "cup"}
+        ],
+        "created_at": "2024-01-01T12:00:00",
+        "version": Decimal(1),
+    }
+
+def test_orjson_response_handles_decimal():
+    """Test that Decimals render as JSON integers or floats."""
+    body = ORJSONResponse({"whole": Decimal(4), "part": Decimal("0.25")}).body
+
+    assert json.loads(body) == {"whole": 4, "part": 0.25}
+    assert b'"whole":4,' in body
+
+def test_build_trusted_matches_validated_output(stored_recipe):
+    """Test that the fast path renders the same JSON as response model validation."""
+    # 1. Build the model both ways
+    trusted = build_trusted(Recipe, stored_recipe)
+    validated = Recipe(**stored_recipe)
+
+    # 2. Storage-only attributes are dropped, nested models are built too
+    assert "PK" not in trusted.__dict__
+    assert trusted.ingredients[0].unit == "cup"
+
+    # 3. Both paths render the same document
+    assert json.loads(ORJSONResponse(trusted).body) == json.loads(validated.json())
+
+def test_trusted_response_disabled_by_default(stored_recipe):
+    """Test that stored data is returned unchanged unless the fast path is on."""
+    assert trusted_response(Recipe, stored_recipe) is stored_recipe
+
+def test_recipe_endpoints_fast_path(client, sample_recipe, monkeypatch):
+    """Test the recipe endpoints with FAST_JSON_RESPONSES on."""
+    monkeypatch.setattr(responses, "FAST_JSON_RESPONSES", True)
+
+    # 1. Create a recipe
+    response = client.post("/api/recipes/", json=sample_recipe)
+    assert response.status_code == status.HTTP_201_CREATED
+    created = response.json()
+    assert created["prep_time"] == sample_recipe["prep_time"]
+    assert "PK" not in created
+
+    # 2. The item GET still carries its ETag and honours If-None-Match
+    response = client.get(f"/api/recipes/{created['id']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["ingredients"] == sample_recipe["ingredients"]
+    etag = response.headers["ETag"]
+
+    response = client.get(f"/api/recipes/{created['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # 3. The list GET returns the same recipe
+    response = client.get("/api/recipes/")
+    assert response.status_code == status.HTTP_200_OK
+    assert "ETag" in response.headers
+    assert [recipe["id"] for recipe in response.json()] == [created["id"]]
@@ -0,0 +1,116 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.db.dynamodb import create_recipe, update_recipe
+from app.db.scaling import nice_quantities, quantity_text, scale_meal_plans, scaled_lines
+from app.db.units import UNIT_NAMES, unit_codes
+from app.models.models import (
+    Ingredient as IngredientModel,
+    MealPlan as MealPlanModel,
+    Recipe as RecipeModel,
+    meal_plan_recipe,
+    recipe_ingredient,
+)
+
+@pytest.fixture(autouse=True)
+def fresh_memo():
+    """Every test starts without scaled recipes in memory."""
+    scaled_lines.clear()
+    yield
+    scaled_lines.clear()
+
+def nice(quantities, units):
+    rounded, codes = nice_quantities(quantities, unit_codes(units))
+    return [(quantity, UNIT_NAMES[code]) for quantity, code in zip(rounded.tolist(), codes.tolist())]
+
+def test_nice_quantities_move_units_and_round():
+    """Test that quantities move along their unit ladder and round to measurable amounts."""
+    assert nice([12, 0.3, 0.2, 2.05], ["tsp", "tbsp", "cups", "cup"]) == [
+        (0.25, "cup"), (1.0, "tsp"), (3.25, "tbsp"), (2.0, "cup"),
+    ]
+    assert nice([1234, 0.25, 333, 7.3], ["g", "kg", "ml", "g"]) == [(1.2, "kg"), (250.0, "g"), (330.0, "ml"), (7.3, "g")]
+    assert nice([20, 0.4], ["oz", "lb"]) == [(1.25, "lb"), (6.333333, "oz")]
+    # Counts round to quarters but never to nothing; from 10 up to whole numbers
+    assert nice([1.3, 0.1, 12.6], ["", "pcs", "pcs"]) == [(1.25, "pcs"), (0.25, "pcs"), (13.0, "pcs")]
+    assert [quantity_text(quantity) for quantity in (1.5, 0.333333, 2.0, 7.3, 1.125)] == ["1 1/2", "1/3", "2", "7.3", "1 1/8"]
+
+def test_scaled_lines_are_memoised_per_stamp_and_servings():
+    """Test that a repeat scale is served from the memo and a new stamp computes again."""
+    lines = [{"ingredient_id": "egg", "name": "Egg", "quantity": 3, "unit": "pcs"}]
+    [first] = scaled_lines.scale([("v1", 2, lines)], 4)
+    assert first == [{"ingredient_id": "egg", "name": "Egg", "quantity": 6.0, "unit": "pcs", "text": "6"}]
+    assert scaled_lines.scale([("v1", 2, lines)], 4)[0] is first
+
+    changed = [{**lines[0], "quantity": 1}]
+    assert scaled_lines.scale([("v1", 2, lines), ("v2", 2, changed)], 3) == [
+        [{**first[0], "quantity": 4.5, "text": "4 1/2"}],
+        [{**first[0], "quantity": 1.5, "text": "1 1/2"}],
+    ]
+
+def test_scale_meal_plans_scales_every_planned_recipe():
+    """Test that a range of meal plans comes back by day with every recipe scaled."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        IngredientModel(id=1, name="Egg"),
+        IngredientModel(id=2, name="Milk"),
+        RecipeModel(id=1, name="Pancakes", servings=2),
+        RecipeModel(id=2, name="Omelette", servings=None),
+        MealPlanModel(id=1, date=date(2024, 1, 7)),
+        MealPlanModel(id=2, date=date(2024, 1, 8)),
+    ])
+    db.flush()
+    db.execute(recipe_ingredient.insert(), [
+        {"recipe_id": 1, "ingredient_id": 1, "quantity": 2, "unit": "pcs"},
+        {"recipe_id": 1, "ingredient_id": 2, "quantity": 1, "unit": "cup"},
+        {"recipe_id": 2, "ingredient_id": 1, "quantity": 3, "unit": "pcs"},
+    ])
+    db.execute(meal_plan_recipe.insert(), [
+        {"meal_plan_id": 1, "recipe_id": 1, "meal_type": "breakfast"},
+        {"meal_plan_id": 1, "recipe_id": 2, "meal_type": "dinner"},
+        {"meal_plan_id": 2, "recipe_id": 1, "meal_type": "breakfast"},
+    ])
+    db.commit()
+
+    scaled = scale_meal_plans(db, date(2024, 1, 1), date(2024, 1, 31), 3)
+    assert [(day["date"], [meal["meal_type"] for meal in day["meals"]]) for day in scaled["days"]] == [
+        ("2024-01-07", ["breakfast", "dinner"]),
+        ("2024-01-08", ["breakfast"]),
+    ]
+    pancakes, omelette = scaled["days"][0]["meals"]
+    assert (pancakes["factor"], pancakes["original_servings"]) == (1.5, 2)
+    assert [(line["name"], line["quantity"], line["unit"]) for line in pancakes["ingredients"]] == [
+        ("Egg", 3.0, "pcs"), ("Milk", 1.5, "cup"),
+    ]
+    # Without servings of its own a recipe can't be scaled
+    assert (omelette["factor"], omelette["ingredients"][0]["quantity"]) == (1.0, 3.0)
+    assert scaled["days"][1]["meals"][0]["ingredients"] is pancakes["ingredients"]
+
+def test_scaled_recipe_endpoint(client, sample_recipe):
+    """Test that the endpoint scales a recipe and follows its updates."""
+    lines = [
+        {"ingredient_id": "1", "name": "Flour", "quantity": Decimal("1.5"), "unit": "cups"},
+        {"ingredient_id": "2", "name": "Salt", "quantity": Decimal("1"), "unit": "tsp"},
+    ]
+    recipe = create_recipe({**sample_recipe, "servings": 4, "ingredients": lines})
+
+    response = client.get(f"/api/recipes/{recipe['id']}/scaled?servings=6")
+    assert response.status_code == status.HTTP_200_OK
+    scaled = response.json()
+    assert (scaled["servings"], scaled["original_servings"], scaled["factor"]) == (6, 4, 1.5)
+    assert [(line["text"], line["unit"]) for line in scaled["ingredients"]] == [("2 1/4", "cup"), ("1 1/2", "tsp")]
+
+    update_recipe(recipe["id"], {"servings": 2})
+    scaled = client.get(f"/api/recipes/{recipe['id']}/scaled?servings=6").json()
+    assert [(line["text"], line["unit"]) for line in scaled["ingredients"]] == [("4 1/2", "cup"), ("1", "tbsp")]
+
+    assert client.get(f"/api/recipes/{recipe['id']}/scaled?servings=0").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/api/recipes/missing/scaled?servings=2").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import status
+
+from app.db import search
+from app.models.models import Ingredient as IngredientModel
+from app.db.search import SearchIndex, stem, tokenize
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Every test starts without a built index or a loaded catalog."""
+    search.live_index.reset()
+    search.reset_ingredient_catalog()
+    yield
+    search.live_index.reset()
+    search.reset_ingredient_catalog()
+
+def make_index(recipes):
+    index = SearchIndex()
+    for recipe in recipes:
+        index.add_recipe(recipe)
+    return index
+
+def test_tokenize_stems_and_drops_stop_words():
+    """Test that inflections share a stem and stop words are ignored."""
+    assert stem("baking") == stem("baked") == stem("bakes") == stem("bake")
+    assert stem("chopped") == stem("chop")
+    assert stem("tomatoes") == stem("tomato")
+    assert tokenize("Roast the Potatoes and Carrots") == [stem("roast"), stem("potato"), stem("carrot")]
+
+def test_search_ranks_with_bm25():
+    """Test that name matches outrank body matches and unmatched recipes are left out."""
+    index = make_index([
+        {"id": "1", "name": "Tomato soup", "description": "Smooth and warming"},
+        {"id": "2", "name": "Green salad", "instructions": "Slice a tomato over the leaves"},
+        {"id": "3", "name": "Pancakes", "tags": ["breakfast"]},
+    ])
+
+    assert [recipe_id for recipe_id, _ in index.search("tomatoes")] == ["1", "2"]
+    assert [recipe_id for recipe_id, _ in index.search("breakfast pancake")] == ["3"]
+    assert index.search("tomato", limit=1)[0][0] == "1"
+    assert index.search("sushi") == []
+
+def test_incremental_updates_and_removal():
+    """Test that re-adding a recipe replaces its terms and removal drops them."""
+    index = make_index([{"id": "1", "name": "Tomato soup"}, {"id": "2", "name": "Leek soup"}])
+
+    index.add_recipe({"id": "1", "name": "Onion soup"})
+    assert index.search("tomato") == []
+    assert [recipe_id for recipe_id, _ in index.search("onion")] == ["1"]
+
+    index.remove("2")
+    assert "leek" not in index.postings
+    assert len(index) == 1
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that a saved snapshot loads back to an index giving the same results."""
+    index = make_index([
+        {"id": "1", "name": "Tomato soup", "ingredients": [{"name": "Tomato"}, {"name": "Basil"}]},
+        {"id": "2", "name": "Basil pesto", "tags": ["italian"]},
+    ])
+    index.version = 7
+    path = str(tmp_path / "recipes.index")
+    index.save(path)
+
+    loaded = SearchIndex.load(path)
+    assert loaded.version == 7
+    assert loaded.postings == index.postings
+    assert loaded.search("basil") == index.search("basil")
+
+def test_search_endpoint_follows_writes(sql_client, sample_recipe):
+    """Test that the search endpoint sees recipes created, renamed and deleted after the index was built."""
+    first = sql_client.post("/api/recipes/", json={**sample_recipe, "name": "Tomato soup"}).json()
+    assert [hit["id"] for hit in sql_client.get("/api/recipes/search?q=soup").json()] == [first["id"]]
+    built = search.live_index.index
+
+    second = sql_client.post("/api/recipes/", json={**sample_recipe, "name": "Lentil soup"}).json()
+    sql_client.put(f"/api/recipes/{first['id']}", json={"name": "Tomato bisque"})
+    hits = sql_client.get("/api/recipes/search?q=soup").json()
+    assert [hit["id"] for hit in hits] == [second["id"]]
+    assert hits[0]["score"] > 0
+
+    sql_client.delete(f"/api/recipes/{second['id']}")
+    assert sql_client.get("/api/recipes/search?q=soup").json() == []
+    # Writes through this process were applied incrementally, without a rebuild
+    assert search.live_index.index is built
+    assert sql_client.get("/api/recipes/search").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_ingredient_lines_are_searched_by_catalog_name(sql_client, sql_session, sample_recipe):
+    """Test that a recipe line without a display name is found by its SQL catalog name, renames included."""
+    with sql_session() as db:
+        db.add(IngredientModel(id=1, name="Saffron"))
+        db.commit()
+    lines = [{"ingredient_id": "1", "quantity": 1, "unit": "g"}, {"ingredient_id": "99", "quantity": 1, "unit": "g"}]
+    paella = sql_client.post("/api/recipes/", json={**sample_recipe, "name": "Paella", "ingredients": lines}).json()
+    response = sql_client.get("/api/recipes/search?q=saffron")
+    assert [hit["id"] for hit in response.json()] == [paella["id"]]
+    built = search.live_index.index
+
+    # Renaming the ingredient changes the ETag and rebuilds the index with the new name
+    sql_client.put("/api/ingredients/1", json={"name": "Turmeric"})
+    stale = sql_client.get("/api/recipes/search?q=saffron", headers={"If-None-Match": response.headers["etag"]})
+    assert stale.status_code == status.HTTP_200_OK and stale.json() == []
+    assert [hit["id"] for hit in sql_client.get("/api/recipes/search?q=turmeric").json()] == [paella["id"]]
+    assert search.live_index.index is not built
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from fastapi import status
+
+from app.db import similarity
+from app.db.dynamodb import create_recipe, update_recipe
+from app.db.similarity import SimilarityIndex
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Every test starts without a built index."""
+    similarity.live_index.reset()
+    yield
+    similarity.live_index.reset()
+
+def recipe(recipe_id, *ingredient_ids, tags=()):
+    return {
+        "id": recipe_id,
+        "tags": list(tags),
+        "ingredients": [{"ingredient_id": i, "quantity": 1, "unit": "g"} for i in ingredient_ids],
+    }
+
+def make_index(recipes):
+    index = SimilarityIndex()
+    for item in recipes:
+        index.add_recipe(item)
+    return index
+
+def test_similar_weighs_rare_features_higher():
+    """Test that a shared rare ingredient counts more than a shared staple, and ties break by id."""
+    index = make_index([
+        recipe("paella", "saffron", "rice", "salt"),
+        recipe("bouillabaisse", "saffron", "fish", "salt"),
+        recipe("toast", "bread", "salt"),
+        recipe("mash", "potato", "salt"),
+    ])
+    hits = index.similar("paella")
+    assert [recipe_id for recipe_id, _ in hits] == ["bouillabaisse", "mash", "toast"]
+    assert 1 > hits[0][1] > hits[1][1] == hits[2][1] > 0
+    assert index.similar("mash", limit=1) == [("toast", index.similar("toast", limit=1)[0][1])]
+    assert index.similar("missing") is None
+
+    # Rows are unit vectors, so a recipe's cosine with an identical one is 1
+    index.add_recipe(recipe("paella-2", "saffron", "rice", "salt"))
+    assert index.similar("paella", limit=1) == [("paella-2", 1.0)]
+    norms = np.bincount(np.repeat(np.arange(len(index)), np.diff(index.indptr)), weights=index.data ** 2)
+    assert np.allclose(norms, 1)
+
+def test_tags_count_and_updates_apply():
+    """Test that shared tags make recipes similar, and re-added and removed recipes are reflected."""
+    index = make_index([
+        recipe("pesto", "basil", tags=["Italian"]),
+        recipe("risotto", "rice", tags=["italian"]),
+        recipe("curry", "rice", tags=["indian"]),
+    ])
+    assert [recipe_id for recipe_id, _ in index.similar("pesto")] == ["risotto"]
+
+    index.add_recipe(recipe("pesto", "basil", "rice"))
+    index.remove("risotto")
+    assert [recipe_id for recipe_id, _ in index.similar("pesto")] == ["curry"]
+    assert len(index) == 2
+
+def test_snapshot_maps_back(tmp_path):
+    """Test that a snapshot loads memory-mapped, answers the same and still takes writes."""
+    index = make_index([recipe("a", "egg", "milk"), recipe("b", "egg", "flour"), recipe("c", "milk", tags=["quick"])])
+    index.version = 7
+    path = str(tmp_path / "similarity.index")
+    index.save(path)
+
+    loaded = SimilarityIndex.load(path)
+    assert loaded.version == 7
+    assert isinstance(loaded.data, np.memmap)
+    assert loaded.similar("a") == index.similar("a")
+
+    loaded.add_recipe(recipe("d", "egg", "milk"))
+    assert loaded.similar("a", limit=1) == [("d", 1.0)]
+    # Writes replace the mapped arrays instead of touching the file
+    assert SimilarityIndex.load(path).similar("a") == index.similar("a")
+
+def test_similar_endpoint_follows_writes(client, sample_recipe):
+    """Test that the endpoint answers from the index and sees writes made after it was built."""
+    def lines(*ingredient_ids):
+        return [{"ingredient_id": i, "quantity": Decimal("1"), "unit": "pcs"} for i in ingredient_ids]
+
+    omelette = create_recipe({**sample_recipe, "ingredients": lines("egg", "butter", "chives")})
+    frittata = create_recipe({**sample_recipe, "ingredients": lines("egg", "chives", "potato")})
+    create_recipe({**sample_recipe, "ingredients": lines("bread", "butter")})
+
+    response = client.get(f"/api/recipes/{omelette['id']}/similar")
+    assert response.status_code == status.HTTP_200_OK
+    hits = response.json()
+    assert hits[0]["id"] == frittata["id"] and 0 < hits[0]["similarity"] < 1
+    assert len(hits) == 2
+
+    update_recipe(frittata["id"], {"ingredients": lines("rice")})
+    assert frittata["id"] not in [hit["id"] for hit in client.get(f"/api/recipes/{omelette['id']}/similar").json()]
+
+    client.delete(f"/api/recipes/{omelette['id']}")
+    assert client.get(f"/api/recipes/{omelette['id']}/similar").status_code == status.HTTP_404_NOT_FOUND
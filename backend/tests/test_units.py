@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+from app.db.units import MASS, UNIT_CODES, UNIT_DIMENSIONS, UNKNOWN, convert, density, parse_unit, readable, unit_codes
+
+def test_parse_unit_aliases():
+    """Test that spellings, plurals and abbreviations map onto canonical units."""
+    assert parse_unit("g") == "g"
+    assert parse_unit("Grams") == "g"
+    assert parse_unit("Tablespoons") == "tbsp"
+    assert parse_unit("tbs.") == "tbsp"
+    assert parse_unit("fl. oz") == "fl oz"
+    assert parse_unit("cups") == "cup"
+    assert parse_unit("lbs") == "lb"
+    assert parse_unit("") == "pcs"
+    assert parse_unit("pieces") == "pcs"
+    assert parse_unit("pinch") is None
+
+def test_unit_codes():
+    """Test that a sequence of spellings becomes registry codes."""
+    codes = unit_codes(["kg", "kilograms", None, "sprig"])
+    assert codes.tolist() == [UNIT_CODES["kg"], UNIT_CODES["kg"], UNIT_CODES["pcs"], UNKNOWN]
+    assert UNIT_DIMENSIONS[codes[0]] == MASS
+    assert unit_codes([]).tolist() == []
+
+def test_convert_within_a_dimension():
+    """Test that a whole array converts in one call, NaN where dimensions differ."""
+    converted = convert(
+        np.array([2.0, 1.5, 1.0, 3.0, 1.0]),
+        unit_codes(["tbsp", "kg", "cup", "pcs", "pinch"]),
+        unit_codes(["ml", "g", "tbsp", "g", "g"])
+    )
+    assert converted[:3].tolist() == [30.0, 1500.0, 16.0]
+    assert math.isnan(converted[3]) and math.isnan(converted[4])
+    assert convert(np.array([1000.0]), unit_codes(["g"]), UNIT_CODES["kg"]).tolist() == [1.0]
+
+def test_convert_between_volume_and_mass():
+    """Test that volume and mass convert through a density, and only with one."""
+    from_codes, to_codes = unit_codes(["cup", "g", "cup"]), unit_codes(["g", "ml", "g"])
+    converted = convert(np.array([1.0, 100.0, 1.0]), from_codes, to_codes, np.array([0.5, 2.0, np.nan]))
+    assert converted[:2].tolist() == [120.0, 50.0]
+    assert math.isnan(converted[2])
+    assert math.isnan(convert(np.array([1.0]), unit_codes(["cup"]), UNIT_CODES["g"])[0])
+
+def test_density_matches_trailing_words():
+    """Test that densities are found by name, falling back to the name's trailing words."""
+    assert density("Flour") == 0.53
+    assert density("extra virgin olive oil") == 0.92
+    assert density("whole milk") == 1.03
+    assert density("Egg") is None
+
+def test_readable():
+    """Test that large base-unit quantities move to kg and l."""
+    assert readable(1500.0, "g") == (1.5, "kg")
+    assert readable(2000.0, "ml") == (2.0, "l")
+    assert readable(500.0, "g") == (500.0, "g")
+    assert readable(3000.0, "pcs") == (3000.0, "pcs")
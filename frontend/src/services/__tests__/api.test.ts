@@ -33,6 +33,22 @@ describe('API Service', () => {
       expect(result).toEqual(mockRecipes);
     });
 
+    test('searchRecipes should fetch ranked results', async () => {
+      const mockResults = [{ ...mockRecipe, score: 1.5 }];
+      mock.onGet('/recipes/search', { params: { q: 'pasta' } }).reply(200, mockResults);
+
+      const result = await api.searchRecipes('pasta');
+      expect(result).toEqual(mockResults);
+    });
+
+    test('getCookableRecipes should send the ingredients on hand', async () => {
+      const mockMatches = [{ ...mockRecipe, covered: 2, coverage: 1, missing_ingredient_ids: [] }];
+      mock.onGet('/recipes/cookable', { params: { ingredients: '1,2', min_coverage: 75 } }).reply(200, mockMatches);
+
+      const result = await api.getCookableRecipes(['1', '2'], 75);
+      expect(result).toEqual(mockMatches);
+    });
+
     test('getRecipe should fetch a specific recipe', async () => {
       mock.onGet('/recipes/test-recipe-1').reply(200, mockRecipe);
 
@@ -40,6 +56,30 @@ describe('API Service', () => {
       expect(result).toEqual(mockRecipe);
     });
 
+    test('getRecipeNutrition should fetch totals and per-serving values', async () => {
+      const mockNutrition = { recipe_id: 'test-recipe-1', servings: 2, total: { calories: 640 }, per_serving: { calories: 320 } };
+      mock.onGet('/recipes/test-recipe-1/nutrition').reply(200, mockNutrition);
+
+      const result = await api.getRecipeNutrition('test-recipe-1');
+      expect(result).toEqual(mockNutrition);
+    });
+
+    test('getScaledRecipe should fetch a recipe scaled to a headcount', async () => {
+      const mockScaled = { recipe_id: 'test-recipe-1', servings: 6, original_servings: 4, factor: 1.5, ingredients: [] };
+      mock.onGet('/recipes/test-recipe-1/scaled', { params: { servings: 6 } }).reply(200, mockScaled);
+
+      const result = await api.getScaledRecipe('test-recipe-1', 6);
+      expect(result).toEqual(mockScaled);
+    });
+
+    test('getSimilarRecipes should fetch recipes like a recipe', async () => {
+      const mockSimilar = [{ ...mockRecipe, id: 'test-recipe-2', similarity: 0.8 }];
+      mock.onGet('/recipes/test-recipe-1/similar', { params: { limit: 5 } }).reply(200, mockSimilar);
+
+      const result = await api.getSimilarRecipes('test-recipe-1', 5);
+      expect(result).toEqual(mockSimilar);
+    });
+
     test('createRecipe should create a recipe', async () => {
       mock.onPost('/recipes/').reply(201, mockRecipe);
 
@@ -78,12 +118,28 @@ describe('API Service', () => {
       expect(result).toEqual(mockIngredients);
     });
 
+    test('autocompleteIngredients should fetch suggestions for a prefix', async () => {
+      const mockSuggestions = [{ ...mockIngredient, usage: 3 }];
+      mock.onGet('/ingredients/autocomplete', { params: { q: 'to' } }).reply(200, mockSuggestions);
+
+      const result = await api.autocompleteIngredients('to');
+      expect(result).toEqual(mockSuggestions);
+    });
+
     test('createIngredient should create an ingredient', async () => {
       mock.onPost('/ingredients/').reply(201, mockIngredient);
 
       const result = await api.createIngredient(mockIngredient);
       expect(result).toEqual(mockIngredient);
     });
+
+    test('updateIngredientNutrition should put the nutrition facts', async () => {
+      const facts = { calories: 18, protein: 0.9, carbohydrates: 3.9, grams_per_piece: 120 };
+      mock.onPut('/ingredients/test-ingredient-1/nutrition', facts).reply(200, { ...facts, ingredient_id: 'test-ingredient-1' });
+
+      const result = await api.updateIngredientNutrition('test-ingredient-1', facts);
+      expect(result.grams_per_piece).toBe(120);
+    });
   });
 
   // Meal Plan API Tests
@@ -123,6 +179,46 @@ describe('API Service', () => {
       expect(result).toEqual(mockMealPlans);
     });
 
+    test('getWeekDashboard should fetch the week in one request', async () => {
+      const mockDashboard = {
+        start_date: '2023-05-01',
+        end_date: '2023-05-07',
+        meal_plans: [mockMealPlan],
+        recipes: [],
+        ingredients: [],
+        grocery_lists: []
+      };
+      mock.onGet('/dashboard/week/', { params: { start_date: '2023-05-01' } }).reply(200, mockDashboard);
+
+      const result = await api.getWeekDashboard('2023-05-01');
+      expect(result).toEqual(mockDashboard);
+    });
+
+    test('getMealPlanNutrition should fetch the rollup for a range', async () => {
+      const mockNutrition = { start_date: '2023-05-01', end_date: '2023-05-07', total: { calories: 14000 }, days: [], weeks: [] };
+      mock.onGet('/meal-plans/nutrition', { params: { start_date: '2023-05-01', end_date: '2023-05-07' } }).reply(200, mockNutrition);
+
+      const result = await api.getMealPlanNutrition('2023-05-01', '2023-05-07');
+      expect(result).toEqual(mockNutrition);
+    });
+
+    test('getScaledMealPlans should fetch a range scaled to a headcount', async () => {
+      const mockScaled = { start_date: '2023-05-01', end_date: '2023-05-07', servings: 4, days: [] };
+      mock.onGet('/meal-plans/scaled', { params: { start_date: '2023-05-01', end_date: '2023-05-07', servings: 4 } }).reply(200, mockScaled);
+
+      const result = await api.getScaledMealPlans('2023-05-01', '2023-05-07', 4);
+      expect(result).toEqual(mockScaled);
+    });
+
+    test('generateMealPlans should post the constraints', async () => {
+      const constraints = { start_date: '2023-05-01', end_date: '2023-05-07', max_total_time: 45, seed: 1 };
+      const mockPlans = { start_date: '2023-05-01', end_date: '2023-05-07', meal_plans: [], distinct_ingredients: 0, repeats: 0 };
+      mock.onPost('/meal-plans/generate', constraints).reply(200, mockPlans);
+
+      const result = await api.generateMealPlans(constraints);
+      expect(result).toEqual(mockPlans);
+    });
+
     test('createMealPlan should create a meal plan', async () => {
       mock.onPost('/meal-plans/').reply(201, mockMealPlan);
 
@@ -184,6 +280,14 @@ describe('API Service', () => {
       expect(result).toEqual(mockGroceryList);
     });
 
+    test('generateGroceryList should post the date range', async () => {
+      const body = { start_date: '2023-05-01', end_date: '2023-05-07', servings: { 'test-recipe-1': 4 } };
+      mock.onPost('/grocery-lists/generate', body).reply(201, mockGroceryList);
+
+      const result = await api.generateGroceryList('2023-05-01', '2023-05-07', { servings: { 'test-recipe-1': 4 } });
+      expect(result).toEqual(mockGroceryList);
+    });
+
     test('updateGroceryList should update a grocery list', async () => {
       const updatedGroceryList = { ...mockGroceryList, name: 'Updated Grocery List' };
       mock.onPut('/grocery-lists/test-grocery-list-1').reply(200, updatedGroceryList);
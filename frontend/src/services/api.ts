@@ -15,6 +15,10 @@ const api = axios.create({
 api.interceptors.request.use(
   (config) => {
     // You can add auth tokens here if needed in the future
+    // A retry of the same config keeps its key, so the server runs the POST once
+    if (config.method === 'post' && config.headers && !config.headers['Idempotency-Key']) {
+      config.headers['Idempotency-Key'] = crypto.randomUUID();
+    }
     return config;
   },
   (error) => {
@@ -40,11 +44,39 @@ export const getRecipes = async () => {
   return response.data;
 };
 
+export const searchRecipes = async (query: string, limit?: number) => {
+  const response = await api.get('/recipes/search', { params: { q: query, limit } });
+  return response.data;
+};
+
+export const getCookableRecipes = async (ingredientIds: string[], minCoverage?: number) => {
+  const response = await api.get('/recipes/cookable', {
+    params: { ingredients: ingredientIds.join(','), min_coverage: minCoverage },
+  });
+  return response.data;
+};
+
 export const getRecipe = async (id: string) => {
   const response = await api.get(`/recipes/${id}`);
   return response.data;
 };
 
+export const getRecipeNutrition = async (id: string) => {
+  const response = await api.get(`/recipes/${id}/nutrition`);
+  return response.data;
+};
+
+// Ingredients scaled to a headcount and rounded to measurable amounts
+export const getScaledRecipe = async (id: string, servings: number) => {
+  const response = await api.get(`/recipes/${id}/scaled`, { params: { servings } });
+  return response.data;
+};
+
+export const getSimilarRecipes = async (id: string, limit?: number) => {
+  const response = await api.get(`/recipes/${id}/similar`, { params: { limit } });
+  return response.data;
+};
+
 export const createRecipe = async (recipe: any) => {
   const response = await api.post('/recipes/', recipe);
   return response.data;
@@ -65,11 +97,21 @@ export const getIngredients = async () => {
   return response.data;
 };
 
+export const autocompleteIngredients = async (prefix: string, limit?: number) => {
+  const response = await api.get('/ingredients/autocomplete', { params: { q: prefix, limit } });
+  return response.data;
+};
+
 export const createIngredient = async (ingredient: any) => {
   const response = await api.post('/ingredients/', ingredient);
   return response.data;
 };
 
+export const updateIngredientNutrition = async (id: string, nutrition: any) => {
+  const response = await api.put(`/ingredients/${id}/nutrition`, nutrition);
+  return response.data;
+};
+
 // Meal Plans
 export const getMealPlans = async (startDate?: string, endDate?: string) => {
   let url = '/meal-plans/';
@@ -93,6 +135,35 @@ export const getWeeklyMealPlan = async (startDate?: string) => {
   return response.data;
 };
 
+// Meal plans, recipes, ingredients and grocery lists for a week in one request
+export const getWeekDashboard = async (startDate?: string, endDate?: string) => {
+  const response = await api.get('/dashboard/week/', {
+    params: { start_date: startDate, end_date: endDate },
+  });
+  return response.data;
+};
+
+// Calories and macros per day and per week of the planned meals
+export const getMealPlanNutrition = async (startDate: string, endDate: string) => {
+  const response = await api.get('/meal-plans/nutrition', {
+    params: { start_date: startDate, end_date: endDate },
+  });
+  return response.data;
+};
+
+export const getScaledMealPlans = async (startDate: string, endDate: string, servings: number) => {
+  const response = await api.get('/meal-plans/scaled', {
+    params: { start_date: startDate, end_date: endDate, servings },
+  });
+  return response.data;
+};
+
+// Proposed meal plans for a range under constraints; nothing is saved until each plan is created
+export const generateMealPlans = async (constraints: any) => {
+  const response = await api.post('/meal-plans/generate', constraints);
+  return response.data;
+};
+
 export const createMealPlan = async (mealPlan: any) => {
   const response = await api.post('/meal-plans/', mealPlan);
   return response.data;
@@ -123,6 +194,19 @@ export const createGroceryList = async (groceryList: any) => {
   return response.data;
 };
 
+export const generateGroceryList = async (
+  startDate: string,
+  endDate: string,
+  options: { name?: string; servings?: Record<string, number> } = {}
+) => {
+  const response = await api.post('/grocery-lists/generate', {
+    start_date: startDate,
+    end_date: endDate,
+    ...options,
+  });
+  return response.data;
+};
+
 export const updateGroceryList = async (id: string, groceryList: any) => {
   const response = await api.put(`/grocery-lists/${id}`, groceryList);
   return response.data;
@@ -133,6 +217,20 @@ export const updateGroceryItem = async (groceryListId: string, ingredientId: str
   return response.data;
 };
 
+// Check toggles are held briefly so a burst of taps on an item sends one PATCH, with its last state
+const CHECK_TOGGLE_DELAY_MS = 250;
+const heldChecks = new Map<string, ReturnType<typeof setTimeout>>();
+
+export const setGroceryItemChecked = (groceryListId: string, ingredientId: string, checked: boolean) => {
+  const key = `${groceryListId}/${ingredientId}`;
+  clearTimeout(heldChecks.get(key));
+  heldChecks.set(key, setTimeout(() => {
+    heldChecks.delete(key);
+    // Failures are already logged by the response interceptor
+    updateGroceryItem(groceryListId, ingredientId, { checked }).catch(() => undefined);
+  }, CHECK_TOGGLE_DELAY_MS));
+};
+
 export const deleteGroceryList = async (id: string) => {
   await api.delete(`/grocery-lists/${id}`);
 };
@@ -35,6 +35,12 @@ resource "aws_dynamodb_table" "meal_planner" {
     enabled = true
   }
 
+  # Idempotency records expire on their own
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Name        = "${var.project_name}-${var.environment}"
     Environment = var.environment
@@ -221,6 +221,12 @@ resource "aws_dynamodb_table" "meal_planner" {
     projection_type    = "ALL"
   }
 
+  # Idempotency records expire on their own
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Name        = "Meal Planner Database"
     Environment = var.environment